@@ -0,0 +1,92 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Расход памяти на расписание 1000 групп за 20 недель в обычном и компактном
+виде.
+
+Запуск: ``python benchmarks/bench_compact.py``
+"""
+
+import gc
+import random
+import time
+import tracemalloc
+from collections.abc import Callable
+from uuid import uuid4
+
+from egov66_timetable.compact import CompactStore
+from egov66_timetable.types import Lesson, LessonData, Timetable
+
+GROUPS = 1000
+WEEKS = 20
+ROOMS = [str(100 + i) for i in range(250)]
+NAMES = [f"Учебная дисциплина номер {i}" for i in range(300)]
+
+
+def fresh(string: str) -> str:
+    # Как и после разбора JSON, каждая строка — отдельный объект.
+    return "".join(list(string))
+
+
+def make_timetable() -> Timetable[Lesson]:
+    return [
+        {
+            lesson_num: Lesson(str(uuid4()), LessonData(fresh(random.choice(ROOMS)),
+                                                        fresh(random.choice(NAMES))))
+            for lesson_num in range(6)
+            if random.random() < 0.7
+        }
+        for _ in range(6)
+    ]
+
+
+def measure(build: Callable[[], object]) -> tuple[int, float]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size, elapsed
+
+
+def main() -> None:
+    random.seed(0)
+
+    def build_plain() -> dict[tuple[str, str], Timetable[Lesson]]:
+        random.seed(0)
+        return {(str(group), str(week)): make_timetable()
+                for group in range(GROUPS) for week in range(WEEKS)}
+
+    def build_compact() -> CompactStore:
+        random.seed(0)
+        store = CompactStore()
+        for group in range(GROUPS):
+            for week in range(WEEKS):
+                store.put(make_timetable(), str(group), str(week))
+        return store
+
+    plain, plain_time = measure(build_plain)
+    compact, compact_time = measure(build_compact)
+
+    print(f"{GROUPS} групп × {WEEKS} недель")
+    print(f"Timetable[Lesson]: {plain / 2**20:.1f} МиБ ({plain_time:.1f} с)")
+    print(f"CompactStore:      {compact / 2**20:.1f} МиБ ({compact_time:.1f} с)")
+    print(f"Экономия: {plain / compact:.1f}×")
+
+    store = build_compact()
+    compact_week = store.timetables[("0", "0")]
+    number = 10000
+    start = time.perf_counter()
+    for _ in range(number):
+        compact_week.to_timetable()
+    print(f"to_timetable: {(time.perf_counter() - start) / number * 1e6:.1f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Нагрузочный тест параллельной загрузки расписания: при каком количестве
+потоков (``workers``) пропускная способность перестает расти.
+
+Функции ``get_timetable`` и ``get_teacher_timetable`` загружают расписание с
+локальной заглушки личного кабинета. Заглушка работает в отдельном процессе и
+отвечает на каждый запрос с задержкой из логнормального распределения (медиана
+и разброс задаются опциями), а опция ``--capacity`` ограничивает количество
+запросов, которые она обрабатывает одновременно, как у настоящего сайта.
+
+Каждый уровень параллельности запускается в новом процессе, для него
+измеряются количество заданий в секунду, задержка задания (p50, p95, p99),
+процессорное время на задание и пиковый объем памяти процесса. Результаты
+выводятся таблицей и записываются в JSON (опция ``--json``).
+
+Точка насыщения — уровень, после которого увеличение ``workers`` дает меньше
+``--min-efficiency`` от прироста пропускной способности, который был бы при
+линейном масштабировании.
+
+Запуск: ``python benchmarks/bench_concurrency.py``
+"""
+
+import argparse
+import contextlib
+import html
+import json
+import math
+import multiprocessing
+import random
+import resource
+import socket
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import pairwise
+from pathlib import Path
+from typing import Any, Literal, NamedTuple
+from uuid import UUID
+
+from egov66_timetable import get_teacher_timetable, get_timetable, tracing
+from egov66_timetable.types import Teacher
+from egov66_timetable.types.settings import Settings
+
+type Mode = Literal["group", "teacher"]
+
+NAMES = [f"Учебная дисциплина номер {i}" for i in range(300)]
+SURNAMES = ["Иванов", "Петров", "Сидоров", "Кузнецов", "Смирнов", "Попов"]
+
+
+class Config(NamedTuple):
+    mode: Mode
+    jobs: int
+    weeks: int
+    latency: float
+    sigma: float
+    capacity: int
+    page_size: int
+    rate: float
+
+
+class Level(NamedTuple):
+    workers: int
+    jobs: int
+    failures: int
+    seconds: float
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+    cpu_per_job: float
+    peak_rss: int
+
+
+def make_uuid(rng: random.Random) -> str:
+    return str(UUID(int=rng.getrandbits(128), version=4))
+
+
+def make_events(mode: Mode, search: str, offset: int) -> dict[str, list[dict[str, Any]]]:
+    rng = random.Random(f"{search}/{offset}")
+    events: dict[str, list[dict[str, Any]]] = {}
+    for day in range(6):
+        for pair in range(rng.randrange(2, 6)):
+            teacher = {"id": search if mode == "teacher" else make_uuid(rng),
+                       "fio": f"{rng.choice(SURNAMES)} Иван Иванович"}
+            events[f"{day}_{pair}"] = [{
+                "id": make_uuid(rng),
+                "classroom": None,
+                "group": search if mode == "group" else str(rng.randrange(1000, 1200)),
+                "place": str(rng.randrange(100, 350)),
+                "discipline": rng.choice(NAMES),
+                "comment": None,
+                "teachers": {"0": teacher},
+                "dayWeekNum": day,
+                "numberPair": pair + 1,
+            }]
+    return events
+
+
+class Portal(ThreadingHTTPServer):
+    """
+    Заглушка личного кабинета: начальная страница и методы Livewire.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, port: int, config: Config) -> None:
+        super().__init__(("127.0.0.1", port), PortalHandler)
+        self.config = config
+        self.slots = (threading.BoundedSemaphore(config.capacity) if config.capacity
+                      else contextlib.nullcontext())
+        # Настоящая страница расписания весит сотни килобайт, и ее разбор
+        # занимает заметную часть процессорного времени клиента
+        self.filler = "".join(f'<div class="row"><span>{i}</span></div>\n'
+                              for i in range(config.page_size // 40))
+
+    def delay(self) -> None:
+        with self.slots:
+            time.sleep(random.lognormvariate(math.log(self.config.latency), self.config.sigma))
+
+
+class PortalHandler(BaseHTTPRequestHandler):
+    server: Portal
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def send(self, body: bytes, content_type: str, cookie: str | None = None) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if cookie is not None:
+            self.send_header("Set-Cookie", f"edinyi_lk_session={cookie}; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self.server.delay()
+        kind = "teacher" if self.path.startswith("/schedule/teachers") else "group"
+        data = {
+            "fingerprint": {"id": "stub", "name": f"schedule-{kind}-grid"},
+            "serverMemo": {
+                "checksum": "0",
+                "htmlHash": "0",
+                "data": {"group": None, "teacher": None, "addNumWeek": None,
+                         "minusNumWeek": None, "events": {},
+                         "scheduleGridWeekType": "current"},
+            },
+        }
+        page = (f'<html><head><meta name="csrf-token" content="token"></head><body>\n'
+                f"{self.server.filler}"
+                f'<div wire:initial-data="{html.escape(json.dumps(data))}"></div>\n'
+                f"</body></html>")
+        self.send(page.encode(), "text/html; charset=utf-8", cookie=f"{random.getrandbits(64):x}")
+
+    def do_POST(self) -> None:
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.delay()
+        mode: Mode = "teacher" if "teacher" in self.path else "group"
+        data = payload["serverMemo"]["data"]
+        update = payload["updates"][0]["payload"]
+        match update["method"]:
+            case "set":
+                data[mode] = update["params"][0]
+            case "addWeek":
+                data["addNumWeek"] = (data["addNumWeek"] or 0) + 1
+            case "minusWeek":
+                data["minusNumWeek"] = (data["minusNumWeek"] or 0) + 1
+        offset = (data["addNumWeek"] or 0) - (data["minusNumWeek"] or 0)
+        diff = {
+            "serverMemo": {
+                "checksum": "0",
+                "htmlHash": "0",
+                "data": {mode: data[mode], "addNumWeek": data["addNumWeek"],
+                         "minusNumWeek": data["minusNumWeek"],
+                         "events": make_events(mode, data[mode] or "", offset)},
+            },
+        }
+        self.send(json.dumps(diff).encode(), "application/json")
+
+
+def serve(port: int, config: Config) -> None:
+    Portal(port, config).serve_forever()
+
+
+def wait_for_port(port: int) -> None:
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("заглушка личного кабинета не запустилась")
+
+
+def quantile(values: list[float], q: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[round(q * 100) - 1]
+
+
+def run_level(port: int, config: Config, workers: int) -> Level:
+    """
+    Выполняется в отдельном процессе, чтобы пиковый объем памяти и
+    процессорное время относились только к этому уровню.
+    """
+
+    settings: Settings = {"instance": f"http://127.0.0.1:{port}", "cookies": {},
+                          "rate_limit": ({"rate": config.rate, "max_rate": config.rate}
+                                         if config.rate else False)}
+    jobs = max(config.jobs, 4 * workers)
+    offsets = range(config.weeks)
+    count = -(-jobs // config.weeks)
+
+    tracer = tracing.enable()
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    if config.mode == "teacher":
+        rng = random.Random(0)
+        teachers = [Teacher(make_uuid(rng), rng.choice(SURNAMES), "Иван", "Иванович")
+                    for _ in range(count)]
+        failures = sum(map(len, get_teacher_timetable(
+            teachers, [], settings=settings, offset_range=offsets, workers=workers
+        ).values()))
+        span = "make_teacher_timetable"
+    else:
+        groups = [str(1000 + i) for i in range(count)]
+        failures = sum(map(len, get_timetable(
+            groups, [], settings=settings, offset_range=offsets, workers=workers
+        ).values()))
+        span = "make_timetable"
+    seconds = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    tracing.disable()
+
+    # Задержка задания — от получения клиента из пула до готового расписания
+    latencies = sorted(float(event["dur"]) / 1e6  # type: ignore[arg-type]
+                       for event in tracer.events if event["name"] == span)
+    done = count * config.weeks - failures
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return Level(
+        workers=workers,
+        jobs=done,
+        failures=failures,
+        seconds=seconds,
+        throughput=done / seconds,
+        p50=quantile(latencies, 0.50),
+        p95=quantile(latencies, 0.95),
+        p99=quantile(latencies, 0.99),
+        cpu_per_job=cpu / max(done, 1),
+        # В Linux ru_maxrss измеряется в килобайтах
+        peak_rss=after.ru_maxrss * 1024,
+    )
+
+
+def find_saturation(levels: list[Level], min_efficiency: float) -> int | None:
+    """
+    :returns: уровень, после которого пропускная способность перестает расти,
+        или ``None``, если она росла до последнего уровня
+    """
+
+    for prev, cur in pairwise(levels):
+        expected = cur.workers / prev.workers - 1
+        gain = cur.throughput / prev.throughput - 1 if prev.throughput else 0.0
+        if gain < min_efficiency * expected:
+            return prev.workers
+    return None
+
+
+def print_table(levels: list[Level]) -> None:
+    print(f"{'workers':>7} {'заданий/с':>10} {'p50, мс':>8} {'p95, мс':>8} {'p99, мс':>8} "
+          f"{'ЦП/задание, мс':>15} {'RSS, МиБ':>9} {'ошибок':>7}")
+    for level in levels:
+        print(f"{level.workers:>7} {level.throughput:>10.1f} {level.p50 * 1000:>8.0f} "
+              f"{level.p95 * 1000:>8.0f} {level.p99 * 1000:>8.0f} "
+              f"{level.cpu_per_job * 1000:>15.1f} {level.peak_rss / 1024**2:>9.0f} "
+              f"{level.failures:>7}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--mode", choices=["group", "teacher"], default="group",
+                        help="расписание групп или преподавателей")
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64",
+                        help="уровни параллельности через запятую")
+    parser.add_argument("--jobs", type=int, default=200,
+                        help="заданий на уровень (не меньше 4 на поток)")
+    parser.add_argument("--weeks", type=int, default=1, help="недель на группу")
+    parser.add_argument("--latency", type=float, default=20.0,
+                        help="медиана задержки ответа, мс")
+    parser.add_argument("--sigma", type=float, default=0.5,
+                        help="разброс задержки (σ логнормального распределения)")
+    parser.add_argument("--capacity", type=int, default=0,
+                        help="сколько запросов заглушка обрабатывает одновременно "
+                             "(0 — без ограничения)")
+    parser.add_argument("--page-size", type=int, default=200_000,
+                        help="размер начальной страницы, байт")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="ограничение частоты запросов, запросов/с (0 — без "
+                             "ограничения; по умолчанию библиотека ограничивает "
+                             "частоту, и пропускная способность упирается в него)")
+    parser.add_argument("--min-efficiency", type=float, default=0.25,
+                        help="доля линейного прироста, ниже которой уровень "
+                             "считается насыщенным")
+    parser.add_argument("--json", type=Path, help="файл для результатов в JSON")
+    args = parser.parse_args()
+
+    config = Config(mode=args.mode, jobs=args.jobs, weeks=max(args.weeks, 1),
+                    latency=args.latency / 1000, sigma=args.sigma,
+                    capacity=args.capacity, page_size=args.page_size, rate=args.rate)
+    workers_levels = sorted({int(level) for level in args.levels.split(",")})
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    context = multiprocessing.get_context("spawn")
+    portal = context.Process(target=serve, args=(port, config), daemon=True)
+    portal.start()
+    levels: list[Level] = []
+    try:
+        wait_for_port(port)
+        for workers in workers_levels:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                level = executor.submit(run_level, port, config, workers).result()
+            levels.append(level)
+            print(f"workers={workers}: {level.throughput:.1f} заданий/с",
+                  file=sys.stderr)
+    finally:
+        portal.terminate()
+        portal.join()
+
+    saturation = find_saturation(levels, args.min_efficiency)
+    print_table(levels)
+    if saturation is None:
+        print("Насыщение не достигнуто: пропускная способность растет до последнего уровня")
+    else:
+        print(f"Насыщение: workers = {saturation} (дальше прирост меньше "
+              f"{args.min_efficiency:.0%} от линейного)")
+
+    if args.json is not None:
+        result = {
+            "config": config._asdict(),
+            "levels": [level._asdict() for level in levels],
+            "saturation": saturation,
+        }
+        args.json.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Скорость сравнения двух версий расписания на неделю.
+
+Большая неделя — расписание аудиторий всего колледжа в виде
+``Timetable[list[Lesson]]``, где в каждой ячейке десятки пар. Примерно
+пятая часть пар в новой версии перенесена, переименована или заменена.
+
+Запуск: ``python benchmarks/bench_diff.py``
+"""
+
+import random
+import timeit
+from uuid import uuid4
+
+from egov66_timetable.diff import diff_timetables
+from egov66_timetable.types import Lesson, LessonData, Timetable
+
+DAYS = 6
+LESSONS_PER_DAY = 8
+
+
+def make_week(lessons_per_slot: int) -> Timetable[list[Lesson]]:
+    return [
+        {
+            lesson_num: [
+                Lesson(str(uuid4()), LessonData(str(random.randrange(100, 350)),
+                                                f"Дисциплина {random.randrange(300)}"))
+                for _ in range(lessons_per_slot)
+            ]
+            for lesson_num in range(LESSONS_PER_DAY)
+        }
+        for _ in range(DAYS)
+    ]
+
+
+def mutate(week: Timetable[list[Lesson]]) -> Timetable[list[Lesson]]:
+    result: Timetable[list[Lesson]] = [{} for _ in week]
+    for day_num, day in enumerate(week):
+        for lesson_num, slot in day.items():
+            for lesson in slot:
+                position = (day_num, lesson_num)
+                match random.randrange(25):
+                    case 0:
+                        continue
+                    case 1:
+                        lesson = Lesson(str(uuid4()), lesson.lesson_data)
+                    case 2:
+                        position = (random.randrange(DAYS), random.randrange(LESSONS_PER_DAY))
+                    case 3:
+                        lesson = lesson._replace(
+                            lesson_data=lesson.lesson_data._replace(where="999")
+                        )
+                    case 4:
+                        lesson = lesson._replace(
+                            lesson_data=lesson.lesson_data._replace(name="Другая")
+                        )
+                new_day_num, new_lesson_num = position
+                result[new_day_num].setdefault(new_lesson_num, []).append(lesson)
+    return result
+
+
+def main() -> None:
+    random.seed(0)
+    for lessons_per_slot in (1, 10, 100, 1000):
+        old = make_week(lessons_per_slot)
+        new = mutate(old)
+        total = DAYS * LESSONS_PER_DAY * lessons_per_slot
+        number = max(1, 100_000 // total)
+        seconds = timeit.timeit(lambda: diff_timetables(old, new), number=number) / number
+        diff = diff_timetables(old, new)
+        print(f"{total:>7} пар: {seconds * 1e3:8.2f} мс "
+              f"({seconds / total * 1e9:.0f} нс на пару, изменений: "
+              f"{len(diff.added) + len(diff.removed) + len(diff.changed)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Выгрузка расписания всех групп и преподавателей за семестр из базы данных
+SQLite в JSON-файлы: первая выгрузка и повторная, когда ничего не изменилось.
+
+Запуск: ``python benchmarks/bench_json.py``
+"""
+
+import random
+import sqlite3
+import tempfile
+import timeit
+from pathlib import Path
+from uuid import uuid4
+
+from egov66_timetable.callbacks.json import export_sqlite
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    sqlite_callback,
+    sqlite_teacher_callback,
+)
+from egov66_timetable.types import Lesson, LessonData, Teacher, Timetable, Week
+
+GROUPS = 120
+WEEKS = 20
+TEACHERS = [Teacher(str(uuid4()), f"Преподаватель{i}", "Иван", "Иванович")
+            for i in range(200)]
+ROOMS = [str(100 + i) for i in range(250)]
+NAMES = [f"Учебная дисциплина номер {i}" for i in range(300)]
+
+
+def main() -> None:
+    random.seed(0)
+    first = Week.from_week_id("2026-2")
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp, "timetable.db"))
+        create_db(conn)
+        callback, teacher_callback = sqlite_callback(conn), sqlite_teacher_callback(conn)
+        for offset in range(WEEKS):
+            teacher_timetables: dict[Teacher, Timetable[list[Lesson]]] = {}
+            for group in range(GROUPS):
+                timetable: Timetable[Lesson] = [{} for _ in range(6)]
+                for day_num, day in enumerate(timetable):
+                    for num in range(4):
+                        lesson = Lesson(str(uuid4()), LessonData(random.choice(ROOMS),
+                                                                 random.choice(NAMES)))
+                        day[num] = lesson
+                        teacher = random.choice(TEACHERS)
+                        teacher_timetable = teacher_timetables.setdefault(
+                            teacher, [{} for _ in range(6)]
+                        )
+                        teacher_timetable[day_num].setdefault(num, []).append(
+                            Lesson(lesson.id, LessonData(str(1000 + group), lesson.lesson_data.name))
+                        )
+                callback(timetable, str(1000 + group), first + offset)
+            for teacher, teacher_timetable in teacher_timetables.items():
+                teacher_callback(teacher_timetable, teacher, first + offset)
+
+        out_dir = Path(tmp, "api")
+        for name in ("Первая выгрузка", "Без изменений"):
+            report = None
+
+            def run() -> None:
+                nonlocal report
+                report = export_sqlite(conn, out_dir, teachers=TEACHERS, hashed=True)
+
+            seconds = timeit.timeit(run, number=1)
+            print(f"{name}: {seconds:.2f} с, {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Поиск текущей и следующей пары по индексу и по расписанию из базы данных.
+
+Запуск: ``python benchmarks/bench_now.py``
+"""
+
+import random
+import sqlite3
+import time
+import timeit
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    load_timetable,
+    sqlite_callback,
+    sqlite_teacher_callback,
+)
+from egov66_timetable.now import NowIndex
+from egov66_timetable.types import Lesson, LessonData, Teacher, Timetable
+from egov66_timetable.utils import DEFAULT_BELLS, YEKATERINBURG, get_current_week
+
+GROUPS = 120
+TEACHERS = [Teacher(str(uuid4()), f"Преподаватель{i}", "Иван", "Иванович")
+            for i in range(200)]
+ROOMS = [str(100 + i) for i in range(250)]
+NAMES = [f"Учебная дисциплина номер {i}" for i in range(300)]
+
+
+def fill(conn: sqlite3.Connection) -> None:
+    current = get_current_week()
+    for week in (current, current + 1):
+        teacher_timetables: dict[Teacher, Timetable[list[Lesson]]] = {}
+        for group in range(GROUPS):
+            timetable: Timetable[Lesson] = [{} for _ in range(6)]
+            for day_num, day in enumerate(timetable):
+                for num in range(random.randrange(2, 6)):
+                    lesson = Lesson(str(uuid4()), LessonData(random.choice(ROOMS),
+                                                             random.choice(NAMES)))
+                    day[num] = lesson
+                    teacher_timetables.setdefault(
+                        random.choice(TEACHERS), [{} for _ in range(6)]
+                    )[day_num].setdefault(num, []).append(
+                        Lesson(lesson.id, LessonData(str(1000 + group), lesson.lesson_data.name))
+                    )
+            sqlite_callback(conn)(timetable, str(1000 + group), week)
+        for teacher, teacher_timetable in teacher_timetables.items():
+            sqlite_teacher_callback(conn)(teacher_timetable, teacher, week)
+
+
+def main() -> None:
+    random.seed(0)
+    conn = sqlite3.connect(":memory:")
+    create_db(conn)
+    fill(conn)
+
+    seconds = timeit.timeit(lambda: NowIndex.from_sqlite(conn), number=1)
+    print(f"Построение индекса: {seconds * 1000:.0f} мс")
+    index = NowIndex.from_sqlite(conn)
+
+    monday = datetime.combine(get_current_week().monday, DEFAULT_BELLS[0][0], YEKATERINBURG)
+    times = [(monday + timedelta(minutes=random.randrange(6 * 24 * 60))).timestamp()
+             for _ in range(1000)]
+    groups = [str(1000 + random.randrange(GROUPS)) for _ in range(1000)]
+    teachers = [random.choice(TEACHERS).id for _ in range(1000)]
+
+    number = 200
+    for name, func in [
+        ("Группа", lambda: [index.group(g, t) for g, t in zip(groups, times)]),
+        ("Преподаватель", lambda: [index.teacher(p, t) for p, t in zip(teachers, times)]),
+    ]:
+        seconds = timeit.timeit(func, number=number)
+        print(f"{name}: {seconds / number / len(times) * 1e9:.0f} нс")
+
+    start = time.perf_counter()
+    for group in groups[:200]:
+        load_timetable(conn, group=group, week=get_current_week())
+    print(f"load_timetable на всю неделю: "
+          f"{(time.perf_counter() - start) / 200 * 1e6:.0f} мкс")
+
+
+if __name__ == "__main__":
+    main()
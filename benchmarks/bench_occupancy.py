@@ -0,0 +1,64 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Скорость запросов к индексу занятости аудиторий.
+
+Запуск: ``python benchmarks/bench_occupancy.py``
+"""
+
+import random
+import timeit
+from uuid import uuid4
+
+from egov66_timetable.occupancy import OccupancyIndex
+from egov66_timetable.types import Lesson, LessonData, Timetable, Week
+
+GROUPS = 400
+ROOMS = 250
+WEEKS = 20
+LESSONS_PER_DAY = 6
+
+
+def make_timetable(rooms: list[str]) -> Timetable[Lesson]:
+    return [
+        {
+            lesson_num: Lesson(str(uuid4()),
+                               LessonData(random.choice(rooms), f"Дисциплина {lesson_num}"))
+            for lesson_num in range(LESSONS_PER_DAY)
+            if random.random() < 0.7
+        }
+        for _ in range(6)
+    ]
+
+
+def main() -> None:
+    random.seed(0)
+    rooms = [str(100 + i) for i in range(ROOMS)]
+    week = Week.from_week_id("2026-1")
+
+    index = OccupancyIndex(rooms)
+    timetables = [make_timetable(rooms) for _ in range(GROUPS)]
+    build = timeit.timeit(
+        lambda: [index.update(timetable, str(group), week + offset)
+                 for offset in range(WEEKS)
+                 for group, timetable in enumerate(timetables)],
+        number=1,
+    )
+    print(f"Построение ({GROUPS} групп × {WEEKS} недель): {build:.2f} с")
+
+    for name, func in [
+        ("free_rooms", lambda: index.free_rooms(week, 2, 3)),
+        ("occupied_rooms", lambda: index.occupied_rooms(week, 2, 3)),
+        ("is_free", lambda: index.is_free("150", week, 2, 3)),
+        ("conflicts (вся неделя)", lambda: index.conflicts(week)),
+        ("update (одна группа)", lambda: index.update(timetables[0], "0", week)),
+    ]:
+        number = 1000
+        seconds = timeit.timeit(func, number=number) / number
+        print(f"{name}: {seconds * 1e6:.1f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Поиск по индексу и перебором списка преподавателей.
+
+Запуск: ``python benchmarks/bench_search.py``
+"""
+
+import random
+import timeit
+from uuid import uuid4
+
+from egov66_timetable.search import SearchIndex
+from egov66_timetable.types import Teacher
+
+SYLLABLES = ["ва", "ле", "ни", "ко", "ро", "ма", "ше", "ту", "ли", "де", "го", "ба", "жу",
+             "ры", "ху", "ци", "па", "зо", "фе", "мы", "ям", "ус", "ор", "эл"]
+GIVEN_NAMES = ["Иван", "Мария", "Петр", "Анна", "Сергей", "Ольга", "Дмитрий", "Елена"]
+PATRONYMICS = ["Иванович", "Петровна", "Сергеевич", "Алексеевна", "Дмитриевич"]
+
+
+def surname() -> str:
+    word = "".join(random.choice(SYLLABLES) for _ in range(random.randrange(2, 4)))
+    return word.capitalize() + random.choice(["ов", "ев", "ин", "ова", "ина"])
+
+
+def main() -> None:
+    random.seed(0)
+    teachers = [Teacher(str(uuid4()), surname(), random.choice(GIVEN_NAMES),
+                        random.choice(PATRONYMICS)) for _ in range(2000)]
+    groups = [f"{prefix}-{num}" for prefix in ("ИСП", "ТО", "БД", "ЭК", "СА")
+              for num in range(11, 45)] + [str(100 + i) for i in range(400)]
+    disciplines = [f"Учебная дисциплина {surname()}" for _ in range(300)]
+    rooms = [str(100 + i) for i in range(250)]
+
+    def build() -> SearchIndex:
+        index = SearchIndex()
+        for teacher in teachers:
+            index.add_teacher(teacher)
+        for group in groups:
+            index.add("group", group)
+        for name in disciplines:
+            index.add("discipline", name)
+        for room in rooms:
+            index.add("room", room)
+        return index
+
+    seconds = timeit.timeit(build, number=1)
+    index = build()
+    print(f"Построение индекса: {len(index)} записей за {seconds * 1000:.0f} мс")
+
+    samples = random.sample(teachers, 100)
+    queries = {
+        "начало фамилии": [teacher.surname[:4] for teacher in samples],
+        "транслитерация": [teacher.translit[:5] for teacher in samples],
+        "фамилия и инициал": [f"{teacher.surname} {teacher.given_name[0]}"
+                              for teacher in samples],
+        "опечатка": [teacher.surname[:2] + teacher.surname[3:] for teacher in samples],
+        "номер группы": [random.choice(groups)[:3] for _ in samples],
+    }
+    for name, batch in queries.items():
+        number = 20
+        seconds = timeit.timeit(lambda: [index.search(query) for query in batch],
+                                number=number)
+        print(f"{name}: {seconds / number / len(batch) * 1e6:.0f} мкс")
+
+    def scan(query: str) -> list[Teacher]:
+        query = query.lower()
+        return [teacher for teacher in teachers if teacher.surname.lower().startswith(query)]
+
+    batch = queries["начало фамилии"]
+    number = 20
+    seconds = timeit.timeit(lambda: [scan(query) for query in batch], number=number)
+    print(f"Перебор преподавателей: {seconds / number / len(batch) * 1e6:.0f} мкс")
+
+
+if __name__ == "__main__":
+    main()
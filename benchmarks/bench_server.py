@@ -0,0 +1,134 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Нагрузочный тест HTTP-сервиса расписания.
+
+Сервис запускается в отдельном процессе, клиенты держат открытые соединения и
+запрашивают расписание случайных групп на случайные недели. Для сравнения
+измеряется, сколько раз в секунду бот может сам вызвать ``load_timetable``.
+
+Запуск: ``python benchmarks/bench_server.py``
+"""
+
+import asyncio
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from egov66_timetable.callbacks.sqlite import create_db, load_timetable, sqlite_callback
+from egov66_timetable.types import Lesson, LessonData, Timetable, Week
+
+GROUPS = 120
+WEEKS = 8
+CONNECTIONS = 32
+DURATION = 5.0
+ROOMS = [str(100 + i) for i in range(250)]
+NAMES = [f"Учебная дисциплина номер {i}" for i in range(300)]
+FIRST = Week.from_week_id("2026-2")
+
+
+def fill(path: Path) -> None:
+    conn = sqlite3.connect(path)
+    create_db(conn)
+    callback = sqlite_callback(conn)
+    for offset in range(WEEKS):
+        for group in range(GROUPS):
+            timetable: Timetable[Lesson] = [
+                {num: Lesson(str(uuid4()), LessonData(random.choice(ROOMS),
+                                                      random.choice(NAMES)))
+                 for num in range(4)}
+                for _ in range(6)
+            ]
+            callback(timetable, str(1000 + group), FIRST + offset)
+    conn.close()
+
+
+def target() -> str:
+    week = FIRST + random.randrange(WEEKS)
+    return f"/groups/{1000 + random.randrange(GROUPS)}/{week.week_id}"
+
+
+async def client(port: int, deadline: float, etags: dict[str, str] | None) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    count = 0
+    while time.monotonic() < deadline:
+        path = target()
+        request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\n"
+        if etags is not None and path in etags:
+            request += f"If-None-Match: {etags[path]}\r\n"
+        writer.write((request + "\r\n").encode())
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.lower() == b"content-length":
+                length = int(value)
+            elif name.lower() == b"etag" and etags is not None:
+                etags[path] = value.strip().decode()
+        await reader.readexactly(length)
+        count += 1
+    writer.close()
+    return count
+
+
+async def load_test(port: int, etags: dict[str, str] | None) -> float:
+    deadline = time.monotonic() + DURATION
+    counts = await asyncio.gather(*(client(port, deadline, etags)
+                                    for _ in range(CONNECTIONS)))
+    return sum(counts) / DURATION
+
+
+def wait_for_port(port: int) -> None:
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("сервис не запустился")
+
+
+def main() -> None:
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, "timetable.db")
+        fill(path)
+
+        conn = sqlite3.connect(path)
+        number = 2000
+        start = time.perf_counter()
+        for _ in range(number):
+            _, _, group, week_id = target().split("/")
+            load_timetable(conn, group=group, week=week_id)
+        print(f"load_timetable в процессе бота: "
+              f"{number / (time.perf_counter() - start):.0f} запросов/с")
+        conn.close()
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = subprocess.Popen([sys.executable, "-O", "-m", "egov66_timetable.server",
+                                   str(path), "--port", str(port)])
+        try:
+            wait_for_port(port)
+            print(f"HTTP, {CONNECTIONS} соединений, 200 OK: "
+                  f"{asyncio.run(load_test(port, None)):.0f} запросов/с")
+            etags: dict[str, str] = {}
+            asyncio.run(load_test(port, etags))
+            print(f"HTTP, {CONNECTIONS} соединений, 304 Not Modified: "
+                  f"{asyncio.run(load_test(port, etags)):.0f} запросов/с")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Запуск процесса бота со снимком расписания и с базой данных SQLite.
+
+Для каждого способа несколько процессов одновременно открывают расписание
+и читают расписание всех групп на все недели.
+
+Запуск: ``python benchmarks/bench_snapshot.py``
+"""
+
+import random
+import sqlite3
+import tempfile
+import time
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from uuid import uuid4
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    load_timetable,
+    sqlite_callback,
+    sqlite_teacher_callback,
+)
+from egov66_timetable.snapshot import Snapshot, export_sqlite
+from egov66_timetable.types import Lesson, LessonData, Teacher, Timetable, Week
+
+GROUPS = 120
+WEEKS = 20
+WORKERS = 8
+TEACHERS = [Teacher(str(uuid4()), f"Преподаватель{i}", "Иван", "Иванович")
+            for i in range(200)]
+ROOMS = [str(100 + i) for i in range(250)]
+NAMES = [f"Учебная дисциплина номер {i}" for i in range(300)]
+FIRST = Week.from_week_id("2026-2")
+
+
+def fill(conn: sqlite3.Connection) -> None:
+    for offset in range(WEEKS):
+        teacher_timetables: dict[Teacher, Timetable[list[Lesson]]] = {}
+        for group in range(GROUPS):
+            timetable: Timetable[Lesson] = [{} for _ in range(6)]
+            for day_num, day in enumerate(timetable):
+                for num in range(random.randrange(2, 6)):
+                    lesson = Lesson(str(uuid4()), LessonData(random.choice(ROOMS),
+                                                             random.choice(NAMES)))
+                    day[num] = lesson
+                    teacher_timetables.setdefault(
+                        random.choice(TEACHERS), [{} for _ in range(6)]
+                    )[day_num].setdefault(num, []).append(
+                        Lesson(lesson.id, LessonData(str(1000 + group), lesson.lesson_data.name))
+                    )
+            sqlite_callback(conn)(timetable, str(1000 + group), FIRST + offset)
+        for teacher, teacher_timetable in teacher_timetables.items():
+            sqlite_teacher_callback(conn)(teacher_timetable, teacher, FIRST + offset)
+
+
+def worker_sqlite(path: str) -> float:
+    start = time.perf_counter()
+    conn = sqlite3.connect(path)
+    for offset in range(WEEKS):
+        for group in range(GROUPS):
+            load_timetable(conn, group=str(1000 + group), week=FIRST + offset)
+    conn.close()
+    return time.perf_counter() - start
+
+
+def worker_snapshot(path: str) -> float:
+    start = time.perf_counter()
+    with Snapshot(path) as snapshot:
+        for offset in range(WEEKS):
+            for group in range(GROUPS):
+                snapshot.get_timetable(str(1000 + group), FIRST + offset)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp, "timetable.db")
+        snapshot_path = Path(tmp, "timetable.snap")
+        conn = sqlite3.connect(db_path)
+        create_db(conn)
+        fill(conn)
+
+        start = time.perf_counter()
+        count = export_sqlite(conn, snapshot_path)
+        print(f"Запись снимка: {count} расписаний за "
+              f"{time.perf_counter() - start:.2f} с, "
+              f"{snapshot_path.stat().st_size / 2**20:.1f} МиБ")
+
+        number = 1000
+        seconds = timeit.timeit(lambda: Snapshot(snapshot_path).close(), number=number)
+        print(f"Открытие снимка: {seconds / number * 1e6:.0f} мкс")
+
+        targets = [(str(1000 + random.randrange(GROUPS)), FIRST + random.randrange(WEEKS))
+                   for _ in range(number)]
+        with Snapshot(snapshot_path) as snapshot:
+            for name, func in [
+                ("load_timetable", lambda: [load_timetable(conn, group=group, week=week)
+                                            for group, week in targets]),
+                ("Snapshot.get_timetable", lambda: [snapshot.get_timetable(group, week)
+                                                    for group, week in targets]),
+            ]:
+                seconds = timeit.timeit(func, number=1)
+                print(f"{name}: {seconds / number * 1e6:.0f} мкс")
+        conn.close()
+
+        with ProcessPoolExecutor(WORKERS) as pool:
+            for name, worker, path in [("SQLite", worker_sqlite, db_path),
+                                       ("Снимок", worker_snapshot, snapshot_path)]:
+                times = list(pool.map(worker, [str(path)] * WORKERS))
+                print(f"{WORKERS} процессов, {GROUPS} групп × {WEEKS} недель, {name}: "
+                      f"{max(times):.2f} с")
+
+
+if __name__ == "__main__":
+    main()
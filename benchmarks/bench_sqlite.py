@@ -0,0 +1,129 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Размер базы данных и скорость запросов в схеме первой и второй версии.
+
+Сначала создается база данных в старом формате с расписанием колледжа за
+несколько лет, затем ее копия переводится на новую схему.
+
+Запуск: ``python benchmarks/bench_sqlite.py``
+"""
+
+import random
+import shutil
+import sqlite3
+import tempfile
+import timeit
+from pathlib import Path
+from uuid import uuid4
+
+from egov66_timetable.callbacks.sqlite import (
+    _select_timetable,
+    create_db,
+    load_timetable,
+)
+from egov66_timetable.types import Lesson, LessonData, Timetable
+
+GROUPS = 120
+WEEKS = 150
+LESSONS_PER_WEEK = 24
+ROOMS = [str(100 + i) for i in range(250)]
+NAMES = [f"Учебная дисциплина номер {i}" for i in range(300)]
+TEACHERS = [str(uuid4()) for _ in range(200)]
+
+SCHEMA_V1 = """
+    CREATE TABLE lesson(
+        id TEXT NOT NULL, instance TEXT NOT NULL DEFAULT '', classroom TEXT,
+        name TEXT, group_id TEXT NOT NULL, teacher_id TEXT, week_id TEXT NOT NULL,
+        day_num INTEGER NOT NULL, lesson_num INTEGER NOT NULL,
+        last_updated TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        last_checked TEXT NOT NULL DEFAULT '1970-01-01 00:00:00',
+        obsolete_since TEXT,
+        PRIMARY KEY (id, group_id)
+    );
+    CREATE INDEX idx_lessons_instance_group
+        ON lesson (instance, group_id, week_id, day_num);
+    CREATE INDEX idx_lessons_teacher ON lesson (teacher_id, week_id, day_num);
+    PRAGMA user_version = 1;
+"""
+
+QUERY_V1 = """
+    SELECT id, classroom, name, day_num, lesson_num FROM lesson
+    WHERE instance = ? AND group_id = ? AND week_id = ? AND obsolete_since IS NULL
+"""
+
+
+def select_v1(conn: sqlite3.Connection, group: str, week: str) -> Timetable[Lesson]:
+    result: Timetable[Lesson] = [{} for _ in range(7)]
+    for lesson_id, classroom, name, day_num, lesson_num in conn.execute(
+        QUERY_V1, ["", group, week]
+    ):
+        result[day_num][lesson_num] = Lesson(lesson_id, LessonData(classroom, name))
+    return result
+
+
+def week_id(week: int) -> str:
+    return f"{2023 + week // 50}-{week % 50 + 1}"
+
+
+def make_rows():
+    for group in range(GROUPS):
+        for week in range(WEEKS):
+            for lesson in range(LESSONS_PER_WEEK):
+                yield (str(uuid4()), random.choice(ROOMS), random.choice(NAMES),
+                       str(1000 + group), random.choice(TEACHERS), week_id(week),
+                       lesson // 4, lesson % 4,
+                       "2026-01-12 08:00:00" if random.random() < 0.05 else None)
+
+
+def size(path: Path) -> float:
+    return path.stat().st_size / 2**20
+
+
+def main() -> None:
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path, new_path = Path(tmp, "v1.db"), Path(tmp, "v2.db")
+
+        conn = sqlite3.connect(old_path)
+        conn.executescript(SCHEMA_V1)
+        conn.executemany(
+            "INSERT INTO lesson(id, classroom, name, group_id, teacher_id, week_id, "
+            "day_num, lesson_num, obsolete_since) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            make_rows()
+        )
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.close()
+        shutil.copy(old_path, new_path)
+
+        new = sqlite3.connect(new_path)
+        seconds = timeit.timeit(lambda: create_db(new), number=1)
+        new.execute("PRAGMA journal_mode=DELETE")
+        new.execute("VACUUM")
+        print(f"{GROUPS * WEEKS * LESSONS_PER_WEEK} пар, перевод на новую схему: "
+              f"{seconds:.1f} с")
+        print(f"Версия 1: {size(old_path):.1f} МиБ")
+        print(f"Версия 2: {size(new_path):.1f} МиБ")
+
+        old = sqlite3.connect(old_path)
+        number = 2000
+        keys = [(str(1000 + random.randrange(GROUPS)), week_id(random.randrange(WEEKS)))
+                for _ in range(number)]
+        for name, func in [
+            ("Версия 1, группа и неделя",
+             lambda group, week: select_v1(old, group, week)),
+            ("Версия 2, группа и неделя",
+             lambda group, week: _select_timetable(new, group=group, week=week,
+                                                   instance="")),
+            ("Версия 2, load_timetable",
+             lambda group, week: load_timetable(new, group=group, week=week)),
+        ]:
+            seconds = timeit.timeit(lambda: [func(*key) for key in keys], number=1)
+            print(f"{name}: {seconds / number * 1e6:.0f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,36 @@
 Просмотр расписания колледжей и техникумов Свердловской области
 """
 
+import asyncio
+import contextlib
+import functools
+import itertools
 import locale
 import logging
 from collections import defaultdict
-from collections.abc import Callable
+from collections.abc import (
+    AsyncIterator,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+)
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import cast
 
-from egov66_timetable.client import Client, TeacherClient
-from egov66_timetable.exceptions import NetworkError
+from egov66_timetable import metrics, tracing
+from egov66_timetable._batch import JobQueue, batch_run, run_callbacks
+from egov66_timetable.client import Client, ClientPool, TeacherClient
+from egov66_timetable.exceptions import (
+    CSRFTokenNotFound,
+    NetworkError,
+    SessionExpired,
+)
 from egov66_timetable.types import (
     Lesson,
     Teacher,
@@ -27,24 +50,131 @@ __version__ = "2026.4.14.0"
 # timetable, group, week
 type TimetableCallback = Callable[[Timetable[Lesson], str, Week], None]
 type TeacherTimetableCallback = Callable[[Timetable[list[Lesson]], Teacher, Week], None]
+# timetable, classroom, week
+type ClassroomTimetableCallback = Callable[[Timetable[list[Lesson]], str, Week], None]
+
+#: Ошибки, после которых задание ставится в очередь повторно.
+RETRYABLE_ERRORS = (NetworkError, SessionExpired, CSRFTokenNotFound)
 
 logger = logging.getLogger(__name__)
 
 
-def get_timetable(
-    groups: str | list[str], callbacks: list[TimetableCallback], *,
-    settings: Settings, offset_range: range = range(1)
-) -> dict[int, list[str]]:
+class BatchResult[T](defaultdict[int, list[T]]):
     """
-    Получает расписание студентов и вызывает коллбэк-функции.
+    Входные параметры, которые не были обработаны из-за ошибок, в виде
+    словаря, где ключ — смещение, а значение — список групп или
+    преподавателей. Дополнительно хранит количество попыток для каждого
+    задания.
+    """
+
+    #: Количество попыток по заданиям ``(смещение, группа или преподаватель)``.
+    attempts: dict[tuple[int, T], int]
+
+    def __init__(self) -> None:
+        super().__init__(list)
+        self.attempts = {}
+
+    @property
+    def retried(self) -> dict[tuple[int, T], int]:
+        """
+        Задания, которые выполнялись больше одного раза.
+        """
+
+        return {job: count for job, count in self.attempts.items() if count > 1}
+
+
+def _map_jobs[J, R](func: Callable[[J], R], jobs: Iterable[J], *,
+                    workers: int) -> Iterator[tuple[J, Callable[[], R]]]:
+    """
+    Выполняет задания и возвращает их по мере готовности вместе с функцией,
+    которая возвращает результат задания или выбрасывает его исключение.
+
+    Если ``workers`` не больше единицы, задание выполняется в текущем потоке
+    только при вызове этой функции. Задания берутся из ``jobs`` уже после
+    обработки предыдущих результатов, поэтому в :class:`~egov66_timetable._batch.JobQueue` можно
+    вернуть неудавшееся задание.
+    """
+
+    if workers <= 1:
+        for job in jobs:
+            yield job, functools.partial(func, job)
+        return
+
+    job_iter = iter(jobs)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="egov66")
+    pending: dict[Future[R], J] = {}
+    try:
+        for job in itertools.islice(job_iter, 2 * workers):
+            pending[executor.submit(func, job)] = job
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result
+                # Пополняем очередь после обработки результата, чтобы в нее
+                # успело вернуться неудавшееся задание
+                for job in itertools.islice(job_iter, 1):
+                    pending[executor.submit(func, job)] = job
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _with_retries[J, R](func: Callable[[], R], job: J, attempts: dict[J, int],
+                        max_attempts: int) -> R:
+    """
+    Выполняет задание сразу несколько раз подряд, пока оно не завершится без
+    ошибок сети или сеанса или не будут исчерпаны попытки.
+    """
+
+    while True:
+        attempts[job] = attempts.get(job, 0) + 1
+        try:
+            return func()
+        except RETRYABLE_ERRORS as err:
+            if attempts[job] >= max_attempts:
+                raise
+            logger.warning("Попытка %d для %s не удалась (%s), задание будет повторено",
+                           attempts[job], job, type(err).__name__)
+            metrics.JOB_RETRIES.inc()
+
+
+def iter_timetables(
+    groups: str | list[str], offset_range: range = range(1), *,
+    settings: Settings, failures: dict[int, list[str]] | None = None,
+    workers: int = 1, max_attempts: int = 3,
+    attempts: dict[tuple[int, str], int] | None = None
+) -> Generator[tuple[Timetable[Lesson], str, Week], None, None]:
+    """
+    Получает расписание студентов и возвращает его по мере загрузки.
+
+    Генератор ленивый: следующее расписание запрашивается только тогда, когда
+    предыдущее уже обработано, поэтому в памяти одновременно находится не
+    больше одного расписания. Перебор можно прервать в любой момент.
+
+    Если ``workers`` больше единицы, расписание загружается параллельно
+    несколькими клиентами (у каждого свой сеанс) и возвращается в порядке
+    готовности. Одновременно выполняется не больше ``2 * workers`` заданий.
+    Клиенты используют общий пул соединений. Если включено ограничение
+    частоты запросов (:mod:`~egov66_timetable.ratelimit`), загрузка
+    ускоряется, только пока не достигнут этот предел.
+
+    Если сеанс истек, клиент сам начинает новый сеанс и заново выбирает группу
+    и неделю. Задания, которые все равно завершились ошибкой, ставятся в конец
+    очереди, пока не будет исчерпано ``max_attempts`` попыток.
 
     :param groups: номера групп
-    :param callbacks: функции обратного вызова
-    :param settings: настройки
     :param offset_range: интервал смещений относительно текущей недели (``-1`` —
         предыдущая неделя, ``+1`` — следующая)
-    :returns: входные параметры, которые не были обработаны из-за ошибок, в виде
-        словаря, где ключ — смещение, а значение — список групп.
+    :param settings: настройки
+    :param failures: словарь, в который будут добавлены входные параметры,
+        которые не были обработаны из-за ошибок (ключ — смещение, значение —
+        список групп)
+    :param workers: количество параллельных загрузок
+    :param max_attempts: сколько раз выполнять задание, которое завершилось
+        ошибкой сети или сеанса, прежде чем добавить его в ``failures``
+    :param attempts: словарь, в который будет записано количество попыток для
+        каждого задания ``(смещение, группа)``
+    :returns: генератор кортежей ``(расписание, группа, неделя)``
     """
 
     # Выводить дни недели в русской локали
@@ -54,30 +184,194 @@ def get_timetable(
         groups = [groups]
 
     current_week = get_current_week()
-    client = Client(settings)
-    failures: defaultdict[int, list[str]] = defaultdict(list)
-    for offset in offset_range:
+    pool = ClientPool(settings, Client, size=workers)
+
+    def fetch(job: tuple[int, str]) -> Timetable[Lesson]:
+        offset, group = job
         week = current_week + offset
-        for group in groups:
-            logger.info("Загрузка расписания для группы %s на неделю %s",
-                        group, week.week_id)
+        logger.info("Загрузка расписания для группы %s на неделю %s",
+                    group, week.week_id)
+        with (pool.client() as client,
+              tracing.span("make_timetable", group=group, week=week.week_id)):
+            return client.make_timetable(group, offset=offset)
+
+    with batch_run(settings), contextlib.closing(pool):
+        jobs = JobQueue(((offset, group) for offset in offset_range for group in groups),
+                        max_attempts=max_attempts, attempts=attempts)
+        for job, result in _map_jobs(fetch, jobs, workers=workers):
+            offset, group = job
+            week = current_week + offset
             try:
-                timetable = client.make_timetable(group, offset=offset)
-            except NetworkError:
-                logger.error("Ошибка сети")
-                failures[offset].append(group)
+                timetable = result()
+            except RETRYABLE_ERRORS as err:
+                if jobs.retry(job, err):
+                    continue
+                logger.error("Не удалось загрузить расписание: %s", type(err).__name__)
+                if failures is not None:
+                    failures.setdefault(offset, []).append(group)
                 continue
 
-            for callback in callbacks:
-                callback(timetable, group, week)
+            with tracing.span("callbacks", group=group, week=week.week_id):
+                yield timetable, group, week
+
+
+def iter_teacher_timetables(
+    teachers: Teacher | list[Teacher], offset_range: range = range(1), *,
+    settings: Settings, failures: dict[int, list[Teacher]] | None = None,
+    workers: int = 1, max_attempts: int = 3,
+    attempts: dict[tuple[int, Teacher], int] | None = None
+) -> Generator[tuple[Timetable[list[Lesson]], Teacher, Week], None, None]:
+    """
+    Получает расписание преподавателей и возвращает его по мере загрузки.
+
+    :param teachers: список преподавателей
+    :param offset_range: интервал смещений относительно текущей недели (``-1`` —
+        предыдущая неделя, ``+1`` — следующая)
+    :param settings: настройки
+    :param failures: словарь, в который будут добавлены входные параметры,
+        которые не были обработаны из-за ошибок (ключ — смещение, значение —
+        список преподавателей)
+    :param workers: количество параллельных загрузок
+    :param max_attempts: сколько раз выполнять задание, которое завершилось
+        ошибкой сети или сеанса, прежде чем добавить его в ``failures``
+    :param attempts: словарь, в который будет записано количество попыток для
+        каждого задания ``(смещение, преподаватель)``
+    :returns: генератор кортежей ``(расписание, преподаватель, неделя)``
+
+    .. seealso:: :func:`iter_timetables`
+    """
+
+    # Выводить дни недели в русской локали
+    locale.setlocale(locale.LC_TIME, "ru_RU.utf8")
+
+    if isinstance(teachers, Teacher):
+        teachers = [teachers]
+
+    current_week = get_current_week()
+    pool = ClientPool(settings, TeacherClient, size=workers)
+
+    def fetch(job: tuple[int, Teacher]) -> Timetable[list[Lesson]]:
+        offset, teacher = job
+        week = current_week + offset
+        logger.info("Загрузка расписания для %s на неделю %s",
+                    teacher.initials, week.week_id)
+        with (pool.client() as client,
+              tracing.span("make_teacher_timetable", teacher=teacher.id,
+                           week=week.week_id)):
+            return client.make_teacher_timetable(teacher.id, offset=offset)
+
+    with batch_run(settings), contextlib.closing(pool):
+        jobs = JobQueue(((offset, teacher) for offset in offset_range for teacher in teachers),
+                        max_attempts=max_attempts, attempts=attempts)
+        for job, result in _map_jobs(fetch, jobs, workers=workers):
+            offset, teacher = job
+            week = current_week + offset
+            try:
+                timetable = result()
+            except RETRYABLE_ERRORS as err:
+                if jobs.retry(job, err):
+                    continue
+                logger.error("Не удалось загрузить расписание: %s", type(err).__name__)
+                if failures is not None:
+                    failures.setdefault(offset, []).append(teacher)
+                continue
+
+            with tracing.span("callbacks", teacher=teacher.id, week=week.week_id):
+                yield timetable, teacher, week
+
+
+async def _aiter_in_thread[T](iterator: Generator[T, None, None]) -> AsyncIterator[T]:
+    """
+    Превращает синхронный генератор в асинхронный, выполняя каждый шаг в
+    отдельном потоке, чтобы не блокировать цикл событий.
+    """
+
+    sentinel = object()
+    try:
+        while (item := await asyncio.to_thread(next, iterator, sentinel)) is not sentinel:
+            yield cast(T, item)
+    finally:
+        iterator.close()
+
+
+def aiter_timetables(
+    groups: str | list[str], offset_range: range = range(1), *,
+    settings: Settings, failures: dict[int, list[str]] | None = None,
+    workers: int = 1, max_attempts: int = 3,
+    attempts: dict[tuple[int, str], int] | None = None
+) -> AsyncIterator[tuple[Timetable[Lesson], str, Week]]:
+    """
+    Асинхронная версия :func:`iter_timetables`.
+
+    Сетевые запросы выполняются в отдельном потоке и не блокируют цикл
+    событий.
+    """
+
+    return _aiter_in_thread(
+        iter_timetables(groups, offset_range, settings=settings, failures=failures,
+                        workers=workers, max_attempts=max_attempts, attempts=attempts)
+    )
+
+
+def aiter_teacher_timetables(
+    teachers: Teacher | list[Teacher], offset_range: range = range(1), *,
+    settings: Settings, failures: dict[int, list[Teacher]] | None = None,
+    workers: int = 1, max_attempts: int = 3,
+    attempts: dict[tuple[int, Teacher], int] | None = None
+) -> AsyncIterator[tuple[Timetable[list[Lesson]], Teacher, Week]]:
+    """
+    Асинхронная версия :func:`iter_teacher_timetables`.
+
+    Сетевые запросы выполняются в отдельном потоке и не блокируют цикл
+    событий.
+    """
+
+    return _aiter_in_thread(
+        iter_teacher_timetables(teachers, offset_range, settings=settings,
+                                failures=failures, workers=workers,
+                                max_attempts=max_attempts, attempts=attempts)
+    )
+
+
+def get_timetable(
+    groups: str | list[str], callbacks: list[TimetableCallback], *,
+    settings: Settings, offset_range: range = range(1), workers: int = 1,
+    max_attempts: int = 3
+) -> BatchResult[str]:
+    """
+    Получает расписание студентов и вызывает коллбэк-функции.
+
+    :param groups: номера групп
+    :param callbacks: функции обратного вызова
+    :param settings: настройки
+    :param offset_range: интервал смещений относительно текущей недели (``-1`` —
+        предыдущая неделя, ``+1`` — следующая)
+    :param workers: количество параллельных загрузок (коллбэки все равно
+        вызываются из текущего потока)
+    :param max_attempts: сколько раз выполнять задание, которое завершилось
+        ошибкой сети или сеанса
+    :returns: входные параметры, которые не были обработаны из-за ошибок, в виде
+        словаря, где ключ — смещение, а значение — список групп, и количество
+        попыток для каждого задания.
+    """
+
+    failures: BatchResult[str] = BatchResult()
+    for timetable, group, week in iter_timetables(groups, offset_range,
+                                                  settings=settings,
+                                                  failures=failures,
+                                                  workers=workers,
+                                                  max_attempts=max_attempts,
+                                                  attempts=failures.attempts):
+        run_callbacks(callbacks, timetable, group, week)
 
     return failures
 
 
 def get_teacher_timetable(teachers: Teacher | list[Teacher],
                           callbacks: list[TeacherTimetableCallback], *,
-                          settings: Settings,
-                          offset_range: range = range(1)) -> dict[int, list[Teacher]]:
+                          settings: Settings, offset_range: range = range(1),
+                          workers: int = 1,
+                          max_attempts: int = 3) -> BatchResult[Teacher]:
     """
     Получает расписание преподавателей и вызывает коллбэк-функции.
 
@@ -86,35 +380,125 @@ def get_teacher_timetable(teachers: Teacher | list[Teacher],
     :param settings: настройки
     :param offset_range: интервал смещений относительно текущей недели (``-1`` —
         предыдущая неделя, ``+1`` — следующая)
+    :param workers: количество параллельных загрузок (коллбэки все равно
+        вызываются из текущего потока)
+    :param max_attempts: сколько раз выполнять задание, которое завершилось
+        ошибкой сети или сеанса
     :returns: входные параметры, которые не были обработаны из-за ошибок, в виде
-        словаря, где ключ — смещение, а значение — список преподавателей.
+        словаря, где ключ — смещение, а значение — список преподавателей, и
+        количество попыток для каждого задания.
     """
 
+    failures: BatchResult[Teacher] = BatchResult()
+    for timetable, teacher, week in iter_teacher_timetables(teachers, offset_range,
+                                                            settings=settings,
+                                                            failures=failures,
+                                                            workers=workers,
+                                                            max_attempts=max_attempts,
+                                                            attempts=failures.attempts):
+        run_callbacks(callbacks, timetable, teacher, week)
+
+    return failures
+
+
+def get_all_timetables(
+    groups: str | list[str], teachers: Teacher | list[Teacher], *,
+    callbacks: list[TimetableCallback],
+    teacher_callbacks: list[TeacherTimetableCallback],
+    classroom_callbacks: list[ClassroomTimetableCallback] | None = None,
+    settings: Settings, offset_range: range = range(1), max_attempts: int = 3
+) -> tuple[BatchResult[str], BatchResult[Teacher]]:
+    """
+    Получает расписание студентов, а расписание преподавателей и аудиторий
+    строит на его основе.
+
+    Отдельный запрос к личному кабинету выполняется только для тех
+    преподавателей, которых не удалось однозначно найти в расписании групп,
+    а также для всех преподавателей, если расписание какой-то группы не
+    загрузилось. Поэтому в ``groups`` должны быть перечислены все группы.
+
+    :param groups: номера групп
+    :param teachers: список преподавателей
+    :param callbacks: функции обратного вызова для расписания групп
+    :param teacher_callbacks: функции обратного вызова для расписания
+        преподавателей
+    :param classroom_callbacks: функции обратного вызова для расписания
+        аудиторий
+    :param settings: настройки
+    :param offset_range: интервал смещений относительно текущей недели (``-1`` —
+        предыдущая неделя, ``+1`` — следующая)
+    :param max_attempts: сколько раз выполнять задание, которое завершилось
+        ошибкой сети или сеанса
+    :returns: входные параметры, которые не были обработаны из-за ошибок, для
+        групп и для преподавателей
+    """
+
+    from egov66_timetable.derive import TimetableIndex
+
     # Выводить дни недели в русской локали
     locale.setlocale(locale.LC_TIME, "ru_RU.utf8")
 
+    if isinstance(groups, str):
+        groups = [groups]
     if isinstance(teachers, Teacher):
         teachers = [teachers]
 
     current_week = get_current_week()
-    client = TeacherClient(settings)
-    failures: defaultdict[int, list[Teacher]] = defaultdict(list)
-    for offset in offset_range:
-        week = current_week + offset
-        for teacher in teachers:
-            logger.info("Загрузка расписания для %s на неделю %s",
-                        teacher.initials, week.week_id)
-            try:
-                timetable = client.make_teacher_timetable(teacher.id, offset=offset)
-            except NetworkError:
-                logger.error("Ошибка сети")
-                failures[offset].append(teacher)
-                continue
+    client = Client(settings)
+    teacher_client: TeacherClient | None = None
+    failures: BatchResult[str] = BatchResult()
+    teacher_failures: BatchResult[Teacher] = BatchResult()
+    with (batch_run(settings), contextlib.closing(client),
+          contextlib.ExitStack() as cleanup):
+        for offset in offset_range:
+            week = current_week + offset
+            index = TimetableIndex()
+            for group in groups:
+                logger.info("Загрузка расписания для группы %s на неделю %s",
+                            group, week.week_id)
+                try:
+                    timetable, lesson_teachers = _with_retries(
+                        lambda: (client.make_timetable(group, offset=offset),
+                                 client.make_lesson_teachers(group, offset=offset)),
+                        (offset, group), failures.attempts, max_attempts
+                    )
+                except RETRYABLE_ERRORS as err:
+                    logger.error("Не удалось загрузить расписание: %s", type(err).__name__)
+                    failures[offset].append(group)
+                    index.incomplete = True
+                    continue
 
-            for callback in callbacks:
-                callback(timetable, teacher, week)
+                run_callbacks(callbacks, timetable, group, week)
+                index.add(timetable, group, lesson_teachers)
 
-    return failures
+            for teacher in teachers:
+                if index.is_resolved(teacher.id):
+                    teacher_timetable = index.teacher_timetable(teacher.id)
+                else:
+                    logger.info("Загрузка расписания для %s на неделю %s",
+                                teacher.initials, week.week_id)
+                    if teacher_client is None:
+                        teacher_client = TeacherClient(settings)
+                        cleanup.callback(teacher_client.close)
+                    try:
+                        teacher_timetable = _with_retries(
+                            functools.partial(teacher_client.make_teacher_timetable,
+                                              teacher.id, offset=offset),
+                            (offset, teacher), teacher_failures.attempts, max_attempts
+                        )
+                    except RETRYABLE_ERRORS as err:
+                        logger.error("Не удалось загрузить расписание: %s",
+                                     type(err).__name__)
+                        teacher_failures[offset].append(teacher)
+                        continue
+
+                run_callbacks(teacher_callbacks, teacher_timetable, teacher, week)
+
+            for classroom in sorted(index.classrooms):
+                run_callbacks(classroom_callbacks or [],
+                              index.classroom_timetable(classroom), classroom, week)
+
+    return failures, teacher_failures
 
 
 def write_timetable(groups: str | list[str], *,
@@ -2,28 +2,227 @@
 # SPDX-FileCopyrightText: 2025 Matvey Vyalkov
 # No warranty
 
+import argparse
+import copy
+import logging
+import sqlite3
 import sys
+from collections.abc import Callable
+from pathlib import Path
 
-from egov66_timetable import write_timetable
+from egov66_timetable import (
+    TeacherTimetableCallback,
+    TimetableCallback,
+    get_teacher_timetable,
+    get_timetable,
+    profiling,
+    tracing,
+)
+from egov66_timetable.types import Teacher
+from egov66_timetable.types.settings import RateLimitSettings
 from egov66_timetable.utils import (
+    get_type_adapter,
     read_settings,
-    write_settings,
 )
 
 
+def parse_offsets(value: str) -> range:
+    """
+    Разбирает смещение (``1``) или интервал смещений (``-1:2``, как в
+    :class:`range`).
+
+    >>> parse_offsets("1")
+    range(1, 2)
+    >>> parse_offsets("-1:2")
+    range(-1, 2)
+    """
+
+    try:
+        match value.split(":"):
+            case [offset]:
+                return range(int(offset), int(offset) + 1)
+            case [start, stop]:
+                return range(int(start), int(stop))
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"некорректный интервал смещений: {value!r}")
+
+
+def parse_rate(value: str) -> float:
+    """
+    Разбирает частоту запросов: неотрицательное число, ``0`` выключает
+    ограничение.
+
+    >>> parse_rate("2.5")
+    2.5
+    """
+
+    try:
+        rate = float(value)
+    except ValueError:
+        pass
+    else:
+        if rate >= 0:
+            return rate
+    raise argparse.ArgumentTypeError(f"некорректная частота запросов: {value!r}")
+
+
+def read_groups(path: str) -> list[str]:
+    """
+    Читает список групп из файла: по одной группе на строку, строки с ``#`` в
+    начале пропускаются.
+    """
+
+    lines = Path(path).read_text().splitlines()
+    return [line.strip() for line in lines
+            if line.strip() and not line.lstrip().startswith("#")]
+
+
+def read_teachers(path: str) -> list[Teacher]:
+    """
+    Читает список преподавателей из JSON-файла (список объектов с полями
+    ``id``, ``surname``, ``given_name`` и ``patronymic``).
+    """
+
+    return get_type_adapter(list[Teacher]).validate_json(Path(path).read_bytes())
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="ecp-egov66-timetable",
+        description="Загрузка расписания из личного кабинета ecp.egov66.ru",
+        epilog="Интервал смещений с минусом указывается через знак равенства: "
+               "--offsets=-1:2",
+    )
+    parser.add_argument("group", nargs="?",
+                        help="номер группы (для совместимости)")
+    parser.add_argument("offset", nargs="?", type=parse_offsets,
+                        help="смещение относительно текущей недели (для совместимости)")
+    parser.add_argument("-g", "--groups", nargs="+", default=[], metavar="GROUP",
+                        help="номера групп")
+    parser.add_argument("-G", "--groups-file", action="append", default=[],
+                        metavar="FILE", help="файл со списком групп")
+    parser.add_argument("-T", "--teachers-file", action="append", default=[],
+                        metavar="FILE", help="JSON-файл со списком преподавателей")
+    parser.add_argument("-o", "--offsets", type=parse_offsets, metavar="START[:STOP]",
+                        help="смещение или интервал смещений (по умолчанию 0)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help="количество параллельных загрузок")
+    parser.add_argument("--rate", type=parse_rate, metavar="N",
+                        help="не больше N запросов в секунду (по умолчанию без "
+                             "ограничения или как в настройках, 0 — выключить)")
+    parser.add_argument("--html", action="store_true",
+                        help="записать HTML-файлы (по умолчанию, если не выбран "
+                             "другой вывод)")
+    parser.add_argument("--sqlite", metavar="DB", help="записать в базу данных SQLite")
+    parser.add_argument("--json", metavar="DIR", help="записать JSON-файлы в каталог")
+    parser.add_argument("--ics", metavar="DIR",
+                        help="записать календари iCalendar в каталог")
+    parser.add_argument("--sessions", metavar="FILE",
+                        help="файл с ключами сеанса (по умолчанию sessions.json)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="записать трассировку в формате Chrome Trace Event")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="записать результаты профилирования по этапам в каталог")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="выводить подробный журнал")
+    return parser
+
+
 def main() -> None:
-    args = sys.argv[1:]
-    if not 1 <= len(args) <= 2:
-        print("usage: ecp-egov66-timetable group [offset]", file=sys.stderr)
-        sys.exit(1)
-
-    group = args[0]
-    offset = int(args[1]) if len(args) == 2 else 0
-
-    settings = read_settings()
-    write_timetable(group, settings=settings,
-                    offset_range=range(offset, offset+1))
-    write_settings(settings)
+    parser = make_parser()
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    groups: list[str] = list(args.groups)
+    if args.group is not None:
+        groups.insert(0, args.group)
+    for path in args.groups_file:
+        groups.extend(read_groups(path))
+    teachers: list[Teacher] = []
+    for path in args.teachers_file:
+        teachers.extend(read_teachers(path))
+
+    if not groups and not teachers:
+        parser.error("не указаны ни группы, ни преподаватели")
+    if args.offset is not None and args.offsets is not None:
+        parser.error("смещение указано дважды")
+    offset_range: range = next(
+        (offsets for offsets in (args.offset, args.offsets) if offsets is not None),
+        range(1)
+    )
+
+    # Файл настроек не перезаписывается: ключи сеанса хранятся отдельно
+    run_settings = copy.copy(read_settings())
+    if args.sessions is not None or "sessions_file" not in run_settings:
+        run_settings["sessions_file"] = args.sessions or "sessions.json"
+    if args.trace is not None:
+        run_settings["trace_file"] = args.trace
+    if args.profile is not None:
+        run_settings["profile_dir"] = args.profile
+    if args.rate == 0:
+        run_settings["rate_limit"] = False
+    elif args.rate is not None:
+        rate_limit = run_settings.get("rate_limit") or RateLimitSettings()
+        run_settings["rate_limit"] = {**rate_limit, "rate": args.rate,
+                                      "max_rate": args.rate}
+
+    callbacks: list[TimetableCallback] = []
+    teacher_callbacks: list[TeacherTimetableCallback] = []
+    cleanup: list[Callable[[], None]] = []
+
+    if args.html or (args.sqlite is None and args.json is None and args.ics is None):
+        from egov66_timetable.callbacks.html import html_callback, html_teacher_callback
+        callbacks.append(html_callback(run_settings))
+        teacher_callbacks.append(html_teacher_callback(run_settings))
+    if args.sqlite is not None:
+        from egov66_timetable.callbacks.sqlite import (
+            create_db,
+            sqlite_callback,
+            sqlite_teacher_callback,
+        )
+        conn = sqlite3.connect(args.sqlite)
+        cleanup.append(conn.close)
+        create_db(conn)
+        callbacks.append(sqlite_callback(conn))
+        teacher_callbacks.append(sqlite_teacher_callback(conn))
+    if args.json is not None:
+        from egov66_timetable.callbacks.json import json_callback, json_teacher_callback
+        callbacks.append(json_callback(args.json))
+        teacher_callbacks.append(json_teacher_callback(args.json))
+    if args.ics is not None:
+        from egov66_timetable.callbacks.ics import ics_callback, ics_teacher_callback
+        from egov66_timetable.utils import DEFAULT_BELLS, parse_bells
+        bells = parse_bells(run_settings["bells"]) if "bells" in run_settings else DEFAULT_BELLS
+        callbacks.append(ics_callback(args.ics, bells=bells))
+        teacher_callbacks.append(ics_teacher_callback(args.ics, bells=bells))
+
+    failed = 0
+    try:
+        with tracing.trace_run(run_settings), profiling.profile_run(run_settings):
+            if groups:
+                failures = get_timetable(groups, callbacks, settings=run_settings,
+                                         offset_range=offset_range, workers=args.jobs)
+                for offset, failed_groups in sorted(failures.items()):
+                    failed += len(failed_groups)
+                    print(f"Не удалось загрузить расписание на смещение {offset}: "
+                          f"{', '.join(failed_groups)}", file=sys.stderr)
+            if teachers:
+                teacher_failures = get_teacher_timetable(teachers, teacher_callbacks,
+                                                         settings=run_settings,
+                                                         offset_range=offset_range,
+                                                         workers=args.jobs)
+                for offset, failed_teachers in sorted(teacher_failures.items()):
+                    failed += len(failed_teachers)
+                    print(f"Не удалось загрузить расписание на смещение {offset}: "
+                          f"{', '.join(t.initials for t in failed_teachers)}",
+                          file=sys.stderr)
+    finally:
+        for func in cleanup:
+            func()
+
+    sys.exit(1 if failed else 0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,83 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Общие части пакетных запусков: очередь заданий с повторами, метрики,
+трассировка и профилирование на время запуска и вызов коллбэков.
+
+Модуль внутренний, его используют :mod:`egov66_timetable`,
+:mod:`egov66_timetable.multi` и :mod:`egov66_timetable.jobqueue`.
+"""
+
+import contextlib
+import logging
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+
+from egov66_timetable import metrics, profiling, tracing
+from egov66_timetable.types.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue[J](Iterator[J]):
+    """
+    Очередь заданий, в конец которой можно вернуть задание, завершившееся
+    ошибкой. Считает попытки выполнения каждого задания.
+    """
+
+    def __init__(self, jobs: Iterable[J], *, max_attempts: int,
+                 attempts: dict[J, int] | None = None) -> None:
+        self.max_attempts = max_attempts
+        self.attempts = attempts if attempts is not None else {}
+        self._jobs = iter(jobs)
+        self._retries: deque[J] = deque()
+
+    def __next__(self) -> J:
+        try:
+            job = next(self._jobs)
+        except StopIteration:
+            if not self._retries:
+                raise
+            job = self._retries.popleft()
+        self.attempts[job] = self.attempts.get(job, 0) + 1
+        return job
+
+    def retry(self, job: J, err: Exception) -> bool:
+        """
+        Возвращает задание в очередь, если попытки еще не исчерпаны.
+
+        :returns: было ли задание возвращено в очередь
+        """
+
+        attempt = self.attempts.get(job, 0)
+        if attempt >= self.max_attempts:
+            return False
+        logger.warning("Попытка %d для %s не удалась (%s), задание будет повторено",
+                       attempt, job, type(err).__name__)
+        metrics.JOB_RETRIES.inc()
+        self._retries.append(job)
+        return True
+
+
+@contextlib.contextmanager
+def batch_run(settings: Settings) -> Iterator[None]:
+    # Выгрузка метрик по окончании относится только к этому запуску
+    metrics.registry.reset_run()
+    metrics.start_server(settings)
+    with tracing.trace_run(settings), profiling.profile_run(settings):
+        try:
+            yield
+        finally:
+            metrics.export(settings)
+
+
+def run_callbacks[*Ts](callbacks: Iterable[Callable[[*Ts], None]], *args: *Ts) -> None:
+    for callback in callbacks:
+        name = metrics.callback_name(callback)
+        start = time.perf_counter()
+        with tracing.span(name), profiling.stage("callback"):
+            callback(*args)
+        metrics.CALLBACK_DURATION.observe(time.perf_counter() - start, callback=name)
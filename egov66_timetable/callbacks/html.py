@@ -8,6 +8,7 @@
 
 import logging
 from collections import defaultdict
+from collections.abc import Mapping, Sequence
 from datetime import timedelta
 from pathlib import Path
 
@@ -16,6 +17,8 @@ import jinja2
 from egov66_timetable import (
     TeacherTimetableCallback,
     TimetableCallback,
+    profiling,
+    tracing,
 )
 from egov66_timetable.types import (
     Lesson,
@@ -55,7 +58,7 @@ def load_teacher_template() -> jinja2.Template:
     return jinja_env.get_template("teacher_week.html.jinja")
 
 
-def collapse_timetable(timetable: Timetable[Lesson]) -> CollapsedTimetable:
+def collapse_timetable(timetable: Sequence[Mapping[int, Lesson]]) -> CollapsedTimetable:
     """
     Преобразует расписание в пригодное для рендеринга в формате таблицы, а
     именно переводит его из формата ``{номер_пары: (аудитория, предмет)}`` в
@@ -63,7 +66,8 @@ def collapse_timetable(timetable: Timetable[Lesson]) -> CollapsedTimetable:
 
     Если расписания на день нет, вставляет вместо него три пустые строки.
 
-    :param timetable: исходное расписание
+    :param timetable: исходное расписание (подойдет и :class:`CompactTimetable
+        <egov66_timetable.compact.CompactTimetable>`)
     """
 
     result: CollapsedTimetable = [[] for _ in range(len(timetable))]
@@ -187,7 +191,7 @@ def _html_callback(settings: Settings, *, template: jinja2.Template,
         css_path=css_path,
         **template_args,
     ).lstrip()
-    with open(out_file, "w") as out:
+    with profiling.stage("persist"), open(out_file, "w") as out:
         out.write(html)
 
 
@@ -207,9 +211,10 @@ def html_callback(settings: Settings, *,
 
     def callback(timetable: Timetable[Lesson], group: str, week: Week) -> None:
         out_file = Path(group) / f"{week.week_id}.html"
+        with tracing.span("collapse_timetable"):
+            collapsed = collapse_timetable(timetable)
         _html_callback(settings, template=template, out_file=out_file,
-                       group=group, week=week,
-                       timetable=collapse_timetable(timetable),
+                       group=group, week=week, timetable=collapsed,
                        **template_args)
 
     return callback
@@ -231,9 +236,10 @@ def html_teacher_callback(settings: Settings, *,
 
     def callback(timetable: Timetable[list[Lesson]], teacher: Teacher, week: Week) -> None:
         out_file = Path(teacher.translit) / f"{week.week_id}.html"
+        with tracing.span("collapse_teacher_timetable"):
+            collapsed = collapse_teacher_timetable(timetable)
         _html_callback(settings, template=template, out_file=out_file,
-                       teacher=teacher, week=week,
-                       timetable=collapse_teacher_timetable(timetable),
+                       teacher=teacher, week=week, timetable=collapsed,
                        **template_args)
 
     return callback
@@ -0,0 +1,223 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Вывод расписания в календари iCalendar (:rfc:`5545`), на которые можно
+подписаться в приложении календаря.
+
+Для каждой группы и каждого преподавателя записывается один файл
+:file:`группа.ics` со всеми загруженными неделями. Рядом с ним хранится файл
+состояния :file:`.группа.ics.json` с событиями по неделям, поэтому при загрузке
+очередной недели остальные недели заново не обрабатываются. Календарь
+перезаписывается, только если события недели изменились, так что приложения
+календаря не скачивают его заново без необходимости.
+
+UID события совпадает с UUID пары, поэтому перенесенная пара обновляется в
+календаре, а не появляется в нем дважды.
+"""
+
+import json
+import logging
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from pathlib import Path
+
+from egov66_timetable import (
+    TeacherTimetableCallback,
+    TimetableCallback,
+)
+from egov66_timetable.types import (
+    Lesson,
+    Teacher,
+    Timetable,
+    Week,
+)
+from egov66_timetable.utils import (
+    DEFAULT_BELLS,
+    YEKATERINBURG,
+    Bell,
+    file_lock,
+    write_atomic,
+)
+
+#: Событие календаря: UID, номер дня недели, номер пары, название, место и
+#: описание.
+type _Event = tuple[str, int, int, str, str, str]
+
+UID_DOMAIN = "egov66-timetable"
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\n", "\\n"))
+
+
+def _fold(line: str) -> str:
+    # Строки длиннее 75 байт переносятся, не разрывая символы UTF-8.
+    if len(line.encode()) <= 75:
+        return line
+    parts: list[str] = []
+    current, size, limit = "", 0, 75
+    for char in line:
+        char_size = len(char.encode())
+        if size + char_size > limit:
+            parts.append(current)
+            current, size, limit = "", 0, 74
+        current += char
+        size += char_size
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+
+def _format_utc(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _render(name: str, weeks: dict[str, dict[str, object]],
+            bells: Sequence[Bell], tz: tzinfo) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:-//{UID_DOMAIN}//RU",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+    ]
+    for week_id in sorted(weeks, key=lambda week_id: Week.from_week_id(week_id).monday):
+        monday = Week.from_week_id(week_id).monday
+        state = weeks[week_id]
+        events = state["events"]
+        assert isinstance(events, list)
+        for uid, day_num, lesson_num, summary, location, description in events:
+            if lesson_num >= len(bells):
+                logger.warning("Нет времени для пары %d, пропускаю %s", lesson_num, uid)
+                continue
+            day: date = monday + timedelta(days=day_num)
+            start, end = bells[lesson_num]
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{uid}@{UID_DOMAIN}",
+                f"DTSTAMP:{state['stamp']}",
+                f"DTSTART:{_format_utc(datetime.combine(day, start, tz))}",
+                f"DTEND:{_format_utc(datetime.combine(day, end, tz))}",
+                f"SUMMARY:{_escape(summary)}",
+            ]
+            if location:
+                lines.append(f"LOCATION:{_escape(location)}")
+            if description:
+                lines.append(f"DESCRIPTION:{_escape(description)}")
+            lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "".join(_fold(line) + "\r\n" for line in lines)
+
+
+def _update_feed(out_file: Path, name: str, week: Week, events: list[_Event],
+                 bells: Sequence[Bell], tz: tzinfo) -> bool:
+    state_file = out_file.with_name(f".{out_file.name}.json")
+    with file_lock(out_file):
+        weeks: dict[str, dict[str, object]] = {}
+        if state_file.exists() and out_file.exists():
+            weeks = json.loads(state_file.read_text())
+
+        # Сравниваем списки, а не готовый текст: DTSTAMP меняется при
+        # каждом изменении
+        old = weeks.get(week.week_id)
+        if old is not None and old["events"] == [list(event) for event in events]:
+            logger.info("Календарь %s уже актуален", out_file)
+            return False
+        if old is None and not events:
+            return False
+
+        if events:
+            weeks[week.week_id] = {
+                "stamp": _format_utc(datetime.now(timezone.utc)),
+                "events": events,
+            }
+        else:
+            del weeks[week.week_id]
+
+        logger.info("Вывод расписания в файл %s", out_file)
+        write_atomic(out_file, _render(name, weeks, bells, tz))
+        write_atomic(state_file, json.dumps(weeks, ensure_ascii=False,
+                                            separators=(",", ":")))
+        return True
+
+
+def group_events(timetable: Timetable[Lesson]) -> list[_Event]:
+    """
+    Составляет список событий по расписанию группы.
+
+    :param timetable: расписание группы
+    :returns: события, упорядоченные по времени
+    """
+
+    return [(lesson_id, day_num, lesson_num, name, classroom, "")
+            for day_num, day in enumerate(timetable)
+            for lesson_num, (lesson_id, (classroom, name)) in sorted(day.items())]
+
+
+def teacher_events(timetable: Timetable[list[Lesson]]) -> list[_Event]:
+    """
+    Составляет список событий по расписанию преподавателя. Совмещенная пара
+    нескольких групп с одним UUID становится одним событием.
+
+    :param timetable: расписание преподавателя
+    :returns: события, упорядоченные по времени
+    """
+
+    result: list[_Event] = []
+    for day_num, day in enumerate(timetable):
+        for lesson_num, lessons in sorted(day.items()):
+            groups: dict[str, list[str]] = {}
+            names: dict[str, str] = {}
+            for lesson_id, (group, name) in lessons:
+                groups.setdefault(lesson_id, []).append(group)
+                names[lesson_id] = name
+            for lesson_id in sorted(groups):
+                group_list = ", ".join(sorted(groups[lesson_id]))
+                result.append((lesson_id, day_num, lesson_num,
+                               f"{names[lesson_id]} ({group_list})", "",
+                               f"Группы: {group_list}"))
+    return result
+
+
+def ics_callback(out_dir: str | Path = ".", *,
+                 bells: Sequence[Bell] = DEFAULT_BELLS,
+                 tz: tzinfo = YEKATERINBURG) -> TimetableCallback:
+    """
+    Записывает расписание студента в календари :file:`группа.ics`.
+
+    :param out_dir: каталог, в который записываются файлы
+    :param bells: расписание звонков
+    :param tz: часовой пояс расписания звонков
+    :returns: коллбэк-функция для расписания группы
+    """
+
+    def callback(timetable: Timetable[Lesson], group: str, week: Week) -> None:
+        _update_feed(Path(out_dir) / f"{group}.ics", group, week,
+                     group_events(timetable), bells, tz)
+
+    return callback
+
+
+def ics_teacher_callback(out_dir: str | Path = ".", *,
+                         bells: Sequence[Bell] = DEFAULT_BELLS,
+                         tz: tzinfo = YEKATERINBURG) -> TeacherTimetableCallback:
+    """
+    Записывает расписание преподавателя в календари
+    :file:`преподаватель.ics`.
+
+    :param out_dir: каталог, в который записываются файлы
+    :param bells: расписание звонков
+    :param tz: часовой пояс расписания звонков
+    :returns: коллбэк-функция для расписания преподавателя
+    """
+
+    def callback(timetable: Timetable[list[Lesson]], teacher: Teacher, week: Week) -> None:
+        _update_feed(Path(out_dir) / f"{teacher.translit}.ics", teacher.initials, week,
+                     teacher_events(timetable), bells, tz)
+
+    return callback
@@ -0,0 +1,313 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Вывод расписания в JSON-файлы.
+
+Кроме документов с расписанием в каталог записывается манифест
+:file:`manifest.json` с путем и хешем SHA-256 каждого документа:
+
+.. code-block:: json
+
+   {
+     "groups": {"101": {"2026-3": {"file": "101/2026-3.json", "sha256": "..."}}},
+     "teachers": {"<UUID>": {"2026-3": {"file": "...", "sha256": "..."}}}
+   }
+
+Документ, содержимое которого не изменилось, не перезаписывается. Если
+включены неизменяемые имена файлов (``hashed=True``), в имя файла добавляется
+начало хеша (:file:`101/2026-3.0123456789abcdef.json`), поэтому такие файлы
+можно отдавать с ``Cache-Control: immutable``, а перечитывать нужно только
+манифест. Старые версии документов при этом не удаляются.
+
+Расписание, которое уже есть в базе данных SQLite, можно выгрузить целиком:
+
+.. code-block:: shell
+
+   python -m egov66_timetable.callbacks.json timetable.db api/ --hashed \\
+       --teachers-file teachers.json
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import sqlite3
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+from egov66_timetable import (
+    TeacherTimetableCallback,
+    TimetableCallback,
+)
+from egov66_timetable.callbacks.sqlite import load_teacher_timetables, load_timetables
+from egov66_timetable.types import (
+    Lesson,
+    Teacher,
+    Timetable,
+    Week,
+)
+from egov66_timetable.utils import file_lock, get_type_adapter, write_atomic
+
+#: Имя файла манифеста.
+MANIFEST_FILE = "manifest.json"
+
+type _Manifest = dict[str, dict[str, dict[str, dict[str, str]]]]
+
+logger = logging.getLogger(__name__)
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+class ExportReport(NamedTuple):
+    """
+    Результат выгрузки.
+    """
+
+    #: Сколько документов записано.
+    written: int
+
+    #: Сколько документов не изменилось.
+    skipped: int
+
+
+class JsonExport:
+    """
+    Каталог с JSON-документами и манифестом.
+
+    Манифест хранится в памяти и перечитывается, только если его изменил
+    другой процесс. Изменять документы нужно внутри :meth:`transaction`.
+
+    :param out_dir: каталог, в который записываются файлы
+    :param hashed: добавлять ли хеш содержимого в имена файлов
+    """
+
+    def __init__(self, out_dir: str | Path = ".", *, hashed: bool = False) -> None:
+        self.out_dir = Path(out_dir)
+        self.hashed = hashed
+        self.manifest: _Manifest = {"groups": {}, "teachers": {}}
+        self._manifest_file = self.out_dir / MANIFEST_FILE
+        self._version: tuple[int, int, int] | None = None
+        self._dirty = False
+
+    def _stat(self) -> tuple[int, int, int] | None:
+        # Манифест заменяется целиком, поэтому вместе со временем изменения
+        # меняется и номер inode: время может совпасть у двух записей подряд.
+        try:
+            stat = self._manifest_file.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+    def _reload(self) -> None:
+        version = self._stat()
+        if version is not None and version != self._version:
+            self.manifest = json.loads(self._manifest_file.read_bytes())
+            self._version = version
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Блокирует манифест, а в конце записывает его, если он изменился.
+        """
+
+        with file_lock(self._manifest_file):
+            self._reload()
+            try:
+                yield
+            finally:
+                if self._dirty:
+                    write_atomic(self._manifest_file, _encoder.encode(self.manifest))
+                    self._version = self._stat()
+                    self._dirty = False
+
+    def put(self, section: str, key: str, directory: str, week: Week,
+            document: dict[str, object]) -> bool:
+        """
+        Записывает документ, если его содержимое изменилось.
+
+        :param section: раздел манифеста (``groups`` или ``teachers``)
+        :param key: ключ в разделе (номер группы или UUID преподавателя)
+        :param directory: каталог документа относительно :attr:`out_dir`
+        :param week: неделя
+        :param document: документ
+        :returns: был ли записан документ
+        """
+
+        data = _encoder.encode(document).encode()
+        digest = hashlib.sha256(data).hexdigest()
+        entries = self.manifest.setdefault(section, {}).setdefault(key, {})
+        old = entries.get(week.week_id)
+        if (old is not None and old["sha256"] == digest
+                and (self.out_dir / old["file"]).exists()):
+            logger.debug("Документ %s не изменился", old["file"])
+            return False
+
+        if self.hashed:
+            file = f"{directory}/{week.week_id}.{digest[:16]}.json"
+        else:
+            file = f"{directory}/{week.week_id}.json"
+        logger.info("Вывод расписания в файл %s", self.out_dir / file)
+        write_atomic(self.out_dir / file, data)
+        entries[week.week_id] = {"file": file, "sha256": digest}
+        self._dirty = True
+        return True
+
+    def put_group(self, timetable: Timetable[Lesson], group: str, week: Week) -> bool:
+        """
+        Записывает расписание группы в файл :file:`группа/неделя.json`.
+
+        :returns: был ли записан документ
+        """
+
+        return self.put("groups", group, group, week, {
+            "group": group,
+            "week_id": week.week_id,
+            "timetable": timetable,
+        })
+
+    def put_teacher(self, timetable: Timetable[list[Lesson]], teacher: Teacher,
+                    week: Week) -> bool:
+        """
+        Записывает расписание преподавателя в файл
+        :file:`преподаватель/неделя.json`.
+
+        :returns: был ли записан документ
+        """
+
+        return self.put("teachers", teacher.id, teacher.translit, week, {
+            "teacher": {
+                "id": teacher.id,
+                "surname": teacher.surname,
+                "given_name": teacher.given_name,
+                "patronymic": teacher.patronymic,
+            },
+            "week_id": week.week_id,
+            "timetable": timetable,
+        })
+
+
+def json_callback(out_dir: str | Path = ".", *, hashed: bool = False) -> TimetableCallback:
+    """
+    Записывает расписание студента в JSON-файлы :file:`группа/неделя.json`.
+
+    Расписание записывается в том же виде, что и ``Timetable[Lesson]``, поэтому
+    его можно снова загрузить с помощью ``get_type_adapter(Timetable[Lesson])``.
+
+    :param out_dir: каталог, в который записываются файлы
+    :param hashed: добавлять ли хеш содержимого в имена файлов
+    :returns: коллбэк-функция для расписания группы
+    """
+
+    export = JsonExport(out_dir, hashed=hashed)
+
+    def callback(timetable: Timetable[Lesson], group: str, week: Week) -> None:
+        with export.transaction():
+            export.put_group(timetable, group, week)
+
+    return callback
+
+
+def json_teacher_callback(out_dir: str | Path = ".", *,
+                          hashed: bool = False) -> TeacherTimetableCallback:
+    """
+    Записывает расписание преподавателя в JSON-файлы
+    :file:`преподаватель/неделя.json`.
+
+    :param out_dir: каталог, в который записываются файлы
+    :param hashed: добавлять ли хеш содержимого в имена файлов
+    :returns: коллбэк-функция для расписания преподавателя
+    """
+
+    export = JsonExport(out_dir, hashed=hashed)
+
+    def callback(timetable: Timetable[list[Lesson]], teacher: Teacher, week: Week) -> None:
+        with export.transaction():
+            export.put_teacher(timetable, teacher, week)
+
+    return callback
+
+
+def export_sqlite(conn: sqlite3.Connection, out_dir: str | Path = ".", *,
+                  week: Week | str | None = None, instance: str = "",
+                  teachers: Iterable[Teacher] = (), hashed: bool = False) -> ExportReport:
+    """
+    Выгружает расписание из базы данных SQLite в JSON-файлы.
+
+    Расписание читается из базы данных по одной неделе одной группы и сразу
+    записывается, поэтому расписание всех групп за семестр не хранится в
+    памяти целиком. Манифест записывается один раз в конце.
+
+    :param conn: база данных SQLite
+    :param out_dir: каталог, в который записываются файлы
+    :param week: неделя (по умолчанию все недели)
+    :param instance: сайт личного кабинета
+    :param teachers: преподаватели, расписание которых нужно выгрузить
+    :param hashed: добавлять ли хеш содержимого в имена файлов
+    :returns: сколько документов записано и сколько не изменилось
+    """
+
+    export = JsonExport(out_dir, hashed=hashed)
+    written = skipped = 0
+    with export.transaction():
+        for timetable, group, group_week in load_timetables(conn, week=week,
+                                                            instance=instance):
+            if export.put_group(timetable, group, group_week):
+                written += 1
+            else:
+                skipped += 1
+
+        by_id = {teacher.id: teacher for teacher in teachers}
+        if by_id:
+            for teacher_timetable, teacher_id, teacher_week in load_teacher_timetables(
+                conn, week=week, instance=instance
+            ):
+                if teacher_id not in by_id:
+                    continue
+                if export.put_teacher(teacher_timetable, by_id[teacher_id], teacher_week):
+                    written += 1
+                else:
+                    skipped += 1
+
+    return ExportReport(written, skipped)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m egov66_timetable.callbacks.json",
+        description="Выгрузка расписания из базы данных SQLite в JSON-файлы",
+    )
+    parser.add_argument("db", help="база данных SQLite")
+    parser.add_argument("out_dir", help="каталог, в который записываются файлы")
+    parser.add_argument("--week", metavar="WEEK_ID",
+                        help="неделя, например 2026-3 (по умолчанию все недели)")
+    parser.add_argument("--instance", default="", help="сайт личного кабинета")
+    parser.add_argument("-T", "--teachers-file", action="append", default=[],
+                        metavar="FILE", help="JSON-файл со списком преподавателей")
+    parser.add_argument("--hashed", action="store_true",
+                        help="добавлять хеш содержимого в имена файлов")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="выводить подробный журнал")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    teachers: list[Teacher] = []
+    for path in args.teachers_file:
+        teachers.extend(get_type_adapter(list[Teacher]).validate_json(Path(path).read_bytes()))
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        report = export_sqlite(conn, args.out_dir, week=args.week, instance=args.instance,
+                               teachers=teachers, hashed=args.hashed)
+    finally:
+        conn.close()
+
+    print(f"Записано документов: {report.written}, без изменений: {report.skipped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,28 +4,220 @@
 
 """
 Запись расписания в базу данных SQLite.
+
+Начиная со второй версии схемы, строки (сайты, группы, аудитории и названия
+предметов) хранятся в словаре ``string``, UUID — в виде 16 байт, а неделя —
+в виде числа ``ГГГГНН``. Пары хранятся в таблице ``lesson_v2`` без rowid.
+Представление ``lesson`` показывает их в старом формате, только для чтения.
 """
 
 import logging
 import sqlite3
+import uuid
+from collections.abc import Iterable, Iterator
 from importlib.resources import files
 
 from egov66_timetable import (
     TeacherTimetableCallback,
     TimetableCallback,
+    profiling,
 )
-from egov66_timetable.types import Lesson, Teacher, Timetable, Week
-from egov66_timetable.utils import (
-    flatten,
-    get_type_adapter,
+from egov66_timetable.diff import diff_timetables
+from egov66_timetable.types import (
+    Lesson,
+    LessonData,
+    Teacher,
+    Timetable,
+    Week,
 )
+from egov66_timetable.utils import get_type_adapter, trim_weekend
+
+#: Версия схемы базы данных (``PRAGMA user_version``).
+SCHEMA_VERSION = 4
+
+# Пересчет сводных таблиц по актуальным парам (см. summary.py). Пара-заглушка
+# Conflict (Conflict.DATA) не считается предметом, как и в триггерах schema.sql.
+_REBUILD_SUMMARIES = """
+    DELETE FROM summary_teacher
+        WHERE (instance, week) IN (SELECT instance, week FROM lesson_v2);
+    DELETE FROM summary_group
+        WHERE (instance, week) IN (SELECT instance, week FROM lesson_v2);
+    DELETE FROM summary_room
+        WHERE (instance, week) IN (SELECT instance, week FROM lesson_v2);
+    INSERT INTO summary_teacher
+        SELECT instance, week, teacher_id, count(*) FROM lesson_v2
+        WHERE obsolete_since IS NULL AND teacher_id IS NOT NULL
+        GROUP BY instance, week, teacher_id;
+    INSERT INTO summary_group
+        SELECT instance, week, group_id, name, count(*) FROM lesson_v2
+        WHERE obsolete_since IS NULL AND name IS NOT NULL
+          AND name NOT IN (SELECT id FROM string WHERE value =
+                           'Ошибка в расписании: Несколько пар в одно и то же время')
+        GROUP BY instance, week, group_id, name;
+    INSERT INTO summary_room
+        SELECT instance, week, classroom, count(*) FROM lesson_v2
+        WHERE obsolete_since IS NULL AND classroom IS NOT NULL
+          AND classroom NOT IN (SELECT id FROM string WHERE value IN ('', '?'))
+        GROUP BY instance, week, classroom;
+"""
+
+#: Скрипты, которые переводят базу данных с указанной версии на следующую.
+MIGRATIONS: dict[int, str] = {
+    0: """
+    BEGIN;
+    ALTER TABLE lesson ADD COLUMN instance TEXT NOT NULL DEFAULT '';
+    DROP INDEX IF EXISTS idx_lessons_group;
+    CREATE INDEX idx_lessons_instance_group
+        ON lesson (instance, group_id, week_id, day_num);
+    PRAGMA user_version = 1;
+    COMMIT;
+    """,
+    1: """
+    BEGIN;
+    CREATE TABLE string(
+        id INTEGER PRIMARY KEY,
+        value TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE lesson_v2(
+        instance INTEGER NOT NULL REFERENCES string(id),
+        group_id INTEGER NOT NULL REFERENCES string(id),
+        id BLOB NOT NULL,
+        week INTEGER NOT NULL,
+        day_num INTEGER NOT NULL,
+        lesson_num INTEGER NOT NULL,
+        classroom INTEGER REFERENCES string(id),
+        name INTEGER REFERENCES string(id),
+        teacher_id BLOB,
+        last_updated INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+        last_checked INTEGER NOT NULL DEFAULT 0,
+        obsolete_since INTEGER,
+        PRIMARY KEY (instance, group_id, id)
+    ) WITHOUT ROWID;
+    INSERT INTO string(value)
+        SELECT instance FROM lesson
+        UNION SELECT group_id FROM lesson
+        UNION SELECT classroom FROM lesson WHERE classroom IS NOT NULL
+        UNION SELECT name FROM lesson WHERE name IS NOT NULL;
+    INSERT INTO lesson_v2
+    SELECT
+        (SELECT id FROM string WHERE value = l.instance),
+        (SELECT id FROM string WHERE value = l.group_id),
+        uuid_to_blob(l.id),
+        CAST(substr(l.week_id, 1, instr(l.week_id, '-') - 1) AS INTEGER) * 100
+            + CAST(substr(l.week_id, instr(l.week_id, '-') + 1) AS INTEGER),
+        l.day_num,
+        l.lesson_num,
+        (SELECT id FROM string WHERE value = l.classroom),
+        (SELECT id FROM string WHERE value = l.name),
+        uuid_to_blob(l.teacher_id),
+        CAST(strftime('%s', l.last_updated) AS INTEGER),
+        CAST(strftime('%s', l.last_checked) AS INTEGER),
+        CAST(strftime('%s', l.obsolete_since) AS INTEGER)
+    FROM
+        lesson AS l;
+    DROP TABLE lesson;
+    PRAGMA user_version = 2;
+    COMMIT;
+    """,
+    2: """
+    BEGIN;
+    CREATE TABLE summary_teacher(
+        instance INTEGER NOT NULL,
+        week INTEGER NOT NULL,
+        teacher_id BLOB NOT NULL,
+        lessons INTEGER NOT NULL,
+        PRIMARY KEY (instance, week, teacher_id)
+    ) WITHOUT ROWID;
+    CREATE TABLE summary_group(
+        instance INTEGER NOT NULL,
+        week INTEGER NOT NULL,
+        group_id INTEGER NOT NULL,
+        name INTEGER NOT NULL,
+        lessons INTEGER NOT NULL,
+        PRIMARY KEY (instance, week, group_id, name)
+    ) WITHOUT ROWID;
+    CREATE TABLE summary_room(
+        instance INTEGER NOT NULL,
+        week INTEGER NOT NULL,
+        classroom INTEGER NOT NULL,
+        lessons INTEGER NOT NULL,
+        PRIMARY KEY (instance, week, classroom)
+    ) WITHOUT ROWID;
+    """ + _REBUILD_SUMMARIES + """
+    PRAGMA user_version = 3;
+    COMMIT;
+    """,
+    3: """
+    BEGIN;
+    -- Триггеры пересоздаются из schema.sql без пары-заглушки Conflict
+    DROP TRIGGER IF EXISTS summary_insert;
+    DROP TRIGGER IF EXISTS summary_update_new;
+    """ + _REBUILD_SUMMARIES + """
+    PRAGMA user_version = 4;
+    COMMIT;
+    """,
+}
 
 logger = logging.getLogger(__name__)
 
 
+def _uuid_to_blob(value: str) -> bytes:
+    return uuid.UUID(value).bytes
+
+
+def _blob_to_uuid(value: bytes) -> str:
+    # Вчетверо быстрее, чем str(uuid.UUID(bytes=value))
+    h = value.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def encode_week(week: Week | str) -> int:
+    """
+    Переводит неделю в число, в котором она хранится в базе данных.
+
+    >>> encode_week("2026-3")
+    202603
+
+    :param week: неделя
+    :returns: число ``ГГГГНН``
+    """
+
+    week_id = week.week_id if isinstance(week, Week) else week
+    year, week_no = week_id.split("-")
+    return int(year) * 100 + int(week_no)
+
+
+def decode_week(value: int) -> Week:
+    """
+    Переводит число из базы данных в неделю.
+
+    :param value: число ``ГГГГНН``
+    :returns: неделя
+    """
+
+    return Week.from_week_id(f"{value // 100}-{value % 100}")
+
+
+def _string_ids(conn: sqlite3.Connection | sqlite3.Cursor,
+                values: Iterable[str | None], *, create: bool = True) -> dict[str, int]:
+    strings = list({value for value in values if value is not None})
+    if create:
+        conn.executemany("INSERT OR IGNORE INTO string(value) VALUES (?)",
+                         [(value,) for value in strings])
+
+    result: dict[str, int] = {}
+    for start in range(0, len(strings), 500):
+        chunk = strings[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        sql = f"SELECT value, id FROM string WHERE value IN ({placeholders})"  # nosec B608
+        result.update(conn.execute(sql, chunk))
+    return result
+
+
 def create_db(conn: sqlite3.Connection) -> sqlite3.Cursor:
     """
-    Создает базу данных и индексы.
+    Создает базу данных и индексы. Базу данных старой версии сначала
+    переводит на текущую схему.
 
     :param conn: база данных SQLite
     :returns: курсор SQLite
@@ -37,173 +229,338 @@ def create_db(conn: sqlite3.Connection) -> sqlite3.Cursor:
         .read_text()
     )
 
+    version: int = conn.execute("PRAGMA user_version").fetchone()[0]
+    has_lesson = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name IN ('lesson', 'lesson_v2')"
+    ).fetchone() is not None
+    if has_lesson:
+        conn.create_function(
+            "uuid_to_blob", 1,
+            lambda value: None if value is None else _uuid_to_blob(value),
+            deterministic=True
+        )
+        while version < SCHEMA_VERSION:
+            logger.info("Обновление схемы базы данных до версии %d", version + 1)
+            try:
+                conn.executescript(MIGRATIONS[version])
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            version += 1
+
     with conn:
         return conn.executescript(sql_script)
 
 
+def _select_timetable(cur: sqlite3.Cursor | sqlite3.Connection, *,
+                      group: str, week: Week | str, instance: str) -> Timetable[Lesson]:
+    cur = cur.execute(
+        """
+        SELECT
+          l.id, c.value, n.value, l.day_num, l.lesson_num
+        FROM
+          -- Без статистики SQLite выбирает первичный ключ и перебирает все
+          -- недели группы
+          lesson_v2 AS l INDEXED BY idx_lesson_week
+          LEFT JOIN string AS c ON c.id = l.classroom
+          LEFT JOIN string AS n ON n.id = l.name
+        WHERE
+          l.instance = (SELECT id FROM string WHERE value = ?)
+          AND l.group_id = (SELECT id FROM string WHERE value = ?)
+          AND l.week = ? AND l.obsolete_since IS NULL
+        """,
+        [instance, group, encode_week(week)]
+    )
+
+    result: Timetable[Lesson] = [{} for _ in range(7)]
+    for lesson_id, classroom, name, day_num, lesson_num in cur:
+        result[day_num][lesson_num] = Lesson(_blob_to_uuid(lesson_id),
+                                             LessonData(classroom, name))
+    return result
+
+
 def load_timetable(cur: sqlite3.Cursor | sqlite3.Connection, *,
-                   group: str, week: Week | str) -> Timetable[Lesson]:
+                   group: str, week: Week | str, instance: str = "") -> Timetable[Lesson]:
     """
     Загружает расписание из базы данных.
 
     :param cur: курсор или база данных SQLite
     :param group: номер группы
     :param week: неделя
+    :param instance: сайт личного кабинета
     :returns: расписание на неделю для группы
     """
 
-    week_id = week.week_id if isinstance(week, Week) else week
+    result = trim_weekend(_select_timetable(cur, group=group, week=week, instance=instance))
+    return get_type_adapter(Timetable[Lesson]).validate_python(result)
 
-    cur = cur.execute(
+
+def load_timetables(cur: sqlite3.Cursor | sqlite3.Connection, *,
+                    week: Week | str | None = None, instance: str = ""
+                    ) -> Iterator[tuple[Timetable[Lesson], str, Week]]:
+    """
+    Загружает из базы данных расписание всех групп.
+
+    Результат имеет тот же вид, что и аргументы коллбэк-функций, поэтому его
+    можно передать любому коллбэку.
+
+    :param cur: курсор или база данных SQLite
+    :param week: неделя (по умолчанию все недели)
+    :param instance: сайт личного кабинета
+    :returns: генератор кортежей ``(расписание, группа, неделя)``
+    """
+
+    sql = (
         """
         SELECT
-          id, classroom, name, day_num, lesson_num
+          g.value, l.week, l.id, c.value, n.value, l.day_num, l.lesson_num
         FROM
-          lesson
+          lesson_v2 AS l
+          JOIN string AS g ON g.id = l.group_id
+          LEFT JOIN string AS c ON c.id = l.classroom
+          LEFT JOIN string AS n ON n.id = l.name
         WHERE
-          group_id = ? AND week_id = ? AND obsolete_since IS NULL
-        """,
-        [group, week_id]
+          l.instance = (SELECT id FROM string WHERE value = ?)
+          AND l.obsolete_since IS NULL
+        """
     )
+    params: list[str | int] = [instance]
+    if week is not None:
+        sql += " AND l.week = ?"
+        params.append(encode_week(week))
+    sql += " ORDER BY g.value, l.week"
+
+    def make_result(group: str, week: int,
+                    result: Timetable[Lesson]) -> tuple[Timetable[Lesson], str, Week]:
+        return trim_weekend(result), group, decode_week(week)
+
+    key: tuple[str, int] | None = None
+    result: Timetable[Lesson] = []
+    rows = cur.execute(sql, params)
+    for group, week_num, lesson_id, classroom, name, day_num, lesson_num in rows:
+        if (group, week_num) != key:
+            if key is not None:
+                yield make_result(*key, result)
+            key = (group, week_num)
+            result = [{} for _ in range(7)]
+        result[day_num][lesson_num] = Lesson(_blob_to_uuid(lesson_id),
+                                             LessonData(classroom, name))
+
+    if key is not None:
+        yield make_result(*key, result)
+
+
+def load_teacher_timetables(cur: sqlite3.Cursor | sqlite3.Connection, *,
+                            week: Week | str | None = None, instance: str = ""
+                            ) -> Iterator[tuple[Timetable[list[Lesson]], str, Week]]:
+    """
+    Загружает из базы данных расписание всех преподавателей, которые известны
+    по коллбэку :func:`sqlite_teacher_callback`.
 
-    result: Timetable[Lesson] = [{} for _ in range(7)]
-    for lesson_id, classroom, name, day_num, lesson_num in cur:
-        result[day_num][lesson_num] = (lesson_id, (classroom, name))
+    Как и в результате :meth:`TeacherClient.make_teacher_timetable
+    <egov66_timetable.client.TeacherClient.make_teacher_timetable>`, вместо
+    номера аудитории в расписании указан номер группы.
 
-    # Если на выходных ничего нет, удаляем лишние дни.
-    for _ in range(2):
-        if len(result[-1]) > 0:
-            break
-        del result[-1]
+    :param cur: курсор или база данных SQLite
+    :param week: неделя (по умолчанию все недели)
+    :param instance: сайт личного кабинета
+    :returns: генератор кортежей ``(расписание, UUID преподавателя, неделя)``
+    """
 
-    return get_type_adapter(Timetable[Lesson]).validate_python(result)
+    sql = (
+        """
+        SELECT
+          l.teacher_id, l.week, l.id, g.value, n.value, l.day_num, l.lesson_num
+        FROM
+          lesson_v2 AS l INDEXED BY idx_lesson_teacher
+          JOIN string AS g ON g.id = l.group_id
+          LEFT JOIN string AS n ON n.id = l.name
+        WHERE
+          l.instance = (SELECT id FROM string WHERE value = ?)
+          AND l.obsolete_since IS NULL AND l.teacher_id IS NOT NULL
+        """
+    )
+    params: list[str | int] = [instance]
+    if week is not None:
+        sql += " AND l.week = ?"
+        params.append(encode_week(week))
+    sql += " ORDER BY l.teacher_id, l.week, l.day_num, l.lesson_num, g.value"
+
+    def make_result(teacher_id: bytes, week: int, result: Timetable[list[Lesson]]
+                    ) -> tuple[Timetable[list[Lesson]], str, Week]:
+        return trim_weekend(result), _blob_to_uuid(teacher_id), decode_week(week)
+
+    key: tuple[bytes, int] | None = None
+    result: Timetable[list[Lesson]] = []
+    rows = cur.execute(sql, params)
+    for teacher_id, week_num, lesson_id, group, name, day_num, lesson_num in rows:
+        if (teacher_id, week_num) != key:
+            if key is not None:
+                yield make_result(*key, result)
+            key = (teacher_id, week_num)
+            result = [{} for _ in range(7)]
+        result[day_num].setdefault(lesson_num, []).append(
+            Lesson(_blob_to_uuid(lesson_id), LessonData(group, name))
+        )
 
+    if key is not None:
+        yield make_result(*key, result)
 
-def sqlite_callback(conn: sqlite3.Connection) -> TimetableCallback:
+
+def sqlite_callback(conn: sqlite3.Connection, *, instance: str = "") -> TimetableCallback:
     """
     Записывает расписание в базу данных.
 
     :param conn: база данных SQLite
+    :param instance: сайт личного кабинета, если в одну базу данных
+        записывается расписание нескольких сайтов
     :returns: коллбэк-функция для расписания группы
     """
 
-    def callback(timetable: Timetable[Lesson], group: str, week: Week) -> None:
-        total_deleted: int = 0
-        total_added: int = 0
+    def write(timetable: Timetable[Lesson], group: str, week: Week) -> None:
+        old = _select_timetable(conn, group=group, week=week, instance=instance)
+        diff = diff_timetables(old, timetable)
+        if not diff:
+            logger.info("Расписание в БД уже актуально")
+            return
+
+        strings = _string_ids(conn, [
+            instance, group,
+            *(value for change in diff.added + diff.changed if change.new is not None
+              for value in change.new),
+        ])
+        key = (strings[instance], strings[group])
+
+        # 1. Пометим удаленные пары устаревшими.
+        if diff.removed:
+            conn.executemany(
+                """
+                UPDATE
+                  lesson_v2
+                SET
+                  obsolete_since = CAST(strftime('%s', 'now') AS INTEGER)
+                WHERE
+                  instance = ? AND group_id = ? AND id = ? AND obsolete_since IS NULL
+                """,
+                [(*key, _uuid_to_blob(change.id)) for change in diff.removed]
+            )
 
-        for day_num, day in enumerate(timetable):
-            # 1. Сначала проверим, нет ли уже в БД расписания на этот день.
-            cur = conn.execute(
+        # 2. Перенесенные и переименованные пары обновим на месте.
+        if diff.changed:
+            conn.executemany(
                 """
-                SELECT
-                  id
-                FROM
-                  lesson
+                UPDATE
+                  lesson_v2
+                SET
+                  classroom = ?, name = ?, day_num = ?, lesson_num = ?,
+                  last_updated = CAST(strftime('%s', 'now') AS INTEGER)
                 WHERE
-                  group_id = ? AND week_id = ? AND day_num = ?
+                  instance = ? AND group_id = ? AND id = ? AND obsolete_since IS NULL
                 """,
-                [group, week.week_id, day_num]
+                [(strings.get(change.new.where), strings.get(change.new.name),
+                  *change.new_position, *key, _uuid_to_blob(change.id))
+                 for change in diff.changed
+                 if change.new is not None and change.new_position is not None]
+            )
+
+        # 3. Добавим новые пары.
+        if diff.added:
+            # Удалим пары, которые уже были в расписании, но их передвинули
+            # на другую неделю или удалили раньше. Перед удалением пометим их
+            # устаревшими, чтобы обновились сводные таблицы.
+            params = [(*key, _uuid_to_blob(change.id)) for change in diff.added]
+            conn.executemany(
+                """
+                UPDATE
+                  lesson_v2
+                SET
+                  obsolete_since = CAST(strftime('%s', 'now') AS INTEGER)
+                WHERE
+                  instance = ? AND group_id = ? AND id = ? AND obsolete_since IS NULL
+                """,
+                params
+            )
+            conn.executemany(
+                "DELETE FROM lesson_v2 WHERE instance = ? AND group_id = ? AND id = ?",
+                params
+            )
+
+            data = (
+                [*key, _uuid_to_blob(change.id), encode_week(week),
+                 *change.new_position,
+                 strings.get(change.new.where), strings.get(change.new.name)]
+                for change in diff.added
+                if change.new is not None and change.new_position is not None
             )
-            old_lesson_ids: set[str] = {item[0] for item in cur}
-
-            # 2. Получим UUID всех пар на день.
-            new_lesson_ids = {lesson[0]: lesson_num
-                              for lesson_num, lesson in day.items()}
-
-            # 3. Найдем пары, которые были удалены.
-            deleted_lesson_ids: set[str] = old_lesson_ids - new_lesson_ids.keys()
-            if (num_deleted := len(deleted_lesson_ids)) > 0:
-                total_deleted += num_deleted
-                conn.executemany(
-                    """
-                    UPDATE
-                      lesson
-                    SET
-                      obsolete_since = CURRENT_TIMESTAMP
-                    WHERE
-                      id = ? AND group_id = ?
-                    """,
-                    [(lesson_id, group) for lesson_id in deleted_lesson_ids]
-                )
-
-            # 4. Найдем пары, которые были добавлены.
-            added_lesson_ids: dict[str, int]
-            added_lesson_ids = {lesson_id: lesson_num
-                                for lesson_id, lesson_num in new_lesson_ids.items()
-                                if lesson_id not in old_lesson_ids}
-
-            if (num_added := len(added_lesson_ids)) > 0:
-                # Удалим пары, которые уже были в расписании, но их передвинули
-                # на другой день или другое время в будущем.
-                sql: str = (
-                    f"""
-                    DELETE FROM
-                      lesson
-                    WHERE
-                      id IN ({",".join("?" * len(added_lesson_ids))})
-                      AND group_id = ?
-                    """  # nosec: SQL injection not possible
-                )
-                conn.execute(sql, [*added_lesson_ids, group])
-
-                total_added += num_added
-                data = (
-                    [*flatten(day[lesson_num]), group, week.week_id,
-                     day_num, lesson_num]
-                    for lesson_num in added_lesson_ids.values()
-                )
-
-                sql = (
-                    """
-                    INSERT INTO
-                      lesson(id, classroom, name, group_id, week_id, day_num, lesson_num)
-                    VALUES
-                      (?, ?, ?, ?, ?, ?, ?)
-                    """
-                )
-
-                if not __debug__:
-                    conn.executemany(sql, data)
-                else:
-                    for lesson in data:
-                        logger.debug("Добавляю новую запись в таблицу lesson: %s", lesson)
-                        conn.execute(sql, lesson)
-
-        if total_added > 0:
-            logger.info("Новых записей в БД: %d", total_added)
-        if total_deleted > 0:
-            logger.info("Устаревших записей в БД: %d", total_deleted)
-        if total_added + total_deleted == 0:
-            logger.info("Расписание в БД уже актуально")
+
+            sql = (
+                """
+                INSERT INTO
+                  lesson_v2(instance, group_id, id, week, day_num, lesson_num,
+                            classroom, name)
+                VALUES
+                  (?, ?, ?, ?, ?, ?, ?, ?)
+                """
+            )
+
+            if not __debug__:
+                conn.executemany(sql, data)
+            else:
+                for lesson in data:
+                    logger.debug("Добавляю новую запись в таблицу lesson_v2: %s", lesson)
+                    conn.execute(sql, lesson)
+
+        if diff.added:
+            logger.info("Новых записей в БД: %d", len(diff.added))
+        if diff.changed:
+            logger.info("Измененных записей в БД: %d", len(diff.changed))
+        if diff.removed:
+            logger.info("Устаревших записей в БД: %d", len(diff.removed))
 
         # Если все получилось, коммитим изменения.
         conn.commit()
 
+    def callback(timetable: Timetable[Lesson], group: str, week: Week) -> None:
+        with profiling.stage("persist"):
+            write(timetable, group, week)
+
     return callback
 
 
-def sqlite_teacher_callback(conn: sqlite3.Connection) -> TeacherTimetableCallback:
+def sqlite_teacher_callback(conn: sqlite3.Connection, *,
+                            instance: str = "") -> TeacherTimetableCallback:
     """
     Добавляет информацию о преподавателе в расписание в базе данных.
 
     :param conn: база данных SQLite
+    :param instance: сайт личного кабинета
     :returns: коллбэк-функция для расписания преподавателя
     """
 
-    def callback(timetable: Timetable[list[Lesson]], teacher: Teacher, week: Week) -> None:
-        params = ((teacher.id, lesson[0], lesson[1][0])
-                  for day in timetable
-                  for time_slot in day.values()
-                  for lesson in time_slot)
+    def write(timetable: Timetable[list[Lesson]], teacher: Teacher, week: Week) -> None:
+        lessons = [lesson
+                   for day in timetable
+                   for time_slot in day.values()
+                   for lesson in time_slot]
+        strings = _string_ids(conn, [instance, *(lesson[1][0] for lesson in lessons)],
+                              create=False)
+        if instance not in strings:
+            return
+
+        teacher_id = _uuid_to_blob(teacher.id)
+        params = ((teacher_id, strings[instance], strings[lesson[1][0]],
+                   _uuid_to_blob(lesson[0]), teacher_id)
+                  for lesson in lessons
+                  if lesson[1][0] in strings)
 
         sql: str = (
             """
             UPDATE
-              lesson
+              lesson_v2
             SET
               teacher_id = ?
             WHERE
-              id = ? AND group_id = ?
+              instance = ? AND group_id = ? AND id = ? AND teacher_id IS NOT ?
             """
         )
 
@@ -214,8 +571,12 @@ def sqlite_teacher_callback(conn: sqlite3.Connection) -> TeacherTimetableCallbac
         else:
             for data in params:
                 logger.debug("Добавляю информацию о преподавателе к "
-                             "занятию (%s, %s)", *data[:-1])
+                             "занятию (%s, %s)", teacher.id, _blob_to_uuid(data[3]))
                 with conn:
                     conn.execute(sql, data)
 
+    def callback(timetable: Timetable[list[Lesson]], teacher: Teacher, week: Week) -> None:
+        with profiling.stage("persist"):
+            write(timetable, teacher, week)
+
     return callback
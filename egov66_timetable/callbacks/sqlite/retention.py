@@ -0,0 +1,458 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Перенос старых записей в архив и обслуживание базы данных.
+
+Пары, которые давно удалены из расписания, и пары за старые недели
+переносятся из ``lesson_v2`` в таблицу ``lesson_archive`` в той же базе данных
+или в подключенной базе данных архива. Записи переносятся пачками, каждая
+пачка — отдельная короткая транзакция, поэтому коллбэки, которые пишут в базу
+данных, ждут не дольше одной пачки. С отдельной базой данных архива пачка
+сначала копируется в архив, и только следующей транзакцией записи удаляются из
+основной таблицы.
+
+Освободившееся место возвращается операционной системе с помощью
+``PRAGMA incremental_vacuum``, а статистика для планировщика запросов
+обновляется с помощью ``PRAGMA optimize``. Обе операции выполняются не чаще
+заданного интервала.
+
+Обслуживание можно запускать по расписанию из командной строки:
+
+.. code-block:: shell
+
+   python -m egov66_timetable.callbacks.sqlite.retention timetable.db \\
+       --archive archive.db --keep-weeks 104
+"""
+
+import argparse
+import logging
+import sqlite3
+import time
+from collections.abc import Callable
+from datetime import date, timedelta
+from pathlib import Path
+from typing import NamedTuple
+
+from egov66_timetable import TimetableCallback
+from egov66_timetable.callbacks.sqlite import encode_week
+from egov66_timetable.types import Lesson, Timetable, Week
+
+#: Имя подключенной базы данных архива.
+ARCHIVE_SCHEMA = "archive"
+
+_COLUMNS = (
+    "instance, group_id, id, week, day_num, lesson_num, classroom, name, "
+    "teacher_id, last_updated, last_checked, obsolete_since"
+)
+
+_EXPIRED = "(l.obsolete_since < :obsolete_before OR l.week < :week_before)"
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionPolicy(NamedTuple):
+    """
+    Правила хранения записей.
+    """
+
+    #: Через сколько дней после удаления из расписания пара переносится в архив.
+    obsolete_days: float = 30
+
+    #: Сколько последних недель хранить в основной таблице (``None`` — все).
+    keep_weeks: int | None = None
+
+    #: Сколько записей переносить в одной транзакции.
+    batch_size: int = 500
+
+    #: Как часто освобождать место (в секундах).
+    vacuum_interval: float = 24 * 3600
+
+    #: Сколько страниц освобождать за один раз (``0`` — все свободные).
+    vacuum_pages: int = 0
+
+    #: Как часто обновлять статистику планировщика запросов (в секундах).
+    optimize_interval: float = 3600
+
+
+class RetentionReport(NamedTuple):
+    """
+    Результат обслуживания базы данных.
+    """
+
+    #: Сколько записей перенесено в архив.
+    archived: int
+
+    #: Сколько байт освобождено.
+    reclaimed: int
+
+    #: Выполнялся ли ``PRAGMA incremental_vacuum``.
+    vacuumed: bool
+
+    #: Выполнялся ли ``PRAGMA optimize``.
+    optimized: bool
+
+
+def attach_archive(conn: sqlite3.Connection, path: str | Path) -> str:
+    """
+    Подключает базу данных архива, если она еще не подключена.
+
+    :param conn: база данных SQLite
+    :param path: путь к базе данных архива
+    :returns: имя подключенной базы данных
+    """
+
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    if ARCHIVE_SCHEMA not in attached:
+        conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", [str(path)])
+    return ARCHIVE_SCHEMA
+
+
+def _prepare(conn: sqlite3.Connection, schema: str) -> None:
+    statements = [
+        f"""
+        CREATE TABLE IF NOT EXISTS {schema}.lesson_archive(
+            instance INTEGER NOT NULL,
+            group_id INTEGER NOT NULL,
+            id BLOB NOT NULL,
+            week INTEGER NOT NULL,
+            day_num INTEGER NOT NULL,
+            lesson_num INTEGER NOT NULL,
+            classroom INTEGER,
+            name INTEGER,
+            teacher_id BLOB,
+            last_updated INTEGER NOT NULL,
+            last_checked INTEGER NOT NULL,
+            obsolete_since INTEGER,
+            archived INTEGER NOT NULL,
+            PRIMARY KEY (instance, group_id, id)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS maintenance(
+            task TEXT PRIMARY KEY,
+            last_run INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TEMP TABLE IF NOT EXISTS retention_batch(
+            instance INTEGER NOT NULL,
+            group_id INTEGER NOT NULL,
+            id BLOB NOT NULL,
+            PRIMARY KEY (instance, group_id, id)
+        ) WITHOUT ROWID
+        """,
+    ]
+    if schema != "main":
+        # В отдельном архиве нужна своя копия словаря строк
+        statements.append(
+            f"""
+            CREATE TABLE IF NOT EXISTS {schema}.string(
+                id INTEGER PRIMARY KEY,
+                value TEXT NOT NULL UNIQUE
+            )
+            """
+        )
+
+    with conn:
+        for sql in statements:
+            conn.execute(sql)  # nosec: SQL injection not possible
+
+
+def _week_of(timestamp: float) -> Week:
+    day = date.fromtimestamp(timestamp)
+    return Week(day - timedelta(days=day.weekday()))
+
+
+def archive_lessons(conn: sqlite3.Connection, policy: RetentionPolicy = RetentionPolicy(),
+                    *, schema: str = "main", now: float | None = None,
+                    max_batches: int | None = None) -> int:
+    """
+    Переносит устаревшие записи в архив.
+
+    :param conn: база данных SQLite
+    :param policy: правила хранения
+    :param schema: имя базы данных с архивом (``main`` или результат
+        :func:`attach_archive`)
+    :param now: текущее время (Unix time)
+    :param max_batches: наибольшее количество пачек (по умолчанию — пока
+        есть устаревшие записи)
+    :returns: количество перенесенных записей
+    """
+
+    _prepare(conn, schema)
+    now = time.time() if now is None else now
+    params = {
+        "obsolete_before": int(now - policy.obsolete_days * 24 * 3600),
+        "week_before": (0 if policy.keep_weeks is None
+                        else encode_week(_week_of(now) - policy.keep_weeks)),
+        "now": int(now),
+    }
+
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        # Ищем записи вне транзакции: в режиме WAL чтение не мешает записи
+        keys = conn.execute(
+            f"""
+            SELECT
+              l.instance, l.group_id, l.id
+            FROM
+              lesson_v2 AS l
+            WHERE
+              {_EXPIRED}
+            LIMIT
+              :limit
+            """,  # nosec: SQL injection not possible
+            {**params, "limit": policy.batch_size}
+        ).fetchall()
+        if not keys:
+            break
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM temp.retention_batch")
+            conn.executemany("INSERT INTO temp.retention_batch VALUES (?, ?, ?)", keys)
+            moved = (
+                f"""
+                FROM
+                  lesson_v2 AS l
+                  JOIN temp.retention_batch USING (instance, group_id, id)
+                WHERE
+                  {_EXPIRED}
+                """
+            )
+            if schema != "main":
+                conn.execute(
+                    f"""
+                    INSERT OR IGNORE INTO {schema}.string(id, value)
+                    SELECT
+                      id, value
+                    FROM
+                      main.string
+                    WHERE
+                      id IN (
+                        SELECT l.instance {moved}
+                        UNION SELECT l.group_id {moved}
+                        UNION SELECT l.classroom {moved}
+                        UNION SELECT l.name {moved}
+                      )
+                    """,  # nosec: SQL injection not possible
+                    params
+                )
+            conn.execute(
+                f"""
+                INSERT OR REPLACE INTO {schema}.lesson_archive({_COLUMNS}, archived)
+                SELECT
+                  {", ".join(f"l.{column}" for column in _COLUMNS.split(", "))}, :now
+                {moved}
+                """,  # nosec: SQL injection not possible
+                params
+            )
+            if schema != "main":
+                # В режиме WAL транзакция с подключенной базой данных не
+                # атомарна: при сбое во время COMMIT удаление могло бы
+                # сохраниться без копии в архиве. Поэтому копия фиксируется
+                # отдельно, а копирование при сбое просто повторится.
+                conn.commit()
+                conn.execute("BEGIN IMMEDIATE")
+            # Удаляются только записи, которые не изменились после копирования
+            deleted = conn.execute(
+                f"""
+                DELETE FROM
+                  lesson_v2
+                WHERE
+                  (instance, group_id, id) IN (
+                    SELECT l.instance, l.group_id, l.id {moved}
+                      AND EXISTS (
+                        SELECT
+                          1
+                        FROM
+                          {schema}.lesson_archive AS a
+                        WHERE
+                          a.instance = l.instance AND a.group_id = l.group_id
+                          AND a.id = l.id AND a.last_updated = l.last_updated
+                          AND a.last_checked = l.last_checked
+                          AND a.obsolete_since IS l.obsolete_since
+                      )
+                  )
+                """,  # nosec: SQL injection not possible
+                params
+            ).rowcount
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        total += deleted
+        batches += 1
+        if len(keys) < policy.batch_size:
+            break
+
+    if total > 0:
+        logger.info("Перенесено в архив записей: %d", total)
+    return total
+
+
+def incremental_vacuum(conn: sqlite3.Connection, pages: int = 0) -> int:
+    """
+    Возвращает операционной системе свободные страницы базы данных.
+
+    Работает, только если в базе данных включен режим
+    ``auto_vacuum=INCREMENTAL`` (см. :func:`enable_incremental_vacuum`).
+
+    :param conn: база данных SQLite
+    :param pages: сколько страниц освободить (``0`` — все свободные)
+    :returns: сколько байт освобождено
+    """
+
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        logger.warning("В базе данных не включен auto_vacuum=INCREMENTAL")
+        return 0
+
+    page_size: int = conn.execute("PRAGMA page_size").fetchone()[0]
+    before: int = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    after: int = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return (before - after) * page_size
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> None:
+    """
+    Включает режим ``auto_vacuum=INCREMENTAL`` в существующей базе данных.
+
+    Для этого база данных перестраивается командой ``VACUUM``, которая
+    блокирует запись на все время работы, поэтому вызывать функцию нужно один
+    раз и в спокойное время. В базах данных, созданных :func:`create_db
+    <egov66_timetable.callbacks.sqlite.create_db>`, режим уже включен.
+
+    :param conn: база данных SQLite
+    """
+
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.commit()
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+def _due(conn: sqlite3.Connection, task: str, interval: float, now: float) -> bool:
+    row = conn.execute("SELECT last_run FROM maintenance WHERE task = ?", [task]).fetchone()
+    return row is None or now - row[0] >= interval
+
+
+def _mark_done(conn: sqlite3.Connection, task: str, now: float) -> None:
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO maintenance(task, last_run) VALUES (?, ?)",
+                     [task, int(now)])
+
+
+def run_retention(conn: sqlite3.Connection, policy: RetentionPolicy = RetentionPolicy(),
+                  *, archive: str | Path | None = None, max_batches: int | None = None,
+                  clock: Callable[[], float] = time.time) -> RetentionReport:
+    """
+    Переносит устаревшие записи в архив, а если подошло время — освобождает
+    место и обновляет статистику.
+
+    :param conn: база данных SQLite
+    :param policy: правила хранения
+    :param archive: путь к отдельной базе данных архива (по умолчанию архив
+        хранится в той же базе данных)
+    :param max_batches: наибольшее количество пачек
+    :param clock: функция, которая возвращает текущее время
+    :returns: отчет
+    """
+
+    now = clock()
+    schema = "main" if archive is None else attach_archive(conn, archive)
+    archived = archive_lessons(conn, policy, schema=schema, now=now,
+                               max_batches=max_batches)
+
+    reclaimed = 0
+    vacuumed = _due(conn, "incremental_vacuum", policy.vacuum_interval, now)
+    if vacuumed:
+        reclaimed = incremental_vacuum(conn, policy.vacuum_pages)
+        _mark_done(conn, "incremental_vacuum", now)
+        if reclaimed > 0:
+            logger.info("Освобождено места: %.1f МиБ", reclaimed / 2**20)
+
+    optimized = _due(conn, "optimize", policy.optimize_interval, now)
+    if optimized:
+        conn.execute("PRAGMA optimize")
+        _mark_done(conn, "optimize", now)
+
+    return RetentionReport(archived, reclaimed, vacuumed, optimized)
+
+
+def retention_callback(conn: sqlite3.Connection,
+                       policy: RetentionPolicy = RetentionPolicy(), *,
+                       archive: str | Path | None = None, interval: float = 60,
+                       clock: Callable[[], float] = time.time) -> TimetableCallback:
+    """
+    Обслуживает базу данных понемногу во время загрузки расписания.
+
+    Не чаще раза в ``interval`` секунд переносит в архив одну пачку записей.
+    Коллбэк нужно добавлять в список после :func:`sqlite_callback
+    <egov66_timetable.callbacks.sqlite.sqlite_callback>` с той же базой данных.
+
+    :param conn: база данных SQLite
+    :param policy: правила хранения
+    :param archive: путь к отдельной базе данных архива
+    :param interval: наименьший интервал между запусками (в секундах)
+    :param clock: функция, которая возвращает текущее время
+    :returns: коллбэк-функция для расписания группы
+    """
+
+    last_run: float | None = None
+
+    def callback(timetable: Timetable[Lesson], group: str, week: Week) -> None:
+        nonlocal last_run
+        now = clock()
+        if last_run is not None and now - last_run < interval:
+            return
+        last_run = now
+        run_retention(conn, policy, archive=archive, max_batches=1, clock=clock)
+
+    return callback
+
+
+def main() -> None:
+    defaults = RetentionPolicy()
+    parser = argparse.ArgumentParser(
+        prog="python -m egov66_timetable.callbacks.sqlite.retention",
+        description="Перенос старых записей в архив и обслуживание базы данных",
+    )
+    parser.add_argument("db", help="база данных SQLite")
+    parser.add_argument("--archive", metavar="DB",
+                        help="отдельная база данных архива")
+    parser.add_argument("--obsolete-days", type=float, default=defaults.obsolete_days,
+                        metavar="N", help="через сколько дней переносить удаленные пары")
+    parser.add_argument("--keep-weeks", type=int, metavar="N",
+                        help="сколько последних недель хранить")
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size,
+                        metavar="N", help="сколько записей переносить за одну транзакцию")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="включить auto_vacuum=INCREMENTAL (выполняет VACUUM)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="выводить подробный журнал")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    policy = RetentionPolicy(obsolete_days=args.obsolete_days, keep_weeks=args.keep_weeks,
+                             batch_size=args.batch_size, vacuum_interval=0,
+                             optimize_interval=0)
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        if args.enable_incremental_vacuum:
+            enable_incremental_vacuum(conn)
+        report = run_retention(conn, policy, archive=args.archive)
+    finally:
+        conn.close()
+
+    print(f"Перенесено в архив: {report.archived}, "
+          f"освобождено: {report.reclaimed / 2**20:.1f} МиБ")
+
+
+if __name__ == "__main__":
+    main()
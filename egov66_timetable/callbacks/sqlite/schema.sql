@@ -2,26 +2,30 @@
 --
 -- SPDX-License-Identifier: EUPL-1.2
 
-PRAGMA journal_mode=WAL;
+-- Для новых баз данных: освобождать место по частям (см. retention.py).
+-- Режим нужно задать до того, как будет создана первая таблица.
+PRAGMA auto_vacuum=INCREMENTAL;
 
-CREATE TABLE IF NOT EXISTS lesson(
-    -- UUID пары
-    id TEXT NOT NULL,
+PRAGMA journal_mode=WAL;
 
-    -- Номер аудитории
-    classroom TEXT,
+-- Словарь строк: номера групп, аудитории, названия предметов и сайты
+CREATE TABLE IF NOT EXISTS string(
+    id INTEGER PRIMARY KEY,
+    value TEXT NOT NULL UNIQUE
+);
 
-    -- Название предмета
-    name TEXT,
+CREATE TABLE IF NOT EXISTS lesson_v2(
+    -- Сайт личного кабинета (строка, пустая, если сайт один)
+    instance INTEGER NOT NULL REFERENCES string(id),
 
-    -- Группа, у которой пара стоит в расписании
-    group_id TEXT NOT NULL,
+    -- Группа, у которой пара стоит в расписании (строка)
+    group_id INTEGER NOT NULL REFERENCES string(id),
 
-    -- UUID преподавателя, который ведет предмет
-    teacher_id TEXT,
+    -- UUID пары (16 байт)
+    id BLOB NOT NULL,
 
-    -- Номер года и номер недели
-    week_id TEXT NOT NULL,
+    -- Номер года и номер недели (пример: 202603)
+    week INTEGER NOT NULL,
 
     -- Номер дня недели (0 - понедельник, 6 - воскресенье)
     day_num INTEGER NOT NULL,
@@ -29,24 +33,196 @@ CREATE TABLE IF NOT EXISTS lesson(
     -- Номер пары (начиная с нуля)
     lesson_num INTEGER NOT NULL,
 
-    -- Дата добавления
-    last_updated TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Номер аудитории (строка)
+    classroom INTEGER REFERENCES string(id),
 
-    -- Дата последней проверки
-    last_checked TEXT NOT NULL DEFAULT '1970-01-01 00:00:00',
+    -- Название предмета (строка)
+    name INTEGER REFERENCES string(id),
 
-    -- Дата удаления из расписания
-    obsolete_since TEXT,
+    -- UUID преподавателя, который ведет предмет (16 байт)
+    teacher_id BLOB,
 
-    PRIMARY KEY (id, group_id)
-);
+    -- Время добавления (Unix time)
+    last_updated INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+
+    -- Время последней проверки (Unix time)
+    last_checked INTEGER NOT NULL DEFAULT 0,
+
+    -- Время удаления из расписания (Unix time)
+    obsolete_since INTEGER,
+
+    PRIMARY KEY (instance, group_id, id)
+) WITHOUT ROWID;
 
 CREATE INDEX IF NOT EXISTS
-    idx_lessons_group
+    idx_lesson_week
 ON
-    lesson (group_id, week_id, day_num);
+    lesson_v2 (instance, group_id, week)
+WHERE
+    obsolete_since IS NULL;
 
 CREATE INDEX IF NOT EXISTS
-    idx_lessons_teacher
+    idx_lesson_obsolete
 ON
-    lesson (teacher_id, week_id, day_num);
+    lesson_v2 (obsolete_since)
+WHERE
+    obsolete_since IS NOT NULL;
+
+-- Для ленты изменений (см. egov66_timetable.server)
+CREATE INDEX IF NOT EXISTS
+    idx_lesson_updated
+ON
+    lesson_v2 (last_updated);
+
+CREATE INDEX IF NOT EXISTS
+    idx_lesson_teacher
+ON
+    lesson_v2 (teacher_id, week, day_num)
+WHERE
+    obsolete_since IS NULL AND teacher_id IS NOT NULL;
+
+-- Количество пар за неделю у преподавателя
+CREATE TABLE IF NOT EXISTS summary_teacher(
+    instance INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    teacher_id BLOB NOT NULL,
+    lessons INTEGER NOT NULL,
+    PRIMARY KEY (instance, week, teacher_id)
+) WITHOUT ROWID;
+
+-- Количество пар за неделю у группы по каждому предмету
+CREATE TABLE IF NOT EXISTS summary_group(
+    instance INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    group_id INTEGER NOT NULL,
+    name INTEGER NOT NULL,
+    lessons INTEGER NOT NULL,
+    PRIMARY KEY (instance, week, group_id, name)
+) WITHOUT ROWID;
+
+-- Количество пар за неделю в аудитории
+CREATE TABLE IF NOT EXISTS summary_room(
+    instance INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    classroom INTEGER NOT NULL,
+    lessons INTEGER NOT NULL,
+    PRIMARY KEY (instance, week, classroom)
+) WITHOUT ROWID;
+
+-- Сводные таблицы учитывают только актуальные пары. Удаление записи их не
+-- меняет, поэтому перенос в архив сохраняет историю, а пару, которую нужно
+-- удалить, сначала помечают устаревшей.
+CREATE TRIGGER IF NOT EXISTS
+    summary_insert
+AFTER INSERT ON
+    lesson_v2
+WHEN
+    NEW.obsolete_since IS NULL
+BEGIN
+    INSERT INTO summary_teacher(instance, week, teacher_id, lessons)
+    SELECT NEW.instance, NEW.week, NEW.teacher_id, 1
+    WHERE NEW.teacher_id IS NOT NULL
+    ON CONFLICT DO UPDATE SET lessons = lessons + 1;
+
+    -- Пара-заглушка Conflict не считается предметом
+    INSERT INTO summary_group(instance, week, group_id, name, lessons)
+    SELECT NEW.instance, NEW.week, NEW.group_id, NEW.name, 1
+    WHERE NEW.name IS NOT NULL
+      AND NEW.name NOT IN (SELECT id FROM string WHERE value =
+                           'Ошибка в расписании: Несколько пар в одно и то же время')
+    ON CONFLICT DO UPDATE SET lessons = lessons + 1;
+
+    INSERT INTO summary_room(instance, week, classroom, lessons)
+    SELECT NEW.instance, NEW.week, NEW.classroom, 1
+    WHERE NEW.classroom IS NOT NULL
+      AND NEW.classroom NOT IN (SELECT id FROM string WHERE value IN ('', '?'))
+    ON CONFLICT DO UPDATE SET lessons = lessons + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS
+    summary_update_old
+AFTER UPDATE OF
+    week, classroom, name, teacher_id, obsolete_since
+ON
+    lesson_v2
+WHEN
+    OLD.obsolete_since IS NULL
+BEGIN
+    UPDATE summary_teacher SET lessons = lessons - 1
+    WHERE instance = OLD.instance AND week = OLD.week AND teacher_id = OLD.teacher_id;
+    DELETE FROM summary_teacher
+    WHERE instance = OLD.instance AND week = OLD.week AND teacher_id = OLD.teacher_id
+      AND lessons <= 0;
+
+    UPDATE summary_group SET lessons = lessons - 1
+    WHERE instance = OLD.instance AND week = OLD.week AND group_id = OLD.group_id
+      AND name = OLD.name;
+    DELETE FROM summary_group
+    WHERE instance = OLD.instance AND week = OLD.week AND group_id = OLD.group_id
+      AND name = OLD.name AND lessons <= 0;
+
+    UPDATE summary_room SET lessons = lessons - 1
+    WHERE instance = OLD.instance AND week = OLD.week AND classroom = OLD.classroom;
+    DELETE FROM summary_room
+    WHERE instance = OLD.instance AND week = OLD.week AND classroom = OLD.classroom
+      AND lessons <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS
+    summary_update_new
+AFTER UPDATE OF
+    week, classroom, name, teacher_id, obsolete_since
+ON
+    lesson_v2
+WHEN
+    NEW.obsolete_since IS NULL
+BEGIN
+    INSERT INTO summary_teacher(instance, week, teacher_id, lessons)
+    SELECT NEW.instance, NEW.week, NEW.teacher_id, 1
+    WHERE NEW.teacher_id IS NOT NULL
+    ON CONFLICT DO UPDATE SET lessons = lessons + 1;
+
+    -- Пара-заглушка Conflict не считается предметом
+    INSERT INTO summary_group(instance, week, group_id, name, lessons)
+    SELECT NEW.instance, NEW.week, NEW.group_id, NEW.name, 1
+    WHERE NEW.name IS NOT NULL
+      AND NEW.name NOT IN (SELECT id FROM string WHERE value =
+                           'Ошибка в расписании: Несколько пар в одно и то же время')
+    ON CONFLICT DO UPDATE SET lessons = lessons + 1;
+
+    INSERT INTO summary_room(instance, week, classroom, lessons)
+    SELECT NEW.instance, NEW.week, NEW.classroom, 1
+    WHERE NEW.classroom IS NOT NULL
+      AND NEW.classroom NOT IN (SELECT id FROM string WHERE value IN ('', '?'))
+    ON CONFLICT DO UPDATE SET lessons = lessons + 1;
+END;
+
+-- Таблица в старом формате (только для чтения)
+CREATE VIEW IF NOT EXISTS lesson AS
+SELECT
+    lower(substr(hex(l.id), 1, 8) || '-' || substr(hex(l.id), 9, 4) || '-' ||
+          substr(hex(l.id), 13, 4) || '-' || substr(hex(l.id), 17, 4) || '-' ||
+          substr(hex(l.id), 21)) AS id,
+    i.value AS instance,
+    c.value AS classroom,
+    n.value AS name,
+    g.value AS group_id,
+    CASE WHEN l.teacher_id IS NOT NULL THEN
+        lower(substr(hex(l.teacher_id), 1, 8) || '-' || substr(hex(l.teacher_id), 9, 4) ||
+              '-' || substr(hex(l.teacher_id), 13, 4) || '-' ||
+              substr(hex(l.teacher_id), 17, 4) || '-' || substr(hex(l.teacher_id), 21))
+    END AS teacher_id,
+    (l.week / 100) || '-' || (l.week % 100) AS week_id,
+    l.day_num,
+    l.lesson_num,
+    datetime(l.last_updated, 'unixepoch') AS last_updated,
+    datetime(l.last_checked, 'unixepoch') AS last_checked,
+    datetime(l.obsolete_since, 'unixepoch') AS obsolete_since
+FROM
+    lesson_v2 AS l
+    JOIN string AS i ON i.id = l.instance
+    JOIN string AS g ON g.id = l.group_id
+    LEFT JOIN string AS c ON c.id = l.classroom
+    LEFT JOIN string AS n ON n.id = l.name;
+
+PRAGMA user_version = 4;
@@ -0,0 +1,129 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Сводная статистика за неделю: нагрузка преподавателей, количество пар у групп
+по предметам и занятость аудиторий.
+
+Счетчики хранятся в таблицах ``summary_teacher``, ``summary_group`` и
+``summary_room`` и обновляются триггерами в той же транзакции, в которой
+коллбэки :func:`~egov66_timetable.callbacks.sqlite.sqlite_callback` и
+:func:`~egov66_timetable.callbacks.sqlite.sqlite_teacher_callback` меняют
+пары, поэтому запросы читают готовые значения и не перебирают все пары.
+
+Учитываются только актуальные пары, а пара-заглушка
+:class:`~egov66_timetable.types.Conflict` не считается предметом. Перенос
+записей в архив (:mod:`egov66_timetable.callbacks.sqlite.retention`) счетчики
+не меняет. Совместная пара нескольких групп учитывается у преподавателя и в
+аудитории один раз для каждой группы.
+"""
+
+import sqlite3
+
+from egov66_timetable.callbacks.sqlite import (
+    _REBUILD_SUMMARIES,
+    _blob_to_uuid,
+    encode_week,
+)
+from egov66_timetable.types import Week
+
+
+def teacher_load(conn: sqlite3.Connection, week: Week | str, *,
+                 instance: str = "") -> dict[str, int]:
+    """
+    Возвращает количество пар у каждого преподавателя за неделю.
+
+    :param conn: база данных SQLite
+    :param week: неделя
+    :param instance: сайт личного кабинета
+    :returns: словарь UUID преподавателя → количество пар
+    """
+
+    cur = conn.execute(
+        """
+        SELECT
+          teacher_id, lessons
+        FROM
+          summary_teacher
+        WHERE
+          instance = (SELECT id FROM string WHERE value = ?) AND week = ?
+        """,
+        [instance, encode_week(week)]
+    )
+    return {_blob_to_uuid(teacher_id): lessons for teacher_id, lessons in cur}
+
+
+def group_load(conn: sqlite3.Connection, week: Week | str, *,
+               group: str | None = None,
+               instance: str = "") -> dict[str, dict[str, int]]:
+    """
+    Возвращает количество пар у групп по каждому предмету за неделю.
+
+    :param conn: база данных SQLite
+    :param week: неделя
+    :param group: номер группы (по умолчанию все группы)
+    :param instance: сайт личного кабинета
+    :returns: словарь группа → (название предмета → количество пар)
+    """
+
+    sql = (
+        """
+        SELECT
+          g.value, n.value, s.lessons
+        FROM
+          summary_group AS s
+          JOIN string AS g ON g.id = s.group_id
+          JOIN string AS n ON n.id = s.name
+        WHERE
+          s.instance = (SELECT id FROM string WHERE value = ?) AND s.week = ?
+        """
+    )
+    params: list[str | int] = [instance, encode_week(week)]
+    if group is not None:
+        sql += " AND s.group_id = (SELECT id FROM string WHERE value = ?)"
+        params.append(group)
+
+    result: dict[str, dict[str, int]] = {}
+    for group_id, name, lessons in conn.execute(sql, params):
+        result.setdefault(group_id, {})[name] = lessons
+    return result
+
+
+def room_usage(conn: sqlite3.Connection, week: Week | str, *,
+               instance: str = "") -> dict[str, int]:
+    """
+    Возвращает количество пар в каждой аудитории за неделю. Пары без
+    аудитории и ошибки в расписании не учитываются.
+
+    :param conn: база данных SQLite
+    :param week: неделя
+    :param instance: сайт личного кабинета
+    :returns: словарь номер аудитории → количество пар
+    """
+
+    cur = conn.execute(
+        """
+        SELECT
+          c.value, s.lessons
+        FROM
+          summary_room AS s
+          JOIN string AS c ON c.id = s.classroom
+        WHERE
+          s.instance = (SELECT id FROM string WHERE value = ?) AND s.week = ?
+        """,
+        [instance, encode_week(week)]
+    )
+    return dict(cur.fetchall())
+
+
+def rebuild_summaries(conn: sqlite3.Connection) -> None:
+    """
+    Заново считает сводные таблицы по актуальным парам, например после
+    изменения таблицы ``lesson_v2`` вручную. Счетчики за недели, пар которых
+    в таблице ``lesson_v2`` уже нет, не меняются.
+
+    :param conn: база данных SQLite
+    """
+
+    conn.executescript(f"BEGIN; {_REBUILD_SUMMARIES} COMMIT;")
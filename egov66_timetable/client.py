@@ -6,32 +6,44 @@
 Клиент для сетевых запросов.
 """
 
+import contextlib
+import copy
+import http.cookiejar
 import json
 import logging
+import queue
 import random
 import string
+import threading
 import time
-import uuid
 from collections import defaultdict
+from collections.abc import Iterator
 from typing import Literal, NoReturn
 from urllib.parse import ParseResult as URLParseResult, urlparse
 
 import httpx
 from bs4 import BeautifulSoup
 
+from egov66_timetable import metrics, profiling, ratelimit, tracing
 from egov66_timetable.exceptions import (
+    CSRFTokenNotFound,
     InitialDataNotFound,
     NetworkError,
+    SessionExpired,
 )
+from egov66_timetable.sessions import SessionStore
 from egov66_timetable.types import (
+    Conflict,
     Lesson,
     LessonData,
+    LessonTeachers,
     Timetable,
 )
 from egov66_timetable.types.livewire import (
     Events,
     LessonDict,
     LivewireData,
+    TeacherDict,
 )
 from egov66_timetable.types.settings import (
     Alias,
@@ -40,11 +52,45 @@ from egov66_timetable.types.settings import (
 from egov66_timetable.utils import (
     get_csrf_token,
     get_type_adapter,
+    trim_weekend,
 )
 
+#: Этапы, к которым относятся методы Livewire.
+LIVEWIRE_STAGES: dict[str, metrics.Stage] = {
+    "set": "set",
+    "addWeek": "week",
+    "minusWeek": "week",
+}
+
+#: Код ответа Laravel, когда CSRF-токен не подходит к сеансу.
+HTTP_PAGE_EXPIRED = 419
+
 logger = logging.getLogger(__name__)
 
 
+def create_http_client(*, max_connections: int = 1) -> httpx.Client:
+    """
+    Создает HTTP-клиент с пулом соединений к сайту. Соединения и SSL-контекст
+    используются повторно, поэтому запрос не тратит время на установку
+    соединения.
+
+    Cookie-файлы из ответов в клиенте не сохраняются: у каждого
+    :class:`Client` свой сеанс, и ключ сеанса передается в каждом запросе.
+
+    :param max_connections: наибольшее количество одновременных соединений
+    :returns: HTTP-клиент
+    """
+
+    max_connections = max(max_connections, 1)
+    return httpx.Client(
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max_connections),
+        cookies=http.cookiejar.CookieJar(http.cookiejar.DefaultCookiePolicy(
+            allowed_domains=[]
+        )),
+    )
+
+
 class Client:
 
     SCHEDULE_PAGE = "/schedule/groups"
@@ -53,6 +99,15 @@ class Client:
     settings: Settings
     instance: URLParseResult
 
+    #: Хранилище ключей сеанса, если в настройках указан ``sessions_file``.
+    sessions: SessionStore | None
+
+    #: Общий ограничитель частоты запросов к сайту.
+    limiter: ratelimit.RateLimiter | None
+
+    _http: httpx.Client | None
+    _owns_http: bool
+    _session: str | None
     _csrf_token: str | None
     _data: LivewireData | None
     _params_hash: int
@@ -62,14 +117,26 @@ class Client:
     _aliases: dict[Literal["by_classroom", "by_teacher"],
                    dict[tuple[str | None, str], str]]
 
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, *, http_client: httpx.Client | None = None):
         """
         :param settings: настройки
+        :param http_client: общий HTTP-клиент (см. :class:`ClientPool`); по
+            умолчанию у клиента свой
         """
 
         self.settings = settings
+        self._http = http_client
+        self._owns_http = http_client is None
         self.instance = urlparse(self.settings["instance"])
 
+        self.sessions = SessionStore.from_settings(settings)
+        self.limiter = ratelimit.get_limiter(settings)
+        if self.sessions is not None:
+            # Ключ сеанса берется из хранилища, общий словарь не изменяется
+            self.settings = copy.copy(settings)
+            self.settings["cookies"] = dict(settings["cookies"])
+
+        self._session = None
         self._csrf_token = None
         self._data = None
         self._params_hash = 0
@@ -77,6 +144,22 @@ class Client:
 
         self._load_aliases()
 
+    @property
+    def http(self) -> httpx.Client:
+        """
+        HTTP-клиент, через который выполняются запросы.
+        """
+
+        if self._http is None:
+            self._http = create_http_client()
+        return self._http
+
+    def _cookie_header(self) -> dict[str, str]:
+        cookies = self.settings["cookies"]
+        if not cookies:
+            return {}
+        return {"Cookie": "; ".join(f"{name}={value}" for name, value in cookies.items())}
+
     def _compute_params_hash(self, *, search: str | None = None,
                              offset: int | None = None) -> int:
         return (
@@ -135,6 +218,18 @@ class Client:
                 case _:
                     logger.warning("Некорректное переименование: %s", alias)
 
+    def _throttle(self) -> None:
+        if self.limiter is not None:
+            with tracing.span("rate_limit"):
+                self.limiter.acquire()
+
+    def _record_request(self, stage: metrics.Stage, method: str, status: int | str,
+                        duration: float, *, sent: int = 0, received: int = 0) -> None:
+        metrics.record_request(stage, method, status, duration,
+                               sent=sent, received=received)
+        if self.limiter is not None:
+            self.limiter.feedback(status, duration)
+
     def _call_livewire_method(self, method: str, *params: str,
                               max_retries: int = 3) -> LivewireData:
         endpoint = self.instance._replace(path=self.SCHEDULE_ENDPOINT).geturl()
@@ -144,6 +239,7 @@ class Client:
         headers: dict[str, str] = {
             "X-CSRF-TOKEN": self.csrf_token,
             "X-Livewire": "true",
+            **self._cookie_header(),
         }
         payload = {
             "fingerprint": self._get_data()["fingerprint"],
@@ -158,21 +254,28 @@ class Client:
             }]
         }
 
+        stage = LIVEWIRE_STAGES.get(method, "other")
+        self._throttle()
+        start = time.perf_counter()
         try:
-            return (
-                httpx.post(endpoint, headers=headers, json=payload,
-                           cookies=self.settings["cookies"])
-                     .raise_for_status()
-                     .json()
-            )
+            with tracing.span("livewire", method=method):
+                response = self.http.post(endpoint, headers=headers, json=payload)
         except httpx.TimeoutException:
+            self._record_request(stage, method, "timeout", time.perf_counter() - start)
             if max_retries <= 0:
                 raise
+            metrics.REQUEST_RETRIES.inc(stage=stage, method=method)
             logger.warning("Время ожидания истекло. Повторяю попытку…")
             time.sleep(1)
             return self._call_livewire_method(method, *params,
                                               max_retries=max_retries - 1)
 
+        self._record_request(stage, method, response.status_code,
+                             time.perf_counter() - start,
+                             sent=len(response.request.content),
+                             received=len(response.content))
+        return response.raise_for_status().json()
+
     def _perform_data_update(self, method: str, *params: str) -> None:
         diff = self._call_livewire_method(method, *params)
         self._get_data()["serverMemo"]["data"].update(
@@ -194,36 +297,84 @@ class Client:
     def _go_forward(self) -> None:
         self._perform_data_update("addWeek")
 
+    def reset(self) -> None:
+        """
+        Сбрасывает состояние клиента. Следующий запрос начнется с загрузки
+        начальной страницы.
+        """
+
+        self._csrf_token = None
+        self._data = None
+        self._params_hash = 0
+        self._has_timetable = True
+
+    def close(self) -> None:
+        """
+        Освобождает занятый сеанс в хранилище ключей сеанса и закрывает
+        соединения, если HTTP-клиент не общий.
+        """
+
+        if self.sessions is not None and self._session is not None:
+            self.sessions.release(self.settings["instance"], self._session)
+            self._session = None
+        if self._owns_http and self._http is not None:
+            self._http.close()
+            self._http = None
+
+    def _checkout_session(self) -> None:
+        if self.sessions is None or self._session is not None:
+            return
+        session = self.sessions.checkout(self.settings["instance"])
+        if session is not None:
+            self._session = session
+            self.settings["cookies"]["edinyi_lk_session"] = session
+
     def _fetch_initial_data(self, *, max_retries: int = 3) -> None:
         schedule_url = self.instance._replace(path=self.SCHEDULE_PAGE).geturl()
+        self._checkout_session()
+        self._throttle()
+        start = time.perf_counter()
         try:
-            response = (
-                httpx.get(
-                    schedule_url,
-                    cookies=self.settings["cookies"]
-                ).raise_for_status()
-            )
+            with tracing.span("fetch_initial_data"):
+                response = self.http.get(schedule_url, headers=self._cookie_header())
         except httpx.TimeoutException:
+            self._record_request("initial", "GET", "timeout", time.perf_counter() - start)
             if max_retries <= 0:
                 raise
+            metrics.REQUEST_RETRIES.inc(stage="initial", method="GET")
             logger.warning("Время ожидания истекло. Повторяю попытку…")
             time.sleep(1)
             return self._fetch_initial_data(max_retries=max_retries - 1)
 
-        self.settings["cookies"]["edinyi_lk_session"] = (
-            response.cookies["edinyi_lk_session"]
-        )
+        self._record_request("initial", "GET", response.status_code,
+                             time.perf_counter() - start,
+                             received=len(response.content))
+        response.raise_for_status()
+
+        session = response.cookies["edinyi_lk_session"]
+        self.settings["cookies"]["edinyi_lk_session"] = session
+
+        with tracing.span("parse_initial_data"):
+            soup = BeautifulSoup(response.text, "lxml")
+            try:
+                self._csrf_token = get_csrf_token(soup)
+            except SessionExpired:
+                if self.sessions is not None and self._session is not None:
+                    self.sessions.discard(self.settings["instance"], self._session)
+                    self._session = None
+                raise
 
-        soup = BeautifulSoup(response.text, "lxml")
-        self._csrf_token = get_csrf_token(soup)
+            for tag in soup.find_all("div", attrs={"wire:initial-data": True}):
+                if isinstance(attr := tag.attrs.get("wire:initial-data"), str):
+                    if "scheduleGridWeekType" in attr:
+                        self._data = json.loads(attr)
+                        break
+            else:
+                raise InitialDataNotFound
 
-        for tag in soup.find_all("div", attrs={"wire:initial-data": True}):
-            if isinstance(attr := tag.attrs.get("wire:initial-data"), str):
-                if "scheduleGridWeekType" in attr:
-                    self._data = json.loads(attr)
-                    break
-        else:
-            raise InitialDataNotFound
+        if self.sessions is not None:
+            self.sessions.update(self.settings["instance"], self._session, session)
+            self._session = session
 
     def fetch_timetable(self, search: str, *, offset: int = 0) -> None:
         """
@@ -246,28 +397,31 @@ class Client:
 
         self._params_hash = self._compute_params_hash()
 
-    def _guess_teacher(self, lesson: LessonDict) -> list[str]:
-        teachers: list[str] = []
+    def _guess_teachers(self, lesson: LessonDict) -> list[TeacherDict]:
+        teachers: list[TeacherDict] = []
         search: str | None = None  # Фамилия И.О.
         for teacher in dict(lesson.get("teachers", {})).values():
             if isinstance(teacher, str):
                 search = teacher
-            elif (fio := teacher.get("fio")) is not None:
-                teachers.append(fio)
+            elif teacher.get("fio") is not None:
+                teachers.append(teacher)
 
         if search is None:
             return teachers
 
-        for fio in teachers:
-            f, *io = fio.split(" ")
+        for teacher in teachers:
+            f, *io = (teacher["fio"] or "").split(" ")
             abbr = f + " " + "".join(name[0] + "." for name in io)
             if abbr == search:
-                return [fio]
+                return [teacher]
 
         logger.error("Не удалось найти преподавателя '%s' в %s",
-                     search, teachers)
+                     search, [teacher["fio"] for teacher in teachers])
         return []
 
+    def _guess_teacher(self, lesson: LessonDict) -> list[str]:
+        return [teacher["fio"] or "" for teacher in self._guess_teachers(lesson)]
+
     def _guess_lesson_name(self, lesson: LessonDict, classroom: str) -> str:
         name = lesson.get("discipline") or ""
         if (rename := lesson.get("comment")) is not None:
@@ -310,17 +464,48 @@ class Client:
 
         return Lesson(lesson["id"], LessonData(classroom, name))
 
-    def _fetch_events(self, search: str, *, offset: int) -> Events:
+    def _restart_session(self, reason: str) -> None:
+        if self.sessions is not None and self._session is not None:
+            self.sessions.discard(self.settings["instance"], self._session)
+            self._session = None
+        self.reset()
+        metrics.SESSION_RESTARTS.inc(reason=reason)
+
+    def _fetch_events(self, search: str, *, offset: int,
+                      max_session_restarts: int = 1) -> Events:
         if self._compute_params_hash(search=search, offset=offset) != self._params_hash:
             try:
-                self.fetch_timetable(search, offset=offset)
-            except httpx.TimeoutException as err:
+                with tracing.span("fetch_timetable", search=search, offset=offset):
+                    self.fetch_timetable(search, offset=offset)
+            except httpx.TransportError as err:
+                self.reset()
                 raise NetworkError from err
+            except (SessionExpired, CSRFTokenNotFound, httpx.HTTPStatusError) as err:
+                if (isinstance(err, httpx.HTTPStatusError)
+                        and err.response.status_code != HTTP_PAGE_EXPIRED):
+                    self.reset()
+                    raise NetworkError from err
+
+                # Сеанс истек или токен устарел: начинаем новый сеанс и заново
+                # выбираем группу и неделю
+                self._restart_session(
+                    "page_expired" if isinstance(err, httpx.HTTPStatusError)
+                    else "session_expired" if isinstance(err, SessionExpired)
+                    else "csrf_token_not_found"
+                )
+                if max_session_restarts <= 0:
+                    if isinstance(err, httpx.HTTPStatusError):
+                        raise SessionExpired from err
+                    raise
+                logger.warning("Сеанс завершен. Начинаю новый сеанс…")
+                return self._fetch_events(search, offset=offset,
+                                          max_session_restarts=max_session_restarts - 1)
 
         events = {}
         if self._has_timetable:
             events = self._get_data()["serverMemo"]["data"]["events"]
-        return get_type_adapter(Events).validate_python(events)
+        with tracing.span("validate_events"):
+            return get_type_adapter(Events).validate_python(events)
 
     def make_timetable(self, group: str, *, offset: int = 0) -> Timetable[Lesson]:
         """
@@ -334,26 +519,65 @@ class Client:
 
         result: Timetable[Lesson] = [{} for _ in range(7)]
 
+        with profiling.stage("fetch"):
+            events = self._fetch_events(group, offset=offset)
+        with tracing.span("build"), profiling.stage("build"):
+            for cell in events:
+                lesson = events[cell][0]
+                day_num = lesson["dayWeekNum"]
+                lesson_num = abs(lesson["numberPair"] - 1)
+
+                if len(events[cell]) == 1:
+                    result[day_num][lesson_num] = self._make_lesson(lesson)
+                else:
+                    result[day_num][lesson_num] = Conflict(
+                        self._make_lesson(lesson) for lesson in events[cell]
+                    )
+
+        return trim_weekend(result)
+
+    def make_lesson_teachers(self, group: str, *,
+                             offset: int = 0) -> dict[tuple[int, int], LessonTeachers]:
+        """
+        Определяет преподавателей для каждой пары в расписании группы.
+
+        Если расписание на эту неделю уже было загружено методом
+        :meth:`make_timetable`, повторный сетевой запрос не выполняется.
+
+        :param group: номер группы
+        :param offset: смещение относительно текущей недели (``-1`` — предыдущая
+            неделя, ``+1`` — следующая)
+        :returns: словарь, где ключ — пара ``(номер_дня, номер_пары)``, а
+            значение — преподаватели
+        """
+
+        result: dict[tuple[int, int], LessonTeachers] = {}
+
         events = self._fetch_events(group, offset=offset)
         for cell in events:
             lesson = events[cell][0]
             day_num = lesson["dayWeekNum"]
             lesson_num = abs(lesson["numberPair"] - 1)
 
-            if len(events[cell]) == 1:
-                result[day_num][lesson_num] = self._make_lesson(lesson)
-            else:
-                result[day_num][lesson_num] = Lesson(
-                    str(uuid.uuid4()),
-                    LessonData("?", "Ошибка в расписании: "
-                                    "Несколько пар в одно и то же время")
-                )
+            candidates = [
+                teacher["id"]
+                for lesson in events[cell]
+                for teacher in dict(lesson.get("teachers", {})).values()
+                if not isinstance(teacher, str)
+            ]
 
-        # Если на выходных ничего нет, удаляем лишние дни.
-        for _ in range(2):
-            if len(result[-1]) > 0:
-                break
-            del result[-1]
+            if len(events[cell]) == 1:
+                if not lesson.get("teachers"):
+                    # У пары нет преподавателя, здесь нечего угадывать.
+                    result[(day_num, lesson_num)] = LessonTeachers([], True)
+                    continue
+                if guessed := self._guess_teachers(lesson):
+                    result[(day_num, lesson_num)] = LessonTeachers(
+                        [teacher["id"] for teacher in guessed], True
+                    )
+                    continue
+
+            result[(day_num, lesson_num)] = LessonTeachers(candidates, False)
 
         return result
 
@@ -388,20 +612,98 @@ class TeacherClient(Client):
 
         result: Timetable[list[Lesson]] = [defaultdict(list) for _ in range(7)]
 
-        events = self._fetch_events(teacher, offset=offset)
-        for cell in events:
-            for lesson in events[cell]:
-                day_num = lesson["dayWeekNum"]
-                lesson_num = abs(lesson["numberPair"] - 1)
-                result[day_num][lesson_num].append(self._make_teacher_lesson(lesson))
-
-        # Если на выходных ничего нет, удаляем лишние дни.
-        for _ in range(2):
-            if len(result[-1]) > 0:
-                break
-            del result[-1]
+        with profiling.stage("fetch"):
+            events = self._fetch_events(teacher, offset=offset)
+        with tracing.span("build"), profiling.stage("build"):
+            for cell in events:
+                for lesson in events[cell]:
+                    day_num = lesson["dayWeekNum"]
+                    lesson_num = abs(lesson["numberPair"] - 1)
+                    result[day_num][lesson_num].append(self._make_teacher_lesson(lesson))
 
-        return result
+        return trim_weekend(result)
 
     def make_timetable(self, *args: object, **kwargs: object) -> NoReturn:  # type: ignore[override]
         raise NotImplementedError
+
+
+class ClientPool[C: Client]:
+    """
+    Набор клиентов для параллельной загрузки расписания.
+
+    У каждого клиента свой сеанс: первый клиент работает с исходным словарем
+    настроек (и обновляет в нем cookie-файл), остальные — с копиями, чтобы не
+    перезаписывать cookie-файлы друг друга. Если в настройках указан
+    ``sessions_file``, клиенты берут ключи сеанса из
+    :class:`~egov66_timetable.sessions.SessionStore`.
+
+    Все клиенты выполняют запросы через один HTTP-клиент (см.
+    :func:`create_http_client`) с пулом соединений по количеству клиентов.
+    """
+
+    #: Настройки.
+    settings: Settings
+
+    #: Общий HTTP-клиент.
+    http: httpx.Client
+
+    _client_class: type[C]
+    _size: int
+    _created: int
+    _clients: list[C]
+    _idle: "queue.SimpleQueue[C]"
+    _lock: threading.Lock
+
+    def __init__(self, settings: Settings, client_class: type[C], *, size: int = 1):
+        """
+        :param settings: настройки
+        :param client_class: класс клиента
+        :param size: максимальное количество клиентов
+        """
+
+        self.settings = settings
+        self._client_class = client_class
+        self._size = max(size, 1)
+        self._created = 0
+        self._clients = []
+        self._idle = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self.http = create_http_client(max_connections=self._size)
+
+    def _new_client(self) -> C:
+        settings = self.settings
+        if self._created > 0:
+            settings = copy.copy(settings)
+            settings["cookies"] = dict(settings["cookies"])
+        self._created += 1
+        client = self._client_class(settings, http_client=self.http)
+        self._clients.append(client)
+        return client
+
+    def close(self) -> None:
+        """
+        Освобождает сеансы всех клиентов и закрывает соединения.
+        """
+
+        for client in self._clients:
+            client.close()
+        self.http.close()
+
+    @contextlib.contextmanager
+    def client(self) -> Iterator[C]:
+        """
+        Выдает свободный клиент на время выполнения блока кода. Если свободных
+        клиентов нет и их меньше, чем ``size``, создает новый, иначе ждет.
+        """
+
+        try:
+            client = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                new_client = self._new_client() if self._created < self._size else None
+            client = new_client if new_client is not None else self._idle.get()
+
+        try:
+            yield client
+        finally:
+            self._idle.put(client)
@@ -0,0 +1,246 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Компактное представление расписания в памяти.
+
+Обычное расписание — это список словарей с кортежами, в которых каждая строка
+хранится отдельно. Если держать в памяти расписание всех групп за семестр,
+одни и те же номера аудиторий и названия предметов повторяются десятки тысяч
+раз. Здесь строки хранятся в общей таблице, а расписание на неделю — в
+массивах фиксированного размера ``дни × пары``.
+"""
+
+from array import array
+from collections.abc import Iterator, Mapping, Sequence
+from uuid import UUID
+
+from egov66_timetable import TimetableCallback
+from egov66_timetable.types import Conflict, Lesson, LessonData, Timetable, Week
+
+
+class StringTable:
+    """
+    Таблица строк: каждой уникальной строке соответствует номер.
+    """
+
+    __slots__ = ("strings", "_ids")
+
+    #: Строки по порядку номеров.
+    strings: list[str]
+
+    _ids: dict[str, int]
+
+    def __init__(self) -> None:
+        self.strings = []
+        self._ids = {}
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.strings[string_id]
+
+    def intern(self, string: str) -> int:
+        """
+        :param string: строка
+        :returns: номер строки в таблице
+        """
+
+        if (string_id := self._ids.get(string)) is None:
+            string_id = len(self.strings)
+            self.strings.append(string)
+            self._ids[string] = string_id
+        return string_id
+
+
+class CompactDay(Mapping[int, Lesson]):
+    """
+    Расписание на день, которое ведет себя как ``dict[int, Lesson]``.
+    """
+
+    __slots__ = ("_timetable", "_offset")
+
+    _timetable: "CompactTimetable"
+    _offset: int
+
+    def __init__(self, timetable: "CompactTimetable", day_num: int) -> None:
+        self._timetable = timetable
+        self._offset = day_num * timetable.width
+
+    def __getitem__(self, lesson_num: int) -> Lesson:
+        if not 0 <= lesson_num < self._timetable.width:
+            raise KeyError(lesson_num)
+        lesson = self._timetable._get(self._offset + lesson_num)
+        if lesson is None:
+            raise KeyError(lesson_num)
+        return lesson
+
+    def __iter__(self) -> Iterator[int]:
+        names = self._timetable._names
+        for lesson_num in range(self._timetable.width):
+            if names[self._offset + lesson_num]:
+                yield lesson_num
+
+    def __len__(self) -> int:
+        names = self._timetable._names
+        return sum(
+            1 for slot in range(self._offset, self._offset + self._timetable.width)
+            if names[slot]
+        )
+
+
+class CompactTimetable(Sequence[Mapping[int, Lesson]]):
+    """
+    Расписание на неделю в компактном виде.
+
+    Объект ведет себя как ``Timetable[Lesson]`` только для чтения, поэтому его
+    можно передать, например, в :func:`collapse_timetable
+    <egov66_timetable.callbacks.html.collapse_timetable>`. Для коллбэк-функций
+    его нужно преобразовать методом :meth:`to_timetable`.
+
+    UUID пар хранятся как 16 байт, номера аудиторий и названия предметов — как
+    номера в общей таблице строк. Нулевой номер означает, что пары нет. Для
+    пары-заглушки :class:`~egov66_timetable.types.Conflict` исходные пары
+    хранятся отдельно, поэтому атрибут ``lessons`` сохраняется.
+    """
+
+    __slots__ = ("strings", "days", "width", "_ids", "_where", "_names", "_conflicts")
+
+    #: Общая таблица строк.
+    strings: StringTable
+
+    #: Количество дней.
+    days: int
+
+    #: Количество пар в дне.
+    width: int
+
+    _ids: bytes
+    _where: array[int]
+    _names: array[int]
+
+    # {ячейка: исходные пары}
+    _conflicts: dict[int, tuple[Lesson, ...]]
+
+    def __init__(self, strings: StringTable, days: int, width: int,
+                 ids: bytes, where: array[int], names: array[int],
+                 conflicts: dict[int, tuple[Lesson, ...]] | None = None) -> None:
+        self.strings = strings
+        self.days = days
+        self.width = width
+        self._ids = ids
+        self._where = where
+        self._names = names
+        self._conflicts = conflicts or {}
+
+    @classmethod
+    def from_timetable(cls, timetable: Timetable[Lesson],
+                       strings: StringTable) -> "CompactTimetable":
+        """
+        Преобразует расписание в компактный вид.
+
+        :param timetable: расписание
+        :param strings: общая таблица строк
+        """
+
+        days = len(timetable)
+        width = max((max(day) + 1 for day in timetable if day), default=0)
+
+        ids = bytearray(16 * days * width)
+        where = array("I", bytes(4 * days * width))
+        names = array("I", bytes(4 * days * width))
+        conflicts: dict[int, tuple[Lesson, ...]] = {}
+        for day_num, day in enumerate(timetable):
+            for lesson_num, lesson in day.items():
+                lesson_id, (classroom, name) = lesson
+                slot = day_num * width + lesson_num
+                if isinstance(lesson, Conflict):
+                    conflicts[slot] = lesson.lessons
+                ids[16 * slot:16 * (slot + 1)] = UUID(lesson_id).bytes
+                where[slot] = strings.intern(classroom) + 1
+                names[slot] = strings.intern(name) + 1
+
+        return cls(strings, days, width, bytes(ids), where, names, conflicts)
+
+    def _get(self, slot: int) -> Lesson | None:
+        if not (name := self._names[slot]):
+            return None
+        if (lessons := self._conflicts.get(slot)) is not None:
+            return Conflict(lessons)
+        return Lesson(
+            str(UUID(bytes=self._ids[16 * slot:16 * (slot + 1)])),
+            LessonData(self.strings[self._where[slot] - 1], self.strings[name - 1])
+        )
+
+    def __len__(self) -> int:
+        return self.days
+
+    def __getitem__(self, day_num: int) -> CompactDay:  # type: ignore[override]
+        if day_num < 0:
+            day_num += self.days
+        if not 0 <= day_num < self.days:
+            raise IndexError(day_num)
+        return CompactDay(self, day_num)
+
+    def to_timetable(self) -> Timetable[Lesson]:
+        """
+        :returns: расписание в обычном виде
+        """
+
+        return [dict(self[day_num]) for day_num in range(self.days)]
+
+
+class CompactStore:
+    """
+    Хранилище расписаний групп в компактном виде с общей таблицей строк.
+    """
+
+    #: Общая таблица строк.
+    strings: StringTable
+
+    #: Расписание по номеру группы и неделе.
+    timetables: dict[tuple[str, str], CompactTimetable]
+
+    def __init__(self) -> None:
+        self.strings = StringTable()
+        self.timetables = {}
+
+    def put(self, timetable: Timetable[Lesson], group: str, week: Week | str) -> None:
+        """
+        Сохраняет расписание.
+
+        :param timetable: расписание группы
+        :param group: номер группы
+        :param week: неделя
+        """
+
+        week_id = week.week_id if isinstance(week, Week) else week
+        self.timetables[(group, week_id)] = CompactTimetable.from_timetable(
+            timetable, self.strings
+        )
+
+    def get(self, group: str, week: Week | str) -> CompactTimetable | None:
+        """
+        :param group: номер группы
+        :param week: неделя
+        :returns: расписание группы, если оно есть
+        """
+
+        week_id = week.week_id if isinstance(week, Week) else week
+        return self.timetables.get((group, week_id))
+
+
+def compact_callback(store: CompactStore) -> TimetableCallback:
+    """
+    Сохраняет расписание в компактном хранилище.
+
+    :param store: хранилище
+    :returns: коллбэк-функция для расписания группы
+    """
+
+    def callback(timetable: Timetable[Lesson], group: str, week: Week) -> None:
+        store.put(timetable, group, week)
+
+    return callback
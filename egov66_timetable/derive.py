@@ -0,0 +1,125 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Построение расписания преподавателей и аудиторий по расписанию групп.
+
+В расписании каждой группы уже есть все, что нужно для расписания
+преподавателей и аудиторий, поэтому вместо отдельных запросов к личному
+кабинету можно построить обратный индекс.
+"""
+
+import logging
+from collections import defaultdict
+
+from egov66_timetable.types import (
+    Conflict,
+    Lesson,
+    LessonData,
+    LessonTeachers,
+    Timetable,
+)
+from egov66_timetable.utils import trim_weekend
+
+logger = logging.getLogger(__name__)
+
+
+def _trim_timetable(timetable: Timetable[list[Lesson]]) -> Timetable[list[Lesson]]:
+    return trim_weekend([dict(day) for day in timetable])
+
+
+class TimetableIndex:
+    """
+    Обратный индекс расписания на одну неделю.
+
+    Принимает расписание групп и раскладывает пары по преподавателям и
+    аудиториям. Получившееся расписание имеет тот же вид, что и результат
+    :meth:`TeacherClient.make_teacher_timetable
+    <egov66_timetable.client.TeacherClient.make_teacher_timetable>`: вместо
+    номера аудитории в нем указан номер группы.
+    """
+
+    #: Расписание по UUID преподавателя.
+    teachers: dict[str, Timetable[list[Lesson]]]
+
+    #: Расписание по номеру аудитории.
+    classrooms: dict[str, Timetable[list[Lesson]]]
+
+    #: UUID преподавателей, расписание которых нельзя построить по индексу,
+    #: потому что некоторые их пары не удалось однозначно сопоставить.
+    unresolved: set[str]
+
+    #: Есть ли пары, для которых не известен ни один кандидат. В этом случае
+    #: неполным может оказаться расписание любого преподавателя.
+    incomplete: bool
+
+    def __init__(self) -> None:
+        self.teachers = defaultdict(lambda: [defaultdict(list) for _ in range(7)])
+        self.classrooms = defaultdict(lambda: [defaultdict(list) for _ in range(7)])
+        self.unresolved = set()
+        self.incomplete = False
+
+    def add(self, timetable: Timetable[Lesson], group: str,
+            lesson_teachers: dict[tuple[int, int], LessonTeachers]) -> None:
+        """
+        Добавляет в индекс расписание группы.
+
+        :param timetable: расписание группы
+        :param group: номер группы
+        :param lesson_teachers: преподаватели пар, результат
+            :meth:`Client.make_lesson_teachers
+            <egov66_timetable.client.Client.make_lesson_teachers>`
+        """
+
+        for day_num, day in enumerate(timetable):
+            for lesson_num, cell in day.items():
+                lesson_id, (_, name) = cell
+                lesson = Lesson(lesson_id, LessonData(group, name))
+
+                # Пары, которые стоят в одно и то же время, занимают каждая
+                # свою аудиторию.
+                for room_lesson_id, (classroom, subject) in (
+                    cell.lessons if isinstance(cell, Conflict) else [cell]
+                ):
+                    if classroom not in ("", "?"):
+                        self.classrooms[classroom][day_num][lesson_num].append(
+                            Lesson(room_lesson_id, LessonData(group, subject))
+                        )
+
+                teachers = lesson_teachers.get((day_num, lesson_num))
+                if teachers is None or not teachers.resolved:
+                    logger.debug("Не удалось определить преподавателя пары %s",
+                                 lesson_id)
+                    if teachers is None or len(teachers.teachers) == 0:
+                        self.incomplete = True
+                    else:
+                        self.unresolved.update(teachers.teachers)
+                    continue
+
+                for teacher_id in teachers.teachers:
+                    self.teachers[teacher_id][day_num][lesson_num].append(lesson)
+
+    def is_resolved(self, teacher_id: str) -> bool:
+        """
+        :param teacher_id: UUID преподавателя
+        :returns: можно ли доверять расписанию преподавателя из индекса
+        """
+
+        return not self.incomplete and teacher_id not in self.unresolved
+
+    def teacher_timetable(self, teacher_id: str) -> Timetable[list[Lesson]]:
+        """
+        :param teacher_id: UUID преподавателя
+        :returns: расписание преподавателя
+        """
+
+        return _trim_timetable(self.teachers.get(teacher_id) or [{} for _ in range(7)])
+
+    def classroom_timetable(self, classroom: str) -> Timetable[list[Lesson]]:
+        """
+        :param classroom: номер аудитории
+        :returns: расписание аудитории
+        """
+
+        return _trim_timetable(self.classrooms.get(classroom) or [{} for _ in range(7)])
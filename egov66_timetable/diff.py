@@ -0,0 +1,193 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Сравнение двух версий расписания на одну неделю.
+
+Пары сопоставляются по UUID, поэтому сравнение выполняется за линейное время
+от количества пар. Для каждой пары, которая есть в обеих версиях, отдельно
+определяется, перенесли ли ее на другой день или другое время, поменяли ли
+аудиторию и название предмета.
+"""
+
+from collections.abc import Iterator, Mapping, Sequence
+from itertools import zip_longest
+from typing import NamedTuple, cast
+
+from egov66_timetable.types import Lesson, LessonData
+
+#: Номер дня недели и номер пары.
+type Position = tuple[int, int]
+
+type AnyTimetable = Sequence[Mapping[int, Lesson]] | Sequence[Mapping[int, list[Lesson]]]
+
+type _Entry = tuple[Position, LessonData]
+
+
+class LessonChange(NamedTuple):
+    """
+    Изменение одной пары.
+    """
+
+    #: UUID пары.
+    id: str
+
+    #: Положение пары в старом расписании (``None`` для новой пары).
+    old_position: Position | None
+
+    #: Положение пары в новом расписании (``None`` для удаленной пары).
+    new_position: Position | None
+
+    #: Данные пары в старом расписании.
+    old: LessonData | None
+
+    #: Данные пары в новом расписании.
+    new: LessonData | None
+
+    @property
+    def moved(self) -> bool:
+        """
+        Пару перенесли на другой день или другое время.
+        """
+
+        return (self.old_position is not None and self.new_position is not None
+                and self.old_position != self.new_position)
+
+    @property
+    def room_changed(self) -> bool:
+        """
+        У пары поменялась аудитория (в расписании преподавателя — группа).
+        """
+
+        return (self.old is not None and self.new is not None
+                and self.old.where != self.new.where)
+
+    @property
+    def renamed(self) -> bool:
+        """
+        У пары поменялось название предмета.
+        """
+
+        return (self.old is not None and self.new is not None
+                and self.old.name != self.new.name)
+
+
+class TimetableDiff(NamedTuple):
+    """
+    Результат сравнения двух версий расписания.
+
+    Одна и та же пара может одновременно попасть в списки :attr:`moved`,
+    :attr:`room_changed` и :attr:`renamed`, а все измененные пары по одному
+    разу перечислены в :attr:`changed`. Объект ложен, если расписание не
+    изменилось.
+    """
+
+    #: Новые пары.
+    added: list[LessonChange]
+
+    #: Удаленные пары.
+    removed: list[LessonChange]
+
+    #: Пары, которые перенесли на другой день или другое время.
+    moved: list[LessonChange]
+
+    #: Пары, у которых поменялась аудитория.
+    room_changed: list[LessonChange]
+
+    #: Пары, у которых поменялось название предмета.
+    renamed: list[LessonChange]
+
+    #: Все пары, которые есть в обеих версиях, но чем-то отличаются.
+    changed: list[LessonChange]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def _index(timetable: AnyTimetable) -> dict[str, list[_Entry]]:
+    index: dict[str, list[_Entry]] = {}
+    for day_num, day in enumerate(timetable):
+        for lesson_num, cell in day.items():
+            lessons: Sequence[Lesson]
+            if isinstance(cell, list):
+                lessons = cell
+            else:
+                lessons = [cast(Lesson, cell)]
+            for lesson_id, lesson_data in lessons:
+                index.setdefault(lesson_id, []).append(
+                    ((day_num, lesson_num), LessonData(*lesson_data))
+                )
+    return index
+
+
+def _pair(old: list[_Entry],
+          new: list[_Entry]) -> Iterator[tuple[_Entry | None, _Entry | None]]:
+    if len(old) == 1 and len(new) == 1:
+        yield old[0], new[0]
+        return
+
+    # В расписании преподавателя одна пара может стоять у нескольких групп
+    # с одним и тем же UUID. Сначала сопоставляем записи с одинаковой группой.
+    unmatched = list(new)
+    rest: list[_Entry] = []
+    for entry in old:
+        for i, candidate in enumerate(unmatched):
+            if candidate[1].where == entry[1].where:
+                yield entry, unmatched.pop(i)
+                break
+        else:
+            rest.append(entry)
+    yield from zip_longest(rest, unmatched)
+
+
+def diff_timetables(old: AnyTimetable, new: AnyTimetable) -> TimetableDiff:
+    """
+    Сравнивает две версии расписания на одну неделю.
+
+    Подходит и для расписания групп, и для расписания преподавателей или
+    аудиторий, где в одной ячейке может быть несколько пар.
+
+    .. code-block:: python
+
+       diff = diff_timetables(old, new)
+       for change in diff.moved:
+           print(change.id, change.old_position, "->", change.new_position)
+
+    :param old: старое расписание
+    :param new: новое расписание
+    :returns: добавленные, удаленные и измененные пары
+    """
+
+    old_index = _index(old)
+    new_index = _index(new)
+    result = TimetableDiff([], [], [], [], [], [])
+
+    def classify(lesson_id: str, old_entry: _Entry | None,
+                 new_entry: _Entry | None) -> None:
+        old_position, old_data = old_entry or (None, None)
+        new_position, new_data = new_entry or (None, None)
+        change = LessonChange(lesson_id, old_position, new_position, old_data, new_data)
+        if old_entry is None:
+            result.added.append(change)
+        elif new_entry is None:
+            result.removed.append(change)
+        elif old_entry != new_entry:
+            result.changed.append(change)
+            if change.moved:
+                result.moved.append(change)
+            if change.room_changed:
+                result.room_changed.append(change)
+            if change.renamed:
+                result.renamed.append(change)
+
+    for lesson_id, old_entries in old_index.items():
+        for old_entry, new_entry in _pair(old_entries, new_index.get(lesson_id, [])):
+            classify(lesson_id, old_entry, new_entry)
+
+    for lesson_id, new_entries in new_index.items():
+        if lesson_id not in old_index:
+            for new_entry in new_entries:
+                classify(lesson_id, None, new_entry)
+
+    return result
@@ -0,0 +1,693 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Очередь заданий в базе данных SQLite для нескольких процессов-обработчиков.
+
+Задание — это загрузка расписания группы или преподавателя на одном сайте на
+одну неделю. Обработчик берет задание в аренду на ``lease_timeout`` секунд и
+продлевает аренду, пока работает. Если обработчик завершился аварийно, по
+истечении аренды задание достанется другому, а если попытки исчерпаны,
+будет отмечено неудавшимся. Неудавшееся задание возвращается в очередь с
+экспоненциально растущей задержкой.
+
+База данных работает в режиме WAL, поэтому ее могут использовать только
+процессы на одной машине: в сетевых файловых системах этот режим не работает.
+
+Очередь можно наполнять и обрабатывать из командной строки:
+
+.. code-block:: shell
+
+   python -m egov66_timetable.jobqueue jobs.db enqueue -g 101 102 --offsets=0:2
+   python -m egov66_timetable.jobqueue jobs.db work --sqlite timetable.db
+   python -m egov66_timetable.jobqueue jobs.db stats
+"""
+
+import argparse
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Literal, NamedTuple
+
+from egov66_timetable import (
+    RETRYABLE_ERRORS,
+    TeacherTimetableCallback,
+    TimetableCallback,
+    metrics,
+    tracing,
+)
+from egov66_timetable._batch import run_callbacks
+from egov66_timetable.client import Client, TeacherClient
+from egov66_timetable.multi import instance_name
+from egov66_timetable.types import Teacher, Week
+from egov66_timetable.types.settings import InstanceSettings
+from egov66_timetable.utils import get_current_week, get_type_adapter
+
+#: На сколько секунд обработчик берет задание по умолчанию.
+LEASE_TIMEOUT = 300.0
+
+#: Задержка перед первой повторной попыткой (в секундах).
+BACKOFF = 30.0
+
+#: Наибольшая задержка перед повторной попыткой (в секундах).
+MAX_BACKOFF = 3600.0
+
+#: За какой период (в секундах) считается пропускная способность.
+THROUGHPUT_WINDOW = 300.0
+
+type JobKind = Literal["group", "teacher"]
+type JobState = Literal["queued", "leased", "done", "failed"]
+
+SCHEMA = """
+PRAGMA journal_mode=WAL;
+
+CREATE TABLE IF NOT EXISTS job(
+    id INTEGER PRIMARY KEY,
+
+    -- Имя сайта (см. egov66_timetable.multi.instance_name)
+    instance TEXT NOT NULL,
+
+    -- group или teacher
+    kind TEXT NOT NULL,
+
+    -- Номер группы или преподаватель в формате JSON
+    target TEXT NOT NULL,
+
+    -- Номер года и номер недели
+    week_id TEXT NOT NULL,
+
+    -- queued, leased, done или failed
+    state TEXT NOT NULL DEFAULT 'queued',
+
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+
+    -- Время в секундах Unix
+    enqueued_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    finished_at REAL,
+
+    last_error TEXT
+);
+
+-- Одно и то же задание не может стоять в очереди дважды
+CREATE UNIQUE INDEX IF NOT EXISTS
+    idx_job_pending
+ON
+    job (instance, kind, target, week_id)
+WHERE
+    state IN ('queued', 'leased');
+
+CREATE INDEX IF NOT EXISTS
+    idx_job_state
+ON
+    job (state, available_at);
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class Job(NamedTuple):
+    """
+    Задание из очереди.
+    """
+
+    #: Номер задания.
+    id: int
+
+    #: Имя сайта.
+    instance: str
+
+    #: Тип задания.
+    kind: JobKind
+
+    #: Номер группы или преподаватель в формате JSON.
+    target: str
+
+    #: Год и номер недели.
+    week_id: str
+
+    #: Номер попытки (начиная с единицы).
+    attempts: int
+
+
+class QueueStats(NamedTuple):
+    """
+    Состояние очереди.
+    """
+
+    #: Заданий в очереди.
+    queued: int
+
+    #: Заданий в работе.
+    leased: int
+
+    #: Выполненных заданий.
+    done: int
+
+    #: Заданий, для которых исчерпаны попытки.
+    failed: int
+
+    #: Сколько секунд ждет самое старое задание, готовое к выполнению.
+    lag: float
+
+    #: Выполнено заданий в секунду за последние :data:`THROUGHPUT_WINDOW`
+    #: секунд.
+    throughput: float
+
+
+def default_owner() -> str:
+    """
+    :returns: имя обработчика по умолчанию: ``хост:процесс:поток``
+    """
+
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class JobQueue:
+    """
+    Очередь заданий в базе данных SQLite.
+    """
+
+    #: На сколько секунд обработчик берет задание.
+    lease_timeout: float
+
+    #: Задержка перед первой повторной попыткой (в секундах).
+    backoff: float
+
+    #: Наибольшая задержка перед повторной попыткой (в секундах).
+    max_backoff: float
+
+    _conn: sqlite3.Connection
+    _lock: threading.Lock
+    _clock: Callable[[], float]
+
+    def __init__(self, path: str | Path, *, lease_timeout: float = LEASE_TIMEOUT,
+                 backoff: float = BACKOFF, max_backoff: float = MAX_BACKOFF,
+                 clock: Callable[[], float] = time.time) -> None:
+        """
+        :param path: путь к базе данных
+        :param lease_timeout: на сколько секунд обработчик берет задание
+        :param backoff: задержка перед первой повторной попыткой
+        :param max_backoff: наибольшая задержка перед повторной попыткой
+        :param clock: источник времени
+        """
+
+        self.lease_timeout = lease_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """
+        Закрывает базу данных.
+        """
+
+        with self._lock:
+            self._conn.close()
+
+    def enqueue(self, instance: str, kind: JobKind, target: str | Teacher,
+                week: Week | str, *, max_attempts: int = 5) -> bool:
+        """
+        Ставит задание в очередь.
+
+        :param instance: имя сайта
+        :param kind: тип задания
+        :param target: номер группы или преподаватель
+        :param week: неделя
+        :param max_attempts: сколько раз пытаться выполнить задание
+        :returns: ``False``, если такое задание уже стоит в очереди
+        """
+
+        if isinstance(target, Teacher):
+            target = get_type_adapter(Teacher).dump_json(target).decode()
+        week_id = week.week_id if isinstance(week, Week) else week
+        now = self._clock()
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                INSERT OR IGNORE INTO
+                  job(instance, kind, target, week_id, max_attempts, enqueued_at,
+                      available_at)
+                VALUES
+                  (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [instance, kind, target, week_id, max_attempts, now, now]
+            )
+        return cur.rowcount > 0
+
+    def enqueue_many(self, instance: str, kind: JobKind,
+                     targets: Iterable[str | Teacher], offset_range: range, *,
+                     max_attempts: int = 5) -> int:
+        """
+        Ставит в очередь задания для всех групп или преподавателей на
+        несколько недель.
+
+        :param instance: имя сайта
+        :param kind: тип задания
+        :param targets: номера групп или преподаватели
+        :param offset_range: интервал смещений относительно текущей недели
+        :param max_attempts: сколько раз пытаться выполнить задание
+        :returns: количество новых заданий
+        """
+
+        current_week = get_current_week()
+        targets = list(targets)
+        return sum(
+            self.enqueue(instance, kind, target, current_week + offset,
+                         max_attempts=max_attempts)
+            for offset in offset_range for target in targets
+        )
+
+    def lease(self, owner: str, *, limit: int = 1,
+              instance: str | None = None) -> list[Job]:
+        """
+        Берет в аренду задания, готовые к выполнению, и задания, аренда
+        которых истекла. Задания с истекшей арендой, у которых исчерпаны
+        попытки (например, обработчик каждый раз завершался аварийно),
+        отмечаются неудавшимися.
+
+        :param owner: имя обработчика
+        :param limit: сколько заданий взять
+        :param instance: брать задания только для этого сайта
+        :returns: задания
+        """
+
+        now = self._clock()
+        sql = (
+            """
+            SELECT
+              id, instance, kind, target, week_id, attempts + 1
+            FROM
+              job
+            WHERE
+              (state = 'queued' AND available_at <= ?
+               OR state = 'leased' AND lease_expires < ? AND attempts < max_attempts)
+            """
+        )
+        params: list[object] = [now, now]
+        if instance is not None:
+            sql += " AND instance = ?"
+            params.append(instance)
+        sql += " ORDER BY available_at, id LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                abandoned = conn.execute(
+                    """
+                    UPDATE
+                      job
+                    SET
+                      state = 'failed', finished_at = ?, lease_owner = NULL,
+                      lease_expires = NULL, last_error = 'аренда истекла'
+                    WHERE
+                      state = 'leased' AND lease_expires < ? AND attempts >= max_attempts
+                    """,
+                    [now, now]
+                ).rowcount
+                jobs = [Job(*row) for row in conn.execute(sql, params)]
+                conn.executemany(
+                    """
+                    UPDATE
+                      job
+                    SET
+                      state = 'leased', lease_owner = ?, lease_expires = ?,
+                      attempts = attempts + 1
+                    WHERE
+                      id = ?
+                    """,
+                    [(owner, now + self.lease_timeout, job.id) for job in jobs]
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        if abandoned:
+            logger.warning("Аренда истекла, попытки исчерпаны: %d заданий", abandoned)
+            metrics.JOBS_PROCESSED.inc(abandoned, result="failed")
+        for job in jobs:
+            if job.attempts > 1:
+                logger.info("Задание %d, попытка %d", job.id, job.attempts)
+        return jobs
+
+    def heartbeat(self, job: Job, owner: str) -> bool:
+        """
+        Продлевает аренду задания.
+
+        :returns: ``False``, если задание уже не принадлежит обработчику
+        """
+
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                UPDATE
+                  job
+                SET
+                  lease_expires = ?
+                WHERE
+                  id = ? AND state = 'leased' AND lease_owner = ?
+                """,
+                [self._clock() + self.lease_timeout, job.id, owner]
+            )
+        return cur.rowcount > 0
+
+    def ack(self, job: Job, owner: str) -> bool:
+        """
+        Отмечает задание выполненным.
+
+        :returns: ``False``, если задание уже не принадлежит обработчику
+        """
+
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                UPDATE
+                  job
+                SET
+                  state = 'done', finished_at = ?, lease_owner = NULL,
+                  lease_expires = NULL, last_error = NULL
+                WHERE
+                  id = ? AND state = 'leased' AND lease_owner = ?
+                """,
+                [self._clock(), job.id, owner]
+            )
+        if cur.rowcount == 0:
+            return False
+        metrics.JOBS_PROCESSED.inc(result="done")
+        return True
+
+    def fail(self, job: Job, owner: str, error: str) -> bool:
+        """
+        Возвращает задание в очередь с задержкой или, если попытки исчерпаны,
+        отмечает его неудавшимся.
+
+        :param error: описание ошибки
+        :returns: ``False``, если задание уже не принадлежит обработчику
+        """
+
+        now = self._clock()
+        delay = min(self.backoff * 2 ** (job.attempts - 1), self.max_backoff)
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                UPDATE
+                  job
+                SET
+                  state = CASE WHEN attempts >= max_attempts
+                          THEN 'failed' ELSE 'queued' END,
+                  finished_at = CASE WHEN attempts >= max_attempts
+                                THEN ? END,
+                  available_at = ?, lease_owner = NULL, lease_expires = NULL,
+                  last_error = ?
+                WHERE
+                  id = ? AND state = 'leased' AND lease_owner = ?
+                RETURNING
+                  state
+                """,
+                [now, now + delay, error, job.id, owner]
+            )
+            row = cur.fetchone()
+        if row is None:
+            return False
+        metrics.JOBS_PROCESSED.inc(result="failed" if row[0] == "failed" else "retried")
+        return True
+
+    def stats(self) -> QueueStats:
+        """
+        Возвращает состояние очереди и обновляет метрики.
+        """
+
+        now = self._clock()
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT state, COUNT(*) FROM job GROUP BY state"
+            ).fetchall())
+            oldest, = self._conn.execute(
+                "SELECT MIN(available_at) FROM job WHERE state = 'queued' "
+                "AND available_at <= ?", [now]
+            ).fetchone()
+            recent, = self._conn.execute(
+                "SELECT COUNT(*) FROM job WHERE state = 'done' AND finished_at >= ?",
+                [now - THROUGHPUT_WINDOW]
+            ).fetchone()
+
+        stats = QueueStats(
+            queued=counts.get("queued", 0), leased=counts.get("leased", 0),
+            done=counts.get("done", 0), failed=counts.get("failed", 0),
+            lag=max(now - oldest, 0.0) if oldest is not None else 0.0,
+            throughput=recent / THROUGHPUT_WINDOW,
+        )
+        for state in ("queued", "leased", "done", "failed"):
+            metrics.JOB_QUEUE_SIZE.set(getattr(stats, state), state=state)
+        metrics.JOB_QUEUE_LAG.set(stats.lag)
+        return stats
+
+    def prune(self, older_than: float) -> int:
+        """
+        Удаляет выполненные и неудавшиеся задания.
+
+        :param older_than: сколько секунд назад задание должно было завершиться
+        :returns: количество удаленных заданий
+        """
+
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM job WHERE state IN ('done', 'failed') AND finished_at < ?",
+                [self._clock() - older_than]
+            )
+        return cur.rowcount
+
+
+class _Heartbeat:
+    """
+    Продлевает аренду текущего задания в отдельном потоке.
+    """
+
+    def __init__(self, queue: JobQueue, job: Job, owner: str) -> None:
+        self._queue = queue
+        self._job = job
+        self._owner = owner
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f"heartbeat-{job.id}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._queue.lease_timeout / 3):
+            if not self._queue.heartbeat(self._job, self._owner):
+                logger.warning("Задание %d больше не принадлежит обработчику",
+                               self._job.id)
+                return
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(queue: JobQueue, instances: list[InstanceSettings], *,
+               callbacks: Callable[[str], list[TimetableCallback]] = lambda _: [],
+               teacher_callbacks: Callable[[str], list[TeacherTimetableCallback]] = (
+                   lambda _: []
+               ),
+               owner: str | None = None, poll_interval: float = 5.0,
+               exit_when_empty: bool = False,
+               stop: threading.Event | None = None) -> int:
+    """
+    Выполняет задания из очереди, пока не будет установлен ``stop`` (или, если
+    указан ``exit_when_empty``, пока в очереди есть задания).
+
+    :param queue: очередь заданий
+    :param instances: настройки сайтов
+    :param callbacks: функция, которая по имени сайта возвращает коллбэки для
+        расписания групп
+    :param teacher_callbacks: функция, которая по имени сайта возвращает
+        коллбэки для расписания преподавателей
+    :param owner: имя обработчика (по умолчанию ``хост:процесс:поток``)
+    :param poll_interval: пауза между проверками пустой очереди (в секундах)
+    :param exit_when_empty: завершиться, когда в очереди не останется
+        готовых заданий
+    :param stop: событие, по которому обработчик завершается
+    :returns: количество выполненных заданий
+    """
+
+    owner = owner or default_owner()
+    stop = stop or threading.Event()
+    settings_by_name = {instance_name(settings): settings for settings in instances}
+    clients: dict[tuple[str, JobKind], Client] = {}
+    instance_callbacks: dict[str, list[TimetableCallback]] = {}
+    instance_teacher_callbacks: dict[str, list[TeacherTimetableCallback]] = {}
+
+    def get_client(instance: str, kind: JobKind) -> Client:
+        if (client := clients.get((instance, kind))) is None:
+            client_class = TeacherClient if kind == "teacher" else Client
+            client = clients[(instance, kind)] = client_class(settings_by_name[instance])
+        return client
+
+    def process(job: Job) -> None:
+        week = Week.from_week_id(job.week_id)
+        offset = (week.monday - get_current_week().monday).days // 7
+        client = get_client(job.instance, job.kind)
+        if job.kind == "teacher":
+            teacher = get_type_adapter(Teacher).validate_json(job.target)
+            assert isinstance(client, TeacherClient)
+            teacher_timetable = client.make_teacher_timetable(teacher.id, offset=offset)
+            if (teacher_funcs := instance_teacher_callbacks.get(job.instance)) is None:
+                teacher_funcs = teacher_callbacks(job.instance)
+                instance_teacher_callbacks[job.instance] = teacher_funcs
+            run_callbacks(teacher_funcs, teacher_timetable, teacher, week)
+        else:
+            timetable = client.make_timetable(job.target, offset=offset)
+            if (funcs := instance_callbacks.get(job.instance)) is None:
+                funcs = instance_callbacks[job.instance] = callbacks(job.instance)
+            run_callbacks(funcs, timetable, job.target, week)
+
+    processed = 0
+    try:
+        while not stop.is_set():
+            jobs = queue.lease(owner)
+            if not jobs:
+                if exit_when_empty:
+                    break
+                stop.wait(poll_interval)
+                continue
+
+            job = jobs[0]
+            if job.instance not in settings_by_name:
+                queue.fail(job, owner, f"неизвестный сайт {job.instance!r}")
+                continue
+
+            logger.info("Задание %d: %s %s (%s) на неделю %s", job.id, job.kind,
+                        job.target, job.instance, job.week_id)
+            try:
+                with (_Heartbeat(queue, job, owner),
+                      tracing.span("job", instance=job.instance, target=job.target,
+                                   week=job.week_id)):
+                    process(job)
+            except RETRYABLE_ERRORS as err:
+                logger.error("Задание %d не выполнено: %s", job.id, type(err).__name__)
+                queue.fail(job, owner, type(err).__name__)
+            except Exception as err:
+                logger.exception("Задание %d не выполнено", job.id)
+                queue.fail(job, owner, repr(err))
+            else:
+                if queue.ack(job, owner):
+                    processed += 1
+                else:
+                    logger.warning("Задание %d выполнено, но аренда потеряна: "
+                                   "его выполнит другой обработчик", job.id)
+    finally:
+        for client in clients.values():
+            client.close()
+
+    return processed
+
+
+def main() -> None:
+    from egov66_timetable.__main__ import parse_offsets, read_groups, read_teachers
+    from egov66_timetable.utils import read_settings
+
+    parser = argparse.ArgumentParser(
+        prog="python -m egov66_timetable.jobqueue",
+        description="Очередь заданий для загрузки расписания несколькими процессами",
+    )
+    parser.add_argument("db", help="база данных очереди")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="поставить задания в очередь")
+    enqueue.add_argument("-g", "--groups", nargs="+", default=[], metavar="GROUP")
+    enqueue.add_argument("-G", "--groups-file", action="append", default=[],
+                         metavar="FILE")
+    enqueue.add_argument("-T", "--teachers-file", action="append", default=[],
+                         metavar="FILE")
+    enqueue.add_argument("-o", "--offsets", type=parse_offsets, default=range(1),
+                         metavar="START[:STOP]")
+
+    work = commands.add_parser("work", help="выполнять задания")
+    work.add_argument("--sqlite", metavar="DB", help="записать в базу данных SQLite")
+    work.add_argument("--json", metavar="DIR", help="записать JSON-файлы в каталог")
+    work.add_argument("--exit-when-empty", action="store_true",
+                      help="завершиться, когда задания закончатся")
+
+    commands.add_parser("stats", help="показать состояние очереди")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="выводить подробный журнал")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    settings = get_type_adapter(InstanceSettings).validate_python(read_settings())
+    instance = instance_name(settings)
+    queue = JobQueue(args.db)
+    try:
+        match args.command:
+            case "enqueue":
+                groups = list(args.groups)
+                for path in args.groups_file:
+                    groups.extend(read_groups(path))
+                teachers: list[Teacher] = []
+                for path in args.teachers_file:
+                    teachers.extend(read_teachers(path))
+                added = (queue.enqueue_many(instance, "group", groups, args.offsets)
+                         + queue.enqueue_many(instance, "teacher", teachers, args.offsets))
+                print(f"Новых заданий: {added}")
+            case "work":
+                callbacks: list[TimetableCallback] = []
+                teacher_callbacks: list[TeacherTimetableCallback] = []
+                conn: sqlite3.Connection | None = None
+                if args.sqlite is not None:
+                    from egov66_timetable.callbacks.sqlite import (
+                        create_db,
+                        sqlite_callback,
+                        sqlite_teacher_callback,
+                    )
+                    conn = sqlite3.connect(args.sqlite)
+                    create_db(conn)
+                    callbacks.append(sqlite_callback(conn))
+                    teacher_callbacks.append(sqlite_teacher_callback(conn))
+                if args.json is not None:
+                    from egov66_timetable.callbacks.json import (
+                        json_callback,
+                        json_teacher_callback,
+                    )
+                    callbacks.append(json_callback(args.json))
+                    teacher_callbacks.append(json_teacher_callback(args.json))
+                try:
+                    processed = run_worker(queue, [settings],
+                                           callbacks=lambda _: callbacks,
+                                           teacher_callbacks=lambda _: teacher_callbacks,
+                                           exit_when_empty=args.exit_when_empty)
+                finally:
+                    if conn is not None:
+                        conn.close()
+                print(f"Выполнено заданий: {processed}")
+            case "stats":
+                stats = queue.stats()
+                print(f"В очереди: {stats.queued}, в работе: {stats.leased}, "
+                      f"выполнено: {stats.done}, не удалось: {stats.failed}")
+                print(f"Задержка: {stats.lag:.0f} с, "
+                      f"пропускная способность: {stats.throughput * 60:.1f} в минуту")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,521 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Метрики сетевых запросов и коллбэков.
+
+Метрики собираются в реестре внутри процесса и выгружаются в текстовом
+формате Prometheus (в файл или по HTTP) и в виде сводки JSON. Счетчики и
+гистограммы сбрасываются в начале каждого запуска, поэтому выгрузка относится
+к последнему запуску; текущие значения (:class:`Gauge`) сохраняются.
+"""
+
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Sequence
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Literal
+
+from egov66_timetable.types.settings import Settings
+from egov66_timetable.utils import write_atomic
+
+#: Этапы работы клиента: загрузка начальной страницы, выбор группы или
+#: преподавателя, переход на другую неделю и прочие вызовы Livewire.
+type Stage = Literal["initial", "set", "week", "other"]
+
+type LabelValues = tuple[str, ...]
+
+#: Границы корзин гистограммы длительности (в секундах).
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+#: Границы корзин гистограммы размера (в байтах).
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_float(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    """
+    Базовый класс метрики.
+    """
+
+    #: Тип метрики в формате Prometheus.
+    kind: str = "untyped"
+
+    #: Имя метрики.
+    name: str
+
+    #: Описание метрики.
+    help: str
+
+    #: Имена меток.
+    labelnames: tuple[str, ...]
+
+    _lock: threading.Lock
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _labels(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def reset(self) -> None:
+        """
+        Сбрасывает все значения.
+        """
+
+    @abstractmethod
+    def samples(self) -> list[tuple[str, LabelValues, float]]:
+        """
+        :returns: значения в виде списка ``(имя, метки, значение)``
+        """
+
+    @abstractmethod
+    def summary(self) -> list[dict[str, object]]:
+        """
+        :returns: сводка значений для JSON
+        """
+
+
+class Counter(Metric):
+    """
+    Счетчик, который может только увеличиваться.
+    """
+
+    kind = "counter"
+
+    _values: dict[LabelValues, float]
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Увеличивает значение счетчика.
+
+        :param amount: на сколько увеличить
+        :param labels: значения меток
+        """
+
+        key = self._labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        """
+        :param labels: значения меток
+        :returns: текущее значение
+        """
+
+        return self._values.get(self._labels(labels), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> list[tuple[str, LabelValues, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+    def summary(self) -> list[dict[str, object]]:
+        return [
+            {"labels": dict(zip(self.labelnames, key)), "value": value}
+            for _, key, value in self.samples()
+        ]
+
+
+class Gauge(Counter):
+    """
+    Значение, которое может как увеличиваться, так и уменьшаться.
+    """
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """
+        Устанавливает значение.
+
+        :param value: новое значение
+        :param labels: значения меток
+        """
+
+        key = self._labels(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Гистограмма с фиксированными границами корзин.
+    """
+
+    kind = "histogram"
+
+    #: Верхние границы корзин.
+    buckets: tuple[float, ...]
+
+    # {метки: [счетчики корзин..., сумма, количество]}
+    _values: dict[LabelValues, list[float]]
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), *,
+                 buckets: Sequence[float] = DURATION_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Добавляет наблюдение.
+
+        :param value: значение
+        :param labels: значения меток
+        """
+
+        key = self._labels(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            if (values := self._values.get(key)) is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 3)
+            values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def _snapshot(self) -> list[tuple[LabelValues, list[float]]]:
+        with self._lock:
+            return [(key, list(values)) for key, values in sorted(self._values.items())]
+
+    def samples(self) -> list[tuple[str, LabelValues, float]]:
+        result: list[tuple[str, LabelValues, float]] = []
+        for key, values in self._snapshot():
+            cumulative = 0.0
+            for bound, count in zip([*self.buckets, float("inf")], values):
+                cumulative += count
+                result.append((f"{self.name}_bucket", (*key, _format_float(bound)),
+                               cumulative))
+            result.append((f"{self.name}_sum", key, values[-2]))
+            result.append((f"{self.name}_count", key, values[-1]))
+        return result
+
+    def _quantile(self, values: list[float], q: float) -> float:
+        # Линейная интерполяция внутри корзины, как в histogram_quantile().
+        count = values[-1]
+        rank = q * count
+        cumulative = 0.0
+        lower = 0.0
+        for bound, bucket_count in zip(self.buckets, values):
+            if cumulative + bucket_count >= rank and bucket_count > 0:
+                return lower + (bound - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = bound
+        return self.buckets[-1] if self.buckets else 0.0
+
+    def summary(self) -> list[dict[str, object]]:
+        result: list[dict[str, object]] = []
+        for key, values in self._snapshot():
+            count = values[-1]
+            result.append({
+                "labels": dict(zip(self.labelnames, key)),
+                "count": count,
+                "sum": values[-2],
+                "mean": values[-2] / count if count else 0.0,
+                "p50": self._quantile(values, 0.5),
+                "p95": self._quantile(values, 0.95),
+            })
+        return result
+
+
+class Registry:
+    """
+    Реестр метрик.
+    """
+
+    _metrics: dict[str, Metric]
+    _server: ThreadingHTTPServer | None
+
+    def __init__(self) -> None:
+        self._metrics = {}
+        self._server = None
+
+    def register[M: Metric](self, metric: M) -> M:
+        """
+        Добавляет метрику в реестр.
+
+        :param metric: метрика
+        :returns: та же метрика
+        :raises ValueError: если метрика с таким именем уже есть
+        """
+
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def reset(self) -> None:
+        """
+        Сбрасывает значения всех метрик.
+        """
+
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def reset_run(self) -> None:
+        """
+        Сбрасывает счетчики и гистограммы перед новым запуском. Текущие
+        значения (:class:`Gauge`) сохраняются.
+        """
+
+        for metric in self._metrics.values():
+            if not isinstance(metric, Gauge):
+                metric.reset()
+
+    def to_prometheus(self) -> str:
+        """
+        :returns: метрики в текстовом формате Prometheus
+        """
+
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            labelnames = metric.labelnames
+            for name, values, value in metric.samples():
+                names = (*labelnames, "le") if name.endswith("_bucket") else labelnames
+                lines.append(f"{name}{_format_labels(names, values)} {_format_float(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict[str, list[dict[str, object]]]:
+        """
+        :returns: сводка всех метрик для JSON
+        """
+
+        return {name: metric.summary() for name, metric in self._metrics.items()}
+
+    def write_prometheus(self, path: str | Path) -> None:
+        """
+        Атомарно записывает метрики в файл (например, для textfile collector
+        из node_exporter).
+
+        :param path: путь к файлу
+        """
+
+        write_atomic(path, self.to_prometheus())
+
+    def write_json(self, path: str | Path) -> None:
+        """
+        Атомарно записывает сводку метрик в файл JSON.
+
+        :param path: путь к файлу
+        """
+
+        write_atomic(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Запускает в фоновом потоке HTTP-сервер, который отдает метрики по
+        адресу ``/metrics``. Повторный вызов возвращает уже запущенный сервер.
+
+        :param port: порт
+        :param host: адрес
+        :returns: HTTP-сервер
+        """
+
+        if self._server is not None:
+            return self._server
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                logger.debug(format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        logger.info("Метрики доступны по адресу http://%s:%d/metrics", host, port)
+        return self._server
+
+    def shutdown(self) -> None:
+        """
+        Останавливает HTTP-сервер, если он запущен.
+        """
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+#: Реестр метрик по умолчанию.
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "egov66_timetable_requests_total",
+    "Количество запросов к личному кабинету",
+    ["stage", "method", "status"],
+))
+REQUEST_DURATION = registry.register(Histogram(
+    "egov66_timetable_request_duration_seconds",
+    "Длительность запросов к личному кабинету",
+    ["stage", "method"],
+))
+REQUEST_RETRIES = registry.register(Counter(
+    "egov66_timetable_request_retries_total",
+    "Количество повторных запросов после истечения времени ожидания",
+    ["stage", "method"],
+))
+BYTES_SENT = registry.register(Histogram(
+    "egov66_timetable_request_bytes",
+    "Размер тела запроса",
+    ["stage", "method"],
+    buckets=SIZE_BUCKETS,
+))
+BYTES_RECEIVED = registry.register(Histogram(
+    "egov66_timetable_response_bytes",
+    "Размер тела ответа",
+    ["stage", "method"],
+    buckets=SIZE_BUCKETS,
+))
+SESSION_RESTARTS = registry.register(Counter(
+    "egov66_timetable_session_restarts_total",
+    "Количество новых сеансов после ошибок сеанса",
+    ["reason"],
+))
+JOB_RETRIES = registry.register(Counter(
+    "egov66_timetable_job_retries_total",
+    "Количество заданий, поставленных в очередь повторно",
+))
+RATE_LIMIT = registry.register(Gauge(
+    "egov66_timetable_rate_limit",
+    "Текущая допустимая частота запросов к сайту (запросов в секунду)",
+    ["host"],
+))
+RATE_LIMIT_WAIT = registry.register(Histogram(
+    "egov66_timetable_rate_limit_wait_seconds",
+    "Время ожидания разрешения на запрос",
+    ["host"],
+))
+JOBS_PROCESSED = registry.register(Counter(
+    "egov66_timetable_jobs_processed_total",
+    "Количество заданий из очереди, обработанных этим процессом",
+    ["result"],
+))
+JOB_QUEUE_SIZE = registry.register(Gauge(
+    "egov66_timetable_job_queue_size",
+    "Количество заданий в очереди по состояниям",
+    ["state"],
+))
+JOB_QUEUE_LAG = registry.register(Gauge(
+    "egov66_timetable_job_queue_lag_seconds",
+    "Сколько ждет самое старое задание, готовое к выполнению",
+))
+CALLBACK_DURATION = registry.register(Histogram(
+    "egov66_timetable_callback_duration_seconds",
+    "Длительность выполнения коллбэк-функций",
+    ["callback"],
+))
+SERVER_REQUESTS = registry.register(Counter(
+    "egov66_timetable_server_requests_total",
+    "Количество запросов к HTTP-сервису расписания",
+    ["route", "status"],
+))
+SERVER_CACHE = registry.register(Counter(
+    "egov66_timetable_server_cache_total",
+    "Обращения к кешу недель HTTP-сервиса расписания",
+    ["result"],
+))
+
+
+def record_request(stage: Stage, method: str, status: int | str, duration: float, *,
+                   sent: int = 0, received: int = 0) -> None:
+    """
+    Записывает метрики одного запроса.
+
+    :param stage: этап
+    :param method: метод Livewire или HTTP
+    :param status: код ответа или ``"timeout"``
+    :param duration: длительность в секундах
+    :param sent: размер тела запроса в байтах
+    :param received: размер тела ответа в байтах
+    """
+
+    REQUESTS.inc(stage=stage, method=method, status=str(status))
+    REQUEST_DURATION.observe(duration, stage=stage, method=method)
+    BYTES_SENT.observe(sent, stage=stage, method=method)
+    BYTES_RECEIVED.observe(received, stage=stage, method=method)
+
+
+def callback_name(callback: object) -> str:
+    """
+    :param callback: коллбэк-функция
+    :returns: имя коллбэк-функции для метрик (например, ``html_callback``)
+    """
+
+    qualname: str = getattr(callback, "__qualname__", type(callback).__qualname__)
+    return qualname.split(".<locals>", 1)[0]
+
+
+def start_server(settings: Settings) -> None:
+    """
+    Запускает HTTP-сервер метрик, если он включен в настройках.
+
+    :param settings: настройки
+    """
+
+    if (port := settings.get("metrics", {}).get("port")) is not None:
+        registry.serve(port)
+
+
+def export(settings: Settings) -> None:
+    """
+    Выгружает метрики в файлы, указанные в настройках.
+
+    :param settings: настройки
+    """
+
+    metrics_settings = settings.get("metrics", {})
+    if (prometheus_file := metrics_settings.get("prometheus_file")) is not None:
+        registry.write_prometheus(prometheus_file)
+    if (json_file := metrics_settings.get("json_file")) is not None:
+        registry.write_json(json_file)
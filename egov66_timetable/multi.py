@@ -0,0 +1,215 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Загрузка расписания с нескольких сайтов в одном процессе.
+
+У каждого сайта свои cookie-файлы, алиасы и клиенты, а потоки общие. Задания
+разных сайтов выдаются потокам по кругу, и для каждого сайта одновременно
+выполняется не больше ``max_workers`` заданий, поэтому медленный или большой
+сайт не занимает все потоки. Частоту запросов к каждому хосту можно
+дополнительно ограничить с помощью :mod:`egov66_timetable.ratelimit`.
+
+Загружается только расписание групп. Расписание преподавателей загружайте для
+каждого сайта функцией :func:`~egov66_timetable.get_teacher_timetable` или
+через очередь заданий :mod:`egov66_timetable.jobqueue`, где задания
+преподавателей разных сайтов тоже выполняются вместе.
+"""
+
+import contextlib
+import locale
+import logging
+from collections.abc import Callable, Generator, Iterator
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from urllib.parse import urlparse
+
+from egov66_timetable import (
+    RETRYABLE_ERRORS,
+    BatchResult,
+    TimetableCallback,
+    tracing,
+)
+from egov66_timetable._batch import JobQueue, batch_run, run_callbacks
+from egov66_timetable.client import Client, ClientPool
+from egov66_timetable.types import Lesson, Timetable, Week
+from egov66_timetable.types.settings import InstanceSettings
+from egov66_timetable.utils import get_current_week
+
+logger = logging.getLogger(__name__)
+
+
+def instance_name(settings: InstanceSettings) -> str:
+    """
+    :param settings: настройки сайта
+    :returns: имя сайта: ``name`` из настроек или имя хоста
+    """
+
+    return settings.get("name") or urlparse(settings["instance"]).netloc
+
+
+def _jobs(groups: list[str], offset_range: range) -> Iterator[tuple[int, str]]:
+    for offset in offset_range:
+        for group in groups:
+            yield offset, group
+
+
+def iter_multi_timetables(
+    instances: list[InstanceSettings], offset_range: range = range(1), *,
+    workers: int = 4, max_attempts: int = 3,
+    failures: dict[str, BatchResult[str]] | None = None
+) -> Generator[tuple[Timetable[Lesson], str, Week, str], None, None]:
+    """
+    Получает расписание групп с нескольких сайтов и возвращает его по мере
+    загрузки.
+
+    Общие настройки запуска (метрики и трассировка) берутся из настроек
+    первого сайта.
+
+    :param instances: настройки сайтов со списками групп
+    :param offset_range: интервал смещений относительно текущей недели (``-1`` —
+        предыдущая неделя, ``+1`` — следующая)
+    :param workers: общее количество параллельных загрузок
+    :param max_attempts: сколько раз выполнять задание, которое завершилось
+        ошибкой сети или сеанса
+    :param failures: словарь, в который для каждого сайта будут добавлены
+        группы, которые не удалось загрузить, и количество попыток
+    :returns: генератор кортежей ``(расписание, группа, неделя, сайт)``
+    """
+
+    if not instances:
+        return
+
+    # Выводить дни недели в русской локали
+    locale.setlocale(locale.LC_TIME, "ru_RU.utf8")
+
+    workers = max(workers, 1)
+    current_week = get_current_week()
+    names = [instance_name(settings) for settings in instances]
+    if len(set(names)) != len(names):
+        raise ValueError("Имена сайтов должны быть уникальными")
+
+    results = [
+        failures.setdefault(name, BatchResult()) if failures is not None
+        else BatchResult[str]()
+        for name in names
+    ]
+    limits = [max(min(settings.get("max_workers", workers), workers), 1)
+              for settings in instances]
+    pools = [ClientPool(settings, Client, size=limit)
+             for settings, limit in zip(instances, limits)]
+    queues = [
+        JobQueue(_jobs(settings.get("groups", []), offset_range),
+                 max_attempts=max_attempts, attempts=result.attempts)
+        for settings, result in zip(instances, results)
+    ]
+    in_flight = [0] * len(instances)
+    next_instance = 0
+
+    def fetch(index: int, job: tuple[int, str]) -> Timetable[Lesson]:
+        offset, group = job
+        week = current_week + offset
+        logger.info("Загрузка расписания для группы %s (%s) на неделю %s",
+                    group, names[index], week.week_id)
+        with (pools[index].client() as client,
+              tracing.span("make_timetable", instance=names[index], group=group,
+                           week=week.week_id)):
+            return client.make_timetable(group, offset=offset)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="egov66")
+    pending: dict[Future[Timetable[Lesson]], tuple[int, tuple[int, str]]] = {}
+
+    def schedule() -> None:
+        # Выдаем задания по кругу, начиная с сайта после последнего выбранного
+        nonlocal next_instance
+        while len(pending) < workers:
+            for step in range(len(instances)):
+                index = (next_instance + step) % len(instances)
+                if in_flight[index] >= limits[index]:
+                    continue
+                if (job := next(queues[index], None)) is None:
+                    continue
+                pending[executor.submit(fetch, index, job)] = (index, job)
+                in_flight[index] += 1
+                next_instance = (index + 1) % len(instances)
+                break
+            else:
+                return
+
+    with batch_run(instances[0]), contextlib.ExitStack() as cleanup:
+        for pool in pools:
+            cleanup.callback(pool.close)
+        cleanup.callback(executor.shutdown, cancel_futures=True)
+
+        schedule()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, job = pending.pop(future)
+                in_flight[index] -= 1
+                offset, group = job
+                try:
+                    timetable = future.result()
+                except RETRYABLE_ERRORS as err:
+                    if not queues[index].retry(job, err):
+                        logger.error("Не удалось загрузить расписание (%s): %s",
+                                     names[index], type(err).__name__)
+                        results[index][offset].append(group)
+                else:
+                    week = current_week + offset
+                    with tracing.span("callbacks", instance=names[index], group=group,
+                                      week=week.week_id):
+                        yield timetable, group, week, names[index]
+                schedule()
+
+
+def get_multi_timetables(
+    instances: list[InstanceSettings],
+    callbacks: Callable[[str], list[TimetableCallback]], *,
+    offset_range: range = range(1), workers: int = 4, max_attempts: int = 3
+) -> dict[str, BatchResult[str]]:
+    """
+    Получает расписание групп с нескольких сайтов и вызывает коллбэк-функции.
+
+    Коллбэки создаются для каждого сайта отдельно, например, чтобы записывать
+    расписание всех сайтов в одну базу данных:
+
+    .. code-block:: python
+
+       conn = sqlite3.connect("timetable.db")
+       create_db(conn)
+       failures = get_multi_timetables(
+           instances,
+           lambda instance: [sqlite_callback(conn, instance=instance)],
+           workers=8,
+       )
+
+    :param instances: настройки сайтов со списками групп
+    :param callbacks: функция, которая по имени сайта возвращает список
+        коллбэк-функций
+    :param offset_range: интервал смещений относительно текущей недели (``-1`` —
+        предыдущая неделя, ``+1`` — следующая)
+    :param workers: общее количество параллельных загрузок (коллбэки все
+        равно вызываются из текущего потока)
+    :param max_attempts: сколько раз выполнять задание, которое завершилось
+        ошибкой сети или сеанса
+    :returns: для каждого сайта группы, которые не удалось загрузить, и
+        количество попыток
+    """
+
+    failures: dict[str, BatchResult[str]] = {}
+    instance_callbacks: dict[str, list[TimetableCallback]] = {}
+    for timetable, group, week, instance in iter_multi_timetables(
+        instances, offset_range, workers=workers, max_attempts=max_attempts,
+        failures=failures
+    ):
+        if (funcs := instance_callbacks.get(instance)) is None:
+            funcs = instance_callbacks[instance] = callbacks(instance)
+        run_callbacks(funcs, timetable, group, week)
+
+    return failures
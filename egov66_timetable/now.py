@@ -0,0 +1,311 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Поиск текущей и следующей пары группы или преподавателя.
+
+Индекс хранит для каждой группы и каждого преподавателя отсортированный по
+времени список пар на текущую и следующую недели, поэтому поиск выполняется
+двоичным поиском за O(log n). Время пар задается расписанием звонков (см.
+:data:`~egov66_timetable.utils.DEFAULT_BELLS`). Расписание добавляется целиком для
+группы (преподавателя) и недели, при этом перестраивается только список этой
+группы (преподавателя).
+"""
+
+import sqlite3
+import time
+from bisect import bisect_right
+from collections.abc import Callable, Iterable, Sequence
+from datetime import date, datetime, timedelta, tzinfo
+from typing import NamedTuple
+
+from egov66_timetable import TeacherTimetableCallback, TimetableCallback
+from egov66_timetable.callbacks.sqlite import load_teacher_timetables, load_timetables
+from egov66_timetable.types import Lesson, Teacher, Timetable, Week
+from egov66_timetable.utils import DEFAULT_BELLS, YEKATERINBURG, Bell
+
+
+class LessonSlot(NamedTuple):
+    """
+    Пара в индексе.
+    """
+
+    #: Начало пары (Unix time).
+    start: float
+
+    #: Конец пары (Unix time).
+    end: float
+
+    #: Неделя (пример: 2026-3).
+    week_id: str
+
+    #: Номер дня недели (0 - понедельник, 6 - воскресенье).
+    day_num: int
+
+    #: Номер пары (начиная с нуля).
+    lesson_num: int
+
+    #: Пары в это время: у группы одна, у преподавателя может быть несколько
+    #: (вместо аудитории указана группа).
+    lessons: tuple[Lesson, ...]
+
+
+class NowNext(NamedTuple):
+    """
+    Результат поиска.
+    """
+
+    #: Пара, которая идет сейчас.
+    current: LessonSlot | None
+
+    #: Ближайшая следующая пара.
+    next: LessonSlot | None
+
+
+_EMPTY = NowNext(None, None)
+
+
+class _Lookup(NamedTuple):
+    ends: tuple[float, ...]
+    starts: tuple[float, ...]
+
+    # Готовые результаты поиска: во время пары и перед ней
+    during: tuple[NowNext, ...]
+    before: tuple[NowNext, ...]
+
+
+class _Schedule:
+    __slots__ = ("weeks", "index")
+
+    weeks: dict[str, list[LessonSlot]]
+
+    # Заменяется одним присваиванием, поэтому поиск из другого потока видит
+    # либо старый, либо новый индекс целиком.
+    index: _Lookup
+
+    def __init__(self) -> None:
+        self.weeks = {}
+        self.index = _Lookup((), (), (), ())
+
+    def rebuild(self) -> None:
+        # Недели не пересекаются, поэтому достаточно упорядочить их самих.
+        slots = [slot
+                 for week_id in sorted(self.weeks, key=lambda w: self.weeks[w][0].start)
+                 for slot in self.weeks[week_id]]
+        self.index = _Lookup(
+            tuple(slot.end for slot in slots),
+            tuple(slot.start for slot in slots),
+            tuple(NowNext(slot, following)
+                  for slot, following in zip(slots, [*slots[1:], None])),
+            tuple(NowNext(None, slot) for slot in slots),
+        )
+
+    def lookup(self, at: float) -> NowNext:
+        index = self.index
+        i = bisect_right(index.ends, at)
+        if i == len(index.ends):
+            return _EMPTY
+        return index.during[i] if index.starts[i] <= at else index.before[i]
+
+
+class NowIndex:
+    """
+    Индекс для поиска текущей и следующей пары.
+
+    Хранит расписание на ``weeks_ahead + 1`` недель, начиная с текущей.
+    Расписание на другие недели при обновлении пропускается, а прошедшие
+    недели удаляются при обновлении и методом :meth:`prune`.
+
+    :param bells: расписание звонков
+    :param tz: часовой пояс расписания звонков
+    :param weeks_ahead: сколько следующих недель хранить
+    :param clock: функция, которая возвращает текущее время (Unix time)
+    """
+
+    _groups: dict[str, _Schedule]
+    _teachers: dict[str, _Schedule]
+
+    def __init__(self, *, bells: Sequence[Bell] = DEFAULT_BELLS,
+                 tz: tzinfo = YEKATERINBURG, weeks_ahead: int = 1,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.bells = tuple(bells)
+        self.tz = tz
+        self.weeks_ahead = weeks_ahead
+        self.clock = clock
+        self._groups = {}
+        self._teachers = {}
+
+    @classmethod
+    def from_sqlite(cls, conn: sqlite3.Connection, *, instance: str = "",
+                    bells: Sequence[Bell] = DEFAULT_BELLS, tz: tzinfo = YEKATERINBURG,
+                    weeks_ahead: int = 1,
+                    clock: Callable[[], float] = time.time) -> "NowIndex":
+        """
+        Строит индекс по расписанию групп и преподавателей из базы данных.
+
+        :param conn: база данных SQLite
+        :param instance: сайт личного кабинета
+
+        Остальные параметры — как у конструктора.
+        """
+
+        index = cls(bells=bells, tz=tz, weeks_ahead=weeks_ahead, clock=clock)
+        for week in index.weeks():
+            for timetable, group, _ in load_timetables(conn, week=week, instance=instance):
+                index.update_group(timetable, group, week)
+            for teacher_timetable, teacher_id, _ in load_teacher_timetables(
+                conn, week=week, instance=instance
+            ):
+                index.update_teacher(teacher_timetable, teacher_id, week)
+        return index
+
+    def current_week(self) -> Week:
+        """
+        :returns: текущая неделя в часовом поясе индекса
+        """
+
+        today = datetime.fromtimestamp(self.clock(), self.tz).date()
+        return Week(today - timedelta(days=today.weekday()))
+
+    def weeks(self) -> list[Week]:
+        """
+        :returns: недели, которые хранит индекс
+        """
+
+        current = self.current_week()
+        return [current + offset for offset in range(self.weeks_ahead + 1)]
+
+    def _slots(self, cells: Iterable[tuple[int, int, tuple[Lesson, ...]]],
+               week: Week) -> list[LessonSlot]:
+        result: list[LessonSlot] = []
+        for day_num, lesson_num, lessons in cells:
+            if lesson_num >= len(self.bells) or not lessons:
+                continue
+            day: date = week.monday + timedelta(days=day_num)
+            start, end = self.bells[lesson_num]
+            result.append(LessonSlot(datetime.combine(day, start, self.tz).timestamp(),
+                                     datetime.combine(day, end, self.tz).timestamp(),
+                                     week.week_id, day_num, lesson_num, lessons))
+        result.sort(key=lambda slot: slot.start)
+        return result
+
+    def _update(self, schedules: dict[str, _Schedule], key: str, week: Week,
+                slots: list[LessonSlot]) -> None:
+        weeks = {w.week_id for w in self.weeks()}
+        if week.week_id not in weeks:
+            return
+        schedule = schedules.get(key)
+        if schedule is None:
+            schedule = schedules[key] = _Schedule()
+        for week_id in [w for w in schedule.weeks if w not in weeks]:
+            del schedule.weeks[week_id]
+        if slots:
+            schedule.weeks[week.week_id] = slots
+        else:
+            schedule.weeks.pop(week.week_id, None)
+        if schedule.weeks:
+            schedule.rebuild()
+        else:
+            del schedules[key]
+
+    def update_group(self, timetable: Timetable[Lesson], group: str, week: Week) -> None:
+        """
+        Заменяет расписание группы на неделю.
+
+        :param timetable: расписание группы
+        :param group: номер группы
+        :param week: неделя
+        """
+
+        cells = ((day_num, lesson_num, (lesson,))
+                 for day_num, day in enumerate(timetable)
+                 for lesson_num, lesson in day.items())
+        self._update(self._groups, group, week, self._slots(cells, week))
+
+    def update_teacher(self, timetable: Timetable[list[Lesson]], teacher_id: str,
+                       week: Week) -> None:
+        """
+        Заменяет расписание преподавателя на неделю.
+
+        :param timetable: расписание преподавателя
+        :param teacher_id: UUID преподавателя
+        :param week: неделя
+        """
+
+        cells = ((day_num, lesson_num, tuple(lessons))
+                 for day_num, day in enumerate(timetable)
+                 for lesson_num, lessons in day.items())
+        self._update(self._teachers, teacher_id, week, self._slots(cells, week))
+
+    def prune(self) -> None:
+        """
+        Удаляет прошедшие недели из индекса.
+        """
+
+        weeks = {w.week_id for w in self.weeks()}
+        for schedules in (self._groups, self._teachers):
+            for key, schedule in list(schedules.items()):
+                old = [week_id for week_id in schedule.weeks if week_id not in weeks]
+                if not old:
+                    continue
+                for week_id in old:
+                    del schedule.weeks[week_id]
+                if schedule.weeks:
+                    schedule.rebuild()
+                else:
+                    del schedules[key]
+
+    def group(self, group: str, at: float | None = None) -> NowNext:
+        """
+        Ищет текущую и следующую пару группы.
+
+        :param group: номер группы
+        :param at: время (Unix time, по умолчанию текущее)
+        """
+
+        schedule = self._groups.get(group)
+        if schedule is None:
+            return _EMPTY
+        return schedule.lookup(self.clock() if at is None else at)
+
+    def teacher(self, teacher_id: str, at: float | None = None) -> NowNext:
+        """
+        Ищет текущую и следующую пару преподавателя.
+
+        :param teacher_id: UUID преподавателя
+        :param at: время (Unix time, по умолчанию текущее)
+        """
+
+        schedule = self._teachers.get(teacher_id)
+        if schedule is None:
+            return _EMPTY
+        return schedule.lookup(self.clock() if at is None else at)
+
+
+def now_callback(index: NowIndex) -> TimetableCallback:
+    """
+    Обновляет индекс текущих пар по расписанию группы.
+
+    :param index: индекс
+    :returns: коллбэк-функция для расписания группы
+    """
+
+    def callback(timetable: Timetable[Lesson], group: str, week: Week) -> None:
+        index.update_group(timetable, group, week)
+
+    return callback
+
+
+def now_teacher_callback(index: NowIndex) -> TeacherTimetableCallback:
+    """
+    Обновляет индекс текущих пар по расписанию преподавателя.
+
+    :param index: индекс
+    :returns: коллбэк-функция для расписания преподавателя
+    """
+
+    def callback(timetable: Timetable[list[Lesson]], teacher: Teacher, week: Week) -> None:
+        index.update_teacher(timetable, teacher.id, week)
+
+    return callback
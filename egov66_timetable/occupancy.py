@@ -0,0 +1,246 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Занятость аудиторий.
+
+Индекс хранит для каждого времени ``(неделя, номер_дня, номер_пары)`` битовую
+маску занятых аудиторий, поэтому поиск свободных аудиторий сводится к одной
+битовой операции.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable
+
+from egov66_timetable import TimetableCallback
+from egov66_timetable.types import Conflict, Lesson, Timetable, Week
+
+# week_id, day_num, lesson_num
+type Slot = tuple[str, int, int]
+
+
+class OccupancyIndex:
+    """
+    Индекс занятости аудиторий.
+
+    Расписание добавляется методом :meth:`update` целиком для группы и недели.
+    Повторный вызов для той же группы и недели заменяет прежние данные, поэтому
+    индекс можно обновлять по мере поступления нового расписания.
+    """
+
+    #: Аудитории в порядке их номеров в битовой маске.
+    rooms: list[str]
+
+    _room_bits: dict[str, int]
+    _all_rooms: int
+
+    # битовая маска занятых аудиторий
+    _occupied: dict[Slot, int]
+
+    # {аудитория: [(группа, предмет), ...]}
+    _occupants: defaultdict[Slot, defaultdict[str, list[tuple[str, str]]]]
+
+    # {(группа, неделя): [(номер_дня, номер_пары, аудитория, предмет), ...]}
+    _by_group: dict[tuple[str, str], list[tuple[int, int, str, str]]]
+
+    # {(время, аудитория), ...}
+    _conflicts: set[tuple[Slot, str]]
+
+    def __init__(self, rooms: Iterable[str] = ()) -> None:
+        """
+        :param rooms: список всех аудиторий. Аудитории, которые встретятся в
+            расписании, будут добавлены автоматически.
+        """
+
+        self.rooms = []
+        self._room_bits = {}
+        self._all_rooms = 0
+        self._occupied = {}
+        self._occupants = defaultdict(lambda: defaultdict(list))
+        self._by_group = {}
+        self._conflicts = set()
+
+        for room in rooms:
+            self.add_room(room)
+
+    @classmethod
+    def from_timetables(
+        cls, timetables: Iterable[tuple[Timetable[Lesson], str, Week]], *,
+        rooms: Iterable[str] = ()
+    ) -> "OccupancyIndex":
+        """
+        Строит индекс по расписанию групп.
+
+        Подходит и для расписания из памяти, и для расписания из базы данных
+        (см. :func:`load_timetables
+        <egov66_timetable.callbacks.sqlite.load_timetables>`).
+
+        :param timetables: кортежи ``(расписание, группа, неделя)``
+        :param rooms: список всех аудиторий
+        """
+
+        index = cls(rooms)
+        for timetable, group, week in timetables:
+            index.update(timetable, group, week)
+        return index
+
+    def add_room(self, room: str) -> int:
+        """
+        Добавляет аудиторию в индекс.
+
+        :param room: номер аудитории
+        :returns: бит аудитории в маске
+        """
+
+        if (bit := self._room_bits.get(room)) is None:
+            bit = 1 << len(self.rooms)
+            self.rooms.append(room)
+            self._room_bits[room] = bit
+            self._all_rooms |= bit
+        return bit
+
+    def _mask_to_rooms(self, mask: int) -> list[str]:
+        result: list[str] = []
+        while mask:
+            low = mask & -mask
+            result.append(self.rooms[low.bit_length() - 1])
+            mask ^= low
+        return sorted(result)
+
+    def _check_conflict(self, slot: Slot, room: str,
+                        occupants: list[tuple[str, str]]) -> None:
+        if len({name for _, name in occupants}) > 1:
+            self._conflicts.add((slot, room))
+        else:
+            self._conflicts.discard((slot, room))
+
+    def _add(self, slot: Slot, room: str, group: str, name: str) -> None:
+        self._occupied[slot] = self._occupied.get(slot, 0) | self.add_room(room)
+        occupants = self._occupants[slot][room]
+        occupants.append((group, name))
+        if len(occupants) > 1:
+            self._check_conflict(slot, room, occupants)
+
+    def _remove(self, slot: Slot, room: str, group: str, name: str) -> None:
+        occupants = self._occupants[slot][room]
+        occupants.remove((group, name))
+        self._check_conflict(slot, room, occupants)
+        if len(occupants) == 0:
+            del self._occupants[slot][room]
+            self._occupied[slot] &= ~self._room_bits[room]
+
+    def update(self, timetable: Timetable[Lesson], group: str, week: Week | str) -> None:
+        """
+        Заменяет в индексе расписание группы на неделю.
+
+        :param timetable: расписание группы
+        :param group: номер группы
+        :param week: неделя
+        """
+
+        week_id = week.week_id if isinstance(week, Week) else week
+        new = [
+            (day_num, lesson_num, classroom, name)
+            for day_num, day in enumerate(timetable)
+            for lesson_num, cell in day.items()
+            for _, (classroom, name) in (
+                cell.lessons if isinstance(cell, Conflict) else [cell]
+            )
+            if classroom not in ("", "?")
+        ]
+
+        for day_num, lesson_num, room, name in self._by_group.pop((group, week_id), []):
+            self._remove((week_id, day_num, lesson_num), room, group, name)
+        for day_num, lesson_num, room, name in new:
+            self._add((week_id, day_num, lesson_num), room, group, name)
+
+        if new:
+            self._by_group[(group, week_id)] = new
+
+    def occupied_rooms(self, week: Week | str, day_num: int, lesson_num: int) -> list[str]:
+        """
+        :param week: неделя
+        :param day_num: номер дня недели (``0`` — понедельник)
+        :param lesson_num: номер пары (начиная с нуля)
+        :returns: отсортированный список занятых аудиторий
+        """
+
+        week_id = week.week_id if isinstance(week, Week) else week
+        return self._mask_to_rooms(self._occupied.get((week_id, day_num, lesson_num), 0))
+
+    def free_rooms(self, week: Week | str, day_num: int, lesson_num: int) -> list[str]:
+        """
+        :param week: неделя
+        :param day_num: номер дня недели (``0`` — понедельник)
+        :param lesson_num: номер пары (начиная с нуля)
+        :returns: отсортированный список свободных аудиторий
+        """
+
+        week_id = week.week_id if isinstance(week, Week) else week
+        occupied = self._occupied.get((week_id, day_num, lesson_num), 0)
+        return self._mask_to_rooms(self._all_rooms & ~occupied)
+
+    def is_free(self, room: str, week: Week | str, day_num: int, lesson_num: int) -> bool:
+        """
+        :param room: номер аудитории
+        :param week: неделя
+        :param day_num: номер дня недели (``0`` — понедельник)
+        :param lesson_num: номер пары (начиная с нуля)
+        :returns: свободна ли аудитория
+        """
+
+        week_id = week.week_id if isinstance(week, Week) else week
+        occupied = self._occupied.get((week_id, day_num, lesson_num), 0)
+        return not occupied & self._room_bits.get(room, 0)
+
+    def occupants(self, room: str, week: Week | str,
+                  day_num: int, lesson_num: int) -> list[tuple[str, str]]:
+        """
+        :param room: номер аудитории
+        :param week: неделя
+        :param day_num: номер дня недели (``0`` — понедельник)
+        :param lesson_num: номер пары (начиная с нуля)
+        :returns: список пар ``(группа, предмет)``, которые проходят в аудитории
+        """
+
+        week_id = week.week_id if isinstance(week, Week) else week
+        slot = (week_id, day_num, lesson_num)
+        if slot not in self._occupants:
+            return []
+        return list(self._occupants[slot].get(room, []))
+
+    def conflicts(self, week: Week | str) -> list[tuple[Slot, str, list[tuple[str, str]]]]:
+        """
+        Ищет аудитории, в которых в одно и то же время проходят разные
+        предметы. Если у нескольких групп в одной аудитории один и тот же
+        предмет, это считается совмещенной парой, а не конфликтом.
+
+        :param week: неделя
+        :returns: список кортежей ``(время, аудитория, [(группа, предмет), ...])``
+        """
+
+        week_id = week.week_id if isinstance(week, Week) else week
+        return [
+            (slot, room, sorted(self._occupants[slot][room]))
+            for slot, room in sorted(self._conflicts)
+            if slot[0] == week_id
+        ]
+
+
+def occupancy_callback(index: OccupancyIndex) -> TimetableCallback:
+    """
+    Обновляет индекс занятости аудиторий.
+
+    Если указать этот коллбэк после :func:`sqlite_callback
+    <egov66_timetable.callbacks.sqlite.sqlite_callback>`, индекс будет
+    обновляться вместе с базой данных.
+
+    :param index: индекс занятости аудиторий
+    :returns: коллбэк-функция для расписания группы
+    """
+
+    def callback(timetable: Timetable[Lesson], group: str, week: Week) -> None:
+        index.update(timetable, group, week)
+
+    return callback
@@ -0,0 +1,312 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Профилирование пакетного запуска по этапам: загрузка расписания (``fetch``),
+составление расписания (``build``), коллбэки (``callback``) и запись
+результата (``persist``).
+
+Для каждого этапа собирается отдельная статистика :mod:`cProfile`, а
+:mod:`tracemalloc` показывает, какие строки кода выделили память, которая
+осталась занятой после этапа. По окончании запуска в каталог
+:file:`{profile_dir}/{время}-{pid}` записываются файлы :file:`{этап}.pstats`
+(их можно открыть в ``python -m pstats`` или snakeviz) и отчет
+:file:`report.txt`.
+
+Этапы могут быть вложенными (запись в базу данных выполняется внутри
+коллбэка): время и память вложенного этапа учитываются только у него. Пока
+профилирование выключено, :func:`stage` возвращает один и тот же пустой
+контекстный менеджер и почти ничего не стоит.
+
+Профилировщик в Python один на весь процесс, поэтому при параллельной
+загрузке (``workers > 1``) работает статистика только одного этапа: того,
+который начался последним среди еще не завершенных во всех потоках. Вызовы из
+других потоков учитываются у него же, а профилирование не прерывается, пока
+хотя бы один поток находится внутри этапа. Точные результаты получаются с
+одним потоком.
+"""
+
+import contextlib
+import cProfile
+import linecache
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from pathlib import Path
+from typing import Literal
+
+from egov66_timetable.types.settings import Settings
+
+type Stage = Literal["fetch", "build", "callback", "persist"]
+
+#: Этапы в порядке вывода в отчете.
+STAGES: tuple[Stage, ...] = ("fetch", "build", "callback", "persist")
+
+#: Сколько строк кода с наибольшим выделением памяти выводить для этапа.
+TOP_ALLOCATIONS = 25
+
+logger = logging.getLogger(__name__)
+
+_NULL_STAGE: AbstractContextManager[None] = contextlib.nullcontext()
+
+# Память, выделенная самим профилировщиком, не учитывается. Снимки не
+# фильтруются целиком (Snapshot.filter_traces), это в десятки раз медленнее.
+_IGNORED_FILES = frozenset({tracemalloc.__file__, __file__})
+
+
+def _format_size(size: int) -> str:
+    if abs(size) < 1024:
+        return f"{size:+d} Б"
+    if abs(size) < 1024**2:
+        return f"{size / 1024:+.1f} КиБ"
+    return f"{size / 1024**2:+.1f} МиБ"
+
+
+class Profiler:
+    """
+    Сборщик статистики по этапам.
+
+    :param memory: отслеживать ли выделение памяти (снимок :mod:`tracemalloc`
+        делается на каждой границе этапов, что заметно замедляет работу)
+    :param top: сколько строк кода выводить в отчете о памяти
+    """
+
+    #: Статистика cProfile по этапам.
+    profiles: dict[Stage, cProfile.Profile]
+
+    #: Количество вызовов этапа.
+    calls: dict[Stage, int]
+
+    #: Суммарное время этапа (в секундах, без вложенных этапов).
+    durations: dict[Stage, float]
+
+    #: Память, оставшаяся занятой после этапа: ``{(файл, строка): [байты, блоки]}``.
+    allocations: dict[Stage, dict[tuple[str, int], list[int]]]
+
+    _lock: threading.RLock
+    _open: list[tuple[int, Stage]]
+    _nested: dict[int, list[float]]
+    _active: Stage | None
+    _snapshot: tracemalloc.Snapshot | None
+    _started_tracemalloc: bool
+
+    def __init__(self, *, memory: bool = True, top: int = TOP_ALLOCATIONS) -> None:
+        self.memory = memory
+        self.top = top
+        self.profiles = {stage: cProfile.Profile() for stage in STAGES}
+        self.calls = dict.fromkeys(STAGES, 0)
+        self.durations = dict.fromkeys(STAGES, 0.0)
+        self.allocations = {stage: {} for stage in STAGES}
+        self._lock = threading.RLock()
+        self._open = []
+        self._nested = {}
+        self._active = None
+        self._snapshot = None
+        self._started_tracemalloc = False
+
+    def start(self) -> None:
+        """
+        Начинает отслеживать выделение памяти.
+        """
+
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def stop(self) -> None:
+        """
+        Завершает профилирование.
+        """
+
+        with self._lock:
+            self._switch(None)
+            self._snapshot = None
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def _switch(self, stage: Stage | None) -> None:
+        # Вызывается под блокировкой.
+        if stage == self._active:
+            return
+        if self._active is not None:
+            self.profiles[self._active].disable()
+
+        if self._snapshot is not None:
+            snapshot = tracemalloc.take_snapshot()
+            if self._active is not None:
+                allocations = self.allocations[self._active]
+                for stat in snapshot.compare_to(self._snapshot, "lineno"):
+                    if not stat.size_diff and not stat.count_diff:
+                        continue
+                    frame = stat.traceback[0]
+                    if frame.filename in _IGNORED_FILES or frame.filename.startswith("<"):
+                        continue
+                    entry = allocations.setdefault((frame.filename, frame.lineno), [0, 0])
+                    entry[0] += stat.size_diff
+                    entry[1] += stat.count_diff
+            self._snapshot = snapshot
+
+        if stage is not None:
+            self.profiles[stage].enable()
+        self._active = stage
+
+    @contextlib.contextmanager
+    def stage(self, stage: Stage) -> Iterator[None]:
+        """
+        Относит выполнение блока кода к этапу.
+
+        :param stage: этап
+        """
+
+        entry = (threading.get_ident(), stage)
+        with self._lock:
+            self._open.append(entry)
+            # Время вложенных этапов этого потока вычитается из времени этапа
+            nested = self._nested.setdefault(entry[0], [])
+            nested.append(0.0)
+            self._switch(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                # Этапы одного потока вложены, поэтому удаляется последний
+                # открытый этим потоком; этапы других потоков остаются.
+                for i in range(len(self._open) - 1, -1, -1):
+                    if self._open[i] == entry:
+                        del self._open[i]
+                        break
+                own = duration - nested.pop()
+                if nested:
+                    nested[-1] += duration
+                else:
+                    del self._nested[entry[0]]
+                self.calls[stage] += 1
+                self.durations[stage] += own
+                self._switch(self._open[-1][1] if self._open else None)
+
+    def report(self) -> str:
+        """
+        :returns: отчет о времени и памяти по этапам
+        """
+
+        lines: list[str] = []
+        for stage in STAGES:
+            if not self.calls[stage]:
+                continue
+            allocations = self.allocations[stage]
+            total = sum(size for size, _ in allocations.values())
+            lines.append(f"Этап {stage}: вызовов {self.calls[stage]}, "
+                         f"{self.durations[stage]:.3f} с, память {_format_size(total)}")
+            top = sorted(allocations.items(), key=lambda item: -abs(item[1][0]))
+            for (filename, lineno), (size, count) in top[:self.top]:
+                if not size:
+                    continue
+                lines.append(f"  {_format_size(size):>12} {count:+8d} блоков  "
+                             f"{filename}:{lineno}")
+                if source := linecache.getline(filename, lineno).strip():
+                    lines.append(f"      {source}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def write(self, out_dir: str | Path) -> None:
+        """
+        Записывает статистику cProfile и отчет в каталог.
+
+        :param out_dir: каталог
+        """
+
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for stage in STAGES:
+            if self.calls[stage]:
+                pstats.Stats(self.profiles[stage]).dump_stats(out_dir / f"{stage}.pstats")
+        (out_dir / "report.txt").write_text(self.report())
+        logger.info("Результаты профилирования записаны в каталог %s", out_dir)
+
+
+_profiler: Profiler | None = None
+
+
+def stage(name: Stage) -> AbstractContextManager[None]:
+    """
+    Относит выполнение блока кода к этапу, если профилирование включено.
+
+    .. code-block:: python
+
+       with profiling.stage("persist"):
+           conn.commit()
+
+    :param name: этап
+    """
+
+    if _profiler is None:
+        return _NULL_STAGE
+    return _profiler.stage(name)
+
+
+def get_profiler() -> Profiler | None:
+    """
+    :returns: текущий сборщик статистики, если профилирование включено
+    """
+
+    return _profiler
+
+
+def enable(*, memory: bool = True) -> Profiler:
+    """
+    Включает профилирование.
+
+    :param memory: отслеживать ли выделение памяти
+    :returns: сборщик статистики
+    """
+
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(memory=memory)
+        _profiler.start()
+    return _profiler
+
+
+def disable() -> None:
+    """
+    Выключает профилирование. Собранная статистика теряется.
+    """
+
+    global _profiler
+    if _profiler is not None:
+        _profiler.stop()
+    _profiler = None
+
+
+@contextlib.contextmanager
+def profile_run(settings: Settings) -> Iterator[None]:
+    """
+    Включает профилирование на время запуска, если в настройках указан
+    каталог ``profile_dir``, и записывает результаты в его подкаталог по
+    окончании. Если профилирование уже включено, ничего не делает.
+
+    :param settings: настройки
+    """
+
+    path = settings.get("profile_dir")
+    if path is None or _profiler is not None:
+        yield
+        return
+
+    profiler = enable()
+    try:
+        yield
+    finally:
+        disable()
+        profiler.write(Path(path, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"))
@@ -0,0 +1,293 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Ограничение частоты запросов к личному кабинету.
+
+Ограничение включается настройкой ``rate_limit``. Все клиенты процесса,
+которые работают с одним сайтом, берут разрешение на запрос из общего «ведра с
+токенами». Если указан файл состояния, ведро хранится в базе данных SQLite и
+общее для всех процессов.
+
+Частота подстраивается под сайт: после ответов 429 и 5xx, истечения времени
+ожидания и слишком долгих ответов она уменьшается вдвое, а после каждого
+успешного запроса понемногу растет, пока сайт справляется, но не выше
+``max_rate``, если он указан.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from urllib.parse import urlparse
+
+from egov66_timetable import metrics
+from egov66_timetable.types.settings import RateLimitSettings, Settings
+
+#: Начальная частота запросов по умолчанию (запросов в секунду).
+DEFAULT_RATE = 5.0
+
+#: Во сколько раз уменьшается частота после ошибки.
+DECREASE_FACTOR = 0.5
+
+#: На сколько увеличивается частота после успешного запроса.
+INCREASE_STEP = 0.1
+
+#: Ответ дольше этого времени (в секундах) считается признаком перегрузки.
+LATENCY_THRESHOLD = 2.0
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    host    TEXT PRIMARY KEY,
+    tokens  REAL NOT NULL,
+    updated REAL NOT NULL,
+    rate    REAL NOT NULL
+)
+"""
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов к одному сайту по алгоритму «ведро с
+    токенами» с аддитивным увеличением и мультипликативным уменьшением
+    частоты.
+    """
+
+    #: Имя хоста.
+    host: str
+
+    #: Текущая частота (запросов в секунду).
+    rate: float
+
+    #: Наибольшая частота.
+    max_rate: float
+
+    #: Наименьшая частота.
+    min_rate: float
+
+    #: Размер ведра: сколько запросов можно сделать подряд без ожидания.
+    burst: float
+
+    #: Ответ дольше этого времени (в секундах) считается признаком перегрузки.
+    latency_threshold: float
+
+    _tokens: float
+    _updated: float
+    _last_decrease: float
+    _lock: threading.Lock
+    _db_lock: threading.Lock
+    _conn: sqlite3.Connection | None
+    _clock: Callable[[], float]
+    _sleep: Callable[[float], None]
+
+    def __init__(self, host: str, rate: float = DEFAULT_RATE, *,
+                 burst: float | None = None, min_rate: float | None = None,
+                 max_rate: float | None = None,
+                 latency_threshold: float = LATENCY_THRESHOLD,
+                 state_file: str | Path | None = None,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        """
+        :param host: имя хоста
+        :param rate: начальная частота (запросов в секунду)
+        :param burst: размер ведра (по умолчанию равен ``rate``)
+        :param min_rate: наименьшая частота (по умолчанию ``rate / 20``)
+        :param max_rate: наибольшая частота, до которой она растет после
+            успешных запросов (по умолчанию не ограничена)
+        :param latency_threshold: ответ дольше этого времени (в секундах)
+            считается признаком перегрузки
+        :param state_file: база данных SQLite, через которую ведро разделяется
+            между процессами
+        :param clock: источник времени
+        :param sleep: функция ожидания
+        :raises ValueError: частота не положительна или больше ``max_rate``
+        """
+
+        if (rate <= 0 or min_rate is not None and min_rate <= 0
+                or max_rate is not None and max_rate < rate):
+            raise ValueError("частота запросов должна быть положительной и не "
+                             "больше max_rate")
+
+        self.host = host
+        self.rate = rate
+        self.max_rate = max_rate if max_rate is not None else float("inf")
+        self.min_rate = min_rate if min_rate is not None else rate / 20
+        self.burst = max(burst if burst is not None else rate, 1.0)
+        self.latency_threshold = latency_threshold
+
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        self._conn = None
+        if state_file is not None:
+            self._conn = sqlite3.connect(state_file, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            self._conn.execute(SCHEMA)
+
+        metrics.RATE_LIMIT.set(self.rate, host=host)
+
+    @classmethod
+    def from_settings(cls, host: str, settings: RateLimitSettings) -> "RateLimiter":
+        """
+        :param host: имя хоста
+        :param settings: настройки ограничения частоты
+        """
+
+        return cls(host, settings.get("rate", DEFAULT_RATE),
+                   burst=settings.get("burst"), min_rate=settings.get("min_rate"),
+                   max_rate=settings.get("max_rate"),
+                   latency_threshold=settings.get("latency_threshold", LATENCY_THRESHOLD),
+                   state_file=settings.get("state_file"))
+
+    def _refill(self, tokens: float, updated: float, rate: float,
+                now: float) -> tuple[float, float]:
+        tokens = min(self.burst, tokens + max(now - updated, 0) * rate)
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / rate
+
+    def _take(self) -> float:
+        """
+        Берет токен, если он есть.
+
+        :returns: сколько секунд подождать перед следующей попыткой (``0`` —
+            токен взят)
+        """
+
+        now = self._clock()
+        if self._conn is None:
+            self._tokens, wait = self._refill(self._tokens, self._updated, self.rate, now)
+            self._updated = now
+            return wait
+
+        with self._db_lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated, rate FROM bucket WHERE host = ?",
+                                   (self.host,)).fetchone()
+                tokens, updated, rate = (row if row is not None
+                                         else (self.burst, now, self.rate))
+                self.rate = rate
+                tokens, wait = self._refill(tokens, updated, rate, now)
+                conn.execute("INSERT OR REPLACE INTO bucket VALUES (?, ?, ?, ?)",
+                             (self.host, tokens, now, rate))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def acquire(self) -> float:
+        """
+        Ждет, пока можно будет сделать запрос.
+
+        :returns: время ожидания в секундах
+        """
+
+        waited = 0.0
+        while True:
+            # Ожидание идет без блокировки, чтобы не задерживать feedback
+            with self._lock:
+                wait = self._take()
+            if wait <= 0:
+                break
+            self._sleep(wait)
+            waited += wait
+        metrics.RATE_LIMIT_WAIT.observe(waited, host=self.host)
+        return waited
+
+    def _set_rate(self, rate: float) -> None:
+        self.rate = rate
+        metrics.RATE_LIMIT.set(rate, host=self.host)
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.execute("UPDATE bucket SET rate = ? WHERE host = ?",
+                                   (rate, self.host))
+
+    def feedback(self, status: int | str, duration: float) -> None:
+        """
+        Подстраивает частоту по результату запроса.
+
+        :param status: код ответа или ``"timeout"``
+        :param duration: длительность запроса в секундах
+        """
+
+        now = self._clock()
+        overloaded = (status == "timeout" or status == 429
+                      or isinstance(status, int) and status >= 500
+                      or duration > self.latency_threshold)
+        with self._lock:
+            if overloaded:
+                # Параллельные запросы часто получают ошибку одновременно,
+                # поэтому частота уменьшается не чаще одного раза в секунду
+                if now - self._last_decrease < 1:
+                    return
+                self._last_decrease = now
+                rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+                logger.warning("Сайт %s перегружен (%s, %.1f с), частота запросов "
+                               "снижена до %.2f в секунду", self.host, status, duration, rate)
+                self._set_rate(rate)
+            elif self.rate < self.max_rate:
+                self._set_rate(min(self.max_rate, self.rate + INCREASE_STEP))
+
+    def close(self) -> None:
+        """
+        Закрывает базу данных с состоянием.
+        """
+
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(settings: Settings) -> RateLimiter | None:
+    """
+    Возвращает общий для процесса ограничитель частоты запросов к сайту из
+    настроек. Ограничитель создается при первом вызове с настройками
+    ``rate_limit`` (по умолчанию начальная частота :data:`DEFAULT_RATE`
+    запросов в секунду).
+
+    :param settings: настройки
+    :returns: ограничитель или ``None``, если ограничение не включено
+        (``rate_limit`` не указан или равен ``false``)
+    """
+
+    limit_settings = settings.get("rate_limit")
+    if limit_settings is None or limit_settings is False:
+        return None
+
+    host = urlparse(settings["instance"]).netloc
+    with _limiters_lock:
+        if (limiter := _limiters.get(host)) is None:
+            limiter = _limiters[host] = RateLimiter.from_settings(
+                host, limit_settings
+            )
+    return limiter
+
+
+def reset() -> None:
+    """
+    Удаляет все ограничители. Следующий вызов :func:`get_limiter` создаст их
+    заново с новыми настройками.
+    """
+
+    with _limiters_lock:
+        for limiter in _limiters.values():
+            limiter.close()
+        _limiters.clear()
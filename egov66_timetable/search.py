@@ -0,0 +1,369 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Поиск групп, преподавателей, предметов и аудиторий по строке запроса.
+
+Каждая запись разбивается на слова, и к ним добавляется их транслитерация
+(:data:`iuliia.MOSMETRO`, как в :attr:`Teacher.translit
+<egov66_timetable.types.Teacher.translit>`), поэтому запросы «мендел» и
+«mendel» находят одного и того же преподавателя. Слово запроса совпадает со
+словом записи, если является его началом. Если таких слов нет, слово
+записи ищется по общим триграммам, что позволяет находить записи с опечатками.
+
+Индекс обновляется по одной записи, поэтому его можно строить коллбэками по
+мере получения расписания.
+"""
+
+import heapq
+import re
+import sqlite3
+from bisect import bisect_left, insort
+from collections import Counter
+from collections.abc import Iterable
+from itertools import chain
+from typing import Literal, NamedTuple
+
+import iuliia
+
+from egov66_timetable import TeacherTimetableCallback, TimetableCallback
+from egov66_timetable.types import Conflict, Lesson, Teacher, Timetable, Week
+
+type SearchKind = Literal["group", "teacher", "discipline", "room"]
+
+#: Наименьшая доля общих триграмм, при которой слова считаются похожими.
+MIN_SIMILARITY = 0.3
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+class SearchResult(NamedTuple):
+    """
+    Найденная запись.
+    """
+
+    #: Вид записи.
+    kind: SearchKind
+
+    #: Номер группы, UUID преподавателя, название предмета или номер
+    #: аудитории.
+    key: str
+
+    #: Название для показа пользователю.
+    title: str
+
+    #: Насколько запись подходит под запрос (больше — лучше).
+    score: float
+
+
+def _words(text: str) -> list[str]:
+    return _WORD.findall(text.lower().replace("ё", "е"))
+
+
+def _terms(text: str) -> set[str]:
+    words = _words(text)
+    if len(words) > 1:
+        # «ИСП-21» находится и по запросу «исп21»
+        words.append("".join(words))
+    terms = set(words)
+    terms.update(iuliia.MOSMETRO.translate(word) for word in words)
+    return terms
+
+
+def _trigrams(term: str) -> frozenset[str]:
+    # Как в pg_trgm: начало слова весит больше, чем конец
+    padded = f"  {term} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class SearchIndex:
+    """
+    Поисковый индекс.
+    """
+
+    # {номер записи: (вид, ключ, название)}, {номер записи: слова}
+    _entries: dict[int, tuple[SearchKind, str, str]]
+    _entry_terms: dict[int, set[str]]
+    _ids: dict[tuple[SearchKind, str], int]
+    _next_id: int
+
+    # {слово: номера записей}, слова в порядке сортировки
+    _postings: dict[str, set[int]]
+    _sorted_terms: list[str]
+
+    # {триграмма: слова}, {слово: триграммы}
+    _trigrams: dict[str, set[str]]
+    _term_trigrams: dict[str, frozenset[str]]
+
+    def __init__(self) -> None:
+        self._entries = {}
+        self._entry_terms = {}
+        self._ids = {}
+        self._next_id = 0
+        self._postings = {}
+        self._sorted_terms = []
+        self._trigrams = {}
+        self._term_trigrams = {}
+
+    @classmethod
+    def from_sqlite(cls, conn: sqlite3.Connection, *, instance: str = "",
+                    teachers: Iterable[Teacher] = (),
+                    groups: Iterable[str] = ()) -> "SearchIndex":
+        """
+        Строит индекс по группам, предметам и аудиториям из сводных таблиц
+        базы данных (см. :mod:`egov66_timetable.callbacks.sqlite.summary`).
+
+        В базе данных хранятся только UUID преподавателей, поэтому
+        преподавателей нужно передать отдельно.
+
+        :param conn: база данных SQLite
+        :param instance: сайт личного кабинета
+        :param teachers: преподаватели
+        :param groups: группы, которых может не быть в базе данных
+        """
+
+        index = cls()
+        for teacher in teachers:
+            index.add_teacher(teacher)
+        for group in groups:
+            index.add("group", group)
+
+        cur = conn.execute(
+            """
+            SELECT DISTINCT
+              g.value, n.value
+            FROM
+              summary_group AS s
+              JOIN string AS g ON g.id = s.group_id
+              JOIN string AS n ON n.id = s.name
+            WHERE
+              s.instance = (SELECT id FROM string WHERE value = ?)
+            """,
+            [instance]
+        )
+        for group, name in cur:
+            index.add("group", group)
+            index.add("discipline", name)
+
+        cur = conn.execute(
+            """
+            SELECT DISTINCT
+              c.value
+            FROM
+              summary_room AS s
+              JOIN string AS c ON c.id = s.classroom
+            WHERE
+              s.instance = (SELECT id FROM string WHERE value = ?)
+            """,
+            [instance]
+        )
+        for (classroom,) in cur:
+            index.add("room", classroom)
+
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, item: tuple[SearchKind, str]) -> bool:
+        return item in self._ids
+
+    def add(self, kind: SearchKind, key: str, title: str | None = None,
+            text: str | None = None) -> None:
+        """
+        Добавляет запись или заменяет запись с тем же видом и ключом.
+        Записи без букв и цифр (например, пустой номер аудитории) пропускаются.
+
+        :param kind: вид записи
+        :param key: ключ записи
+        :param title: название для показа (по умолчанию ключ)
+        :param text: текст, по которому ищется запись (по умолчанию название)
+        """
+
+        title = key if title is None else title
+        terms = _terms(title if text is None else text)
+        if not terms:
+            return
+
+        entry_id = self._ids.get((kind, key))
+        if entry_id is not None:
+            if self._entries[entry_id][2] == title and self._entry_terms[entry_id] == terms:
+                return
+            self.remove(kind, key)
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (kind, key, title)
+        self._entry_terms[entry_id] = terms
+        self._ids[(kind, key)] = entry_id
+        for term in terms:
+            if (postings := self._postings.get(term)) is None:
+                postings = self._postings[term] = set()
+                insort(self._sorted_terms, term)
+                trigrams = self._term_trigrams[term] = _trigrams(term)
+                for trigram in trigrams:
+                    self._trigrams.setdefault(trigram, set()).add(term)
+            postings.add(entry_id)
+
+    def add_teacher(self, teacher: Teacher) -> None:
+        """
+        Добавляет преподавателя. Он ищется по фамилии, имени и отчеству.
+
+        :param teacher: преподаватель
+        """
+
+        self.add("teacher", teacher.id, teacher.initials,
+                 f"{teacher.surname} {teacher.given_name} {teacher.patronymic}")
+
+    def remove(self, kind: SearchKind, key: str) -> None:
+        """
+        Удаляет запись, если она есть.
+
+        :param kind: вид записи
+        :param key: ключ записи
+        """
+
+        entry_id = self._ids.pop((kind, key), None)
+        if entry_id is None:
+            return
+        del self._entries[entry_id]
+        for term in self._entry_terms.pop(entry_id):
+            postings = self._postings[term]
+            postings.discard(entry_id)
+            if not postings:
+                del self._postings[term]
+                del self._sorted_terms[bisect_left(self._sorted_terms, term)]
+                for trigram in self._term_trigrams.pop(term):
+                    terms = self._trigrams[trigram]
+                    terms.discard(term)
+                    if not terms:
+                        del self._trigrams[trigram]
+
+    def _similarity(self, trigrams: frozenset[str], term: str) -> float:
+        term_trigrams = self._term_trigrams[term]
+        count = len(trigrams & term_trigrams)
+        return count / (len(trigrams) + len(term_trigrams) - count)
+
+    def _match(self, word: str) -> dict[int, float]:
+        # Лучшая оценка совпадения слова запроса для каждой записи: от 0,5 до 1
+        # для начала слова, меньше 0,5 для похожего слова.
+        result: dict[int, float] = {}
+        terms = self._sorted_terms
+        i = bisect_left(terms, word)
+        while i < len(terms) and terms[i].startswith(word):
+            term = terms[i]
+            score = 0.5 + 0.5 * len(word) / len(term)
+            for entry_id in self._postings[term]:
+                if score > result.get(entry_id, 0.0):
+                    result[entry_id] = score
+            i += 1
+        if result or len(word) < 3:
+            return result
+
+        trigrams = _trigrams(word)
+        common = Counter(chain.from_iterable(self._trigrams.get(trigram, ())
+                                             for trigram in trigrams))
+        # Слово с меньшим числом общих триграмм не может быть похожим
+        min_count = MIN_SIMILARITY * len(trigrams)
+        for term, count in common.items():
+            if count < min_count:
+                continue
+            similarity = count / (len(trigrams) + len(self._term_trigrams[term]) - count)
+            if similarity < MIN_SIMILARITY:
+                continue
+            score = 0.5 * similarity
+            for entry_id in self._postings[term]:
+                if score > result.get(entry_id, 0.0):
+                    result[entry_id] = score
+        return result
+
+    def _match_entries(self, word: str, entry_ids: Iterable[int]) -> dict[int, float]:
+        # То же, что _match, но только среди уже найденных записей.
+        result: dict[int, float] = {}
+        for entry_id in entry_ids:
+            longest = max((len(word) / len(term) for term in self._entry_terms[entry_id]
+                           if term.startswith(word)), default=0.0)
+            if longest:
+                result[entry_id] = 0.5 + 0.5 * longest
+        if result or len(word) < 3:
+            return result
+
+        trigrams = _trigrams(word)
+        for entry_id in entry_ids:
+            similarity = max(self._similarity(trigrams, term)
+                             for term in self._entry_terms[entry_id])
+            if similarity >= MIN_SIMILARITY:
+                result[entry_id] = 0.5 * similarity
+        return result
+
+    def search(self, query: str, *, limit: int = 10,
+               kinds: Iterable[SearchKind] | None = None) -> list[SearchResult]:
+        """
+        Ищет записи, которые подходят под каждое слово запроса.
+
+        :param query: запрос
+        :param limit: сколько записей вернуть
+        :param kinds: виды записей (по умолчанию все)
+        :returns: записи, начиная с самой подходящей
+        """
+
+        # Сначала ищется самое длинное слово: обычно под него подходит меньше
+        # всего записей, и остальные слова проверяются только у них.
+        words = sorted(set(_words(query)), key=len, reverse=True)
+        if not words:
+            return []
+        scores = self._match(words[0])
+        for word in words[1:]:
+            if not scores:
+                break
+            matches = self._match_entries(word, scores)
+            scores = {entry_id: scores[entry_id] + score for entry_id, score in matches.items()}
+
+        allowed = None if kinds is None else set(kinds)
+        entries = self._entries
+        best = heapq.nsmallest(
+            limit,
+            ((-score, entries[entry_id][2], entry_id) for entry_id, score in scores.items()
+             if allowed is None or entries[entry_id][0] in allowed)
+        )
+        return [SearchResult(*entries[entry_id], -score) for score, _, entry_id in best]
+
+
+def search_callback(index: SearchIndex) -> TimetableCallback:
+    """
+    Добавляет в индекс группу, ее предметы и аудитории.
+
+    :param index: индекс
+    :returns: коллбэк-функция для расписания группы
+    """
+
+    def callback(timetable: Timetable[Lesson], group: str, week: Week) -> None:
+        index.add("group", group)
+        for day in timetable:
+            for cell in day.values():
+                for _, (classroom, name) in (
+                    cell.lessons if isinstance(cell, Conflict) else [cell]
+                ):
+                    index.add("discipline", name)
+                    index.add("room", classroom)
+
+    return callback
+
+
+def search_teacher_callback(index: SearchIndex) -> TeacherTimetableCallback:
+    """
+    Добавляет в индекс преподавателя и его предметы.
+
+    :param index: индекс
+    :returns: коллбэк-функция для расписания преподавателя
+    """
+
+    def callback(timetable: Timetable[list[Lesson]], teacher: Teacher, week: Week) -> None:
+        index.add_teacher(teacher)
+        for day in timetable:
+            for lessons in day.values():
+                for _, (_, name) in lessons:
+                    index.add("discipline", name)
+
+    return callback
@@ -0,0 +1,599 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+HTTP-сервис, который отдает расписание из базы данных SQLite.
+
+Боты и другие клиенты получают расписание в формате JSON вместо того, чтобы
+открывать базу данных самостоятельно:
+
+* ``GET /groups/<группа>/<неделя>`` — расписание группы;
+* ``GET /teachers/<UUID>/<неделя>`` — расписание преподавателя (известное по
+  :func:`~egov66_timetable.callbacks.sqlite.sqlite_teacher_callback`);
+* ``GET /classrooms/<аудитория>/<неделя>`` — расписание аудитории;
+* ``GET /weeks/<неделя>`` — расписание всех групп;
+* ``GET /changes?since=<Unix time>&limit=<N>`` — лента изменений.
+
+Неделя указывается в виде ``2026-3``. Документы имеют тот же вид, что и у
+:mod:`egov66_timetable.callbacks.json`.
+
+Расписание на неделю читается из базы данных одним запросом и хранится в кеше
+на заданное количество недель. Кеш сбрасывается, как только другое соединение
+(например, :func:`~egov66_timetable.callbacks.sqlite.sqlite_callback` в
+другом процессе) записывает изменения в базу данных, для этого проверяется
+``PRAGMA data_version``. На каждый ответ выдается ETag, и на повторный запрос с
+``If-None-Match`` сервис отвечает ``304 Not Modified``.
+
+Соединения keep-alive закрываются после :data:`IDLE_TIMEOUT` секунд простоя, а
+на чтение запроса дается :data:`READ_TIMEOUT` секунд. Запросы с более чем
+:data:`MAX_HEADERS` заголовками, с телом больше :data:`MAX_BODY` байт или с
+``Transfer-Encoding`` получают ``400 Bad Request``.
+
+Запуск:
+
+.. code-block:: shell
+
+   python -m egov66_timetable.server timetable.db --port 8080
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, NamedTuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from egov66_timetable import metrics
+from egov66_timetable.callbacks.sqlite import (
+    _blob_to_uuid,
+    decode_week,
+    load_teacher_timetables,
+    load_timetables,
+)
+from egov66_timetable.types import Lesson, LessonData, Timetable, Week
+from egov66_timetable.utils import trim_weekend
+
+#: Наибольшее количество изменений в одном ответе ленты изменений.
+MAX_CHANGES = 5000
+
+#: Сколько секунд ждать следующего запроса на keep-alive соединении.
+IDLE_TIMEOUT = 60.0
+
+#: Сколько секунд даётся на чтение заголовков и тела запроса.
+READ_TIMEOUT = 10.0
+
+#: Наибольшее количество строк заголовков в запросе.
+MAX_HEADERS = 100
+
+#: Наибольший размер тела запроса в байтах; тело читается и отбрасывается.
+MAX_BODY = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+_REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+class Response(NamedTuple):
+    """
+    Ответ HTTP-сервиса.
+    """
+
+    #: Код ответа.
+    status: int
+
+    #: Тело ответа.
+    body: bytes
+
+    #: ETag (для успешных ответов).
+    etag: str | None = None
+
+
+def _ok(document: object) -> Response:
+    body = _encoder.encode(document).encode()
+    return Response(200, body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+
+
+def _error(status: int, message: str) -> Response:
+    return Response(status, _encoder.encode({"error": message}).encode())
+
+
+class ConnectionPool:
+    """
+    Пул соединений с базой данных SQLite только для чтения.
+
+    Соединения создаются по мере необходимости, но не больше ``size``; если все
+    заняты, :meth:`connection` ждет освобождения одного из них.
+
+    :param database: путь к базе данных
+    :param size: наибольшее количество соединений
+    """
+
+    def __init__(self, database: str | Path, size: int = 4) -> None:
+        self._uri = Path(database).absolute().as_uri() + "?mode=ro"
+        self._size = size
+        self._idle: queue.SimpleQueue[sqlite3.Connection] = queue.SimpleQueue()
+        self._all: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Берет соединение из пула на время выполнения блока кода.
+        """
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                new = len(self._all) < self._size
+                if new:
+                    conn = self._connect()
+                    self._all.append(conn)
+            if not new:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        """
+        Закрывает все соединения.
+        """
+
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+
+class WeekData:
+    """
+    Расписание на одну неделю, разложенное по группам, преподавателям и
+    аудиториям, и уже закодированные ответы.
+    """
+
+    #: Неделя.
+    week: Week
+
+    #: Расписание по номеру группы.
+    groups: dict[str, Timetable[Lesson]]
+
+    #: Расписание по UUID преподавателя.
+    teachers: dict[str, Timetable[list[Lesson]]]
+
+    #: Расписание по номеру аудитории (вместо аудитории указана группа).
+    classrooms: dict[str, Timetable[list[Lesson]]]
+
+    def __init__(self, week: Week, groups: dict[str, Timetable[Lesson]],
+                 teachers: dict[str, Timetable[list[Lesson]]]) -> None:
+        self.week = week
+        self.groups = groups
+        self.teachers = teachers
+        self.classrooms = {}
+        for group, timetable in groups.items():
+            for day_num, day in enumerate(timetable):
+                for lesson_num, (lesson_id, (classroom, name)) in day.items():
+                    if not classroom or classroom == "?":
+                        continue
+                    room = self.classrooms.setdefault(classroom, [{} for _ in range(7)])
+                    room[day_num].setdefault(lesson_num, []).append(
+                        Lesson(lesson_id, LessonData(group, name))
+                    )
+        for room in self.classrooms.values():
+            trim_weekend(room)
+        self._responses: dict[tuple[str, str], Response] = {}
+
+    def response(self, kind: str, key: str) -> Response:
+        """
+        Возвращает ответ с расписанием. Ответ кодируется один раз и затем
+        берется из кеша.
+
+        :param kind: ``groups``, ``teachers``, ``classrooms`` или ``weeks``
+        :param key: группа, UUID преподавателя или номер аудитории
+        """
+
+        response = self._responses.get((kind, key))
+        if response is not None:
+            return response
+
+        empty: Timetable[Lesson] = [{} for _ in range(5)]
+        document: dict[str, object] = {"week_id": self.week.week_id}
+        known = True
+        match kind:
+            case "groups":
+                document["group"] = key
+                document["timetable"] = self.groups.get(key, empty)
+                known = key in self.groups
+            case "teachers":
+                document["teacher"] = {"id": key}
+                document["timetable"] = self.teachers.get(key, empty)
+                known = key in self.teachers
+            case "classrooms":
+                document["classroom"] = key
+                document["timetable"] = self.classrooms.get(key, empty)
+                known = key in self.classrooms
+            case "weeks":
+                document["groups"] = self.groups
+        response = _ok(document)
+        # Ответы для неизвестных ключей не запоминаются, чтобы кеш не рос от
+        # произвольных адресов
+        if known:
+            self._responses[kind, key] = response
+        return response
+
+
+class TimetableServer:
+    """
+    HTTP-сервис расписания.
+
+    .. code-block:: python
+
+       server = TimetableServer("timetable.db")
+       asyncio_server = await server.start(port=8080)
+       await asyncio_server.serve_forever()
+
+    :param database: путь к базе данных SQLite
+    :param instance: сайт личного кабинета
+    :param cache_weeks: сколько недель хранить в кеше
+    :param pool_size: сколько соединений с базой данных открывать
+    """
+
+    def __init__(self, database: str | Path, *, instance: str = "",
+                 cache_weeks: int = 64, pool_size: int = 4) -> None:
+        self.instance = instance
+        self.cache_weeks = cache_weeks
+        self.pool = ConnectionPool(database, pool_size)
+        self._watch = sqlite3.connect(Path(database).absolute().as_uri() + "?mode=ro",
+                                      uri=True, check_same_thread=False)
+        self._data_version: int | None = None
+        self._cache: OrderedDict[str, WeekData] = OrderedDict()
+        self._loading: dict[str, asyncio.Task[WeekData]] = {}
+        self._generation = 0
+        self.idle_timeout = IDLE_TIMEOUT
+        self.read_timeout = READ_TIMEOUT
+
+    def invalidate(self) -> None:
+        """
+        Сбрасывает кеш.
+        """
+
+        self._cache.clear()
+        self._loading.clear()
+        self._generation += 1
+
+    def _check_data_version(self) -> None:
+        version: int = self._watch.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            if self._data_version is not None:
+                logger.info("База данных изменилась, сбрасываю кеш")
+            self._data_version = version
+            self.invalidate()
+
+    def _load_week(self, week: Week) -> WeekData:
+        with self.pool.connection() as conn:
+            groups = {group: timetable for timetable, group, _ in
+                      load_timetables(conn, week=week, instance=self.instance)}
+            teachers = {teacher_id: timetable for timetable, teacher_id, _ in
+                        load_teacher_timetables(conn, week=week, instance=self.instance)}
+        return WeekData(week, groups, teachers)
+
+    async def _load(self, week: Week, generation: int) -> WeekData:
+        try:
+            data = await asyncio.to_thread(self._load_week, week)
+        finally:
+            if self._loading.get(week.week_id) is asyncio.current_task():
+                del self._loading[week.week_id]
+        # Пока неделя загружалась, база данных могла измениться
+        if generation == self._generation:
+            self._cache[week.week_id] = data
+            while len(self._cache) > self.cache_weeks:
+                self._cache.popitem(last=False)
+        return data
+
+    async def get_week(self, week: Week) -> WeekData:
+        """
+        Возвращает расписание на неделю из кеша или из базы данных.
+
+        :param week: неделя
+        """
+
+        self._check_data_version()
+        data = self._cache.get(week.week_id)
+        if data is not None:
+            metrics.SERVER_CACHE.inc(result="hit")
+            self._cache.move_to_end(week.week_id)
+            return data
+
+        metrics.SERVER_CACHE.inc(result="miss")
+        task = self._loading.get(week.week_id)
+        if task is None:
+            task = asyncio.create_task(self._load(week, self._generation))
+            self._loading[week.week_id] = task
+        return await asyncio.shield(task)
+
+    def _query_changes(self, conn: sqlite3.Connection, since: float, until: float,
+                       limit: int) -> list[tuple[Any, ...]]:
+        return conn.execute(
+            """
+            SELECT
+              l.time, l.status, l.id, g.value, l.week, l.day_num, l.lesson_num,
+              c.value, n.value
+            FROM (
+              SELECT
+                last_updated AS time, 'updated' AS status, id, group_id, week,
+                day_num, lesson_num, classroom, name
+              FROM
+                lesson_v2
+              WHERE
+                instance = (SELECT id FROM string WHERE value = ?)
+                AND last_updated > ? AND last_updated <= ?
+              UNION ALL
+              SELECT
+                obsolete_since, 'removed', id, group_id, week, day_num, lesson_num,
+                classroom, name
+              FROM
+                lesson_v2
+              WHERE
+                instance = (SELECT id FROM string WHERE value = ?)
+                AND obsolete_since > ? AND obsolete_since <= ?
+            ) AS l
+              JOIN string AS g ON g.id = l.group_id
+              LEFT JOIN string AS c ON c.id = l.classroom
+              LEFT JOIN string AS n ON n.id = l.name
+            ORDER BY
+              l.time
+            LIMIT ?
+            """,
+            [self.instance, since, until, self.instance, since, until, limit]
+        ).fetchall()
+
+    def _select_changes(self, since: float, limit: int) -> list[dict[str, object]]:
+        with self.pool.connection() as conn:
+            rows = self._query_changes(conn, since, float("inf"), limit + 1)
+            if len(rows) > limit:
+                # Изменения за одну секунду отдаются целиком, чтобы следующий
+                # запрос с since = next ничего не пропустил
+                cut = rows[limit][0]
+                rows = [row for row in rows if row[0] < cut]
+                if not rows:
+                    rows = self._query_changes(conn, since, cut, -1)
+
+        return [{
+            "time": time,
+            "status": status,
+            "id": _blob_to_uuid(lesson_id),
+            "group": group,
+            "week_id": decode_week(week).week_id,
+            "day_num": day_num,
+            "lesson_num": lesson_num,
+            "classroom": classroom,
+            "name": name,
+        } for (time, status, lesson_id, group, week, day_num, lesson_num, classroom,
+               name) in rows]
+
+    async def _changes(self, query: str) -> Response:
+        params = parse_qs(query)
+        since = float(params.get("since", ["0"])[0])
+        limit = min(int(params.get("limit", ["500"])[0]), MAX_CHANGES)
+        if limit <= 0:
+            raise ValueError("limit должен быть положительным")
+        changes = await asyncio.to_thread(self._select_changes, since, limit)
+        return _ok({
+            "changes": changes,
+            "next": changes[-1]["time"] if changes else since,
+        })
+
+    async def _route(self, path: str, query: str) -> tuple[str, Response]:
+        parts = [unquote(part) for part in path.split("/") if part]
+        try:
+            match parts:
+                case ["groups" | "classrooms" as kind, key, week_id]:
+                    week = Week.from_week_id(week_id)
+                    return kind, (await self.get_week(week)).response(kind, key)
+                case ["teachers", key, week_id]:
+                    week = Week.from_week_id(week_id)
+                    key = str(uuid.UUID(key))
+                    return "teachers", (await self.get_week(week)).response("teachers", key)
+                case ["weeks", week_id]:
+                    week = Week.from_week_id(week_id)
+                    return "weeks", (await self.get_week(week)).response("weeks", "")
+                case ["changes"]:
+                    return "changes", await self._changes(query)
+        except ValueError as e:
+            return "invalid", _error(400, str(e))
+        return "unknown", _error(404, "неизвестный адрес")
+
+    async def handle(self, method: str, target: str,
+                     headers: dict[str, str] | None = None) -> Response:
+        """
+        Обрабатывает один запрос.
+
+        :param method: метод HTTP
+        :param target: адрес запроса (путь и параметры)
+        :param headers: заголовки запроса (имена в нижнем регистре)
+        :returns: ответ
+        """
+
+        headers = headers or {}
+        if method not in ("GET", "HEAD"):
+            route, response = "unknown", _error(405, "поддерживаются только GET и HEAD")
+        else:
+            url = urlsplit(target)
+            try:
+                route, response = await self._route(url.path, url.query)
+            except Exception:
+                logger.exception("Ошибка при обработке запроса %s", target)
+                route, response = "error", _error(500, "внутренняя ошибка")
+
+        if response.etag is not None:
+            tags = {tag.strip().removeprefix("W/")
+                    for tag in headers.get("if-none-match", "").split(",")}
+            if response.etag in tags or "*" in tags:
+                response = Response(304, b"", response.etag)
+
+        metrics.SERVER_REQUESTS.inc(route=route, status=str(response.status))
+        return response
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader,
+                            request_line: bytes) -> tuple[str, str, str, dict[str, str]]:
+        """
+        Прочитать заголовки и тело запроса.
+
+        Тело не нужно ни одному методу сервиса, поэтому оно отбрасывается, но
+        прочитать его необходимо, чтобы следующий запрос на том же соединении
+        начинался с начала строки.
+
+        :raises ValueError: запрос некорректен или слишком велик
+        :raises asyncio.IncompleteReadError: клиент закрыл соединение
+        """
+        method, target, version = request_line.decode("latin-1").split()
+        headers: dict[str, str] = {}
+        count = 0
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            count += 1
+            if count > MAX_HEADERS:
+                raise ValueError("слишком много заголовков")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "transfer-encoding" in headers:
+            raise ValueError("Transfer-Encoding не поддерживается")
+        length = int(headers.get("content-length", "0"))
+        if not 0 <= length <= MAX_BODY:
+            raise ValueError("недопустимая длина тела запроса")
+        if length:
+            await reader.readexactly(length)
+        return method, target, version, headers
+
+    async def _serve_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(),
+                                                          self.idle_timeout)
+                except (TimeoutError, ValueError):
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, target, version, headers = await asyncio.wait_for(
+                        self._read_request(reader, request_line), self.read_timeout
+                    )
+                except ValueError:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n"
+                                 b"Connection: close\r\n\r\n")
+                    await writer.drain()
+                    break
+                except (TimeoutError, asyncio.IncompleteReadError):
+                    break
+
+                response = await self.handle(method, target, headers)
+                connection = headers.get("connection", "").lower()
+                keep_alive = (connection != "close" if version == "HTTP/1.1"
+                              else connection == "keep-alive")
+                head = [
+                    f"HTTP/1.1 {response.status} {_REASONS[response.status]}",
+                    f"Content-Length: {len(response.body)}",
+                    "Cache-Control: no-cache",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                if response.status != 304:
+                    head.append("Content-Type: application/json; charset=utf-8")
+                if response.etag is not None:
+                    head.append(f"ETag: {response.etag}")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+                if method != "HEAD":
+                    writer.write(response.body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.Server:
+        """
+        Запускает HTTP-сервер.
+
+        :param host: адрес, на котором принимать соединения
+        :param port: порт (``0`` — любой свободный)
+        :returns: сервер :mod:`asyncio`
+        """
+
+        server = await asyncio.start_server(self._serve_client, host, port)
+        for sock in server.sockets:
+            logger.info("Расписание доступно по адресу http://%s:%d/",
+                        *sock.getsockname()[:2])
+        return server
+
+    def close(self) -> None:
+        """
+        Закрывает соединения с базой данных.
+        """
+
+        self.pool.close()
+        self._watch.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m egov66_timetable.server",
+        description="HTTP-сервис расписания из базы данных SQLite",
+    )
+    parser.add_argument("db", help="база данных SQLite")
+    parser.add_argument("--host", default="127.0.0.1", help="адрес (по умолчанию 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="порт (по умолчанию 8080)")
+    parser.add_argument("--instance", default="", help="сайт личного кабинета")
+    parser.add_argument("--cache-weeks", type=int, default=64, metavar="N",
+                        help="сколько недель хранить в кеше")
+    parser.add_argument("--pool-size", type=int, default=4, metavar="N",
+                        help="сколько соединений с базой данных открывать")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="выводить подробный журнал")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    server = TimetableServer(args.db, instance=args.instance,
+                             cache_weeks=args.cache_weeks, pool_size=args.pool_size)
+
+    async def serve() -> None:
+        asyncio_server = await server.start(args.host, args.port)
+        async with asyncio_server:
+            await asyncio_server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Хранилище ключей сеанса.
+
+Ключ сеанса (cookie-файл ``edinyi_lk_session``) меняется при каждом входе на
+страницу расписания. Если хранить его в :file:`settings.json`, параллельные
+загрузки и запуски по расписанию перезаписывают ключи друг друга, и сеансы
+приходится начинать заново. Здесь ключи хранятся отдельно от настроек: на
+каждый сайт может приходиться несколько живых сеансов, и каждый из них в
+любой момент времени занят не больше чем одним клиентом.
+
+Файл изменяется под блокировкой и заменяется атомарно, а записывается только
+тогда, когда что-то действительно поменялось.
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import TypedDict
+
+from egov66_timetable.types.settings import Settings
+from egov66_timetable.utils import file_lock, write_atomic
+
+#: Через сколько секунд бездействия сеанс считается истекшим.
+SESSION_LIFETIME = 2 * 60 * 60
+
+#: На сколько секунд клиент занимает сеанс. Если процесс завершился, не
+#: освободив сеанс, через это время сеанс снова станет свободным.
+LEASE_DURATION = 15 * 60
+
+logger = logging.getLogger(__name__)
+
+
+class SessionEntry(TypedDict):
+    """
+    Запись о сеансе в файле.
+    """
+
+    #: Значение cookie-файла ``edinyi_lk_session``.
+    cookie: str
+
+    #: Время последнего обновления ключа (Unix time).
+    updated: float
+
+    #: До какого времени сеанс занят (Unix time), ``0`` — свободен.
+    leased_until: float
+
+    #: Идентификатор процесса, который занял сеанс.
+    pid: int
+
+
+type SessionData = dict[str, list[SessionEntry]]
+
+
+class SessionStore:
+    """
+    Файл с ключами сеанса, которым могут одновременно пользоваться несколько
+    потоков и процессов.
+
+    Клиент занимает сеанс методом :meth:`checkout`, сообщает о новом ключе
+    методом :meth:`update` и освобождает сеанс методом :meth:`release`.
+    """
+
+    #: Путь к файлу.
+    path: Path
+
+    #: Через сколько секунд бездействия сеанс считается истекшим.
+    lifetime: float
+
+    #: На сколько секунд клиент занимает сеанс.
+    lease_duration: float
+
+    def __init__(self, path: str | Path, *, lifetime: float = SESSION_LIFETIME,
+                 lease_duration: float = LEASE_DURATION) -> None:
+        """
+        :param path: путь к файлу
+        :param lifetime: через сколько секунд бездействия сеанс считается
+            истекшим
+        :param lease_duration: на сколько секунд клиент занимает сеанс
+        """
+
+        self.path = Path(path)
+        self.lifetime = lifetime
+        self.lease_duration = lease_duration
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "SessionStore | None":
+        """
+        :param settings: настройки
+        :returns: хранилище из настройки ``sessions_file``, если она указана
+        """
+
+        if (path := settings.get("sessions_file")) is None:
+            return None
+        return cls(path)
+
+    def _read(self) -> SessionData:
+        try:
+            data = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as err:
+            logger.warning("Не удалось прочитать файл %s: %s", self.path, err)
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _write(self, data: SessionData) -> None:
+        write_atomic(self.path, json.dumps(data, indent=2, ensure_ascii=False))
+
+    def _prune(self, data: SessionData, now: float) -> bool:
+        changed = False
+        for instance, entries in list(data.items()):
+            alive = [entry for entry in entries
+                     if now - entry["updated"] < self.lifetime]
+            if len(alive) != len(entries):
+                changed = True
+                if alive:
+                    data[instance] = alive
+                else:
+                    del data[instance]
+        return changed
+
+    def sessions(self, instance: str) -> list[SessionEntry]:
+        """
+        :param instance: адрес сайта личного кабинета
+        :returns: живые сеансы
+        """
+
+        now = time.time()
+        return [entry for entry in self._read().get(instance, [])
+                if now - entry["updated"] < self.lifetime]
+
+    def checkout(self, instance: str) -> str | None:
+        """
+        Занимает свободный сеанс, который обновлялся позже остальных.
+
+        :param instance: адрес сайта личного кабинета
+        :returns: ключ сеанса или ``None``, если свободных сеансов нет
+        """
+
+        with file_lock(self.path):
+            now = time.time()
+            data = self._read()
+            changed = self._prune(data, now)
+
+            free = [entry for entry in data.get(instance, [])
+                    if entry["leased_until"] <= now]
+            entry = max(free, key=lambda entry: entry["updated"], default=None)
+            if entry is not None:
+                entry["leased_until"] = now + self.lease_duration
+                entry["pid"] = os.getpid()
+                changed = True
+
+            if changed:
+                self._write(data)
+        return entry["cookie"] if entry is not None else None
+
+    def update(self, instance: str, old: str | None, new: str) -> None:
+        """
+        Заменяет ключ сеанса новым и продлевает занятость. Если ключ не
+        изменился, файл не перезаписывается.
+
+        :param instance: адрес сайта личного кабинета
+        :param old: прежний ключ сеанса (``None`` — новый сеанс)
+        :param new: новый ключ сеанса
+        """
+
+        with file_lock(self.path):
+            now = time.time()
+            data = self._read()
+            entries = data.setdefault(instance, [])
+
+            entry = next((entry for entry in entries if entry["cookie"] == old), None)
+            if entry is not None and old == new:
+                if entry["leased_until"] - now > self.lease_duration / 2:
+                    return
+            elif entry is None:
+                entry = SessionEntry(cookie=new, updated=now, leased_until=0, pid=0)
+                entries.append(entry)
+
+            entry["cookie"] = new
+            entry["updated"] = now
+            entry["leased_until"] = now + self.lease_duration
+            entry["pid"] = os.getpid()
+            self._prune(data, now)
+            self._write(data)
+
+    def release(self, instance: str, cookie: str) -> None:
+        """
+        Освобождает сеанс.
+
+        :param instance: адрес сайта личного кабинета
+        :param cookie: ключ сеанса
+        """
+
+        with file_lock(self.path):
+            data = self._read()
+            for entry in data.get(instance, []):
+                if entry["cookie"] == cookie and entry["leased_until"]:
+                    entry["leased_until"] = 0
+                    self._write(data)
+                    return
+
+    def discard(self, instance: str, cookie: str) -> None:
+        """
+        Удаляет истекший сеанс.
+
+        :param instance: адрес сайта личного кабинета
+        :param cookie: ключ сеанса
+        """
+
+        with file_lock(self.path):
+            data = self._read()
+            entries = data.get(instance, [])
+            alive = [entry for entry in entries if entry["cookie"] != cookie]
+            if len(alive) != len(entries):
+                data[instance] = alive
+                self._write(data)
@@ -0,0 +1,406 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Двоичный снимок расписания всех групп и преподавателей только для чтения.
+
+Снимок предназначен для процессов ботов, которым при запуске нужно расписание
+за много недель: вместо :func:`load_timetable
+<egov66_timetable.callbacks.sqlite.load_timetable>` и проверки pydantic они
+отображают файл в память с помощью :mod:`mmap`. Страницы файла общие для всех
+процессов, а расписание разбирается только при обращении к нему, поэтому
+открытие снимка не зависит от его размера.
+
+Формат файла (все числа little-endian):
+
+* заголовок: сигнатура ``EGTTSNAP``, версия формата, номер строки с сайтом
+  личного кабинета, количество строк, расписаний и пар, смещения разделов;
+* таблица строк: смещения строк в UTF-8 и сами строки;
+* расписания, отсортированные по виду (группа или преподаватель), ключу и
+  неделе: количество дней, номер пары, с которой начинается расписание, и
+  количество пар;
+* пары фиксированного размера: UUID, номер дня, номер пары, номера строк с
+  аудиторией (у преподавателя — с группой) и названием предмета.
+
+Нулевой номер строки означает ``None``.
+
+Снимок можно получить из базы данных SQLite:
+
+.. code-block:: shell
+
+   python -m egov66_timetable.snapshot timetable.db timetable.snap
+"""
+
+import argparse
+import mmap
+import sqlite3
+import struct
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from types import TracebackType
+from typing import Self
+from uuid import UUID
+
+from egov66_timetable.callbacks.sqlite import (
+    _blob_to_uuid,
+    decode_week,
+    encode_week,
+    load_teacher_timetables,
+    load_timetables,
+)
+from egov66_timetable.types import Lesson, LessonData, Timetable, Week
+from egov66_timetable.utils import write_atomic
+
+#: Версия формата снимка.
+SNAPSHOT_VERSION = 1
+
+_MAGIC = b"EGTTSNAP"
+
+# Сигнатура, версия, сайт, количество строк, расписаний и пар, смещения
+# таблицы смещений строк, строк, расписаний и пар.
+_HEADER = struct.Struct("<8s9I")
+
+# Вид, количество дней, ключ, неделя, первая пара, количество пар.
+_ENTITY = struct.Struct("<BxHIIII")
+
+# UUID, день, номер пары, аудитория или группа, название.
+_LESSON = struct.Struct("<16sBBxxII")
+
+_OFFSET = struct.Struct("<II")
+
+# Неделя в записи о расписании.
+_WEEK = struct.Struct("<8xI")
+
+_GROUP = 0
+_TEACHER = 1
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.strings: list[bytes] = []
+        self.string_ids: dict[str, int] = {}
+        self.entities: list[tuple[int, str, int, int, int, int, int]] = []
+        self.lessons = bytearray()
+        self.lesson_count = 0
+
+    def intern(self, string: str | None) -> int:
+        if string is None:
+            return 0
+        if (string_id := self.string_ids.get(string)) is None:
+            self.strings.append(string.encode())
+            string_id = self.string_ids[string] = len(self.strings)
+        return string_id
+
+    def add(self, kind: int, key: str, week: Week,
+            timetable: Iterable[Iterable[tuple[int, Lesson]]], days: int) -> None:
+        first = self.lesson_count
+        for day_num, day in enumerate(timetable):
+            for lesson_num, (lesson_id, (where, name)) in day:
+                self.lessons += _LESSON.pack(UUID(lesson_id).bytes, day_num, lesson_num,
+                                             self.intern(where), self.intern(name))
+                self.lesson_count += 1
+        self.entities.append((kind, key, encode_week(week), self.intern(key), days, first,
+                              self.lesson_count - first))
+
+    def build(self, instance: str) -> bytes:
+        instance_id = self.intern(instance)
+        self.entities.sort(key=lambda entity: entity[:3])
+
+        offsets = bytearray()
+        position = 0
+        for string in self.strings:
+            offsets += _OFFSET.pack(position, position + len(string))
+            position += len(string)
+        data = b"".join(self.strings)
+
+        entities = bytearray()
+        for kind, _, week, key_id, days, first, count in self.entities:
+            entities += _ENTITY.pack(kind, days, key_id, week, first, count)
+
+        offsets_start = _HEADER.size
+        data_start = offsets_start + len(offsets)
+        entities_start = data_start + len(data)
+        lessons_start = entities_start + len(entities)
+        header = _HEADER.pack(_MAGIC, SNAPSHOT_VERSION, instance_id, len(self.strings),
+                              len(self.entities), self.lesson_count, offsets_start,
+                              data_start, entities_start, lessons_start)
+        return b"".join((header, offsets, data, entities, self.lessons))
+
+
+def write_snapshot(path: str | Path,
+                   timetables: Iterable[tuple[Timetable[Lesson], str, Week]],
+                   teacher_timetables: Iterable[
+                       tuple[Timetable[list[Lesson]], str, Week]
+                   ] = (), *,
+                   instance: str = "") -> int:
+    """
+    Записывает снимок расписания. Файл заменяется атомарно, поэтому процессы,
+    которые уже открыли старый снимок, продолжают его читать.
+
+    :param path: путь к файлу снимка
+    :param timetables: расписание групп в виде кортежей ``(расписание,
+        группа, неделя)``, как у :func:`load_timetables
+        <egov66_timetable.callbacks.sqlite.load_timetables>`
+    :param teacher_timetables: расписание преподавателей в виде кортежей
+        ``(расписание, UUID преподавателя, неделя)``
+    :param instance: сайт личного кабинета
+    :returns: количество расписаний в снимке
+    """
+
+    writer = _Writer()
+    for timetable, group, week in timetables:
+        writer.add(_GROUP, group, week, (day.items() for day in timetable), len(timetable))
+    for teacher_timetable, teacher_id, week in teacher_timetables:
+        writer.add(_TEACHER, teacher_id, week,
+                   ([(lesson_num, lesson) for lesson_num, lessons in day.items()
+                     for lesson in lessons] for day in teacher_timetable),
+                   len(teacher_timetable))
+    write_atomic(path, writer.build(instance))
+    return len(writer.entities)
+
+
+def export_sqlite(conn: sqlite3.Connection, path: str | Path, *,
+                  instance: str = "") -> int:
+    """
+    Записывает снимок всего расписания групп и преподавателей из базы данных
+    SQLite.
+
+    :param conn: база данных SQLite
+    :param path: путь к файлу снимка
+    :param instance: сайт личного кабинета
+    :returns: количество расписаний в снимке
+    """
+
+    return write_snapshot(path, load_timetables(conn, instance=instance),
+                          load_teacher_timetables(conn, instance=instance),
+                          instance=instance)
+
+
+class _Keys:
+    # Ключи сортировки расписаний для двоичного поиска.
+
+    __slots__ = ("_snapshot",)
+
+    def __init__(self, snapshot: "Snapshot") -> None:
+        self._snapshot = snapshot
+
+    def __len__(self) -> int:
+        return self._snapshot._entity_count
+
+    def __getitem__(self, index: int) -> tuple[int, str, int]:
+        kind, _, key, week, _, _ = self._snapshot._entity(index)
+        return kind, self._snapshot._string(key) or "", week
+
+
+class _Weeks:
+    # Недели расписаний для двоичного поиска внутри одной группы.
+
+    __slots__ = ("_snapshot",)
+
+    def __init__(self, snapshot: "Snapshot") -> None:
+        self._snapshot = snapshot
+
+    def __len__(self) -> int:
+        return self._snapshot._entity_count
+
+    def __getitem__(self, index: int) -> int:
+        week: int = _WEEK.unpack_from(
+            self._snapshot._mmap, self._snapshot._entities_start + _ENTITY.size * index
+        )[0]
+        return week
+
+
+class Snapshot:
+    """
+    Снимок расписания, отображенный в память.
+
+    Методы возвращают расписание в том же виде, что и функции модуля
+    :mod:`egov66_timetable.callbacks.sqlite`. Расписание каждый раз
+    разбирается заново, поэтому его можно изменять.
+
+    :param path: путь к файлу снимка
+    :raises ValueError: файл не является снимком или имеет другую версию
+        формата
+    """
+
+    #: Сайт личного кабинета.
+    instance: str
+
+    _mmap: mmap.mmap
+    _strings: list[str | None]
+
+    # Диапазоны расписаний по виду и ключу, которые уже искали
+    _bounds: dict[tuple[int, str], tuple[int, int]]
+
+    def __init__(self, path: str | Path) -> None:
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < _HEADER.size:
+                raise ValueError(f"{path} не является снимком расписания")
+            (magic, version, instance_id, self._string_count, self._entity_count,
+             self._lesson_count, self._offsets_start, self._data_start,
+             self._entities_start, self._lessons_start) = _HEADER.unpack_from(self._mmap)
+            if magic != _MAGIC:
+                raise ValueError(f"{path} не является снимком расписания")
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"Неподдерживаемая версия снимка: {version}")
+        except BaseException:
+            self._mmap.close()
+            raise
+
+        self._strings = [None] * (self._string_count + 1)
+        self._bounds = {}
+        self._keys = _Keys(self)
+        self._weeks = _Weeks(self)
+        self.instance = self._string(instance_id) or ""
+
+    def close(self) -> None:
+        """
+        Закрывает файл снимка.
+        """
+
+        self._mmap.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+                 exc_value: BaseException | None,
+                 traceback: TracebackType | None) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._entity_count
+
+    def _string(self, string_id: int) -> str | None:
+        if (string := self._strings[string_id]) is None and string_id:
+            start, end = _OFFSET.unpack_from(
+                self._mmap, self._offsets_start + _OFFSET.size * (string_id - 1)
+            )
+            string = self._strings[string_id] = self._mmap[
+                self._data_start + start:self._data_start + end
+            ].decode()
+        return string
+
+    def _entity(self, index: int) -> tuple[int, int, int, int, int, int]:
+        return _ENTITY.unpack_from(self._mmap, self._entities_start + _ENTITY.size * index)
+
+    def _find(self, kind: int, key: str, week: Week | str) -> int | None:
+        if (bounds := self._bounds.get((kind, key))) is None:
+            low = bisect_left(self._keys, (kind, key, 0))
+            high = bisect_left(self._keys, (kind, key, 2**32), low)
+            if low == high:
+                return None
+            bounds = self._bounds[(kind, key)] = (low, high)
+
+        week_num = encode_week(week)
+        index = bisect_left(self._weeks, week_num, *bounds)
+        if index < bounds[1] and self._weeks[index] == week_num:
+            return index
+        return None
+
+    def _lessons(self, first: int, count: int) -> Iterator[tuple[int, int, Lesson]]:
+        start = self._lessons_start + _LESSON.size * first
+        data = self._mmap[start:start + _LESSON.size * count]
+        string = self._string
+        for lesson_id, day_num, lesson_num, where, name in _LESSON.iter_unpack(data):
+            yield day_num, lesson_num, Lesson(
+                _blob_to_uuid(lesson_id),
+                LessonData(string(where), string(name))  # type: ignore[arg-type]
+            )
+
+    def _timetable(self, index: int) -> Timetable[Lesson]:
+        _, days, _, _, first, count = self._entity(index)
+        result: Timetable[Lesson] = [{} for _ in range(days)]
+        for day_num, lesson_num, lesson in self._lessons(first, count):
+            result[day_num][lesson_num] = lesson
+        return result
+
+    def _teacher_timetable(self, index: int) -> Timetable[list[Lesson]]:
+        _, days, _, _, first, count = self._entity(index)
+        result: Timetable[list[Lesson]] = [{} for _ in range(days)]
+        for day_num, lesson_num, lesson in self._lessons(first, count):
+            result[day_num].setdefault(lesson_num, []).append(lesson)
+        return result
+
+    def _iterate(self, kind: int, week: Week | str | None) -> Iterator[tuple[int, str, Week]]:
+        week_num = None if week is None else encode_week(week)
+        index = bisect_left(self._keys, (kind,))
+        while index < self._entity_count:
+            entity_kind, _, key, entity_week, _, _ = self._entity(index)
+            if entity_kind != kind:
+                break
+            if week_num is None or entity_week == week_num:
+                yield index, self._string(key) or "", decode_week(entity_week)
+            index += 1
+
+    def get_timetable(self, group: str, week: Week | str) -> Timetable[Lesson] | None:
+        """
+        :param group: номер группы
+        :param week: неделя
+        :returns: расписание группы, если оно есть в снимке
+        """
+
+        index = self._find(_GROUP, group, week)
+        return None if index is None else self._timetable(index)
+
+    def get_teacher_timetable(self, teacher_id: str,
+                              week: Week | str) -> Timetable[list[Lesson]] | None:
+        """
+        :param teacher_id: UUID преподавателя
+        :param week: неделя
+        :returns: расписание преподавателя, если оно есть в снимке
+        """
+
+        index = self._find(_TEACHER, teacher_id, week)
+        return None if index is None else self._teacher_timetable(index)
+
+    def timetables(self, week: Week | str | None = None
+                   ) -> Iterator[tuple[Timetable[Lesson], str, Week]]:
+        """
+        Перебирает расписание групп.
+
+        :param week: неделя (по умолчанию все недели)
+        :returns: генератор кортежей ``(расписание, группа, неделя)``
+        """
+
+        for index, group, group_week in self._iterate(_GROUP, week):
+            yield self._timetable(index), group, group_week
+
+    def teacher_timetables(self, week: Week | str | None = None
+                           ) -> Iterator[tuple[Timetable[list[Lesson]], str, Week]]:
+        """
+        Перебирает расписание преподавателей.
+
+        :param week: неделя (по умолчанию все недели)
+        :returns: генератор кортежей ``(расписание, UUID преподавателя, неделя)``
+        """
+
+        for index, teacher_id, teacher_week in self._iterate(_TEACHER, week):
+            yield self._teacher_timetable(index), teacher_id, teacher_week
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m egov66_timetable.snapshot",
+        description="Запись снимка расписания из базы данных SQLite",
+    )
+    parser.add_argument("db", help="база данных SQLite")
+    parser.add_argument("path", help="файл снимка")
+    parser.add_argument("--instance", default="", help="сайт личного кабинета")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        count = export_sqlite(conn, args.path, instance=args.instance)
+    finally:
+        conn.close()
+
+    print(f"Записано расписаний: {count}")
+
+
+if __name__ == "__main__":
+    main()
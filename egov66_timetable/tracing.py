@@ -0,0 +1,169 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+"""
+Трассировка этапов работы в формате Chrome Trace Event.
+
+Получившийся файл открывается в ``chrome://tracing`` или в Perfetto
+(https://ui.perfetto.dev). Пока трассировка выключена, :func:`span`
+возвращает один и тот же пустой контекстный менеджер и почти ничего не стоит.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from pathlib import Path
+
+from egov66_timetable.types.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+_NULL_SPAN: AbstractContextManager[None] = contextlib.nullcontext()
+
+
+class Tracer:
+    """
+    Сборщик событий трассировки.
+    """
+
+    #: События в формате Trace Event.
+    events: list[dict[str, object]]
+
+    _lock: threading.Lock
+    _pid: int
+    _threads: dict[int, int]
+
+    def __init__(self) -> None:
+        self.events = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._threads = {}
+
+    def _tid(self) -> int:
+        ident = threading.get_ident()
+        if (tid := self._threads.get(ident)) is None:
+            with self._lock:
+                tid = self._threads.setdefault(ident, len(self._threads) + 1)
+                self.events.append({
+                    "name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                    "args": {"name": threading.current_thread().name},
+                })
+        return tid
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args: object) -> Iterator[None]:
+        """
+        Записывает интервал выполнения блока кода.
+
+        :param name: название этапа
+        :param args: дополнительные данные (например, номер группы)
+        """
+
+        tid = self._tid()
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            event: dict[str, object] = {
+                "name": name, "ph": "X", "pid": self._pid, "tid": tid,
+                "ts": start / 1000, "dur": (end - start) / 1000,
+            }
+            if args:
+                event["args"] = args
+            with self._lock:
+                self.events.append(event)
+
+    def write(self, path: str | Path) -> None:
+        """
+        Записывает события в файл JSON.
+
+        :param path: путь к файлу
+        """
+
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file,
+                      ensure_ascii=False, default=str)
+        logger.info("Трассировка записана в файл %s", path)
+
+
+_tracer: Tracer | None = None
+
+
+def span(name: str, **args: object) -> AbstractContextManager[None]:
+    """
+    Записывает интервал выполнения блока кода, если трассировка включена.
+
+    .. code-block:: python
+
+       with tracing.span("make_timetable", group=group):
+           ...
+
+    :param name: название этапа
+    :param args: дополнительные данные
+    """
+
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, **args)
+
+
+def get_tracer() -> Tracer | None:
+    """
+    :returns: текущий сборщик событий, если трассировка включена
+    """
+
+    return _tracer
+
+
+def enable() -> Tracer:
+    """
+    Включает трассировку.
+
+    :returns: сборщик событий
+    """
+
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def disable() -> None:
+    """
+    Выключает трассировку. Собранные события теряются.
+    """
+
+    global _tracer
+    _tracer = None
+
+
+@contextlib.contextmanager
+def trace_run(settings: Settings) -> Iterator[None]:
+    """
+    Включает трассировку на время запуска, если в настройках указан файл
+    ``trace_file``, и записывает его по окончании. Если трассировка уже
+    включена, ничего не делает.
+
+    :param settings: настройки
+    """
+
+    path = settings.get("trace_file")
+    if path is None or _tracer is not None:
+        yield
+        return
+
+    tracer = enable()
+    try:
+        yield
+    finally:
+        disable()
+        tracer.write(path)
@@ -6,6 +6,9 @@
 Основные типы данных.
 """
 
+import hashlib
+import uuid
+from collections.abc import Iterable
 from datetime import date, timedelta
 from functools import cached_property
 from pathlib import Path
@@ -116,6 +119,61 @@ class Lesson(NamedTuple):
     lesson_data: LessonData
 
 
+def conflict_id(lesson_ids: Iterable[str]) -> str:
+    """
+    Вычисляет UUID пары-заглушки по UUID пар, которые стоят в одно и то же
+    время. Результат не зависит от порядка пар и совпадает между запусками.
+
+    >>> conflict_id(["1", "2"]) == conflict_id(["2", "1"])
+    True
+
+    :param lesson_ids: UUID пар
+    :returns: UUID версии 4
+    """
+
+    digest = hashlib.sha256("\n".join(sorted(lesson_ids)).encode()).digest()
+    return str(uuid.UUID(bytes=digest[:16], version=4))
+
+
+class Conflict(Lesson):
+    """
+    Несколько пар в одно и то же время.
+
+    Для обычных коллбэков это пара-заглушка с детерминированным UUID (см.
+    :func:`conflict_id`), а исходные пары доступны в атрибуте :attr:`lessons`.
+    При копировании методом ``_replace`` исходные пары теряются.
+
+    :param lessons: пары, которые стоят в одно и то же время
+    """
+
+    #: Данные пары-заглушки.
+    DATA = LessonData("?", "Ошибка в расписании: Несколько пар в одно и то же время")
+
+    #: Исходные пары, отсортированные по UUID.
+    lessons: tuple[Lesson, ...] = ()
+
+    def __new__(cls, lessons: Iterable[Lesson]) -> "Conflict":
+        sorted_lessons = tuple(sorted(lessons))
+        self = super().__new__(
+            cls, conflict_id(lesson.id for lesson in sorted_lessons), cls.DATA
+        )
+        self.lessons = sorted_lessons
+        return self
+
+    def __getnewargs__(self) -> tuple[tuple[Lesson, ...]]:  # type: ignore[override]
+        return (self.lessons,)
+
+
+class LessonTeachers(NamedTuple):
+
+    #: UUID преподавателей. Если преподаватель не определен однозначно, здесь
+    #: перечислены все кандидаты.
+    teachers: list[UUID4Str]
+
+    #: Определен ли преподаватель однозначно.
+    resolved: bool
+
+
 @dataclass
 class Week:
     """
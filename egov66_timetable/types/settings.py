@@ -6,7 +6,7 @@
 Типы данных для настроек.
 """
 
-from typing import TypedDict, NotRequired
+from typing import Literal, TypedDict, NotRequired
 
 from pydantic import ConfigDict, with_config
 
@@ -32,6 +32,52 @@ class Alias(TypedDict):
     rename: str
 
 
+@with_config(ConfigDict(extra="forbid", validate_assignment=True))
+class MetricsSettings(TypedDict):
+    """
+    Настройки выгрузки метрик.
+    """
+
+    #: Файл, в который после каждого запуска записываются метрики в текстовом
+    #: формате Prometheus.
+    prometheus_file: NotRequired[PathStr]
+
+    #: Файл, в который после каждого запуска записывается сводка метрик в
+    #: формате JSON.
+    json_file: NotRequired[PathStr]
+
+    #: Порт локального HTTP-сервера, который отдает метрики по адресу
+    #: ``/metrics``.
+    port: NotRequired[int]
+
+
+@with_config(ConfigDict(extra="forbid", validate_assignment=True))
+class RateLimitSettings(TypedDict):
+    """
+    Настройки ограничения частоты запросов.
+    """
+
+    #: Начальная частота запросов к сайту (запросов в секунду).
+    rate: NotRequired[float]
+
+    #: Наибольшая частота, до которой она растет, пока сайт справляется
+    #: (по умолчанию не ограничена).
+    max_rate: NotRequired[float]
+
+    #: Сколько запросов можно сделать подряд без ожидания.
+    burst: NotRequired[float]
+
+    #: Наименьшая частота, до которой она снижается при перегрузке сайта.
+    min_rate: NotRequired[float]
+
+    #: Ответ дольше этого времени (в секундах) считается признаком перегрузки.
+    latency_threshold: NotRequired[float]
+
+    #: База данных SQLite, через которую ограничение разделяется между
+    #: процессами.
+    state_file: NotRequired[PathStr]
+
+
 @with_config(ConfigDict(extra="allow", validate_assignment=True))
 class Settings(TypedDict):
     """
@@ -49,3 +95,46 @@ class Settings(TypedDict):
 
     #: Список переименований.
     aliases: NotRequired[list[Alias]]
+
+    #: Выгрузка метрик.
+    metrics: NotRequired[MetricsSettings]
+
+    #: Файл, в который записывается трассировка запуска в формате Chrome Trace
+    #: Event (см. :mod:`egov66_timetable.tracing`).
+    trace_file: NotRequired[PathStr]
+
+    #: Каталог, в который записываются результаты профилирования запуска (см.
+    #: :mod:`egov66_timetable.profiling`).
+    profile_dir: NotRequired[PathStr]
+
+    #: Файл, в котором хранятся ключи сеанса (см.
+    #: :mod:`egov66_timetable.sessions`). Если он указан, ключ сеанса в
+    #: ``cookies`` не изменяется.
+    sessions_file: NotRequired[PathStr]
+
+    #: Ограничение частоты запросов (см. :mod:`egov66_timetable.ratelimit`),
+    #: по умолчанию выключено.
+    #: Значение ``false`` выключает ограничение.
+    rate_limit: NotRequired[RateLimitSettings | Literal[False]]
+
+    #: Расписание звонков для календарей iCalendar: начало и конец каждой пары
+    #: (``"08:30-10:00"``), см. :mod:`egov66_timetable.callbacks.ics`.
+    bells: NotRequired[list[str]]
+
+
+@with_config(ConfigDict(extra="allow", validate_assignment=True))
+class InstanceSettings(Settings):
+    """
+    Настройки одного сайта для загрузки расписания с нескольких сайтов (см.
+    :mod:`egov66_timetable.multi`).
+    """
+
+    #: Короткое имя сайта, которое записывается в базу данных (по умолчанию
+    #: имя хоста).
+    name: NotRequired[str]
+
+    #: Номера групп.
+    groups: NotRequired[list[str]]
+
+    #: Сколько загрузок для этого сайта может выполняться одновременно.
+    max_workers: NotRequired[int]
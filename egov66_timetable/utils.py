@@ -6,24 +6,72 @@
 Разнообразные вспомогательные функции.
 """
 
+import contextlib
 import functools
 import json
-from collections.abc import Sequence
-from datetime import date, timedelta
+import os
+import stat
+import tempfile
+import threading
+from collections.abc import Iterator, Sequence
+from datetime import date, time, timedelta, timezone
 from pathlib import Path
 
 from bs4 import BeautifulSoup
 from pydantic import TypeAdapter
 
+from egov66_timetable import profiling
 from egov66_timetable.exceptions import (
     CSRFTokenNotFound,
     SessionExpired,
 )
-from egov66_timetable.types import Week
+from egov66_timetable.types import Timetable, Week
 from egov66_timetable.types.settings import Settings
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
 type NestedSequence = Sequence[object | NestedSequence]
 
+#: Начало и конец пары.
+type Bell = tuple[time, time]
+
+#: Расписание звонков по умолчанию (номер пары — индекс в списке).
+DEFAULT_BELLS: tuple[Bell, ...] = (
+    (time(8, 30), time(10, 0)),
+    (time(10, 10), time(11, 40)),
+    (time(12, 20), time(13, 50)),
+    (time(14, 0), time(15, 30)),
+    (time(15, 40), time(17, 10)),
+    (time(17, 20), time(18, 50)),
+    (time(19, 0), time(20, 30)),
+)
+
+#: Часовой пояс Екатеринбурга (UTC+5, без перехода на летнее время).
+YEKATERINBURG = timezone(timedelta(hours=5))
+
+_thread_locks: dict[Path, threading.Lock] = {}
+_umask_lock = threading.Lock()
+
+
+@functools.cache
+def _get_umask() -> int:
+    # В Linux umask можно прочитать, не меняя его
+    with contextlib.suppress(OSError, ValueError):
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+
+    # Иначе узнать umask можно, только заменив его. Это делается при первой
+    # записи нового файла, а не при импорте
+    with _umask_lock:
+        umask = os.umask(0o022)
+        os.umask(umask)
+    return umask
+
 
 @functools.cache
 def get_type_adapter[T](t: type[T]) -> TypeAdapter[T]:
@@ -71,6 +119,27 @@ def flatten(seq: NestedSequence) -> list[object]:
             raise ValueError
 
 
+def trim_weekend[T](timetable: Timetable[T]) -> Timetable[T]:
+    """
+    Удаляет с конца расписания субботу и воскресенье, если на них нет пар.
+    Расписание изменяется на месте.
+
+    :param timetable: расписание на неделю
+    :returns: то же расписание
+
+    >>> len(trim_weekend([{0: "Химия"}] + [{}] * 6))
+    5
+    >>> len(trim_weekend([{}] * 6 + [{0: "Химия"}]))
+    7
+    """
+
+    for _ in range(2):
+        if len(timetable[-1]) > 0:
+            break
+        del timetable[-1]
+    return timetable
+
+
 def get_csrf_token(soup: BeautifulSoup) -> str:
     """
     :param soup: разобранный HTML-код страницы
@@ -91,6 +160,27 @@ def get_csrf_token(soup: BeautifulSoup) -> str:
     raise CSRFTokenNotFound
 
 
+def parse_bells(values: Sequence[str]) -> tuple[Bell, ...]:
+    """
+    Разбирает расписание звонков вида ``["08:30-10:00", "10:10-11:40"]``.
+
+    >>> parse_bells(["08:30-10:00"])
+    ((datetime.time(8, 30), datetime.time(10, 0)),)
+
+    :param values: начало и конец каждой пары через дефис
+    :returns: расписание звонков
+    :raises ValueError: если строка записана неверно
+    """
+
+    result: list[Bell] = []
+    for value in values:
+        start, sep, end = value.partition("-")
+        if not sep:
+            raise ValueError(f"некорректное время пары: {value!r}")
+        result.append((time.fromisoformat(start.strip()), time.fromisoformat(end.strip())))
+    return tuple(result)
+
+
 def get_current_week() -> Week:
     """
     :returns: текущая неделя
@@ -124,5 +214,62 @@ def write_settings(settings: Settings) -> None:
     :param settings: настройки
     """
 
-    with open("settings.json", "w") as file:
-        json.dump(settings, file, indent=2, ensure_ascii=False)
+    write_atomic(Path("settings.json"),
+                 json.dumps(settings, indent=2, ensure_ascii=False))
+
+
+def write_atomic(path: str | Path, data: str | bytes) -> None:
+    """
+    Записывает файл атомарно: сначала во временный файл рядом, затем заменяет
+    им исходный. Читатели видят либо старое, либо новое содержимое целиком.
+    Права доступа сохраняются, а новый файл создается с правами по umask, как
+    при обычном :func:`open`.
+
+    :param path: путь к файлу
+    :param data: содержимое
+    """
+
+    path = Path(path)
+    with profiling.stage("persist"):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as file:
+                file.write(data)
+            try:
+                mode = stat.S_IMODE(path.stat().st_mode)
+            except FileNotFoundError:
+                mode = 0o666 & ~_get_umask()
+            # mkstemp создает файл с правами 0600
+            os.chmod(tmp, mode)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+@contextlib.contextmanager
+def file_lock(path: str | Path) -> Iterator[None]:
+    """
+    Блокирует файл на время выполнения блока кода, чтобы его не изменил другой
+    поток или процесс. Для блокировки используется отдельный файл с суффиксом
+    ``.lock``. Там, где нет :mod:`fcntl`, блокировка действует только внутри
+    процесса.
+
+    :param path: путь к защищаемому файлу
+    """
+
+    lock_path = Path(path).with_name(Path(path).name + ".lock").absolute()
+    thread_lock = _thread_locks.setdefault(lock_path, threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
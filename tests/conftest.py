@@ -0,0 +1,52 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import locale
+import threading
+from uuid import uuid4
+
+import pytest
+
+from egov66_timetable.client import Client
+from egov66_timetable.exceptions import NetworkError
+from egov66_timetable.types import Lesson, LessonData, Timetable
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def calls(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, int]]:
+    """
+    Подменяет загрузку расписания: у группы ``bad`` всегда ошибка сети, у
+    остальных — одна пара с названием группы в аудитории с именем хоста.
+    Возвращает список загрузок ``(группа, смещение)``.
+    """
+
+    calls: list[tuple[str, int]] = []
+    lock = threading.Lock()
+
+    def make_timetable(self, group: str, *, offset: int = 0) -> Timetable[Lesson]:
+        with lock:
+            calls.append((group, offset))
+        if group == "bad":
+            raise NetworkError
+        return [{0: Lesson(str(uuid4()), LessonData(self.instance.netloc, group))}]
+
+    monkeypatch.setattr(locale, "setlocale", lambda *args: None)
+    monkeypatch.setattr(Client, "make_timetable", make_timetable)
+    return calls
@@ -0,0 +1,203 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import asyncio
+
+import httpx
+import pytest
+
+from egov66_timetable import (
+    aiter_timetables,
+    get_timetable,
+    iter_timetables,
+)
+from egov66_timetable.client import Client, ClientPool, create_http_client
+from egov66_timetable.exceptions import (
+    CSRFTokenNotFound,
+    NetworkError,
+    SessionExpired,
+)
+from egov66_timetable.types import Lesson, Timetable
+from egov66_timetable.types.settings import Settings
+
+settings: Settings = {
+    "instance": "https://t00.ecp.egov66.ru",
+    "cookies": {},
+}
+
+
+def test_iter_timetables_lazy(calls):
+    it = iter_timetables(["1", "2", "3"], range(2), settings=settings)
+    assert calls == []
+
+    timetable, group, _ = next(it)
+    assert group == "1"
+    assert timetable[0][0].lesson_data.name == "1"
+    assert calls == [("1", 0)]
+
+    it.close()
+    assert calls == [("1", 0)]
+
+
+def test_iter_timetables_order(calls):
+    result = [(group, week.week_id)
+              for _, group, week in iter_timetables(["1", "2"], range(-1, 1),
+                                                    settings=settings)]
+    assert [group for group, _ in result] == ["1", "2", "1", "2"]
+    assert calls == [("1", -1), ("2", -1), ("1", 0), ("2", 0)]
+
+
+def test_iter_timetables_failures(calls):
+    failures: dict[int, list[str]] = {}
+    groups = [group for _, group, _ in iter_timetables(["1", "bad", "2"],
+                                                       settings=settings,
+                                                       failures=failures)]
+    assert groups == ["1", "2"]
+    assert failures == {0: ["bad"]}
+
+
+def test_get_timetable_failures(calls):
+    seen: list[str] = []
+    failures = get_timetable(["bad", "1"], [lambda _t, group, _w: seen.append(group)],
+                             settings=settings)
+    assert seen == ["1"]
+    assert failures == {0: ["bad"]}
+
+
+def test_aiter_timetables(calls):
+    async def consume() -> list[str]:
+        result: list[str] = []
+        async for _, group, _ in aiter_timetables(["1", "2", "3"], settings=settings):
+            result.append(group)
+            if group == "2":
+                break
+        return result
+
+    assert asyncio.run(consume()) == ["1", "2"]
+    assert calls == [("1", 0), ("2", 0)]
+
+
+def test_iter_timetables_workers(calls):
+    failures: dict[int, list[str]] = {}
+    groups = [str(i) for i in range(20)] + ["bad"]
+    result = {group for _, group, _ in iter_timetables(groups, range(2), settings=settings,
+                                                       failures=failures, workers=4,
+                                                       max_attempts=1)}
+    assert result == set(groups) - {"bad"}
+    assert sorted(calls) == sorted((group, offset) for offset in range(2) for group in groups)
+    assert failures == {0: ["bad"], 1: ["bad"]}
+
+
+def test_iter_timetables_workers_early_exit(calls):
+    it = iter_timetables([str(i) for i in range(100)], settings=settings, workers=2)
+    next(it)
+    it.close()
+    assert len(calls) <= 2 * 2 + 1
+
+
+def test_client_pool_sessions():
+    pool = ClientPool(settings, Client, size=2)
+    with pool.client() as first, pool.client() as second:
+        assert first is not second
+        assert first.settings is settings
+        assert second.settings["cookies"] is not settings["cookies"]
+    with pool.client() as client:
+        assert client in (first, second)
+
+    # Соединения общие, а сеансы — нет
+    assert first.http is second.http is pool.http
+    first.settings["cookies"]["edinyi_lk_session"] = "first"
+    assert first._cookie_header() == {"Cookie": "edinyi_lk_session=first"}
+    assert second._cookie_header() == {}
+
+    pool.close()
+    assert pool.http.is_closed
+
+
+def test_http_client_ignores_cookies():
+    http_client = create_http_client(max_connections=4)
+    request = httpx.Request("GET", settings["instance"])
+    response = httpx.Response(200, headers={"Set-Cookie": "edinyi_lk_session=x; Path=/"},
+                              request=request)
+    http_client.cookies.extract_cookies(response)
+    assert not http_client.cookies
+    assert response.cookies["edinyi_lk_session"] == "x"
+
+    client = Client(settings)
+    assert client.http is client.http
+    owned = client.http
+    client.close()
+    assert owned.is_closed
+    assert not client.http.is_closed
+
+
+@pytest.fixture
+def flaky(monkeypatch: pytest.MonkeyPatch, calls) -> list[tuple[str, int]]:
+    make_timetable = Client.make_timetable
+
+    def flaky_make_timetable(self, group: str, *, offset: int = 0) -> Timetable[Lesson]:
+        if group == "flaky" and (group, offset) not in calls:
+            calls.append((group, offset))
+            raise SessionExpired
+        return make_timetable(self, group, offset=offset)
+
+    monkeypatch.setattr(Client, "make_timetable", flaky_make_timetable)
+    return calls
+
+
+def test_get_timetable_requeue(flaky):
+    seen: list[str] = []
+    result = get_timetable(["flaky", "1", "bad"],
+                           [lambda _t, group, _w: seen.append(group)], settings=settings)
+    assert seen == ["1", "flaky"]
+    assert result == {0: ["bad"]}
+    assert result.attempts == {(0, "flaky"): 2, (0, "1"): 1, (0, "bad"): 3}
+    assert result.retried == {(0, "flaky"): 2, (0, "bad"): 3}
+
+
+def test_iter_timetables_workers_requeue(flaky):
+    failures: dict[int, list[str]] = {}
+    groups = [str(i) for i in range(10)] + ["flaky"]
+    result = {group for _, group, _ in iter_timetables(groups, settings=settings,
+                                                       failures=failures, workers=4)}
+    assert result == set(groups)
+    assert failures == {}
+
+
+def test_client_session_restart(monkeypatch: pytest.MonkeyPatch):
+    request = httpx.Request("POST", settings["instance"])
+    errors: list[Exception] = [
+        httpx.HTTPStatusError("", request=request,
+                              response=httpx.Response(419, request=request)),
+    ]
+    initial_loads: list[int] = []
+
+    def fetch_initial_data(self, **kwargs) -> None:
+        initial_loads.append(1)
+        self._csrf_token = "token"
+        self._data = {"serverMemo": {"data": {"group": None, "events": {}}}}
+
+    def fetch_timetable(self, search: str, *, offset: int = 0) -> None:
+        self._get_data()
+        if errors:
+            raise errors.pop()
+
+    monkeypatch.setattr(Client, "_fetch_initial_data", fetch_initial_data)
+    monkeypatch.setattr(Client, "fetch_timetable", fetch_timetable)
+
+    client = Client(settings)
+    assert client._fetch_events("101", offset=1) == {}
+    assert len(initial_loads) == 2
+
+    errors.extend([
+        SessionExpired(),
+        CSRFTokenNotFound(),
+    ])
+    with pytest.raises(SessionExpired):
+        client._fetch_events("102", offset=1)
+
+    errors.append(httpx.HTTPStatusError("", request=request,
+                                        response=httpx.Response(500, request=request)))
+    with pytest.raises(NetworkError):
+        client._fetch_events("103", offset=1)
@@ -0,0 +1,83 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+from uuid import uuid4
+
+import pytest
+
+from egov66_timetable.callbacks.html import collapse_timetable
+from egov66_timetable.compact import (
+    CompactStore,
+    CompactTimetable,
+    StringTable,
+    compact_callback,
+)
+from egov66_timetable.types import Conflict, Lesson, LessonData, Timetable, Week
+
+
+@pytest.fixture
+def timetable() -> Timetable[Lesson]:
+    return [
+        {0: Lesson(str(uuid4()), LessonData("100", "А")),
+         1: Lesson(str(uuid4()), LessonData("100", "А")),
+         3: Lesson(str(uuid4()), LessonData("", "Б"))},
+        {},
+        {2: Lesson(str(uuid4()), LessonData("200", "В"))},
+    ]
+
+
+def test_roundtrip(timetable):
+    compact = CompactTimetable.from_timetable(timetable, StringTable())
+
+    assert len(compact) == 3
+    assert compact.width == 4
+    assert compact.to_timetable() == timetable
+    assert list(compact[0]) == [0, 1, 3]
+    assert len(compact[1]) == 0
+    assert compact[-1][2] == timetable[2][2]
+    assert compact[0].get(2) is None
+    with pytest.raises(IndexError):
+        compact[3]
+
+
+def test_conflict(timetable):
+    lessons = [Lesson(str(uuid4()), LessonData("100", "А")),
+               Lesson(str(uuid4()), LessonData("200", "Б"))]
+    timetable[1][0] = Conflict(lessons)
+    compact = CompactTimetable.from_timetable(timetable, StringTable())
+
+    lesson = compact[1][0]
+    assert isinstance(lesson, Conflict)
+    assert lesson == timetable[1][0]
+    assert lesson.lessons == tuple(sorted(lessons))
+    assert not isinstance(compact[0][0], Conflict)
+
+
+def test_strings_shared(timetable):
+    strings = StringTable()
+    CompactTimetable.from_timetable(timetable, strings)
+    CompactTimetable.from_timetable(timetable, strings)
+
+    assert sorted(strings.strings) == ["", "100", "200", "А", "Б", "В"]
+
+
+def test_collapse(timetable):
+    compact = CompactTimetable.from_timetable(timetable, StringTable())
+    assert collapse_timetable(compact) == collapse_timetable(timetable)
+
+
+def test_empty():
+    compact = CompactTimetable.from_timetable([{} for _ in range(5)], StringTable())
+    assert compact.to_timetable() == [{} for _ in range(5)]
+
+
+def test_compact_callback(timetable):
+    store = CompactStore()
+    week = Week.from_week_id("2000-2")
+    compact_callback(store)(timetable, "101", week)
+
+    compact = store.get("101", week)
+    assert compact is not None
+    assert compact.to_timetable() == timetable
+    assert store.get("102", week) is None
@@ -0,0 +1,121 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+from uuid import uuid4
+
+import pytest
+
+from egov66_timetable.client import Client
+from egov66_timetable.derive import TimetableIndex
+from egov66_timetable.types import (
+    Conflict,
+    Lesson,
+    LessonData,
+    LessonTeachers,
+    Timetable,
+)
+from egov66_timetable.types.livewire import Events
+from egov66_timetable.types.settings import Settings
+from egov66_timetable.utils import get_type_adapter
+
+settings: Settings = {
+    "instance": "https://t00.ecp.egov66.ru",
+    "cookies": {},
+}
+
+mendeleev = str(uuid4())
+pasteur = str(uuid4())
+
+
+def make_lesson_dict(day: int, pair: int, teachers: object) -> dict[str, object]:
+    return {
+        "id": str(uuid4()),
+        "classroom": None,
+        "group": "101",
+        "place": "100",
+        "discipline": "Химия",
+        "comment": None,
+        "teachers": teachers,
+        "dayWeekNum": day,
+        "numberPair": pair,
+    }
+
+
+def test_make_lesson_teachers(monkeypatch: pytest.MonkeyPatch):
+    events = get_type_adapter(Events).validate_python({
+        "0-1": [make_lesson_dict(0, 1, {
+            "1": {"id": mendeleev, "fio": "Менделеев Дмитрий Иванович"},
+            "2": {"id": pasteur, "fio": "Пастер Луи"},
+            "3": "Менделеев Д.И.",
+        })],
+        "0-2": [make_lesson_dict(0, 2, {
+            "1": {"id": mendeleev, "fio": "Менделеев Дмитрий Иванович"},
+            "3": "Ломоносов М.В.",
+        })],
+        "0-3": [make_lesson_dict(0, 3, [])],
+        "0-4": [make_lesson_dict(0, 4, {"1": {"id": pasteur, "fio": "Пастер Луи"}}),
+                make_lesson_dict(0, 4, {"1": {"id": mendeleev, "fio": None}})],
+    })
+    monkeypatch.setattr(Client, "_fetch_events", lambda *args, **kwargs: events)
+
+    assert Client(settings).make_lesson_teachers("101") == {
+        (0, 0): LessonTeachers([mendeleev], True),
+        (0, 1): LessonTeachers([mendeleev], False),
+        (0, 2): LessonTeachers([], True),
+        (0, 3): LessonTeachers([pasteur, mendeleev], False),
+    }
+
+
+def test_make_timetable_conflict(monkeypatch: pytest.MonkeyPatch):
+    first, second = make_lesson_dict(0, 1, []), make_lesson_dict(0, 1, [])
+    second["place"] = "200"
+    events = get_type_adapter(Events).validate_python({"0-1": [first, second]})
+    monkeypatch.setattr(Client, "_fetch_events", lambda *args, **kwargs: events)
+
+    conflict = Client(settings).make_timetable("101")[0][0]
+    assert isinstance(conflict, Conflict)
+    assert conflict.lesson_data == Conflict.DATA
+    assert sorted(lesson.lesson_data.where for lesson in conflict.lessons) == ["100", "200"]
+
+    # UUID не меняется между запусками и не зависит от порядка пар
+    events = get_type_adapter(Events).validate_python({"0-1": [second, first]})
+    assert Client(settings).make_timetable("101")[0][0].id == conflict.id
+
+    index = TimetableIndex()
+    index.add([{0: conflict}], "101", {})
+    assert index.classroom_timetable("200")[:1] == [
+        {0: [Lesson(str(second["id"]), LessonData("101", "Химия"))]}
+    ]
+
+
+def test_timetable_index():
+    first, second = str(uuid4()), str(uuid4())
+    index = TimetableIndex()
+    index.add([{0: Lesson(first, LessonData("100", "А"))}], "101",
+              {(0, 0): LessonTeachers([mendeleev], True)})
+    index.add([{0: Lesson(second, LessonData("100", "А"))}], "102",
+              {(0, 0): LessonTeachers([mendeleev], True)})
+
+    expected: Timetable[list[Lesson]] = [{0: [
+        Lesson(first, LessonData("101", "А")),
+        Lesson(second, LessonData("102", "А")),
+    ]}]
+    assert index.is_resolved(mendeleev)
+    assert index.teacher_timetable(mendeleev)[:1] == expected
+    assert index.classroom_timetable("100")[:1] == expected
+    assert index.teacher_timetable(pasteur)[0] == {}
+
+
+def test_timetable_index_unresolved():
+    index = TimetableIndex()
+    index.add([{0: Lesson(str(uuid4()), LessonData("100", "А"))}], "101",
+              {(0, 0): LessonTeachers([pasteur], False)})
+
+    assert not index.is_resolved(pasteur)
+    assert index.is_resolved(mendeleev)
+
+    index.add([{1: Lesson(str(uuid4()), LessonData("?", "Ошибка"))}], "102", {})
+
+    assert not index.is_resolved(mendeleev)
+    assert "?" not in index.classrooms
@@ -0,0 +1,140 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import sqlite3
+from uuid import uuid4
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    load_timetable,
+    sqlite_callback,
+    sqlite_teacher_callback,
+)
+from egov66_timetable.diff import diff_timetables
+from egov66_timetable.types import (
+    Conflict,
+    Lesson,
+    LessonData,
+    Teacher,
+    Timetable,
+    Week,
+)
+
+
+def make_lesson(where: str = "100", name: str = "Математика") -> Lesson:
+    return Lesson(str(uuid4()), LessonData(where, name))
+
+
+def test_no_changes():
+    lesson = make_lesson()
+    timetable: Timetable[Lesson] = [{0: lesson}, {}]
+    diff = diff_timetables(timetable, [{0: lesson}])
+    assert not diff
+    assert diff == ([], [], [], [], [], [])
+
+
+def test_classify():
+    kept, moved, room, renamed, removed, added = (make_lesson() for _ in range(6))
+    old: Timetable[Lesson] = [
+        {0: kept, 1: moved, 2: room},
+        {0: renamed, 1: removed},
+    ]
+    new: Timetable[Lesson] = [
+        {0: kept, 2: room._replace(lesson_data=LessonData("200", "Математика"))},
+        {0: renamed._replace(lesson_data=LessonData("100", "Физика")), 1: added},
+        {3: moved},
+    ]
+
+    diff = diff_timetables(old, new)
+    assert diff
+    assert [change.id for change in diff.added] == [added.id]
+    assert [change.id for change in diff.removed] == [removed.id]
+    assert [(change.id, change.old_position, change.new_position)
+            for change in diff.moved] == [(moved.id, (0, 1), (2, 3))]
+    assert [(change.id, change.old, change.new) for change in diff.room_changed] == [
+        (room.id, ("100", "Математика"), ("200", "Математика"))
+    ]
+    assert [change.new for change in diff.renamed] == [("100", "Физика")]
+    assert {change.id for change in diff.changed} == {moved.id, room.id, renamed.id}
+
+
+def test_moved_and_renamed():
+    lesson = make_lesson()
+    diff = diff_timetables(
+        [{0: lesson}],
+        [{1: lesson._replace(lesson_data=LessonData("200", "Физика"))}],
+    )
+    change, = diff.changed
+    assert change.moved and change.room_changed and change.renamed
+    assert diff.moved == diff.room_changed == diff.renamed == [change]
+
+
+def test_teacher_timetable():
+    # Одна пара у двух групп с одним UUID
+    lesson_id = str(uuid4())
+    first = Lesson(lesson_id, LessonData("101", "Математика"))
+    second = Lesson(lesson_id, LessonData("102", "Математика"))
+    other = make_lesson("101")
+
+    old: Timetable[list[Lesson]] = [{0: [first, second], 1: [other]}]
+    new: Timetable[list[Lesson]] = [{0: [second]}, {1: [first, other]}]
+    diff = diff_timetables(old, new)
+    assert not diff.added and not diff.removed
+    moved = sorted((change.id, change.old.where if change.old else None,
+                    change.new_position) for change in diff.moved)
+    assert moved == sorted([(lesson_id, "101", (1, 1)), (other.id, "101", (1, 1))])
+    assert diff.room_changed == []
+
+    diff = diff_timetables(old, [{0: [first]}])
+    assert [(change.id, change.old) for change in diff.removed] == [
+        (lesson_id, ("102", "Математика")), (other.id, ("101", "Математика"))
+    ]
+
+
+def test_sqlite_callback():
+    conn = sqlite3.connect(":memory:")
+    create_db(conn)
+    callback = sqlite_callback(conn)
+    week = Week.from_week_id("2026-3")
+
+    kept, moved, removed = make_lesson(), make_lesson(), make_lesson()
+    callback([{0: kept, 1: moved, 2: removed}], "101", week)
+    teacher = Teacher(str(uuid4()), "Менделеев", "Дмитрий", "Иванович")
+    sqlite_teacher_callback(conn)([{1: [Lesson(moved.id, LessonData("101", "Химия"))]}],
+                                  teacher, week)
+
+    changed = moved._replace(lesson_data=LessonData("200", "Физика"))
+    added = make_lesson()
+    callback([{0: kept, 2: added}, {1: changed}], "101", week)
+
+    assert load_timetable(conn, group="101", week=week) == [
+        {0: kept, 2: added}, {1: changed}, {}, {}, {}
+    ]
+    # Измененная пара обновлена на месте, а не добавлена заново
+    assert conn.execute("SELECT teacher_id FROM lesson WHERE id = ?",
+                        [moved.id]).fetchone() == (teacher.id,)
+    obsolete = {row[0] for row in conn.execute(
+        "SELECT id FROM lesson WHERE obsolete_since IS NOT NULL"
+    )}
+    assert obsolete == {removed.id}
+
+    # Удаленная пара вернулась в расписание
+    callback([{0: kept, 2: removed}, {1: changed}], "101", week)
+    assert load_timetable(conn, group="101", week=week) == [
+        {0: kept, 2: removed}, {1: changed}, {}, {}, {}
+    ]
+
+
+def test_sqlite_callback_conflict():
+    conn = sqlite3.connect(":memory:")
+    create_db(conn)
+    callback = sqlite_callback(conn)
+    week = Week.from_week_id("2026-3")
+
+    first, second = make_lesson("100"), make_lesson("200")
+    callback([{0: Conflict([first, second])}], "101", week)
+    changes = conn.total_changes
+
+    callback([{0: Conflict([second, first])}], "101", week)
+    assert conn.total_changes == changes
@@ -0,0 +1,100 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+from pathlib import Path
+from uuid import uuid4
+
+from egov66_timetable.callbacks.ics import (
+    _fold,
+    ics_callback,
+    ics_teacher_callback,
+)
+from egov66_timetable.types import Lesson, LessonData, Teacher, Timetable, Week
+from egov66_timetable.utils import parse_bells
+
+week = Week.from_week_id("2026-10")
+
+
+def unfold(text: str) -> list[str]:
+    return text.replace("\r\n ", "").split("\r\n")
+
+
+def events(text: str) -> list[dict[str, str]]:
+    result: list[dict[str, str]] = []
+    for line in unfold(text):
+        key, _, value = line.partition(":")
+        if line == "BEGIN:VEVENT":
+            result.append({})
+        elif result and line and key not in ("END", "BEGIN"):
+            result[-1].setdefault(key, value)
+    return result
+
+
+def test_fold():
+    line = "SUMMARY:" + "Математика, " * 20
+    folded = _fold(line)
+    assert folded.replace("\r\n ", "") == line
+    assert all(len(part.encode()) <= 75 for part in folded.split("\r\n"))
+
+
+def test_ics_callback(tmp_path: Path):
+    lesson, other = str(uuid4()), str(uuid4())
+    timetable: Timetable[Lesson] = [
+        {1: Lesson(lesson, LessonData("100", "Химия; практика"))},
+        {},
+        {0: Lesson(other, LessonData("", "Физика"))},
+    ]
+    callback = ics_callback(tmp_path)
+    callback(timetable, "101", week)
+
+    feed = tmp_path / "101.ics"
+    text = feed.read_bytes().decode()
+    assert text.startswith("BEGIN:VCALENDAR\r\n")
+    assert events(text) == [
+        {"UID": f"{lesson}@egov66-timetable", "DTSTAMP": events(text)[0]["DTSTAMP"],
+         "DTSTART": "20260302T051000Z", "DTEND": "20260302T064000Z",
+         "SUMMARY": "Химия\\; практика", "LOCATION": "100"},
+        {"UID": f"{other}@egov66-timetable", "DTSTAMP": events(text)[1]["DTSTAMP"],
+         "DTSTART": "20260304T033000Z", "DTEND": "20260304T050000Z",
+         "SUMMARY": "Физика"},
+    ]
+
+    # Без изменений файл не перезаписывается
+    mtime = feed.stat().st_mtime_ns
+    callback(timetable, "101", week)
+    assert feed.stat().st_mtime_ns == mtime
+
+    # Недели объединяются, перенесенная пара сохраняет UID
+    callback([{0: Lesson(lesson, LessonData("200", "Химия"))}], "101", week + 1)
+    callback([{2: Lesson(other, LessonData("", "Физика"))}], "101", week)
+    uids = [event["UID"] for event in events(feed.read_bytes().decode())]
+    assert uids == [f"{other}@egov66-timetable", f"{lesson}@egov66-timetable"]
+
+    # Пустая неделя удаляет ее события
+    callback([], "101", week)
+    assert len(events(feed.read_bytes().decode())) == 1
+
+
+def test_ics_bells(tmp_path: Path):
+    timetable: Timetable[Lesson] = [{0: Lesson(str(uuid4()), LessonData("100", "А")),
+                                     1: Lesson(str(uuid4()), LessonData("100", "Б"))}]
+    ics_callback(tmp_path, bells=parse_bells(["09:00-10:30"]))(timetable, "101", week)
+    [event] = events((tmp_path / "101.ics").read_bytes().decode())
+    assert event["DTSTART"] == "20260302T040000Z"
+
+
+def test_ics_teacher_callback(tmp_path: Path):
+    teacher = Teacher(str(uuid4()), "Менделеев", "Дмитрий", "Иванович")
+    joint = str(uuid4())
+    timetable: Timetable[list[Lesson]] = [
+        {0: [Lesson(joint, LessonData("102", "Химия")),
+             Lesson(joint, LessonData("101", "Химия"))]},
+    ]
+    ics_teacher_callback(tmp_path)(timetable, teacher, week)
+
+    text = (tmp_path / "mendeleev_d_i.ics").read_bytes().decode()
+    assert "X-WR-CALNAME:Менделеев\xa0Д.\xa0И." in unfold(text)
+    [event] = events(text)
+    assert event["SUMMARY"] == "Химия (101\\, 102)"
+    assert event["DESCRIPTION"] == "Группы: 101\\, 102"
@@ -0,0 +1,160 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from egov66_timetable.client import Client
+from egov66_timetable.jobqueue import JobQueue, run_worker
+from egov66_timetable.types import Lesson, Teacher, Timetable, Week
+from egov66_timetable.types.settings import InstanceSettings
+from egov66_timetable.utils import get_current_week, get_type_adapter
+from tests.conftest import FakeClock
+
+INSTANCE = "t00.ecp.egov66.ru"
+
+
+@pytest.fixture
+def queue(tmp_path: Path, clock: FakeClock):
+    queue = JobQueue(tmp_path / "jobs.db", lease_timeout=60, backoff=10,
+                     max_backoff=25, clock=clock)
+    yield queue
+    queue.close()
+
+
+def test_enqueue_dedup(queue: JobQueue):
+    assert queue.enqueue(INSTANCE, "group", "101", "2026-3")
+    assert not queue.enqueue(INSTANCE, "group", "101", "2026-3")
+    assert queue.enqueue(INSTANCE, "group", "101", "2026-4")
+    assert queue.enqueue_many(INSTANCE, "group", ["101", "102"], range(2)) == 4
+    assert queue.stats().queued == 6
+
+
+def test_enqueue_teacher(queue: JobQueue):
+    teacher = Teacher(str(uuid4()), "Иванов", "Иван", "Иванович")
+    assert queue.enqueue(INSTANCE, "teacher", teacher, "2026-3")
+    job, = queue.lease("w1")
+    assert get_type_adapter(Teacher).validate_json(job.target) == teacher
+
+
+def test_lease_ack(queue: JobQueue, clock: FakeClock):
+    queue.enqueue(INSTANCE, "group", "101", "2026-3")
+    queue.enqueue(INSTANCE, "group", "102", "2026-3")
+
+    first, = queue.lease("w1")
+    second, = queue.lease("w2")
+    assert {first.target, second.target} == {"101", "102"}
+    assert queue.lease("w3") == []
+
+    assert not queue.ack(first, "w2")
+    assert queue.ack(first, "w1")
+    clock.now += 30
+    stats = queue.stats()
+    assert (stats.queued, stats.leased, stats.done) == (0, 1, 1)
+    assert stats.throughput > 0
+
+    # После завершения задание можно поставить в очередь снова
+    assert queue.enqueue(INSTANCE, "group", "101", "2026-3")
+
+
+def test_expired_lease(queue: JobQueue, clock: FakeClock):
+    queue.enqueue(INSTANCE, "group", "101", "2026-3")
+    job, = queue.lease("crashed")
+
+    clock.now += 40
+    assert queue.heartbeat(job, "crashed")
+    clock.now += 40
+    assert queue.lease("w2") == []
+
+    clock.now += 40
+    released, = queue.lease("w2")
+    assert released.id == job.id
+    assert released.attempts == 2
+    assert not queue.ack(job, "crashed")
+    assert queue.ack(released, "w2")
+
+
+def test_expired_lease_attempts(queue: JobQueue, clock: FakeClock):
+    # Задание, на котором обработчик каждый раз завершается аварийно
+    queue.enqueue(INSTANCE, "group", "101", "2026-3", max_attempts=2)
+    queue.lease("crashed")
+    clock.now += 61
+    job, = queue.lease("crashed")
+    assert job.attempts == 2
+
+    clock.now += 61
+    assert queue.lease("w2") == []
+    stats = queue.stats()
+    assert (stats.leased, stats.failed) == (0, 1)
+    assert not queue.ack(job, "crashed")
+
+
+def test_fail_backoff(queue: JobQueue, clock: FakeClock):
+    queue.enqueue(INSTANCE, "group", "101", "2026-3", max_attempts=3)
+
+    job, = queue.lease("w1")
+    assert queue.fail(job, "w1", "NetworkError")
+    assert queue.lease("w1") == []
+    assert queue.stats().lag == 0
+
+    clock.now += 10
+    job, = queue.lease("w1")
+    queue.fail(job, "w1", "NetworkError")
+    clock.now += 19
+    assert queue.lease("w1") == []
+    clock.now += 1
+    assert queue.stats().lag == 0
+
+    clock.now += 5
+    assert queue.stats().lag == 5
+    job, = queue.lease("w1")
+    assert job.attempts == 3
+    queue.fail(job, "w1", "NetworkError")
+    assert queue.stats().failed == 1
+
+    clock.now += 1000
+    assert queue.lease("w1") == []
+    assert queue.prune(500) == 1
+
+
+def test_run_worker(calls: list[tuple[str, int]], queue: JobQueue):
+    queue.enqueue_many(INSTANCE, "group", ["101", "bad"], range(0, 2))
+    queue.enqueue("unknown", "group", "101", get_current_week())
+
+    seen: list[tuple[str, str, Week]] = []
+    settings: InstanceSettings = {"instance": f"https://{INSTANCE}", "cookies": {}}
+    processed = run_worker(
+        queue, [settings],
+        callbacks=lambda instance: [
+            lambda _t, group, week: seen.append((instance, group, week))
+        ],
+        exit_when_empty=True,
+    )
+
+    assert processed == 2
+    assert sorted(calls) == [("101", 0), ("101", 1), ("bad", 0), ("bad", 1)]
+    current_week = get_current_week()
+    assert sorted((group, week.week_id) for _, group, week in seen) == [
+        ("101", current_week.week_id), ("101", (current_week + 1).week_id)
+    ]
+    stats = queue.stats()
+    assert (stats.done, stats.queued) == (2, 3)
+
+
+def test_run_worker_lost_lease(monkeypatch: pytest.MonkeyPatch, queue: JobQueue,
+                               clock: FakeClock):
+    def make_timetable(self, group: str, *, offset: int = 0) -> Timetable[Lesson]:
+        # Обработчик завис, и задание досталось другому
+        clock.now += 120
+        assert queue.lease("other")
+        return []
+
+    monkeypatch.setattr(Client, "make_timetable", make_timetable)
+    queue.enqueue(INSTANCE, "group", "101", get_current_week())
+
+    settings: InstanceSettings = {"instance": f"https://{INSTANCE}", "cookies": {}}
+    assert run_worker(queue, [settings], callbacks=lambda _: [], exit_when_empty=True) == 0
+    assert queue.stats().leased == 1
@@ -0,0 +1,103 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from uuid import uuid4
+
+from egov66_timetable.callbacks.json import (
+    export_sqlite,
+    json_callback,
+    json_teacher_callback,
+)
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    sqlite_callback,
+    sqlite_teacher_callback,
+)
+from egov66_timetable.types import Lesson, LessonData, Teacher, Timetable, Week
+from egov66_timetable.utils import get_type_adapter
+
+week = Week.from_week_id("2000-2")
+
+
+def test_json_callback(tmp_path: Path):
+    timetable: Timetable[Lesson] = [
+        {0: Lesson(str(uuid4()), LessonData("100", "А"))},
+        {},
+        {3: Lesson(str(uuid4()), LessonData("", "Б"))},
+    ]
+    json_callback(tmp_path)(timetable, "101", week)
+
+    document = json.loads((tmp_path / "101" / "2000-2.json").read_text())
+    assert document["group"] == "101"
+    assert document["week_id"] == "2000-2"
+    assert get_type_adapter(Timetable[Lesson]).validate_python(
+        document["timetable"]
+    ) == timetable
+
+
+def test_manifest(tmp_path: Path):
+    timetable: Timetable[Lesson] = [{0: Lesson(str(uuid4()), LessonData("100", "А"))}]
+    callback = json_callback(tmp_path, hashed=True)
+    callback(timetable, "101", week)
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    entry = manifest["groups"]["101"]["2000-2"]
+    data = (tmp_path / entry["file"]).read_bytes()
+    assert hashlib.sha256(data).hexdigest() == entry["sha256"]
+    assert entry["file"] == f"101/2000-2.{entry['sha256'][:16]}.json"
+
+    # Без изменений документ и манифест не перезаписываются
+    mtime = (tmp_path / "manifest.json").stat().st_mtime_ns
+    json_callback(tmp_path, hashed=True)(timetable, "101", week)
+    assert (tmp_path / "manifest.json").stat().st_mtime_ns == mtime
+
+    # Изменившийся документ получает новое имя, старый файл остается
+    timetable.append({1: Lesson(str(uuid4()), LessonData("200", "Б"))})
+    callback(timetable, "101", week)
+    new_entry = json.loads((tmp_path / "manifest.json").read_text())["groups"]["101"]["2000-2"]
+    assert new_entry["file"] != entry["file"]
+    assert (tmp_path / entry["file"]).exists()
+
+
+def test_manifest_shared(tmp_path: Path):
+    teacher = Teacher(str(uuid4()), "Менделеев", "Дмитрий", "Иванович")
+    group_callback = json_callback(tmp_path)
+    teacher_callback = json_teacher_callback(tmp_path)
+    for offset in range(3):
+        group_callback([], "101", week + offset)
+        teacher_callback([], teacher, week + offset)
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert len(manifest["groups"]["101"]) == 3
+    assert manifest["teachers"][teacher.id]["2000-3"]["file"] == "mendeleev_d_i/2000-3.json"
+
+
+def test_export_sqlite(tmp_path: Path):
+    conn = sqlite3.connect(":memory:")
+    create_db(conn)
+    teacher = Teacher(str(uuid4()), "Менделеев", "Дмитрий", "Иванович")
+    lesson = Lesson(str(uuid4()), LessonData("100", "Химия"))
+    for group in ("101", "102"):
+        sqlite_callback(conn)([{0: lesson}], group, week)
+    sqlite_teacher_callback(conn)([{0: [Lesson(lesson.id, LessonData("101", "Химия")),
+                                        Lesson(lesson.id, LessonData("102", "Химия"))]}],
+                                  teacher, week)
+
+    out_dir = tmp_path / "api"
+    report = export_sqlite(conn, out_dir, teachers=[teacher], hashed=True)
+    assert report == (3, 0)
+    assert export_sqlite(conn, out_dir, teachers=[teacher], hashed=True) == (0, 3)
+
+    manifest = json.loads((out_dir / "manifest.json").read_text())
+    assert sorted(manifest["groups"]) == ["101", "102"]
+    document = json.loads((out_dir / manifest["teachers"][teacher.id]["2000-2"]["file"])
+                          .read_text())
+    assert document["teacher"]["surname"] == "Менделеев"
+    assert document["timetable"] == [
+        {"0": [[lesson.id, ["101", "Химия"]], [lesson.id, ["102", "Химия"]]]}, {}, {}, {}, {}
+    ]
@@ -0,0 +1,87 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+import egov66_timetable.__main__ as cli
+
+
+@pytest.fixture
+def run(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "settings.json").write_text(json.dumps({
+        "instance": "https://t00.ecp.egov66.ru",
+        "cookies": {"edinyi_lk_session": "old"},
+    }))
+
+    calls: list[tuple[list[str], range, int, str]] = []
+
+    def get_timetable(groups, callbacks, *, settings, offset_range, workers):
+        calls.append((groups, offset_range, workers, settings["sessions_file"]))
+        return {offset_range.start: ["bad"]} if "bad" in groups else {}
+
+    monkeypatch.setattr(cli, "get_timetable", get_timetable)
+
+    def run(*args: str) -> tuple[object, list[tuple[list[str], range, int, str]]]:
+        monkeypatch.setattr(sys, "argv", ["ecp-egov66-timetable", *args])
+        with pytest.raises(SystemExit) as exc_info:
+            cli.main()
+        return exc_info.value.code, calls
+
+    return run
+
+
+def test_legacy_arguments(run, tmp_path: Path):
+    code, calls = run("101", "-1")
+    assert code == 0
+    assert calls == [(["101"], range(-1, 0), 1, "sessions.json")]
+
+    settings = json.loads((tmp_path / "settings.json").read_text())
+    assert settings == {
+        "instance": "https://t00.ecp.egov66.ru",
+        "cookies": {"edinyi_lk_session": "old"},
+    }
+
+
+def test_batch_arguments(run, tmp_path: Path):
+    (tmp_path / "groups.txt").write_text("# группы\n102\n\n103\n")
+    code, calls = run("-g", "101", "-G", "groups.txt", "--offsets=-1:2", "-j", "4",
+                      "--json", "out", "--sessions", "s.json")
+    assert code == 0
+    assert calls == [(["101", "102", "103"], range(-1, 2), 4, "s.json")]
+
+
+def test_failures_exit_code(run):
+    code, _ = run("-g", "101", "bad")
+    assert code == 1
+
+
+def test_no_groups(run):
+    code, _ = run()
+    assert code == 2
+
+
+def test_profile(run, tmp_path: Path):
+    code, _ = run("-g", "101", "--profile", "profile")
+    assert code == 0
+    run_dir, = (tmp_path / "profile").iterdir()
+    assert (run_dir / "report.txt").exists()
+
+
+def test_rate(run, monkeypatch: pytest.MonkeyPatch):
+    rate_limits: list[object] = []
+
+    def get_timetable(groups, callbacks, *, settings, offset_range, workers):
+        rate_limits.append(settings.get("rate_limit"))
+        return {}
+
+    monkeypatch.setattr(cli, "get_timetable", get_timetable)
+    assert run("-g", "101", "--rate", "2")[0] == 0
+    assert run("-g", "101", "--rate", "0")[0] == 0
+    assert rate_limits == [{"rate": 2.0, "max_rate": 2.0}, False]
+    assert run("-g", "101", "--rate", "-1")[0] == 2
@@ -0,0 +1,148 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import json
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from egov66_timetable.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    callback_name,
+    export,
+)
+from egov66_timetable.types.settings import Settings
+
+
+@pytest.fixture
+def registry() -> Registry:
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Запросы", ["method"]))
+    duration = registry.register(Histogram("duration_seconds", "Длительность", ["method"],
+                                           buckets=[0.1, 1.0]))
+    requests.inc(method="set")
+    requests.inc(2, method="set")
+    for value in (0.05, 0.5, 5.0):
+        duration.observe(value, method="set")
+    return registry
+
+
+def test_prometheus(registry: Registry):
+    assert registry.to_prometheus() == (
+        "# HELP requests_total Запросы\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{method="set"} 3\n'
+        "# HELP duration_seconds Длительность\n"
+        "# TYPE duration_seconds histogram\n"
+        'duration_seconds_bucket{method="set",le="0.1"} 1\n'
+        'duration_seconds_bucket{method="set",le="1"} 2\n'
+        'duration_seconds_bucket{method="set",le="+Inf"} 3\n'
+        'duration_seconds_sum{method="set"} 5.55\n'
+        'duration_seconds_count{method="set"} 3\n'
+    )
+
+
+def test_summary(registry: Registry):
+    summary = registry.summary()
+    assert summary["requests_total"] == [{"labels": {"method": "set"}, "value": 3}]
+
+    [duration] = summary["duration_seconds"]
+    assert duration["count"] == 3
+    assert duration["p50"] == pytest.approx(0.55)
+
+
+def test_duplicate(registry: Registry):
+    with pytest.raises(ValueError):
+        registry.register(Counter("requests_total", ""))
+
+
+def test_serve(registry: Registry):
+    server = registry.serve(0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.read().decode() == registry.to_prometheus()
+    finally:
+        registry.shutdown()
+
+
+def test_export(tmp_path: Path):
+    settings: Settings = {
+        "instance": "https://t00.ecp.egov66.ru",
+        "cookies": {},
+        "metrics": {
+            "prometheus_file": str(tmp_path / "metrics.prom"),
+            "json_file": str(tmp_path / "metrics.json"),
+        },
+    }
+    export(settings)
+
+    assert "egov66_timetable_requests_total" in (tmp_path / "metrics.prom").read_text()
+    assert "egov66_timetable_requests_total" in json.loads(
+        (tmp_path / "metrics.json").read_text()
+    )
+
+
+def test_reset_run(registry: Registry):
+    gauge = registry.register(Gauge("rate", "Частота"))
+    gauge.set(5)
+    registry.reset_run()
+    summary = registry.summary()
+    assert summary["requests_total"] == summary["duration_seconds"] == []
+    assert gauge.get() == 5
+
+
+def test_export_per_run(tmp_path: Path):
+    from egov66_timetable import metrics
+    from egov66_timetable._batch import batch_run
+
+    settings: Settings = {
+        "instance": "https://t00.ecp.egov66.ru",
+        "cookies": {},
+        "metrics": {"json_file": str(tmp_path / "metrics.json")},
+    }
+    with batch_run(settings):
+        metrics.JOB_RETRIES.inc()
+    with batch_run(settings):
+        pass
+
+    # Вторая выгрузка не включает первый запуск
+    summary = json.loads((tmp_path / "metrics.json").read_text())
+    assert summary["egov66_timetable_job_retries_total"] == []
+
+
+def test_callback_name():
+    def html_callback():
+        def callback():
+            pass
+        return callback
+
+    assert callback_name(html_callback()) == "test_callback_name"
+    assert callback_name(print) == "print"
+
+
+def test_client_records_requests(monkeypatch: pytest.MonkeyPatch):
+    import httpx
+
+    from egov66_timetable import metrics
+    from egov66_timetable.client import Client
+
+    def post(self: httpx.Client, url: str, **kwargs) -> httpx.Response:
+        request = httpx.Request("POST", url, json=kwargs["json"])
+        return httpx.Response(200, json={"serverMemo": {"data": {}}}, request=request)
+
+    monkeypatch.setattr(httpx.Client, "post", post)
+    client = Client({"instance": "https://t00.ecp.egov66.ru", "cookies": {}})
+    client._csrf_token = "secret!"
+    client._data = {"fingerprint": {}, "serverMemo": {  # type: ignore[assignment]
+        "data": {"group": None}, "checksum": "", "htmlHash": "",
+    }}
+
+    before = metrics.REQUESTS.get(stage="week", method="addWeek", status="200")
+    client._go_forward()
+    assert metrics.REQUESTS.get(stage="week", method="addWeek", status="200") == before + 1
@@ -0,0 +1,127 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import sqlite3
+import threading
+import time
+from uuid import uuid4
+
+import pytest
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    load_timetable,
+    sqlite_callback,
+)
+from egov66_timetable.client import Client
+from egov66_timetable.multi import (
+    get_multi_timetables,
+    instance_name,
+    iter_multi_timetables,
+)
+from egov66_timetable.types import Lesson, Timetable
+from egov66_timetable.types.settings import InstanceSettings
+from egov66_timetable.utils import get_current_week
+
+
+def make_instance(host: str, groups: list[str], **kwargs) -> InstanceSettings:
+    return {"instance": f"https://{host}", "cookies": {}, "groups": groups,
+            **kwargs}  # type: ignore[typeddict-item]
+
+
+def test_instance_name():
+    assert instance_name(make_instance("t00.ecp.egov66.ru", [])) == "t00.ecp.egov66.ru"
+    assert instance_name(make_instance("t00.ecp.egov66.ru", [], name="t00")) == "t00"
+
+
+def test_round_robin(calls):
+    instances = [make_instance("a", ["1", "2", "3"]), make_instance("b", ["1"]),
+                 make_instance("c", ["1", "2"])]
+    result = [(instance, group) for _, group, _, instance
+              in iter_multi_timetables(instances, workers=1)]
+    assert result == [("a", "1"), ("b", "1"), ("c", "1"), ("a", "2"), ("c", "2"),
+                      ("a", "3")]
+
+
+def test_per_instance_limit(monkeypatch: pytest.MonkeyPatch, calls):
+    active = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+    lock = threading.Lock()
+
+    def make_timetable(self, group: str, *, offset: int = 0) -> Timetable[Lesson]:
+        host = self.instance.netloc
+        with lock:
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+        time.sleep(0.005)
+        with lock:
+            active[host] -= 1
+        return [{}]
+
+    monkeypatch.setattr(Client, "make_timetable", make_timetable)
+    instances = [make_instance("a", [str(i) for i in range(20)], max_workers=1),
+                 make_instance("b", [str(i) for i in range(20)])]
+    result = list(iter_multi_timetables(instances, workers=4))
+    assert len(result) == 40
+    assert peak["a"] == 1
+    assert peak["b"] > 1
+
+
+def test_failures(calls):
+    instances = [make_instance("a", ["1", "bad"]), make_instance("b", ["1"])]
+    failures = get_multi_timetables(instances, lambda instance: [], workers=2,
+                                    max_attempts=2)
+    assert failures == {"a": {0: ["bad"]}, "b": {}}
+    assert failures["a"].attempts[(0, "bad")] == 2
+
+
+def test_shared_database(calls):
+    conn = sqlite3.connect(":memory:")
+    create_db(conn)
+    instances = [make_instance("a", ["101"]), make_instance("b", ["101"])]
+    failures = get_multi_timetables(
+        instances, lambda instance: [sqlite_callback(conn, instance=instance)],
+        workers=2
+    )
+    assert failures == {"a": {}, "b": {}}
+
+    week = get_current_week()
+    for instance in ("a", "b"):
+        timetable = load_timetable(conn, group="101", week=week, instance=instance)
+        assert timetable[0][0].lesson_data.where == instance
+
+
+def test_migrate_database():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE lesson(
+            id TEXT NOT NULL, classroom TEXT, name TEXT, group_id TEXT NOT NULL,
+            teacher_id TEXT, week_id TEXT NOT NULL, day_num INTEGER NOT NULL,
+            lesson_num INTEGER NOT NULL,
+            last_updated TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            last_checked TEXT NOT NULL DEFAULT '1970-01-01 00:00:00',
+            obsolete_since TEXT,
+            PRIMARY KEY (id, group_id)
+        );
+        CREATE INDEX idx_lessons_group ON lesson (group_id, week_id, day_num);
+    """)
+    lesson_id = str(uuid4())
+    conn.execute("INSERT INTO lesson(id, classroom, name, group_id, week_id, day_num, "
+                 "lesson_num) VALUES (?, '100', 'Математика', '101', '2026-3', 0, 0)",
+                 [lesson_id])
+    conn.commit()
+
+    create_db(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 4
+    timetable = load_timetable(conn, group="101", week="2026-3")
+    assert timetable[0][0] == (lesson_id, ("100", "Математика"))
+    indexes = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+    )}
+    assert indexes == {"idx_lesson_week", "idx_lesson_obsolete", "idx_lesson_updated",
+                       "idx_lesson_teacher"}
+
+    # Повторный вызов ничего не меняет
+    create_db(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 4
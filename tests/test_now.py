@@ -0,0 +1,115 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import sqlite3
+import threading
+from datetime import datetime
+from uuid import uuid4
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    sqlite_callback,
+    sqlite_teacher_callback,
+)
+from egov66_timetable.now import NowIndex, NowNext, now_callback, now_teacher_callback
+from egov66_timetable.types import Lesson, LessonData, Teacher, Timetable, Week
+from egov66_timetable.utils import YEKATERINBURG
+from tests.conftest import FakeClock
+
+week = Week.from_week_id("2026-10")
+
+
+def at(day: int, hour: int, minute: int = 0) -> float:
+    return datetime(2026, 3, 2 + day, hour, minute, tzinfo=YEKATERINBURG).timestamp()
+
+
+def make_lesson(name: str) -> Lesson:
+    return Lesson(str(uuid4()), LessonData("100", name))
+
+
+def names(result: NowNext) -> tuple[str | None, str | None]:
+    current, next_slot = result
+    return (None if current is None else current.lessons[0].lesson_data.name,
+            None if next_slot is None else next_slot.lessons[0].lesson_data.name)
+
+
+def test_group():
+    clock = FakeClock(at(0, 7))
+    index = NowIndex(clock=clock)
+    timetable: Timetable[Lesson] = [{0: make_lesson("А"), 2: make_lesson("Б")},
+                                    {1: make_lesson("В")}]
+    now_callback(index)(timetable, "101", week)
+
+    assert names(index.group("101")) == (None, "А")
+    current, next_slot = index.group("101", at(0, 9))
+    assert current is not None and current.lessons == (timetable[0][0],)
+    assert next_slot is not None and (next_slot.day_num, next_slot.lesson_num) == (0, 2)
+
+    # Перемена между парами
+    assert names(index.group("101", at(0, 11))) == (None, "Б")
+
+    # Следующая пара на другой день, после последней пары ничего нет
+    assert names(index.group("101", at(0, 15))) == (None, "В")
+    assert names(index.group("101", at(1, 12))) == (None, None)
+    assert names(index.group("102", at(0, 9))) == (None, None)
+
+    # Обновление заменяет неделю, следующая неделя добавляется
+    now_callback(index)([{0: make_lesson("Г")}], "101", week)
+    now_callback(index)([{0: make_lesson("Д")}], "101", week + 1)
+    assert names(index.group("101", at(0, 9))) == ("Г", "Д")
+
+    # Недели вне окна пропускаются, прошедшие удаляются
+    now_callback(index)([{0: make_lesson("Е")}], "101", week + 2)
+    assert names(index.group("101", at(7, 7))) == (None, "Д")
+    clock.now = at(7, 7)
+    index.prune()
+    assert names(index.group("101", at(0, 9))) == (None, "Д")
+    now_callback(index)([], "101", week + 1)
+    assert names(index.group("101")) == (None, None)
+
+
+def test_teacher_and_sqlite():
+    conn = sqlite3.connect(":memory:")
+    create_db(conn)
+    lesson = make_lesson("Химия")
+    teacher = Teacher(str(uuid4()), "Менделеев", "Дмитрий", "Иванович")
+    sqlite_callback(conn)([{}, {6: lesson, 7: make_lesson("Физика")}], "101", week)
+    teacher_timetable: Timetable[list[Lesson]] = [
+        {}, {6: [Lesson(lesson.id, LessonData("101", "Химия"))]}
+    ]
+    sqlite_teacher_callback(conn)(teacher_timetable, teacher, week)
+
+    index = NowIndex.from_sqlite(conn, clock=FakeClock(at(0, 7)))
+    current, next_slot = index.teacher(teacher.id, at(1, 19, 30))
+    assert current is not None and current.lessons[0].lesson_data.where == "101"
+    assert next_slot is None
+    # Восьмой пары нет в расписании звонков
+    assert index.group("101", at(1, 19, 30)).next is None
+
+    other = NowIndex(clock=FakeClock(at(0, 7)))
+    now_teacher_callback(other)(teacher_timetable, teacher, week)
+    assert other.teacher(teacher.id, at(1, 19)) == index.teacher(teacher.id, at(1, 19))
+
+
+def test_concurrent_update():
+    index = NowIndex(clock=FakeClock(at(0, 7)))
+    short: Timetable[Lesson] = [{0: make_lesson("А")}]
+    long: Timetable[Lesson] = [{num: make_lesson("Б") for num in range(6)}
+                               for _ in range(6)]
+    done = threading.Event()
+
+    def writer() -> None:
+        for _ in range(300):
+            index.update_group(long, "101", week)
+            index.update_group(short, "101", week)
+        done.set()
+
+    # Поиск во время перестройки видит индекс целиком, старый или новый
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        while not done.is_set():
+            assert names(index.group("101", at(5, 9))) in ((None, None), ("Б", "Б"))
+    finally:
+        thread.join()
@@ -0,0 +1,84 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import sqlite3
+from uuid import uuid4
+
+import pytest
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    load_timetables,
+    sqlite_callback,
+)
+from egov66_timetable.occupancy import OccupancyIndex, occupancy_callback
+from egov66_timetable.types import Lesson, LessonData, Timetable, Week
+
+week = Week.from_week_id("2000-2")
+
+
+def make_timetable(*lessons: tuple[int, str, str]) -> Timetable[Lesson]:
+    return [{
+        lesson_num: Lesson(str(uuid4()), LessonData(classroom, name))
+        for lesson_num, classroom, name in lessons
+    }]
+
+
+@pytest.fixture
+def index() -> OccupancyIndex:
+    index = OccupancyIndex(["100", "200", "300"])
+    index.update(make_timetable((0, "100", "А"), (1, "200", "Б")), "101", week)
+    index.update(make_timetable((0, "200", "В"), (1, "", "Г")), "102", week)
+    return index
+
+
+def test_free_rooms(index: OccupancyIndex):
+    assert index.free_rooms(week, 0, 0) == ["300"]
+    assert index.occupied_rooms(week, 0, 0) == ["100", "200"]
+    assert index.free_rooms(week, 0, 1) == ["100", "300"]
+    assert index.free_rooms(week, 1, 0) == ["100", "200", "300"]
+    assert index.free_rooms(week + 1, 0, 0) == ["100", "200", "300"]
+    assert not index.is_free("100", week, 0, 0)
+    assert index.is_free("300", week, 0, 0)
+
+
+def test_update_replaces(index: OccupancyIndex):
+    index.update(make_timetable((2, "400", "А")), "101", week)
+
+    assert index.free_rooms(week, 0, 0) == ["100", "300", "400"]
+    assert index.occupied_rooms(week, 0, 2) == ["400"]
+    assert index.occupants("400", week, 0, 2) == [("101", "А")]
+
+
+def test_conflicts(index: OccupancyIndex):
+    assert index.conflicts(week) == []
+
+    # Совмещенная пара не считается конфликтом
+    index.update(make_timetable((0, "100", "А")), "103", week)
+    assert index.conflicts(week) == []
+
+    index.update(make_timetable((0, "100", "Д")), "104", week)
+    assert index.conflicts(week) == [
+        ((week.week_id, 0, 0), "100", [("101", "А"), ("103", "А"), ("104", "Д")])
+    ]
+
+    index.update([], "104", week)
+    assert index.conflicts(week) == []
+
+
+def test_from_db():
+    conn = sqlite3.connect(":memory:")
+    create_db(conn)
+
+    timetable = make_timetable((0, "100", "А"), (1, "200", "Б"))
+    index = OccupancyIndex()
+    for callback in [sqlite_callback(conn), occupancy_callback(index)]:
+        callback(timetable, "101", week)
+
+    loaded = list(load_timetables(conn))
+    assert [(group, w.week_id) for _, group, w in loaded] == [("101", week.week_id)]
+    assert loaded[0][0][0] == timetable[0]
+
+    from_db = OccupancyIndex.from_timetables(loaded)
+    assert from_db.occupied_rooms(week, 0, 1) == index.occupied_rooms(week, 0, 1) == ["200"]
@@ -0,0 +1,133 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import pstats
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from egov66_timetable import profiling
+from egov66_timetable.callbacks.sqlite import create_db, sqlite_callback
+from egov66_timetable.types import Lesson, LessonData, Week
+from egov66_timetable.types.settings import Settings
+
+retained: list[object] = []
+
+
+def build_lessons() -> None:
+    retained.append([str(i) * 10 for i in range(10000)])
+
+
+def save_lessons() -> None:
+    retained.append(bytearray(200_000))
+
+
+def fetch_more() -> None:
+    retained.append(sum(range(1000)))
+
+
+def test_disabled():
+    assert profiling.get_profiler() is None
+    assert profiling.stage("fetch") is profiling.stage("build")
+
+
+def test_profile_run(tmp_path: Path):
+    settings: Settings = {
+        "instance": "https://t00.ecp.egov66.ru",
+        "cookies": {},
+        "profile_dir": str(tmp_path / "profile"),
+    }
+
+    with profiling.profile_run(settings):
+        profiler = profiling.get_profiler()
+        assert profiler is not None
+        for _ in range(2):
+            with profiling.stage("build"):
+                build_lessons()
+            with profiling.stage("callback"):
+                with profiling.stage("persist"):
+                    save_lessons()
+    retained.clear()
+
+    assert profiling.get_profiler() is None
+    assert profiler.calls == {"fetch": 0, "build": 2, "callback": 2, "persist": 2}
+
+    run_dir, = (tmp_path / "profile").iterdir()
+    assert sorted(path.name for path in run_dir.iterdir()) == [
+        "build.pstats", "callback.pstats", "persist.pstats", "report.txt"
+    ]
+
+    def functions(stage: str) -> set[str]:
+        stats = pstats.Stats(str(run_dir / f"{stage}.pstats"))
+        return {func for _, _, func in stats.stats}  # type: ignore[attr-defined]
+
+    # Вложенный этап не учитывается у внешнего
+    assert "build_lessons" in functions("build")
+    assert "save_lessons" in functions("persist")
+    assert "save_lessons" not in functions("callback")
+
+    report = (run_dir / "report.txt").read_text()
+    assert "Этап build: вызовов 2" in report
+    assert "Этап fetch" not in report
+    persist = report[report.index("Этап persist"):]
+    assert "bytearray(200_000)" in persist
+    assert "test_profiling.py" in persist
+
+
+def test_nested_durations():
+    profiler = profiling.Profiler(memory=False)
+    with profiler.stage("callback"):
+        time.sleep(0.05)
+        with profiler.stage("persist"):
+            time.sleep(0.1)
+    profiler.stop()
+
+    # Время вложенного этапа не учитывается у внешнего
+    assert 0.1 <= profiler.durations["persist"] < 0.15
+    assert 0.05 <= profiler.durations["callback"] < 0.1
+
+
+def test_threads():
+    profiler = profiling.Profiler(memory=False)
+    entered = threading.Event()
+    finished = threading.Event()
+
+    def fetch() -> None:
+        with profiler.stage("fetch"):
+            entered.set()
+            finished.wait(5)
+            fetch_more()
+
+    thread = threading.Thread(target=fetch)
+    thread.start()
+    entered.wait(5)
+    with profiler.stage("build"):
+        build_lessons()
+    finished.set()
+    thread.join()
+    profiler.stop()
+    retained.clear()
+
+    def functions(stage: profiling.Stage) -> set[str]:
+        stats = pstats.Stats(profiler.profiles[stage])
+        return {func for _, _, func in stats.stats}  # type: ignore[attr-defined]
+
+    # Завершение этапа в одном потоке не выключает профилирование в другом
+    assert "build_lessons" in functions("build")
+    assert "fetch_more" in functions("fetch")
+    assert profiler.calls["fetch"] == profiler.calls["build"] == 1
+
+
+def test_sqlite_persist(tmp_path: Path):
+    conn = sqlite3.connect(":memory:")
+    create_db(conn)
+    profiler = profiling.enable(memory=False)
+    try:
+        sqlite_callback(conn)([{0: Lesson(str(uuid4()), LessonData("100", "Химия"))}],
+                              "101", Week.from_week_id("2026-10"))
+    finally:
+        profiling.disable()
+    assert profiler.calls["persist"] == 1
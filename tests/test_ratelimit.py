@@ -0,0 +1,124 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from egov66_timetable import metrics, ratelimit
+from egov66_timetable.client import Client
+from egov66_timetable.ratelimit import RateLimiter, get_limiter
+from tests.conftest import FakeClock
+
+HOST = "t00.ecp.egov66.ru"
+
+
+@pytest.fixture(autouse=True)
+def limiters():
+    ratelimit.reset()
+    yield
+    ratelimit.reset()
+
+
+def test_burst_then_rate(clock: FakeClock):
+    limiter = RateLimiter(HOST, 2, burst=3, clock=clock, sleep=clock.sleep)
+    assert [limiter.acquire() for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire() == pytest.approx(0.5)
+    assert limiter.acquire() == pytest.approx(0.5)
+
+    clock.now += 10
+    assert [limiter.acquire() for _ in range(3)] == [0, 0, 0]
+
+
+def test_adaptive_rate(clock: FakeClock):
+    limiter = RateLimiter(HOST, 4, min_rate=1, max_rate=4, clock=clock, sleep=clock.sleep)
+
+    limiter.feedback(503, 0.1)
+    assert limiter.rate == 2
+    assert metrics.RATE_LIMIT.get(host=HOST) == 2
+
+    # Одновременные ошибки уменьшают частоту один раз
+    limiter.feedback(429, 0.1)
+    assert limiter.rate == 2
+
+    clock.now += 1
+    limiter.feedback(200, 5.0)
+    clock.now += 1
+    limiter.feedback("timeout", 10.0)
+    assert limiter.rate == 1
+
+    for _ in range(100):
+        limiter.feedback(200, 0.1)
+    assert limiter.rate == 4
+
+
+def test_probe_above_rate(clock: FakeClock):
+    # Без max_rate частота растет выше начальной, пока сайт справляется
+    limiter = RateLimiter(HOST, 1, clock=clock, sleep=clock.sleep)
+    for _ in range(100):
+        limiter.feedback(200, 0.1)
+    assert limiter.rate == pytest.approx(11)
+
+    limiter.feedback(429, 0.1)
+    assert limiter.rate == pytest.approx(5.5)
+
+
+def test_concurrent_feedback(clock: FakeClock):
+    limiter = RateLimiter(HOST, 1, clock=clock, sleep=clock.sleep)
+
+    def succeed() -> None:
+        for _ in range(200):
+            limiter.feedback(200, 0.1)
+
+    # Ни одно увеличение не теряется
+    threads = [threading.Thread(target=succeed) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.rate == pytest.approx(1 + 8 * 200 * ratelimit.INCREASE_STEP)
+
+
+def test_shared_state(tmp_path: Path, clock: FakeClock):
+    state_file = tmp_path / "ratelimit.db"
+    first = RateLimiter(HOST, 1, burst=2, state_file=state_file,
+                        clock=clock, sleep=clock.sleep)
+    second = RateLimiter(HOST, 1, burst=2, state_file=state_file,
+                         clock=clock, sleep=clock.sleep)
+
+    assert first.acquire() == 0
+    assert second.acquire() == 0
+    assert first.acquire() == pytest.approx(1)
+
+    second.feedback(500, 0.1)
+    first.acquire()
+    assert first.rate == 0.5
+
+    first.close()
+    second.close()
+
+
+def test_get_limiter():
+    # Ограничение включается только настройкой rate_limit
+    assert get_limiter({"instance": f"https://{HOST}", "cookies": {}}) is None
+
+    settings = {"instance": f"https://{HOST}", "cookies": {}, "rate_limit": {}}
+    limiter = get_limiter(settings)  # type: ignore[arg-type]
+    assert limiter is not None
+    assert limiter.rate == ratelimit.DEFAULT_RATE
+    assert limiter.max_rate == float("inf")
+    assert get_limiter(settings) is limiter  # type: ignore[arg-type]
+    assert Client(settings).limiter is limiter  # type: ignore[arg-type]
+
+    assert get_limiter({**settings, "rate_limit": False}) is None  # type: ignore[typeddict-item]
+
+
+def test_invalid_rate():
+    with pytest.raises(ValueError):
+        RateLimiter(HOST, 0)
+    with pytest.raises(ValueError):
+        RateLimiter(HOST, 1, min_rate=-1)
+    with pytest.raises(ValueError):
+        RateLimiter(HOST, 2, max_rate=1)
@@ -0,0 +1,129 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import sqlite3
+import time
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    load_timetable,
+    sqlite_callback,
+)
+from egov66_timetable.callbacks.sqlite.retention import (
+    RetentionPolicy,
+    archive_lessons,
+    retention_callback,
+    run_retention,
+)
+from egov66_timetable.types import Lesson, LessonData, Timetable, Week
+from egov66_timetable.utils import get_current_week
+from tests.conftest import FakeClock
+
+DAY = 24 * 3600
+
+
+def make_timetable(size: int) -> Timetable[Lesson]:
+    return [{num: Lesson(str(uuid4()), LessonData(str(100 + num), "Химия"))
+             for num in range(size)}]
+
+
+@pytest.fixture
+def conn(tmp_path: Path):
+    conn = sqlite3.connect(tmp_path / "timetable.db")
+    create_db(conn)
+    yield conn
+    conn.close()
+
+
+def count(conn: sqlite3.Connection, table: str) -> int:
+    return conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+def test_archive_obsolete(conn: sqlite3.Connection):
+    callback = sqlite_callback(conn)
+    week = Week.from_week_id("2026-10")
+    timetable = make_timetable(5)
+    callback(timetable, "101", week)
+    callback([{0: timetable[0][0]}], "101", week)
+    conn.execute("UPDATE lesson_v2 SET obsolete_since = obsolete_since - 40 * ?", [DAY])
+    conn.commit()
+
+    policy = RetentionPolicy(obsolete_days=30, batch_size=3)
+    assert archive_lessons(conn, policy, max_batches=1) == 3
+    assert archive_lessons(conn, policy) == 1
+    assert archive_lessons(conn, policy) == 0
+
+    assert count(conn, "lesson_v2") == 1
+    assert count(conn, "lesson_archive") == 4
+    assert load_timetable(conn, group="101", week=week)[0] == {0: timetable[0][0]}
+
+
+def test_archive_old_weeks(tmp_path: Path, conn: sqlite3.Connection):
+    clock = FakeClock(time.time())
+    callback = sqlite_callback(conn)
+    current = get_current_week()
+    for offset in range(-5, 1):
+        callback(make_timetable(2), "101", current + offset)
+
+    archive = tmp_path / "archive.db"
+    report = run_retention(conn, RetentionPolicy(keep_weeks=2), archive=archive,
+                           clock=clock)
+    assert report.archived == 6
+    assert report.vacuumed and report.optimized
+    assert count(conn, "lesson_v2") == 6
+
+    # Отдельный архив можно читать без основной базы данных
+    archived = sqlite3.connect(archive)
+    assert archived.execute(
+        "SELECT DISTINCT s.value FROM lesson_archive JOIN string AS s ON s.id = group_id"
+    ).fetchall() == [("101",)]
+    archived.close()
+
+    # Обслуживание выполняется не чаще интервала
+    clock.now += 60
+    report = run_retention(conn, RetentionPolicy(keep_weeks=2), archive=archive,
+                           clock=clock)
+    assert report == (0, 0, False, False)
+
+
+def test_incremental_vacuum(conn: sqlite3.Connection):
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    callback = sqlite_callback(conn)
+    week = Week.from_week_id("2026-10")
+    for group in range(200):
+        callback(make_timetable(6), str(group), week)
+    conn.execute("UPDATE lesson_v2 SET obsolete_since = 0")
+    conn.commit()
+
+    report = run_retention(conn, RetentionPolicy(), clock=FakeClock(time.time()))
+    assert report.archived == 1200
+    conn.execute("DELETE FROM lesson_archive")
+    conn.commit()
+    report = run_retention(conn, RetentionPolicy(vacuum_interval=0), clock=FakeClock(time.time()))
+    assert report.reclaimed > 0
+
+
+def test_retention_callback(conn: sqlite3.Connection):
+    clock = FakeClock(time.time())
+    week = Week.from_week_id("2026-10")
+    callbacks = [sqlite_callback(conn),
+                 retention_callback(conn, RetentionPolicy(obsolete_days=0, batch_size=1),
+                                    interval=10, clock=clock)]
+
+    for timetable in (make_timetable(3), make_timetable(0), make_timetable(0)):
+        clock.now += 1
+        for callback in callbacks:
+            callback(timetable, "101", week)
+    assert count(conn, "lesson_archive") == 0
+
+    # Одна пачка за интервал
+    clock.now += 10
+    callbacks[1]([], "101", week)
+    assert count(conn, "lesson_archive") == 1
+    callbacks[1]([], "101", week)
+    assert count(conn, "lesson_archive") == 1
@@ -0,0 +1,126 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import sqlite3
+from uuid import uuid4
+
+import pytest
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    sqlite_callback,
+)
+from egov66_timetable.search import (
+    SearchIndex,
+    search_callback,
+    search_teacher_callback,
+)
+from egov66_timetable.types import Conflict, Lesson, LessonData, Teacher, Week
+
+week = Week.from_week_id("2026-10")
+mendeleev = Teacher(str(uuid4()), "Менделеев", "Дмитрий", "Иванович")
+mendel = Teacher(str(uuid4()), "Мендель", "Грегор", "")
+
+
+@pytest.fixture
+def index() -> SearchIndex:
+    index = SearchIndex()
+    index.add_teacher(mendeleev)
+    index.add_teacher(mendel)
+    for group in ("101", "1011", "ИСП-21", "ИСП-22"):
+        index.add("group", group)
+    index.add("discipline", "Химия")
+    index.add("discipline", "Физическая культура")
+    index.add("room", "101")
+    index.add("room", "")
+    return index
+
+
+def keys(index: SearchIndex, query: str, **kwargs) -> list[str]:
+    return [result.key for result in index.search(query, **kwargs)]
+
+
+def test_prefix(index: SearchIndex):
+    assert len(index) == 9
+    assert keys(index, "мендел") == [mendel.id, mendeleev.id]
+    assert keys(index, "МЕНДЕЛЕЕВ Д И") == [mendeleev.id]
+    assert keys(index, "дмитрий") == [mendeleev.id]
+    assert keys(index, "физ кул") == ["Физическая культура"]
+    assert keys(index, "исп21") == ["ИСП-21"]
+    assert keys(index, "исп-2") == ["ИСП-21", "ИСП-22"]
+    assert keys(index, "101") == ["101", "101", "1011"]
+    assert keys(index, "101", kinds=["room"]) == ["101"]
+    assert keys(index, "101", limit=1) == ["101"]
+    assert keys(index, "") == []
+    assert keys(index, "химия мендел") == []
+
+
+def test_translit(index: SearchIndex):
+    assert keys(index, "mendeleev") == [mendeleev.id]
+    assert keys(index, "khim") == ["Химия"]
+    assert keys(index, "isp-21") == ["ИСП-21"]
+
+
+def test_fuzzy(index: SearchIndex):
+    assert keys(index, "химя") == ["Химия"]
+    assert keys(index, "mendeleyev")[0] == mendeleev.id
+    assert keys(index, "zzzz") == []
+
+    # Точное совпадение начала слова важнее похожего слова
+    result = index.search("менделеев")
+    assert [r.key for r in result] == [mendeleev.id]
+    assert result[0].score == 1.0
+
+
+def test_update(index: SearchIndex):
+    index.remove("teacher", mendeleev.id)
+    index.remove("teacher", mendeleev.id)
+    assert keys(index, "мендел") == [mendel.id]
+    assert "mendeleev" not in index._postings
+    assert ("teacher", mendeleev.id) not in index
+
+    index.add("group", "ИСП-21", "ИСП-21 (программисты)")
+    assert keys(index, "програм") == ["ИСП-21"]
+    assert len(index) == 8
+
+
+def test_callbacks():
+    index = SearchIndex()
+    lesson = Lesson(str(uuid4()), LessonData("205", "Органическая химия"))
+    search_callback(index)([{0: lesson}], "101", week)
+    search_teacher_callback(index)([{0: [Lesson(lesson.id, LessonData("101", "Физика"))]}],
+                                   mendeleev, week)
+
+    assert keys(index, "орг") == ["Органическая химия"]
+    assert keys(index, "205") == ["205"]
+    assert keys(index, "физ") == ["Физика"]
+    assert keys(index, "мен") == [mendeleev.id]
+
+
+def test_callback_conflict():
+    index = SearchIndex()
+    conflict = Conflict([Lesson(str(uuid4()), LessonData("202", "Физика")),
+                         Lesson(str(uuid4()), LessonData("203", "Химия"))])
+    search_callback(index)([{0: conflict}], "101", week)
+
+    # Индексируются исходные пары, а не пара-заглушка
+    assert keys(index, "ошибка") == []
+    assert keys(index, "физика") == ["Физика"]
+    assert keys(index, "202") == ["202"]
+    assert keys(index, "хим") == ["Химия"]
+
+
+def test_from_sqlite():
+    conn = sqlite3.connect(":memory:")
+    create_db(conn)
+    sqlite_callback(conn)([{0: Lesson(str(uuid4()), LessonData("205", "Химия"))}],
+                          "101", week)
+    index = SearchIndex.from_sqlite(conn, teachers=[mendeleev], groups=["102"])
+
+    assert [(result.kind, result.key) for result in index.search("10")] == [
+        ("group", "101"), ("group", "102")
+    ]
+    assert keys(index, "хим") == ["Химия"]
+    assert keys(index, "205") == ["205"]
+    assert keys(index, "mendeleev") == [mendeleev.id]
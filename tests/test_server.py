@@ -0,0 +1,220 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import asyncio
+import json
+import sqlite3
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    sqlite_callback,
+    sqlite_teacher_callback,
+)
+from egov66_timetable.server import TimetableServer
+from egov66_timetable.types import Lesson, LessonData, Teacher, Timetable, Week
+
+week = Week.from_week_id("2026-10")
+
+
+@pytest.fixture
+def conn(tmp_path: Path):
+    conn = sqlite3.connect(tmp_path / "timetable.db")
+    create_db(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def server(tmp_path: Path, conn: sqlite3.Connection):
+    server = TimetableServer(tmp_path / "timetable.db", cache_weeks=2)
+    yield server
+    server.close()
+
+
+def get(server: TimetableServer, target: str, **headers: str) -> tuple[int, object]:
+    response = asyncio.run(server.handle("GET", target, headers))
+    return response.status, json.loads(response.body) if response.body else None
+
+
+def test_timetables(conn: sqlite3.Connection, server: TimetableServer):
+    lesson = Lesson(str(uuid4()), LessonData("100", "Химия"))
+    timetable: Timetable[Lesson] = [{0: lesson}, {1: Lesson(str(uuid4()),
+                                                            LessonData("?", "Ошибка"))}]
+    sqlite_callback(conn)(timetable, "ИСП-21", week)
+    sqlite_callback(conn)([{0: Lesson(lesson.id, LessonData("100", "Химия"))}], "102", week)
+    teacher = Teacher(str(uuid4()), "Менделеев", "Дмитрий", "Иванович")
+    sqlite_teacher_callback(conn)([{0: [Lesson(lesson.id, LessonData("ИСП-21", "Химия"))]}],
+                                  teacher, week)
+
+    status, document = get(server, "/groups/%D0%98%D0%A1%D0%9F-21/2026-10")
+    assert status == 200
+    assert document == {
+        "group": "ИСП-21", "week_id": "2026-10",
+        "timetable": [{"0": [lesson.id, ["100", "Химия"]]},
+                      {"1": [timetable[1][1].id, ["?", "Ошибка"]]}, {}, {}, {}],
+    }
+
+    status, document = get(server, f"/teachers/{teacher.id}/2026-10")
+    assert status == 200 and isinstance(document, dict)
+    assert document["timetable"][0] == {"0": [[lesson.id, ["ИСП-21", "Химия"]]]}
+
+    status, document = get(server, "/classrooms/100/2026-10")
+    assert status == 200 and isinstance(document, dict)
+    assert document["timetable"] == [
+        {"0": [[lesson.id, ["102", "Химия"]], [lesson.id, ["ИСП-21", "Химия"]]]},
+        {}, {}, {}, {},
+    ]
+
+    status, document = get(server, "/weeks/2026-10")
+    assert status == 200 and isinstance(document, dict)
+    assert sorted(document["groups"]) == ["102", "ИСП-21"]
+
+    # Неизвестная группа: пустое расписание, как у load_timetable
+    assert get(server, "/groups/999/2026-10") == (200, {
+        "group": "999", "week_id": "2026-10", "timetable": [{}, {}, {}, {}, {}],
+    })
+
+    assert get(server, "/groups/101/2026")[0] == 400
+    assert get(server, "/teachers/abc/2026-10")[0] == 400
+    assert get(server, "/lessons")[0] == 404
+    assert asyncio.run(server.handle("POST", "/weeks/2026-10")).status == 405
+
+
+def test_etag_and_invalidation(conn: sqlite3.Connection, server: TimetableServer):
+    callback = sqlite_callback(conn)
+    callback([{0: Lesson(str(uuid4()), LessonData("100", "Химия"))}], "101", week)
+
+    response = asyncio.run(server.handle("GET", "/groups/101/2026-10"))
+    assert response.etag is not None
+    assert get(server, "/groups/101/2026-10", **{"if-none-match": response.etag}) == (
+        304, None
+    )
+
+    # Запись в базу данных сбрасывает кеш
+    callback([{0: Lesson(str(uuid4()), LessonData("200", "Физика"))}], "101", week)
+    status, document = get(server, "/groups/101/2026-10",
+                           **{"if-none-match": response.etag})
+    assert status == 200 and isinstance(document, dict)
+    assert document["timetable"][0]["0"][1] == ["200", "Физика"]
+
+
+def test_lru(conn: sqlite3.Connection, server: TimetableServer):
+    for offset in range(3):
+        get(server, f"/weeks/{(week + offset).week_id}")
+    assert list(server._cache) == [(week + 1).week_id, (week + 2).week_id]
+    get(server, f"/weeks/{(week + 1).week_id}")
+    assert list(server._cache) == [(week + 2).week_id, (week + 1).week_id]
+
+
+def test_changes(conn: sqlite3.Connection, server: TimetableServer):
+    callback = sqlite_callback(conn)
+    lessons = [Lesson(str(uuid4()), LessonData("100", "Химия")) for _ in range(3)]
+    callback([dict(enumerate(lessons))], "101", week)
+    conn.execute("UPDATE lesson_v2 SET last_updated = 1000 + lesson_num")
+    conn.commit()
+    callback([{0: lessons[0], 1: lessons[1]}], "101", week)
+    conn.execute("UPDATE lesson_v2 SET obsolete_since = 2000 WHERE obsolete_since IS NOT NULL")
+    conn.commit()
+
+    status, document = get(server, "/changes?since=1000&limit=1")
+    assert status == 200 and isinstance(document, dict)
+    assert [change["id"] for change in document["changes"]] == [lessons[1].id]
+    assert document["next"] == 1001
+
+    status, document = get(server, "/changes?since=1001")
+    assert status == 200 and isinstance(document, dict)
+    assert [(change["id"], change["status"]) for change in document["changes"]] == [
+        (lessons[2].id, "updated"), (lessons[2].id, "removed")
+    ]
+    assert document["changes"][1]["week_id"] == "2026-10"
+    assert get(server, "/changes?limit=0")[0] == 400
+
+
+def test_http(conn: sqlite3.Connection, server: TimetableServer):
+    sqlite_callback(conn)([{0: Lesson(str(uuid4()), LessonData("100", "Химия"))}],
+                          "101", week)
+
+    async def main() -> list[bytes]:
+        asyncio_server = await server.start(port=0)
+        port = asyncio_server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        responses: list[bytes] = []
+        for target in ("/groups/101/2026-10", "/nothing"):
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(next(line.split(b":")[1] for line in head.split(b"\r\n")
+                              if line.lower().startswith(b"content-length")))
+            responses.append(head + await reader.readexactly(length))
+        writer.close()
+        asyncio_server.close()
+        await asyncio_server.wait_closed()
+        return responses
+
+    first, second = asyncio.run(main())
+    assert first.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert b"ETag: " in first and first.endswith(b"}")
+    assert second.startswith(b"HTTP/1.1 404 Not Found\r\n")
+
+
+def test_changes_same_second(conn: sqlite3.Connection, server: TimetableServer):
+    callback = sqlite_callback(conn)
+    callback([{num: Lesson(str(uuid4()), LessonData("100", "Химия")) for num in range(4)}],
+             "101", week)
+    conn.execute("UPDATE lesson_v2 SET last_updated = 1000")
+    conn.commit()
+
+    # Все изменения за одну секунду отдаются, даже если их больше limit
+    status, document = get(server, "/changes?limit=2")
+    assert status == 200 and isinstance(document, dict)
+    assert len(document["changes"]) == 4
+    assert document["next"] == 1000
+
+
+async def exchange(server: TimetableServer, *requests: bytes) -> list[bytes]:
+    asyncio_server = await server.start(port=0)
+    port = asyncio_server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    responses: list[bytes] = []
+    for request in requests:
+        writer.write(request)
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(next(line.split(b":")[1] for line in head.split(b"\r\n")
+                          if line.lower().startswith(b"content-length")))
+        responses.append(head + await reader.readexactly(length))
+    # Сервис закрывает соединение сам: после 400 или по таймауту простоя
+    responses.append(await asyncio.wait_for(reader.read(), 5))
+    writer.close()
+    asyncio_server.close()
+    await asyncio_server.wait_closed()
+    return responses
+
+
+def test_http_body(server: TimetableServer):
+    server.idle_timeout = 0.1
+    first, second, rest = asyncio.run(exchange(
+        server,
+        b"GET /nothing HTTP/1.1\r\nContent-Length: 12\r\n\r\nGET /x HTTP/",
+        b"GET /nothing HTTP/1.1\r\n\r\n",
+    ))
+    assert first.startswith(b"HTTP/1.1 404 Not Found\r\n")
+    assert second.startswith(b"HTTP/1.1 404 Not Found\r\n")
+    assert rest == b""
+
+
+def test_http_limits(server: TimetableServer):
+    headers = b"".join(b"X-%d: 1\r\n" % num for num in range(101))
+    response, rest = asyncio.run(exchange(
+        server, b"GET /nothing HTTP/1.1\r\n" + headers + b"\r\n"
+    ))
+    assert response.startswith(b"HTTP/1.1 400 Bad Request\r\n")
+    assert rest == b""
+
+    response, rest = asyncio.run(exchange(
+        server, b"POST /nothing HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+    ))
+    assert response.startswith(b"HTTP/1.1 400 Bad Request\r\n")
@@ -0,0 +1,118 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+import egov66_timetable.sessions
+from egov66_timetable.client import Client
+from egov66_timetable.sessions import SessionStore
+
+INSTANCE = "https://t00.ecp.egov66.ru"
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> SessionStore:
+    return SessionStore(tmp_path / "sessions.json")
+
+
+@pytest.fixture
+def writes(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    writes: list[Path] = []
+    write_atomic = egov66_timetable.sessions.write_atomic
+
+    def counting_write_atomic(path, data):
+        writes.append(path)
+        write_atomic(path, data)
+
+    monkeypatch.setattr(egov66_timetable.sessions, "write_atomic", counting_write_atomic)
+    return writes
+
+
+def test_checkout_empty(store: SessionStore):
+    assert store.checkout(INSTANCE) is None
+    assert not store.path.exists()
+
+
+def test_lease(store: SessionStore):
+    store.update(INSTANCE, None, "a")
+    assert store.checkout(INSTANCE) is None
+
+    store.release(INSTANCE, "a")
+    assert store.checkout(INSTANCE) == "a"
+    assert store.checkout(INSTANCE) is None
+
+
+def test_multiple_sessions(store: SessionStore):
+    store.update(INSTANCE, None, "a")
+    store.update(INSTANCE, None, "b")
+    store.update("https://t01.ecp.egov66.ru", None, "c")
+    store.release(INSTANCE, "a")
+    store.release(INSTANCE, "b")
+
+    assert {store.checkout(INSTANCE), store.checkout(INSTANCE)} == {"a", "b"}
+    assert store.checkout(INSTANCE) is None
+
+
+def test_update_replaces(store: SessionStore):
+    store.update(INSTANCE, None, "a")
+    store.update(INSTANCE, "a", "b")
+    assert [entry["cookie"] for entry in store.sessions(INSTANCE)] == ["b"]
+
+
+def test_unchanged_not_written(store: SessionStore, writes: list[Path]):
+    store.update(INSTANCE, None, "a")
+    store.update(INSTANCE, "a", "a")
+    store.release(INSTANCE, "a")
+    store.release(INSTANCE, "a")
+    assert len(writes) == 2
+
+
+def test_expired_sessions(store: SessionStore):
+    store.path.write_text(json.dumps({INSTANCE: [{
+        "cookie": "old", "updated": 0, "leased_until": 0, "pid": 0,
+    }]}))
+    assert store.checkout(INSTANCE) is None
+    assert json.loads(store.path.read_text()) == {}
+
+
+def test_discard(store: SessionStore):
+    store.update(INSTANCE, None, "a")
+    store.discard(INSTANCE, "a")
+    assert store.sessions(INSTANCE) == []
+
+
+def test_concurrent_checkout(store: SessionStore):
+    for cookie in "abcdefgh":
+        store.update(INSTANCE, None, cookie)
+        store.release(INSTANCE, cookie)
+
+    results: list[str | None] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(store.checkout(INSTANCE)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == list("abcdefgh")  # type: ignore[type-var]
+
+
+def test_client_settings_untouched(store: SessionStore):
+    store.update(INSTANCE, None, "a")
+    store.release(INSTANCE, "a")
+
+    cookies = {"edinyi_lk_session": "static"}
+    client = Client({"instance": INSTANCE, "cookies": cookies,
+                     "sessions_file": str(store.path)})
+    client._checkout_session()
+    assert client.settings["cookies"]["edinyi_lk_session"] == "a"
+    assert cookies == {"edinyi_lk_session": "static"}
+
+    client.close()
+    assert store.checkout(INSTANCE) == "a"
@@ -0,0 +1,105 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import sqlite3
+import struct
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    load_teacher_timetables,
+    load_timetables,
+    sqlite_callback,
+    sqlite_teacher_callback,
+)
+from egov66_timetable.snapshot import Snapshot, export_sqlite, write_snapshot
+from egov66_timetable.types import Lesson, LessonData, Teacher, Timetable, Week
+
+week = Week.from_week_id("2026-10")
+
+
+def test_write_snapshot(tmp_path: Path):
+    timetable: Timetable[Lesson] = [
+        {0: Lesson(str(uuid4()), LessonData("100", "Химия")),
+         3: Lesson(str(uuid4()), LessonData("", "Физика"))},
+        {},
+        {1: Lesson(str(uuid4()), LessonData("200", "Химия"))},
+    ]
+    teacher_id = str(uuid4())
+    teacher_timetable: Timetable[list[Lesson]] = [
+        {0: [Lesson(timetable[0][0].id, LessonData("101", "Химия")),
+             Lesson(timetable[0][0].id, LessonData("102", "Химия"))]},
+        {}, {}, {}, {}, {},
+    ]
+    assert write_snapshot(tmp_path / "timetable.snap",
+                          [(timetable, "101", week), ([{}], "102", week + 1)],
+                          [(teacher_timetable, teacher_id, week)],
+                          instance="site") == 3
+
+    with Snapshot(tmp_path / "timetable.snap") as snapshot:
+        assert snapshot.instance == "site"
+        assert len(snapshot) == 3
+        assert snapshot.get_timetable("101", week) == timetable
+        assert snapshot.get_timetable("102", "2026-11") == [{}]
+        assert snapshot.get_timetable("101", week + 1) is None
+        assert snapshot.get_timetable("103", week) is None
+        assert snapshot.get_teacher_timetable(teacher_id, week) == teacher_timetable
+        assert snapshot.get_teacher_timetable(teacher_id, week + 1) is None
+
+        assert [(group, w.week_id) for _, group, w in snapshot.timetables()] == [
+            ("101", "2026-10"), ("102", "2026-11")
+        ]
+        assert [group for _, group, _ in snapshot.timetables(week + 1)] == ["102"]
+        assert [key for _, key, _ in snapshot.teacher_timetables()] == [teacher_id]
+
+
+def test_export_sqlite(tmp_path: Path):
+    conn = sqlite3.connect(tmp_path / "timetable.db")
+    create_db(conn)
+    lesson = Lesson(str(uuid4()), LessonData("100", "Химия"))
+    for offset in range(3):
+        first = lesson if offset == 0 else Lesson(str(uuid4()), lesson.lesson_data)
+        sqlite_callback(conn)([{0: first}, {2: Lesson(str(uuid4()), LessonData("?", "Б"))}],
+                              "ИСП-21", week + offset)
+    sqlite_callback(conn)([{0: Lesson(lesson.id, LessonData("100", "Химия"))}], "102", week)
+    teacher = Teacher(str(uuid4()), "Менделеев", "Дмитрий", "Иванович")
+    sqlite_teacher_callback(conn)([{0: [Lesson(lesson.id, LessonData("102", "Химия")),
+                                        Lesson(lesson.id, LessonData("ИСП-21", "Химия"))]}],
+                                  teacher, week)
+
+    assert export_sqlite(conn, tmp_path / "timetable.snap") == 5
+    with Snapshot(tmp_path / "timetable.snap") as snapshot:
+        assert list(snapshot.timetables()) == list(load_timetables(conn))
+        assert list(snapshot.teacher_timetables()) == list(load_teacher_timetables(conn))
+    conn.close()
+
+
+def test_replace(tmp_path: Path):
+    path = tmp_path / "timetable.snap"
+    write_snapshot(path, [([{}], "101", week)])
+    snapshot = Snapshot(path)
+
+    # Открытый снимок не меняется, когда файл заменяют новым
+    write_snapshot(path, [([{}], "102", week)])
+    assert snapshot.get_timetable("101", week) == [{}]
+    snapshot.close()
+    with Snapshot(path) as snapshot:
+        assert snapshot.get_timetable("101", week) is None
+
+
+def test_invalid(tmp_path: Path):
+    path = tmp_path / "timetable.snap"
+    path.write_bytes(b"not a snapshot" * 10)
+    with pytest.raises(ValueError):
+        Snapshot(path)
+
+    write_snapshot(path, [])
+    data = bytearray(path.read_bytes())
+    struct.pack_into("<I", data, 8, 999)
+    path.write_bytes(data)
+    with pytest.raises(ValueError, match="999"):
+        Snapshot(path)
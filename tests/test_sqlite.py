@@ -0,0 +1,90 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import sqlite3
+from uuid import uuid4
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    decode_week,
+    encode_week,
+    load_timetable,
+    load_timetables,
+    sqlite_callback,
+)
+from egov66_timetable.types import Lesson, LessonData, Week
+
+SCHEMA_V1 = """
+    CREATE TABLE lesson(
+        id TEXT NOT NULL, instance TEXT NOT NULL DEFAULT '', classroom TEXT,
+        name TEXT, group_id TEXT NOT NULL, teacher_id TEXT, week_id TEXT NOT NULL,
+        day_num INTEGER NOT NULL, lesson_num INTEGER NOT NULL,
+        last_updated TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        last_checked TEXT NOT NULL DEFAULT '1970-01-01 00:00:00',
+        obsolete_since TEXT,
+        PRIMARY KEY (id, group_id)
+    );
+    CREATE INDEX idx_lessons_instance_group
+        ON lesson (instance, group_id, week_id, day_num);
+    CREATE INDEX idx_lessons_teacher ON lesson (teacher_id, week_id, day_num);
+    PRAGMA user_version = 1;
+"""
+
+
+def columns(conn: sqlite3.Connection, table: str) -> list[tuple[object, ...]]:
+    return conn.execute(f"PRAGMA table_xinfo({table})").fetchall()
+
+
+def test_encode_week():
+    assert encode_week(Week.from_week_id("2026-12")) == 202612
+    assert decode_week(202612) == Week.from_week_id("2026-12")
+    assert encode_week("2025-52") < encode_week("2026-1")
+
+
+def test_migrate_v1():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA_V1)
+    current, obsolete, teacher = str(uuid4()), str(uuid4()), str(uuid4())
+    conn.executemany(
+        "INSERT INTO lesson(id, instance, classroom, name, group_id, teacher_id, "
+        "week_id, day_num, lesson_num, last_updated, obsolete_since) "
+        "VALUES (?, 'a', ?, 'Химия', '101', ?, '2026-3', 1, ?, "
+        "'2026-01-12 08:00:00', ?)",
+        [(current, "100", teacher, 2, None),
+         (obsolete, None, None, 3, "2026-01-13 09:30:00")]
+    )
+    conn.commit()
+
+    create_db(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 4
+    assert load_timetable(conn, group="101", week="2026-3", instance="a") == [
+        {}, {2: Lesson(current, LessonData("100", "Химия"))}, {}, {}, {}
+    ]
+    assert conn.execute(
+        "SELECT id, classroom, teacher_id, week_id, last_updated, obsolete_since "
+        "FROM lesson ORDER BY lesson_num"
+    ).fetchall() == [
+        (current, "100", teacher, "2026-3", "2026-01-12 08:00:00", None),
+        (obsolete, None, None, "2026-3", "2026-01-12 08:00:00", "2026-01-13 09:30:00"),
+    ]
+
+    fresh = sqlite3.connect(":memory:")
+    create_db(fresh)
+    for table in ("string", "lesson_v2", "lesson", "summary_teacher", "summary_group",
+                  "summary_room"):
+        assert columns(conn, table) == columns(fresh, table)
+
+
+def test_load_timetables_order():
+    conn = sqlite3.connect(":memory:")
+    create_db(conn)
+    callback = sqlite_callback(conn)
+    for week_id in ("2026-10", "2026-9"):
+        callback([{0: Lesson(str(uuid4()), LessonData("100", week_id))}], "101",
+                 Week.from_week_id(week_id))
+
+    assert [week.week_id for _, _, week in load_timetables(conn)] == ["2026-9", "2026-10"]
+    assert [week.week_id for _, _, week in load_timetables(conn, week="2026-10")] == [
+        "2026-10"
+    ]
@@ -0,0 +1,135 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import random
+import sqlite3
+from uuid import uuid4
+
+import pytest
+
+from egov66_timetable.callbacks.sqlite import (
+    create_db,
+    encode_week,
+    sqlite_callback,
+    sqlite_teacher_callback,
+)
+from egov66_timetable.callbacks.sqlite.retention import (
+    RetentionPolicy,
+    archive_lessons,
+)
+from egov66_timetable.callbacks.sqlite.summary import (
+    group_load,
+    rebuild_summaries,
+    room_usage,
+    teacher_load,
+)
+from egov66_timetable.types import Conflict, Lesson, LessonData, Teacher, Timetable, Week
+
+WEEK = Week.from_week_id("2026-10")
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    create_db(conn)
+    yield conn
+    conn.close()
+
+
+def make_lesson(where: str = "100", name: str = "Химия") -> Lesson:
+    return Lesson(str(uuid4()), LessonData(where, name))
+
+
+def summaries(conn: sqlite3.Connection) -> list[list[tuple[object, ...]]]:
+    return [conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3, 4").fetchall()
+            for table in ("summary_teacher", "summary_group", "summary_room")]
+
+
+def test_counts(conn: sqlite3.Connection):
+    callback = sqlite_callback(conn)
+    first, second, third = make_lesson(), make_lesson("?"), make_lesson("200", "Физика")
+    callback([{0: first, 1: second}, {0: third}], "101", WEEK)
+    callback([{0: make_lesson()}], "102", WEEK)
+
+    assert group_load(conn, WEEK) == {"101": {"Химия": 2, "Физика": 1},
+                                      "102": {"Химия": 1}}
+    assert group_load(conn, WEEK, group="102") == {"102": {"Химия": 1}}
+    assert room_usage(conn, WEEK) == {"100": 2, "200": 1}
+    assert room_usage(conn, WEEK + 1) == {}
+    assert room_usage(conn, WEEK, instance="other") == {}
+
+    teacher = Teacher(str(uuid4()), "Менделеев", "Дмитрий", "Иванович")
+    teacher_callback = sqlite_teacher_callback(conn)
+    teacher_lessons = [{0: [Lesson(first.id, LessonData("101", "Химия"))]},
+                       {0: [Lesson(third.id, LessonData("101", "Физика"))]}]
+    teacher_callback(teacher_lessons, teacher, WEEK)
+    teacher_callback(teacher_lessons, teacher, WEEK)
+    assert teacher_load(conn, WEEK) == {teacher.id: 2}
+
+    # Пару перенесли в другую аудиторию, а другую удалили
+    callback([{0: Lesson(first.id, LessonData("300", "Химия")), 1: second}], "101", WEEK)
+    assert group_load(conn, WEEK, group="101") == {"101": {"Химия": 2}}
+    assert room_usage(conn, WEEK) == {"100": 1, "300": 1}
+    assert teacher_load(conn, WEEK) == {teacher.id: 1}
+
+    # Пару перенесли на другую неделю
+    callback([{0: first}], "101", WEEK + 1)
+    assert group_load(conn, WEEK, group="101") == {"101": {"Химия": 1}}
+    assert teacher_load(conn, WEEK) == {}
+    assert room_usage(conn, WEEK + 1) == {"100": 1}
+
+
+def test_consistency(conn: sqlite3.Connection):
+    rng = random.Random(42)
+    callback = sqlite_callback(conn)
+    lessons = [make_lesson(rng.choice(["100", "200", "", "?"]),
+                           rng.choice(["Химия", "Физика"]))
+               for _ in range(40)]
+    for _ in range(50):
+        group, week = rng.choice(["101", "102"]), WEEK + rng.randrange(3)
+        sample = rng.sample(lessons, 12)
+        timetable: Timetable[Lesson] = [
+            {num: sample[day * 4 + num] for num in range(4)}
+            for day in range(rng.randrange(1, 4))
+        ]
+        callback(timetable, group, week)
+
+    expected = summaries(conn)
+    rebuild_summaries(conn)
+    assert summaries(conn) == expected
+
+
+def test_archive_keeps_counts(conn: sqlite3.Connection):
+    callback = sqlite_callback(conn)
+    callback([{0: make_lesson(), 1: make_lesson()}], "101", WEEK)
+    conn.execute("UPDATE lesson_v2 SET week = ?", [encode_week(WEEK - 60)])
+    conn.commit()
+    expected = summaries(conn)
+
+    assert archive_lessons(conn, RetentionPolicy(keep_weeks=1)) == 2
+    assert summaries(conn) == expected
+    assert room_usage(conn, WEEK - 60) == {"100": 2}
+
+    rebuild_summaries(conn)
+    assert summaries(conn) == expected
+
+
+def test_conflict(conn: sqlite3.Connection):
+    conflict = Conflict([make_lesson("200", "Физика"), make_lesson("300", "Химия")])
+    sqlite_callback(conn)([{0: conflict, 1: make_lesson()}], "101", WEEK)
+
+    # Пара-заглушка не считается предметом
+    assert group_load(conn, WEEK) == {"101": {"Химия": 1}}
+    expected = summaries(conn)
+    rebuild_summaries(conn)
+    assert summaries(conn) == expected
+
+    # База данных версии 3 считала заглушку предметом, миграция это исправляет
+    conn.execute("INSERT INTO summary_group SELECT instance, week, group_id, name, 1 "
+                 "FROM lesson_v2 WHERE lesson_num = 0")
+    conn.execute("PRAGMA user_version = 3")
+    conn.commit()
+    assert len(group_load(conn, WEEK)["101"]) == 2
+    create_db(conn)
+    assert summaries(conn) == expected
@@ -0,0 +1,47 @@
+# SPDX-License-Identifier: EUPL-1.2
+# SPDX-FileCopyrightText: 2026 Matvey Vyalkov
+# No warranty
+
+import json
+from pathlib import Path
+
+from egov66_timetable import tracing
+from egov66_timetable.types.settings import Settings
+
+
+def test_disabled():
+    assert tracing.get_tracer() is None
+    assert tracing.span("a") is tracing.span("b")
+
+
+def test_trace_run(tmp_path: Path):
+    trace_file = tmp_path / "trace.json"
+    settings: Settings = {
+        "instance": "https://t00.ecp.egov66.ru",
+        "cookies": {},
+        "trace_file": str(trace_file),
+    }
+
+    with tracing.trace_run(settings):
+        with tracing.span("outer", group="101"):
+            with tracing.span("inner"):
+                pass
+
+    assert tracing.get_tracer() is None
+
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    spans = {event["name"]: event for event in events if event["ph"] == "X"}
+    assert spans.keys() == {"outer", "inner"}
+    assert spans["outer"]["args"] == {"group": "101"}
+
+    outer, inner = spans["outer"], spans["inner"]
+    assert outer["tid"] == inner["tid"]
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert any(event["ph"] == "M" for event in events)
+
+
+def test_trace_run_disabled():
+    settings: Settings = {"instance": "https://t00.ecp.egov66.ru", "cookies": {}}
+    with tracing.trace_run(settings):
+        assert tracing.get_tracer() is None
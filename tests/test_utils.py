@@ -2,7 +2,9 @@
 # SPDX-FileCopyrightText: 2025 Matvey Vyalkov
 # No warranty
 
-from datetime import date
+import os
+import stat
+from datetime import date, time
 from pathlib import Path
 from unittest.mock import MagicMock
 
@@ -14,6 +16,8 @@ from egov66_timetable.exceptions import SessionExpired
 from egov66_timetable.utils import (
     get_csrf_token,
     get_current_week,
+    parse_bells,
+    write_atomic,
 )
 
 
@@ -41,3 +45,37 @@ def test_get_csrf_token(soup: BeautifulSoup):
 def test_get_csrf_token_expired(soup: BeautifulSoup):
     with pytest.raises(SessionExpired):
         get_csrf_token(soup)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="права доступа POSIX")
+def test_write_atomic_mode(tmp_path: Path):
+    path = tmp_path / "settings.json"
+    write_atomic(path, "{}")
+    assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~egov66_timetable.utils._get_umask()
+
+    path.chmod(0o640)
+    write_atomic(path, b"[]")
+    assert path.read_text() == "[]"
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="нет /proc")
+def test_get_umask(monkeypatch: pytest.MonkeyPatch):
+    umask = os.umask(0o022)
+    os.umask(umask)
+    egov66_timetable.utils._get_umask.cache_clear()
+
+    # umask читается из /proc и не меняется даже на время
+    monkeypatch.setattr(os, "umask", MagicMock(side_effect=AssertionError))
+    try:
+        assert egov66_timetable.utils._get_umask() == umask
+    finally:
+        egov66_timetable.utils._get_umask.cache_clear()
+
+
+def test_parse_bells():
+    assert parse_bells(["08:30 - 10:00", "10:10-11:40"]) == (
+        (time(8, 30), time(10, 0)), (time(10, 10), time(11, 40))
+    )
+    with pytest.raises(ValueError):
+        parse_bells(["08:30"])